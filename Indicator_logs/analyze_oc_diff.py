@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 """Analyze close-open behaviour against indicator metrics.
-Generates oc_diff_analysis.csv with correlation and filter performance stats."""
+Generates oc_diff_analysis.csv with correlation and filter performance stats.
+
+Filter stats run on web/dashboard/filter_grid.py and need numpy. Set
+OC_FILTER_GRID_CONFIG to a JSON file {"bull": {"axes": [...]}, "bear": {"axes": [...]}}
+(either section optional) to also sweep threshold grids."""
 import csv
+import json
+import os
+import sys
 from pathlib import Path
 
+FILTER_GRID_DIR = str(Path(__file__).resolve().parent.parent / 'web' / 'dashboard')
+
 LOG_FILE = Path('CBASTestingIndicator3_MNQ 12-25_NA.csv')
 OUTPUT_FILE = Path('oc_diff_analysis.csv')
 FLAT_TOLERANCE = 0.25  # treat |close-open| <= 0.25 as flat
@@ -67,62 +76,69 @@ def correlation(xs, ys):
     return num / (den_x * den_y)
 
 
-def rule_match(value, bounds):
-    if value is None:
-        return False
-    min_val, max_val = bounds
-    if min_val is not None and value < min_val:
-        return False
-    if max_val is not None and value > max_val:
-        return False
-    return True
+def _filter_grid():
+    """web/dashboard/filter_grid.py, imported on first use (it needs numpy)."""
+    if FILTER_GRID_DIR not in sys.path:
+        sys.path.insert(0, FILTER_GRID_DIR)
+    import filter_grid
+    return filter_grid
+
+
+def outcome_grid(records, fields, target_positive=True):
+    """FilterGrid over `fields`; positives are bars moving the target way by more than FLAT_TOLERANCE,
+    negatives those moving the other way (flat bars are in neither class)."""
+    diffs = [rec['oc_diff'] for rec in records]
+    up = [d > FLAT_TOLERANCE for d in diffs]
+    down = [d < -FLAT_TOLERANCE for d in diffs]
+    columns = {field: [rec.get(field) for rec in records] for field in fields}
+    return _filter_grid().FilterGrid(columns, positive=up if target_positive else down, negative=down if target_positive else up)
+
+
+def rule_conditions(rules):
+    """{field: (min, max)} -> filter_grid conditions; either bound may be None, a missing value never matches."""
+    conditions = []
+    for field, (min_val, max_val) in rules.items():
+        conditions.append((field, '>=', -float('inf') if min_val is None else min_val))
+        if max_val is not None:
+            conditions.append((field, '<=', max_val))
+    return conditions
+
+
+def confusion_row(name, row):
+    return {
+        'filter': name,
+        'tp': row['tp'],
+        'fp': row['fp'],
+        'tn': row['tn'],
+        'fn': row['fn'],
+        'precision': round(row['precision'], 3),
+        'recall': round(row['recall'], 3)
+    }
 
 
 def evaluate_filters(records, filters, target_positive=True):
-    rows = []
-    for name, rules in filters:
-        tp = fp = tn = fn = 0
-        for rec in records:
-            diff = rec['oc_diff']
-            cond = True
-            for field, bounds in rules.items():
-                if not rule_match(rec.get(field), bounds):
-                    cond = False
-                    break
-            if target_positive:
-                if diff > FLAT_TOLERANCE:
-                    if cond:
-                        tp += 1
-                    else:
-                        fn += 1
-                elif diff < -FLAT_TOLERANCE:
-                    if cond:
-                        fp += 1
-                    else:
-                        tn += 1
-            else:  # target negatives
-                if diff < -FLAT_TOLERANCE:
-                    if cond:
-                        tp += 1
-                    else:
-                        fn += 1
-                elif diff > FLAT_TOLERANCE:
-                    if cond:
-                        fp += 1
-                    else:
-                        tn += 1
-        precision = tp / (tp + fp) if (tp + fp) else 0.0
-        recall = tp / (tp + fn) if (tp + fn) else 0.0
-        rows.append({
-            'filter': name,
-            'tp': tp,
-            'fp': fp,
-            'tn': tn,
-            'fn': fn,
-            'precision': round(precision, 3),
-            'recall': round(recall, 3)
-        })
-    return rows
+    fields = {field for _, rules in filters for field in rules}
+    grid = outcome_grid(records, fields, target_positive)
+    rows = grid.evaluate_filters([(name, rule_conditions(rules)) for name, rules in filters])
+    return [confusion_row(row['label'], row) for row in rows]
+
+
+def load_grid_config(path):
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict) or not ({'bull', 'bear'} & set(config)):
+        raise ValueError(f'{path}: expected "bull" and/or "bear" sections '
+                         '(analyze_gradient_strategy_logs.py configs use a top-level "axes")')
+    return config
+
+
+def evaluate_filter_grid(records, config, target_positive=True):
+    """Confusion-matrix rows for every scenario of a filter_grid config ({"axes": [...], "min_n"})."""
+    axes = _filter_grid().axes_from_config(config)
+    grid = outcome_grid(records, {axis.field for axis in axes}, target_positive)
+    rows = grid.evaluate_grid(axes, min_n=int(config.get('min_n', 1)))
+    rows.sort(key=lambda r: (r['precision'], r['recall']), reverse=True)
+    return [confusion_row(row['label'], row) for row in rows]
 
 
 def compute_flat_stats(records):
@@ -249,6 +265,14 @@ def main():
 
     bull_rows = evaluate_filters(records, bull_filters, target_positive=True)
     bear_rows = evaluate_filters(records, bear_filters, target_positive=False)
+    # Optional threshold sweep (see module docstring)
+    grid_rows = []
+    grid_config = os.environ.get('OC_FILTER_GRID_CONFIG')
+    if grid_config:
+        cfg = load_grid_config(grid_config)
+        for section, target_positive in (('bull', True), ('bear', False)):
+            if section in cfg:
+                grid_rows.extend((f'{section}_grid', row) for row in evaluate_filter_grid(records, cfg[section], target_positive))
     flat_stats = compute_flat_stats(records)
 
     with OUTPUT_FILE.open('w', newline='') as f:
@@ -260,6 +284,8 @@ def main():
             writer.writerow(['bull_filter', row['filter'], row['precision'], f"recall={row['recall']} tp={row['tp']} fp={row['fp']} tn={row['tn']} fn={row['fn']}"])
         for row in bear_rows:
             writer.writerow(['bear_filter', row['filter'], row['precision'], f"recall={row['recall']} tp={row['tp']} fp={row['fp']} tn={row['tn']} fn={row['fn']}"])
+        for section, row in grid_rows:
+            writer.writerow([section, row['filter'], row['precision'], f"recall={row['recall']} tp={row['tp']} fp={row['fp']} tn={row['tn']} fn={row['fn']}"])
         writer.writerow(['flat_summary', 'flat_pct', flat_stats['flat_pct'], f"flat_count={flat_stats['flat_count']} total={flat_stats['total']}"])
     print(f"Analysis written to {OUTPUT_FILE}")
 
@@ -2,11 +2,15 @@ import csv
 import glob
 import os
 import statistics as stats
+import json
+import sys
 from collections import Counter, defaultdict
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# The what-if filter grid runs on web/dashboard/filter_grid.py (numpy), imported when needed
+FILTER_GRID_DIR = os.path.join(SCRIPT_DIR, 'web', 'dashboard')
 # Prefer workspace-local strategy_logs next to this script; fallback to user's Documents path
 LOG_DIR_LOCAL = os.path.join(SCRIPT_DIR, "strategy_logs")
 LOG_DIR_USER = os.path.join(os.path.expanduser("~"), "Documents", "NinjaTrader 8", "bin", "Custom", "strategy_logs")
@@ -255,10 +259,37 @@ def correlate_entry_indicators(trades: List[Dict[str,str]], main_rows: List[Dict
     return result
 
 
-def simulate_filter_grid(trades: List[Dict[str,str]], main_rows: List[Dict[str,str]]) -> List[Dict[str, object]]:
+# Default what-if grid (576 scenarios, "no filter" is added to every axis). GRADIENT_FILTER_GRID_CONFIG=<json>
+# replaces it with a file of the same shape (see web/dashboard/filter_grid.py); fields are snapshot keys and fg.
+DEFAULT_FILTER_GRID = {
+    'axes': [
+        {'field': 'GradStab', 'op': '<=', 'values': [1.85, 1.46, 1.40]},
+        {'field': 'RSI', 'op': '>=', 'values': [46.0, 50.0]},
+        {'field': 'ATR', 'op': '<=', 'values': [13.57, 12.00]},
+        {'field': 'ADX', 'op': '>=', 'values': [12.0, 15.0, 18.0]},
+        {'field': 'fg', 'op': '>=', 'abs': True, 'label': '|FastGrad|', 'values': [0.45, 0.50, 0.60]},
+    ],
+    'min_n': 1,
+}
+
+
+def load_filter_grid_config(path: str) -> Dict[str, object]:
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict) or 'axes' not in config:
+        raise ValueError(f'{path}: expected {{"axes": [...]}} (analyze_oc_diff.py configs use "bull"/"bear" sections)')
+    return config
+
+
+def simulate_filter_grid(trades: List[Dict[str,str]], main_rows: List[Dict[str,str]],
+                         config: Optional[Dict[str, object]] = None) -> List[Dict[str, object]]:
     """Counterfactual experiment: evaluate PnL if certain entry filters had been applied
     at the time of ENTRY. Uses the indicator snapshot parsed from the ENTRY row in DECISIONS CSV.
-    Returns a ranked list of scenarios with count and avg PnL."""
+    Returns a ranked list of scenarios with count, avg PnL, win rate and recall of winning trades.
+    Needs numpy (web/dashboard/filter_grid.py)."""
+    if FILTER_GRID_DIR not in sys.path:
+        sys.path.insert(0, FILTER_GRID_DIR)
+    from filter_grid import FilterGrid, axes_from_config
     # Map entry bar -> (snapshot, fastGrad)
     snap_by_bar: Dict[int, Dict[str,float]] = {}
     fg_by_bar: Dict[int, float] = {}
@@ -292,37 +323,17 @@ def simulate_filter_grid(trades: List[Dict[str,str]], main_rows: List[Dict[str,s
             entries.append(rec)
     if not entries:
         return []
-    # Grid of scenarios
-    import itertools
-    max_gradstab_vals = [None, 1.85, 1.46, 1.40]
-    min_rsi_vals = [None, 46.0, 50.0]
-    max_atr_vals = [None, 13.57, 12.00]
-    min_adx_vals = [None, 12.0, 15.0, 18.0]
-    min_fastgrad_vals = [None, 0.45, 0.50, 0.60]
+    if config is None:
+        config = DEFAULT_FILTER_GRID
+    axes = axes_from_config(config)
+    columns = {field: [e.get(field, 0.0) for e in entries] for field in {axis.field for axis in axes}}
+    pnl = [e['pnl'] for e in entries]
+    # keep_missing: a NaN snapshot value never excludes an entry, as in the original per-entry checks
+    grid = FilterGrid(columns, pnl=pnl, positive=[x > 0 for x in pnl], negative=[x <= 0 for x in pnl], keep_missing=True)
     scenarios = []
-    for mg, rsi, atr, adx_min, fg_min in itertools.product(max_gradstab_vals, min_rsi_vals, max_atr_vals, min_adx_vals, min_fastgrad_vals):
-        label_parts = []
-        if mg is not None: label_parts.append(f"GradStab<= {mg}")
-        if rsi is not None: label_parts.append(f"RSI>= {rsi}")
-        if atr is not None: label_parts.append(f"ATR<= {atr}")
-        if adx_min is not None: label_parts.append(f"ADX>= {adx_min}")
-        if fg_min is not None: label_parts.append(f"|FastGrad|>= {fg_min}")
-        label = ", ".join(label_parts) if label_parts else "No extra filters"
-        # Apply selection
-        sel = []
-        for e in entries:
-            if mg is not None and e.get('GradStab', 0.0) > mg: continue
-            if rsi is not None and e.get('RSI', 0.0) < rsi: continue
-            if atr is not None and e.get('ATR', 0.0) > atr: continue
-            if adx_min is not None and e.get('ADX', 0.0) < adx_min: continue
-            if fg_min is not None and abs(e.get('fg',0.0)) < fg_min: continue
-            sel.append(e)
-        if not sel:
-            continue
-        pnl = [x['pnl'] for x in sel]
-        avg = sum(pnl)/len(pnl) if pnl else 0.0
-        wr = sum(1 for x in pnl if x>0)/len(pnl)*100.0 if pnl else 0.0
-        scenarios.append({'label': label, 'n': len(sel), 'avg': round(avg,3), 'win_rate': round(wr,1)})
+    for row in grid.evaluate_grid(axes, min_n=int(config.get('min_n', 1))):
+        scenarios.append({'label': row['label'], 'n': row['n'], 'avg': round(row['avg'], 3),
+                          'win_rate': round(row['win_rate'], 1), 'recall': round(row['recall'], 3)})
     # Rank: prioritize average PnL then count
     scenarios.sort(key=lambda s: (s['avg'], s['n']), reverse=True)
     return scenarios
@@ -895,11 +906,16 @@ def main():
             for m, info in ind_corr['metrics'].items():
                 print(f"{m:7s} corrPnL={info['corr_pnl']:+.3f} corrBars={info['corr_bars']:+.3f} Q1={info['q1']:.3f} Q3={info['q3']:.3f} PnL_low={info['avg_low_pnl']:+.2f} PnL_high={info['avg_high_pnl']:+.2f} Bars_low={info['avg_low_bars']:.2f} Bars_high={info['avg_high_bars']:.2f} {info['suggestion']}")
         # New: what-if filter grid at ENTRY based on snapshots
-        sims = simulate_filter_grid(trades, rows)
+        grid_config = os.environ.get('GRADIENT_FILTER_GRID_CONFIG')
+        try:
+            sims = simulate_filter_grid(trades, rows, load_filter_grid_config(grid_config) if grid_config else None)
+        except ImportError:
+            print("\n[WARN] What-if entry filters need numpy (pip install numpy); skipped")
+            sims = []
         if sims:
             print("\n=== What-If Entry Filters (counterfactual) ===")
             for s in sims[:12]:
-                print(f"{s['label']:<50s}  n={s['n']:3d}  avg={s['avg']:+.3f}  win%={s['win_rate']:.1f}")
+                print(f"{s['label']:<50s}  n={s['n']:3d}  avg={s['avg']:+.3f}  win%={s['win_rate']:.1f}  recall={s['recall']:.3f}")
         # New: longest trades and longest trends analysis
         print("\n=== Longest Trades (tolerance) ===")
         top = find_longest_trades(trades, top_n=10)
@@ -18,12 +18,17 @@ Options:
     --output <file>          Output CSV file for results (optional)
 """
 
+import os
 import csv
 import sys
 import argparse
 from datetime import datetime
 from typing import List, Dict, Any
 
+# Streak search is shared with the dashboard's /api/analyze-streaks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web', 'dashboard'))
+from streak_engine import find_streak_windows
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Analyze opportunity logs for directional streaks')
@@ -85,112 +90,40 @@ def find_streaks(bars: List[Dict], args) -> List[Dict]:
     4. Optional gradient threshold check
     """
     streaks = []
-    i = 0
-    
-    while i < len(bars) - args.min_streak + 1:
-        # Try to find a streak starting at bar i
-        for length in range(args.max_streak, args.min_streak - 1, -1):
-            if i + length > len(bars):
-                continue
-            
-            streak_bars = bars[i:i+length]
-            
-            # Calculate net movement and direction
-            start_price = streak_bars[0]['open']
-            end_price = streak_bars[-1]['close']
-            net_movement = end_price - start_price
-            
-            if abs(net_movement) < args.min_movement:
-                continue
-            
-            direction = 'LONG' if net_movement > 0 else 'SHORT'
-            
-            # Filter by streak type
-            if args.type == 'long' and direction != 'LONG':
-                continue
-            if args.type == 'short' and direction != 'SHORT':
-                continue
-            
-            # Count good/bad bars
-            good_bars = 0
-            bad_bars = 0
-            for bar in streak_bars:
-                is_good_candle = bar['candleType'] == 'good'
-                if (direction == 'LONG' and is_good_candle) or (direction == 'SHORT' and not is_good_candle):
-                    good_bars += 1
-                else:
-                    bad_bars += 1
-            
-            # Check counter-trend ratio
-            actual_counter_ratio = bad_bars / length if length > 0 else 0
-            if actual_counter_ratio > args.counter_ratio:
-                continue
-            
-            # Calculate average gradient
-            gradients = [b['fastEmaGradDeg'] for b in streak_bars if b['fastEmaGradDeg'] is not None]
-            avg_gradient = sum(gradients) / len(gradients) if gradients else 0
-            
-            # Check if gradient meets threshold
-            gradient_ok = True
-            if direction == 'LONG' and avg_gradient < args.long_grad:
-                gradient_ok = False
-            if direction == 'SHORT' and avg_gradient > args.short_grad:
-                gradient_ok = False
-            
-            # Determine entry status
-            entry_bar = -1
-            entry_status = 'missed'
-            missed_points = abs(net_movement)
-            block_reasons = []
-            
-            # Check if we entered during this streak
-            for idx, bar in enumerate(streak_bars):
-                if bar['entryBar'] >= 0 and bar['currentPosition'] != 'Flat':
-                    entry_bar = bar['bar']
-                    if idx == 0:
-                        entry_status = 'caught'
-                        missed_points = 0
-                    else:
-                        entry_status = 'partial'
-                        entry_price = streak_bars[idx]['open']
-                        missed_points = abs(entry_price - start_price)
-                    break
-                
-                # Capture block reasons
-                if bar['opportunityType'] in ('LONG_SIGNAL', 'SHORT_SIGNAL'):
-                    if 'SKIPPED' in bar['actionTaken'] or 'BLOCKED' in bar['actionTaken']:
-                        if bar['blockReason'] and bar['blockReason'] not in block_reasons:
-                            block_reasons.append(bar['blockReason'])
-            
-            # Only add streaks that were either caught or had a valid signal
-            if entry_status != 'missed' or block_reasons:
-                streaks.append({
-                    'start_bar': streak_bars[0]['bar'],
-                    'end_bar': streak_bars[-1]['bar'],
-                    'start_time': streak_bars[0]['timestamp'],
-                    'end_time': streak_bars[-1]['timestamp'],
-                    'length': length,
-                    'direction': direction,
-                    'net_movement': net_movement,
-                    'avg_gradient': avg_gradient,
-                    'good_bars': good_bars,
-                    'bad_bars': bad_bars,
-                    'counter_ratio': actual_counter_ratio,
-                    'status': entry_status,
-                    'entry_bar': entry_bar,
-                    'missed_points': missed_points,
-                    'block_reasons': '; '.join(block_reasons),
-                    'pattern': streak_bars[0].get('barPattern', ''),
-                    'gradient_ok': gradient_ok,
-                    'start_price': start_price,
-                    'end_price': end_price
-                })
-                
-                # Skip ahead to avoid overlapping streaks
-                i += length
-                break
-        else:
-            i += 1
+    for streak in find_streak_windows(bars, args.min_streak, args.max_streak, args.min_movement,
+                                      args.type, args.counter_ratio, block_rule='any'):
+        streak_bars = streak['bars']
+        direction = streak['direction']
+        avg_gradient = streak['avg_gradient']
+        
+        # Check if gradient meets threshold
+        gradient_ok = True
+        if direction == 'LONG' and avg_gradient < args.long_grad:
+            gradient_ok = False
+        if direction == 'SHORT' and avg_gradient > args.short_grad:
+            gradient_ok = False
+        
+        streaks.append({
+            'start_bar': streak_bars[0]['bar'],
+            'end_bar': streak_bars[-1]['bar'],
+            'start_time': streak_bars[0]['timestamp'],
+            'end_time': streak_bars[-1]['timestamp'],
+            'length': streak['length'],
+            'direction': direction,
+            'net_movement': streak['net_movement'],
+            'avg_gradient': avg_gradient,
+            'good_bars': streak['good_bars'],
+            'bad_bars': streak['bad_bars'],
+            'counter_ratio': streak['counter_ratio'],
+            'status': streak['status'],
+            'entry_bar': streak['entry_bar'],
+            'missed_points': streak['missed_points'],
+            'block_reasons': '; '.join(streak['block_reasons']),
+            'pattern': streak_bars[0].get('barPattern', ''),
+            'gradient_ok': gradient_ok,
+            'start_price': streak['start_price'],
+            'end_price': streak['end_price']
+        })
     
     return streaks
 
@@ -0,0 +1,32 @@
+"""Shared fixtures for the dashboard module tests (pytest, run from web/dashboard)."""
+import random
+
+import pytest
+
+
+def _opportunity_bars(seed, count):
+    """Random walk of opportunity-log bars with entries, blocked signals and missing gradients."""
+    rnd = random.Random(seed)
+    bars, price = [], 20000.0
+    for k in range(count):
+        open_ = price
+        price = round(open_ + rnd.uniform(-3, 3.2), 2)
+        bars.append({
+            'bar': k,
+            'open': open_,
+            'close': price,
+            'fastEmaGradDeg': rnd.choice([None, round(rnd.uniform(-20, 20), 3)]),
+            'candleType': 'good' if price > open_ and rnd.random() < 0.8 else rnd.choice(['bad', 'good']),
+            'entryBar': rnd.choice([-1, -1, -1, -1, k]),
+            'currentPosition': rnd.choice(['Flat', 'Flat', 'Long', 'Short']),
+            'opportunityType': rnd.choice(['LONG_SIGNAL', 'SHORT_SIGNAL', 'NONE', 'NONE']),
+            'actionTaken': rnd.choice(['SKIPPED', 'BLOCKED_BY_FILTER', 'ENTERED', 'NONE']),
+            'blockReason': rnd.choice(['', '', 'grad', 'chop']),
+        })
+    return bars
+
+
+@pytest.fixture
+def opportunity_bars():
+    """opportunity_bars(seed, count) -> list of bar dicts as _load_opportunity_bars returns them."""
+    return _opportunity_bars
@@ -0,0 +1,225 @@
+"""
+Bitmask evaluation of entry-filter grids.
+
+A filter is a (field, op, threshold) comparison over one column of records; a
+scenario keeps the records that pass all of its filters. FilterGrid computes
+one boolean mask per distinct filter once (NumPy, cached) and evaluates a
+scenario by AND-ing masks, so a grid costs one mask per axis value plus one
+AND per axis and scenario instead of a Python pass over every record.
+Missing values (None/NaN) fail filters unless the grid is built with
+keep_missing=True (see FilterGrid).
+
+Grids are the cartesian product of axes; an axis is one field/op with a list
+of thresholds where None means "no filter on this axis". Scenario order is
+itertools.product order (last axis fastest). Axes can come from a JSON config
+(GRADIENT_FILTER_GRID_CONFIG for analyze_gradient_strategy_logs.py; analyze_oc_diff.py's
+OC_FILTER_GRID_CONFIG holds one such object per "bull"/"bear" section):
+
+    {"axes": [
+        {"field": "GradStab", "op": "<=", "values": [1.85, 1.46, 1.40]},
+        {"field": "RSI", "op": ">=", "values": {"start": 40, "stop": 60, "step": 2}},
+        {"field": "fg", "op": ">=", "abs": true, "label": "|FastGrad|", "values": [0.45, 0.5]}
+     ],
+     "min_n": 1}
+
+"values" is a list or an inclusive {start, stop, step} range; "None"/no-filter
+is prepended unless the axis has "required": true.
+
+Per scenario: n, and with pnl: total, avg, win_rate (%); with positive/negative
+labels: tp, fp, tn, fn, precision, recall. Records in neither class (e.g. flat
+bars) only count towards n.
+"""
+
+import numpy as np
+
+OPS = {
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '<': np.less,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+# op -> the comparison that excludes a record; with keep_missing a filter is ~exclude, so NaN passes
+EXCLUDE_OPS = {
+    '>=': np.less,
+    '<=': np.greater,
+    '>': np.less_equal,
+    '<': np.greater_equal,
+    '==': np.not_equal,
+    '!=': np.equal,
+}
+
+MAX_RANGE_VALUES = 1000
+# Scenario masks are built in blocks of at most this many (scenario x record) cells
+CHUNK_CELLS = 1 << 22
+
+
+class Axis:
+    """One grid dimension: `field op threshold` for each of `values` (None = no filter)."""
+
+    def __init__(self, field, op, values, label=None, use_abs=False):
+        if op not in OPS:
+            raise ValueError(f'Unknown filter op {op!r}')
+        self.field = field
+        self.op = op
+        self.values = list(values)
+        self.label = label or (f'|{field}|' if use_abs else field)
+        self.use_abs = use_abs
+
+    def describe(self, value):
+        return f'{self.label}{self.op} {value}'
+
+
+def expand_values(spec):
+    """List or {"start", "stop", "step"} (inclusive) -> list of thresholds."""
+    if isinstance(spec, dict):
+        start, stop = spec['start'], spec['stop']
+        step = spec.get('step', 1)
+        if not step or (stop - start) / step < 0:
+            raise ValueError(f'Invalid range {spec}')
+        count = int(round((stop - start) / step)) + 1
+        if count > MAX_RANGE_VALUES:
+            raise ValueError(f'Range {spec} has more than {MAX_RANGE_VALUES} values')
+        return [round(start + k * step, 10) for k in range(count)]
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+
+def axes_from_config(config):
+    """{"axes": [{"field", "op", "values", "label"?, "abs"?, "required"?}, ...]} -> [Axis]."""
+    axes = []
+    for spec in config['axes']:
+        values = expand_values(spec['values'])
+        if not spec.get('required') and None not in values:
+            values = [None] + values
+        axes.append(Axis(spec['field'], spec.get('op', '>='), values, spec.get('label'), bool(spec.get('abs'))))
+    return axes
+
+
+class FilterGrid:
+    """Masks and scenario statistics over one set of records.
+
+    columns: field -> sequence of numbers (None -> NaN).
+    pnl: per-record outcome for n/avg/win_rate; positive/negative: boolean labels for the confusion matrix.
+    keep_missing: False - a NaN value fails every filter on its field (record must match the rule);
+                  True  - a record is dropped only when the exclusion test is true, so NaN passes
+                          (the `if value > max: skip` style of the what-if scripts).
+    """
+
+    def __init__(self, columns, pnl=None, positive=None, negative=None, keep_missing=False):
+        self.columns = {name: np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+                        for name, values in columns.items()}
+        lengths = {len(col) for col in self.columns.values()}
+        if pnl is not None:
+            lengths.add(len(pnl))
+        if len(lengths) > 1:
+            raise ValueError('Filter grid columns differ in length')
+        self.n = lengths.pop() if lengths else 0
+        self.pnl = None if pnl is None else np.asarray(pnl, dtype=np.float64)
+        self.positive = None if positive is None else np.asarray(positive, dtype=bool)
+        self.negative = None if negative is None else np.asarray(negative, dtype=bool)
+        self.keep_missing = keep_missing
+        self._masks = {}
+
+    def column(self, field, use_abs=False):
+        col = self.columns[field]
+        return np.abs(col) if use_abs else col
+
+    def mask(self, field, op, threshold, use_abs=False):
+        """Records passing `field op threshold` (all records when threshold is None); cached."""
+        key = (field, op, threshold, use_abs)
+        cached = self._masks.get(key)
+        if cached is None:
+            if threshold is None:
+                cached = np.ones(self.n, dtype=bool)
+            else:
+                with np.errstate(invalid='ignore'):
+                    if self.keep_missing:
+                        cached = ~EXCLUDE_OPS[op](self.column(field, use_abs), threshold)
+                    else:
+                        # `NaN != x` is true, so drop missing values explicitly
+                        col = self.column(field, use_abs)
+                        cached = OPS[op](col, threshold) & ~np.isnan(col)
+            self._masks[key] = cached
+        return cached
+
+    def conditions_mask(self, conditions):
+        """AND of mask() over (field, op, threshold[, use_abs]) tuples."""
+        selected = np.ones(self.n, dtype=bool)
+        for condition in conditions:
+            selected &= self.mask(*condition)
+        return selected
+
+    def _stats(self, selected):
+        """Per-row statistics for a (scenarios x records) boolean matrix."""
+        stats = {'n': selected.sum(axis=1)}
+        weights = selected.astype(np.float64)
+        if self.pnl is not None:
+            stats['total'] = weights @ self.pnl
+            stats['wins'] = weights @ (self.pnl > 0)
+        if self.positive is not None:
+            stats['tp'] = weights @ self.positive
+            stats['fp'] = weights @ self.negative
+        return stats
+
+    def _rows(self, stats, labels):
+        n_pos = int(self.positive.sum()) if self.positive is not None else 0
+        n_neg = int(self.negative.sum()) if self.positive is not None else 0
+        rows = []
+        for k, label in enumerate(labels):
+            n = int(stats['n'][k])
+            row = {'label': label, 'n': n}
+            if self.pnl is not None:
+                total = float(stats['total'][k])
+                row['total'] = total
+                row['avg'] = total / n if n else 0.0
+                row['win_rate'] = float(stats['wins'][k]) / n * 100.0 if n else 0.0
+            if self.positive is not None:
+                tp, fp = int(stats['tp'][k]), int(stats['fp'][k])
+                row.update({
+                    'tp': tp,
+                    'fp': fp,
+                    'tn': n_neg - fp,
+                    'fn': n_pos - tp,
+                    'precision': tp / (tp + fp) if (tp + fp) else 0.0,
+                    'recall': tp / n_pos if n_pos else 0.0,
+                })
+            rows.append(row)
+        return rows
+
+    def evaluate_filters(self, filters):
+        """[(label, conditions)] -> one stats row per named filter set, in input order."""
+        if not filters:
+            return []
+        selected = np.stack([self.conditions_mask(conditions) for _, conditions in filters])
+        return self._rows(self._stats(selected), [label for label, _ in filters])
+
+    def evaluate_grid(self, axes, min_n=1):
+        """Stats for every scenario in the product of `axes`, in product order; scenarios with n < min_n dropped."""
+        stacks = [np.stack([self.mask(axis.field, axis.op, value, axis.use_abs) for value in axis.values])
+                  for axis in axes]
+        shape = tuple(len(axis.values) for axis in axes)
+        total = int(np.prod(shape)) if shape else 1
+        chunk = max(1, CHUNK_CELLS // max(self.n, 1))
+        rows = []
+        for first in range(0, total, chunk):
+            scenario = np.arange(first, min(first + chunk, total))
+            index = np.unravel_index(scenario, shape) if shape else ()
+            selected = np.ones((len(scenario), self.n), dtype=bool)
+            for stack, picks in zip(stacks, index):
+                selected &= stack[picks]
+            stats = self._stats(selected)
+            keep = np.nonzero(stats['n'] >= min_n)[0]
+            if not len(keep):
+                continue
+            stats = {name: values[keep] for name, values in stats.items()}
+            labels = []
+            for k in keep:
+                parts = [axis.describe(axis.values[picks[k]]) for axis, picks in zip(axes, index)
+                         if axis.values[picks[k]] is not None]
+                labels.append(', '.join(parts) or 'No extra filters')
+            rows.extend(self._rows(stats, labels))
+        return rows
+
@@ -0,0 +1,94 @@
+"""
+Overlap matching between bar-number ranges (trades vs trends).
+
+Two ranges overlap when an endpoint of one lies inside the other, inclusive -
+the test the trend analysis has always used. For well-formed ranges that is
+plain closed-interval overlap; a reversed range (start > end) only matches
+through its endpoints, and two reversed ranges never match.
+
+IntervalIndex sorts the intervals by start and keeps a max-end segment tree
+over that order: a query takes the intervals starting inside it with a bisect
+and walks the tree for the ones that start earlier but reach into it, so it
+costs O(log n + k) for k overlaps and matching m queries against n intervals
+is O((n + m) log n + K) instead of O(n * m).
+"""
+
+import bisect
+
+
+class IntervalIndex:
+    """Static index over (start, end) ranges; query results are positions in the input sequence."""
+
+    def __init__(self, ranges):
+        entries = []
+        self._reversed = set()
+        for pos, (start, end) in enumerate(ranges):
+            if start <= end:
+                entries.append((start, end, pos))
+            else:
+                # Reversed range: only its endpoints can match
+                self._reversed.add(pos)
+                entries.append((start, start, pos))
+                entries.append((end, end, pos))
+        entries.sort()
+        self._starts = [e[0] for e in entries]
+        self._ends = [e[1] for e in entries]
+        self._ids = [e[2] for e in entries]
+        size = 1
+        while size < len(entries):
+            size *= 2
+        self._size = size
+        tree = [None] * (2 * size)
+        tree[size:size + len(entries)] = self._ends
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if right is None or (left is not None and left >= right) else right
+        self._max_end = tree
+
+    def _reaching(self, stop, lo, out):
+        """Append ids at sorted positions [0, stop) whose end is >= lo."""
+        tree = self._max_end
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, first, last = stack.pop()
+            if first >= stop or tree[node] is None or tree[node] < lo:
+                continue
+            if node >= self._size:
+                out.append(self._ids[first])
+                continue
+            mid = (first + last) // 2
+            stack.append((2 * node + 1, mid, last))
+            stack.append((2 * node, first, mid))
+
+    def _overlap(self, lo, hi):
+        first = bisect.bisect_left(self._starts, lo)
+        last = bisect.bisect_right(self._starts, hi)
+        out = self._ids[first:last]
+        self._reaching(first, lo, out)
+        return out
+
+    def overlapping(self, start, end):
+        """Sorted positions of every range overlapping (start, end)."""
+        if start <= end:
+            return sorted(set(self._overlap(start, end)))
+        # Reversed query: its endpoints inside well-formed ranges
+        found = set(self._overlap(start, start)) | set(self._overlap(end, end))
+        return sorted(found - self._reversed)
+
+    def first(self, start, end):
+        """Lowest position overlapping (start, end), or None."""
+        found = self.overlapping(start, end)
+        return found[0] if found else None
+
+
+def match_overlaps(queries, ranges, all_matches=False):
+    """For each (start, end) query, positions in `ranges` that overlap it: the first one only
+    (as a 0/1-element list) unless all_matches, in which case every overlap in input order."""
+    index = IntervalIndex(ranges)
+    if all_matches:
+        return [index.overlapping(start, end) for start, end in queries]
+    out = []
+    for start, end in queries:
+        pos = index.first(start, end)
+        out.append([] if pos is None else [pos])
+    return out
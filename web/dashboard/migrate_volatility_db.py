@@ -0,0 +1,159 @@
+"""
+Versioned schema migrations for volatility.db.
+
+The schema version lives in `PRAGMA user_version`; each migration runs once, in
+order, and bumps it. Migrations are written to be idempotent so databases that
+were upgraded by the old per-request ALTER TABLE checks (user_version 0 but
+columns already present) migrate cleanly.
+
+Run at server startup (startup_event) or by hand:
+    python migrate_volatility_db.py
+"""
+
+import sqlite3
+
+from setup_volatility_db import DB_PATH, create_tables, ensure_aggregate_maintenance, rebuild_aggregated_stats
+
+# Columns added to the trades tables (volatility.db and dashboard.db) after their first release
+TRADES_ADDED_COLUMNS = (
+    ('contracts', 'INTEGER'),
+    ('ema_fast_period', 'INTEGER'),
+    ('ema_slow_period', 'INTEGER'),
+    ('ema_fast_value', 'REAL'),
+    ('ema_slow_value', 'REAL'),
+    ('candle_type', 'TEXT'),
+    ('open_final', 'REAL'),
+    ('high_final', 'REAL'),
+    ('low_final', 'REAL'),
+    ('close_final', 'REAL'),
+    ('fast_ema', 'REAL'),
+    ('fast_ema_grad_deg', 'REAL'),
+    ('bar_pattern', 'TEXT'),
+    ('entry_reason', 'TEXT'),
+)
+
+# EMA, stop-loss and strategy-debug columns sent with each bar sample
+BAR_SAMPLES_ADDED_COLUMNS = (
+    ('ema_fast_period', 'INTEGER'),
+    ('ema_slow_period', 'INTEGER'),
+    ('ema_fast_value', 'REAL'),
+    ('ema_slow_value', 'REAL'),
+    ('fast_ema_grad_deg', 'REAL'),
+    ('stop_loss_points', 'REAL'),
+    ('candle_type', 'TEXT'),
+    ('trend_up', 'INTEGER'),
+    ('trend_down', 'INTEGER'),
+    ('allow_long_this_bar', 'INTEGER'),
+    ('allow_short_this_bar', 'INTEGER'),
+    ('pending_long_from_bad', 'INTEGER'),
+    ('pending_short_from_good', 'INTEGER'),
+    ('avoid_longs_on_bad_candle', 'INTEGER'),
+    ('avoid_shorts_on_good_candle', 'INTEGER'),
+    ('entry_reason', 'TEXT'),
+)
+
+
+def add_missing_columns(cursor, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, type) not already in `table`. Returns the added names."""
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    added = []
+    for name, decl in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+            added.append(name)
+    return added
+
+
+def _create_trades_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_time REAL NOT NULL,
+            entry_bar INTEGER,
+            direction TEXT,
+            entry_price REAL,
+            exit_time REAL,
+            exit_bar INTEGER,
+            exit_price REAL,
+            bars_held INTEGER,
+            realized_points REAL,
+            mfe REAL,
+            mae REAL,
+            exit_reason TEXT
+        )
+    """)
+    add_missing_columns(cursor, 'trades', TRADES_ADDED_COLUMNS)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_entry_time ON trades(entry_time DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_direction ON trades(direction)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_exit_reason ON trades(exit_reason)")
+    # Prevent the same filled trade from being recorded twice
+    try:
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_volatility_trades_unique_entry
+            ON trades(entry_time, entry_price, direction)
+        """)
+    except sqlite3.IntegrityError as ex:
+        print(f'[MIGRATE] trades unique index skipped (duplicates exist): {ex}')
+
+
+def _add_bar_sample_columns(cursor):
+    add_missing_columns(cursor, 'bar_samples', BAR_SAMPLES_ADDED_COLUMNS)
+
+
+def _unique_bar_samples(cursor):
+    """One row per (symbol, timestamp, bar_index) so re-posted bars are ignored by INSERT OR IGNORE."""
+    # Keep the first copy of bars stored twice before the index existed
+    cursor.execute('''
+        DELETE FROM bar_samples
+        WHERE symbol IS NOT NULL AND timestamp IS NOT NULL AND bar_index IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM bar_samples GROUP BY symbol, timestamp, bar_index)
+    ''')
+    removed = cursor.rowcount
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_bar_samples_unique_bar
+        ON bar_samples(symbol, timestamp, bar_index)
+    ''')
+    if removed > 0:
+        print(f'[MIGRATE] removed {removed} duplicate bar_samples rows')
+        # The insert trigger counted the duplicates; recompute the stats without them
+        if not ensure_aggregate_maintenance(cursor):
+            rebuild_aggregated_stats(cursor)
+
+
+# (version, description, migration(cursor)); append new migrations, never renumber
+MIGRATIONS = (
+    (1, 'base volatility tables', create_tables),
+    (2, 'trades table for filled trades', _create_trades_table),
+    (3, 'bar_samples EMA, stop-loss and debug columns', _add_bar_sample_columns),
+    (4, 'unique bar_samples (symbol, timestamp, bar_index)', _unique_bar_samples),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate_volatility_db(conn=None, db_path=DB_PATH):
+    """Apply pending migrations. Uses `conn` if given (caller holds its lock). Returns applied versions."""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        applied = []
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            migrate(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+            applied.append(number)
+            print(f'[MIGRATE] volatility.db v{number}: {description}')
+        return applied
+    finally:
+        if own_conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    applied = migrate_volatility_db()
+    print(f'volatility.db schema version {SCHEMA_VERSION} ({len(applied)} migrations applied)')
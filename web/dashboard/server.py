@@ -1,20 +1,50 @@
 import os
+import sys
 import time
 import json
 import csv
 import sqlite3
 import hashlib
 import re
+import bisect
 import io
+import gzip
+import zlib
+import queue
+import asyncio
+import threading
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from collections import deque
+from collections import deque, OrderedDict
+from contextlib import contextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Query
 from starlette.requests import ClientDisconnect
 from fastapi import WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from setup_volatility_db import ensure_aggregate_maintenance, rebuild_aggregated_stats
+from migrate_volatility_db import migrate_volatility_db, add_missing_columns, TRADES_ADDED_COLUMNS
+from tick_cache import tick_cache, build_sidecar, parse_tick_line, SIDECAR_SUFFIX
+from wire_format import decode_body, merge_state_delta, UnsupportedWireFormat
+from interval_match import IntervalIndex
+# numpy is in requirements.txt; an install without it still serves everything else, and the
+# numpy endpoints (resample-tick, analyze-streaks, its sweep) answer 501
+try:
+    import tick_bars
+except ImportError:
+    tick_bars = None
+try:
+    import streak_engine
+    import streak_sweep
+except ImportError:
+    streak_engine = streak_sweep = None
+if tick_bars is None or streak_engine is None:
+    print('[STARTUP] numpy is not installed (pip install -r requirements.txt); '
+          'tick resampling and streak analysis endpoints are disabled')
 
 app = FastAPI()
 
@@ -27,6 +57,207 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# --- Bounded executors per endpoint class ---
+# Blocking sqlite/file work must not run on the event loop (it would stall /diag ingest and
+# WebSocket pushes). Each endpoint class gets its own thread pool so a long analytics scan can
+# never hold the threads that live ingest needs. 'admission' caps requests in flight per class
+# (running + waiting for a thread); 0 = unlimited. Over the cap we answer 503 after ADMISSION_WAIT_SEC.
+POOL_CLASSES = {
+    'ingest':    {'workers': int(os.environ.get('POOL_INGEST_WORKERS', '2')),    'admission': 0},
+    'db':        {'workers': int(os.environ.get('POOL_DB_WORKERS', '4')),        'admission': int(os.environ.get('POOL_DB_ADMISSION', '8'))},
+    'analytics': {'workers': int(os.environ.get('POOL_ANALYTICS_WORKERS', '2')), 'admission': int(os.environ.get('POOL_ANALYTICS_ADMISSION', '4'))},
+    'download':  {'workers': int(os.environ.get('POOL_DOWNLOAD_WORKERS', '2')),  'admission': int(os.environ.get('POOL_DOWNLOAD_ADMISSION', '2'))},
+}
+ADMISSION_WAIT_SEC = float(os.environ.get('ADMISSION_WAIT_SEC', '2.0'))
+
+class AdmissionRejected(Exception):
+    """Raised when an endpoint class is saturated; mapped to HTTP 503."""
+    def __init__(self, kind: str):
+        super().__init__(f'{kind} pool is busy')
+        self.kind = kind
+
+class WorkPool:
+    """Thread pool plus admission semaphore for one endpoint class."""
+
+    def __init__(self, name: str, workers: int, admission: int = 0):
+        self.name = name
+        self.workers = max(1, workers)
+        self.admission = max(0, admission)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'{name}-pool')
+        self._sem = asyncio.Semaphore(self.admission) if self.admission else None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_ms_total = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        if self._sem is not None:
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=ADMISSION_WAIT_SEC)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(self.name)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        t0 = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.busy_ms_total += (time.perf_counter() - t0) * 1000.0
+            self.in_flight -= 1
+            if self._sem is not None:
+                self._sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        done = self.completed + self.failed
+        return {
+            'workers': self.workers,
+            'admission': self.admission,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_ms': round(self.busy_ms_total / done, 2) if done else 0.0,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+WORK_POOLS: Dict[str, WorkPool] = {name: WorkPool(name, cfg['workers'], cfg['admission']) for name, cfg in POOL_CLASSES.items()}
+
+async def run_blocking(kind: str, fn, *args, **kwargs):
+    """Run a blocking callable in the pool for endpoint class `kind`."""
+    return await WORK_POOLS[kind].run(fn, *args, **kwargs)
+
+def offload(kind: str):
+    """Route decorator: run a sync handler in the `kind` pool (FastAPI still sees the original signature)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(kind, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse({'error': 'busy', 'class': exc.kind}, status_code=503,
+                        headers={'Retry-After': str(max(1, int(ADMISSION_WAIT_SEC)))})
+
+# --- Ingest body decoding ---
+async def read_payload(request: Request):
+    """Request body as JSON, msgpack and/or gzip, with positional rows expanded (see wire_format)."""
+    body = await request.body()
+    return decode_body(body, request.headers.get('content-type'), request.headers.get('content-encoding'))
+
+@app.exception_handler(UnsupportedWireFormat)
+async def unsupported_wire_format_handler(request: Request, exc: UnsupportedWireFormat):
+    return JSONResponse({'error': 'unsupported_encoding', 'message': str(exc)}, status_code=415)
+
+# --- Per-route latency histogram ---
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+class RouteLatency:
+    """Fixed-bucket latency histogram for one route."""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms', 'errors')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def observe(self, ms: float, status: int):
+        for i, upper in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= upper:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if status >= 500:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (max for the open bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                upper = LATENCY_BUCKETS_MS[i]
+                return round(self.max_ms if upper == float('inf') else min(upper, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'buckets': {('inf' if b == float('inf') else str(b)): c for b, c in zip(LATENCY_BUCKETS_MS, self.counts) if c},
+        }
+
+route_latency: Dict[str, RouteLatency] = {}
+
+class RouteLatencyMiddleware:
+    """Pure ASGI middleware timing each HTTP request under its route template (e.g. /bars/detail/{barIndex})."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        status = {'code': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            key = f"{scope.get('method', '')} {path}"
+            hist = route_latency.get(key)
+            if hist is None:
+                hist = route_latency[key] = RouteLatency()
+            hist.observe((time.perf_counter() - t0) * 1000.0, status['code'])
+
+app.add_middleware(RouteLatencyMiddleware)
+
+@app.get('/api/perf/routes')
+async def perf_routes(sort: str = 'p95_ms'):
+    """Latency histogram per route plus executor pool stats."""
+    routes = {k: h.stats() for k, h in route_latency.items()}
+    if sort in ('count', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'errors'):
+        routes = dict(sorted(routes.items(), key=lambda kv: kv[1][sort], reverse=True))
+    return JSONResponse({
+        'buckets_ms': [('inf' if b == float('inf') else b) for b in LATENCY_BUCKETS_MS],
+        'routes': routes,
+        'pools': {name: pool.stats() for name, pool in WORK_POOLS.items()},
+    })
+
 # Serve monitor.html at root
 @app.get('/')
 async def serve_monitor():
@@ -69,35 +300,190 @@ async def serve_trend_parameter_analyzer():
             return HTMLResponse(content=f.read())
     except FileNotFoundError:
         return HTMLResponse('<h1>Trend Parameter Analyzer not found</h1>', status_code=404)
-ws_clients: List[WebSocket] = []
-
-async def ws_broadcast(message: Dict[str, Any]):
-    """Broadcast a JSON message to all connected WebSocket clients."""
-    stale: List[WebSocket] = []
-    for ws in ws_clients:
-        try:
-            await ws.send_json(message)
-        except Exception:
-            stale.append(ws)
-    # Remove stale connections
-    for s in stale:
+# --- WebSocket broadcast hub ---
+# Each message is serialized once and handed to a bounded per-client queue drained by
+# that client's own sender task, so a slow browser tab never stalls an ingest request.
+WS_CLIENT_QUEUE_MAX = int(os.environ.get('WS_CLIENT_QUEUE_MAX', '256'))
+
+# Subscribable topics by message type; anything else (welcome, acks, overrides) always goes out
+WS_TOPICS = ('diag', 'state', 'trade', 'command')
+WS_TOPIC_OF_TYPE = {'diag': 'diag', 'diag_batch': 'diag', 'state': 'state', 'trade': 'trade', 'command': 'command'}
+
+class _WSClient:
+    """Per-connection send queue (drop-oldest, coalesce-latest by key) and stats."""
+
+    def __init__(self, ws: WebSocket, max_queue: int):
+        self.ws = ws
+        self.max_queue = max_queue
+        self.pending: deque = deque()  # (coalesce_key, text, enqueued_ts)
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.host = ws.client.host if ws.client else 'unknown'
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.bytes_sent = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.topics: Optional[set] = None  # None = legacy client, receives every topic
+        self.fields: Dict[str, Optional[tuple]] = {}  # topic -> projected field names
+
+    def wants(self, topic: Optional[str]) -> bool:
+        return topic is None or self.topics is None or topic in self.topics
+
+    def subscribe(self, topics, fields=None):
+        """Replace this client's subscription. fields is a list (all topics) or {topic: [names]}."""
+        self.topics = set(topics)
+        self.fields = {}
+        for topic in self.topics:
+            names = fields.get(topic) if isinstance(fields, dict) else fields
+            self.fields[topic] = tuple(sorted(set(str(n) for n in names))) if names else None
+
+    def offer(self, text: str, key: Optional[str] = None):
+        if self.closed:
+            return
+        now = time.time()
+        if key is not None:
+            for i, (k, _, _) in enumerate(self.pending):
+                if k == key:
+                    # Coalesce: a newer snapshot replaces the one still waiting to be sent
+                    self.pending[i] = (key, text, now)
+                    self.coalesced += 1
+                    return
+        if len(self.pending) >= self.max_queue:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append((key, text, now))
+        self.wakeup.set()
+
+    async def run(self):
         try:
-            ws_clients.remove(s)
-        except ValueError:
+            while not self.closed:
+                if not self.pending:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                _, text, enqueued_ts = self.pending.popleft()
+                await self.ws.send_text(text)
+                lag_ms = (time.time() - enqueued_ts) * 1000.0
+                self.last_lag_ms = lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                self.sent += 1
+                self.bytes_sent += len(text)
+        except asyncio.CancelledError:
             pass
+        except Exception:
+            # Socket is gone; the receive loop in ws_endpoint will clean up
+            self.closed = True
+
+    def stats(self) -> Dict[str, Any]:
+        oldest_age_ms = (time.time() - self.pending[0][2]) * 1000.0 if self.pending else 0.0
+        return {
+            'host': self.host,
+            'connected_at': self.connected_at,
+            'queue_depth': len(self.pending),
+            'queue_max': self.max_queue,
+            'oldest_pending_ms': round(oldest_age_ms, 1),
+            'last_lag_ms': round(self.last_lag_ms, 1),
+            'max_lag_ms': round(self.max_lag_ms, 1),
+            'sent': self.sent,
+            'bytes_sent': self.bytes_sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'topics': sorted(self.topics) if self.topics is not None else 'all',
+        }
+
+class BroadcastHub:
+    """Fan-out of pre-serialized frames to all connected WebSocket clients."""
+
+    def __init__(self, max_queue: int = WS_CLIENT_QUEUE_MAX):
+        self.max_queue = max_queue
+        self.clients: Dict[WebSocket, _WSClient] = {}
+        self.published = 0
+
+    def register(self, ws: WebSocket) -> _WSClient:
+        client = _WSClient(ws, self.max_queue)
+        client.task = asyncio.create_task(client.run())
+        self.clients[ws] = client
+        return client
+
+    def unregister(self, ws: WebSocket):
+        client = self.clients.pop(ws, None)
+        if client is not None:
+            client.closed = True
+            if client.task is not None:
+                client.task.cancel()
+
+    def send(self, ws: WebSocket, message: Dict[str, Any]):
+        """Queue a message for one client (keeps ordering with broadcasts)."""
+        client = self.clients.get(ws)
+        if client is not None:
+            client.offer(_ws_dumps(message))
+
+    def publish(self, message: Dict[str, Any], coalesce_key: Optional[str] = None):
+        if not self.clients:
+            return
+        topic = WS_TOPIC_OF_TYPE.get(message.get('type'))
+        texts: Dict[Optional[tuple], str] = {}  # serialize once per distinct projection
+        self.published += 1
+        for ws, client in list(self.clients.items()):
+            if client.closed:
+                self.unregister(ws)
+                continue
+            if not client.wants(topic):
+                continue
+            fields = client.fields.get(topic) if topic else None
+            text = texts.get(fields)
+            if text is None:
+                text = _ws_dumps(_ws_project(message, fields))
+                texts[fields] = text
+            client.offer(text, coalesce_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self.clients),
+            'published': self.published,
+            'queue_max': self.max_queue,
+            'per_client': [c.stats() for c in self.clients.values()],
+        }
+
+def _ws_project(message: Dict[str, Any], fields: Optional[tuple]) -> Dict[str, Any]:
+    """Keep only the requested keys of message['data'] (a dict or a list of dicts)."""
+    if not fields:
+        return message
+    data = message.get('data')
+    if isinstance(data, dict):
+        data = {k: data[k] for k in fields if k in data}
+    elif isinstance(data, list):
+        data = [{k: d[k] for k in fields if k in d} if isinstance(d, dict) else d for d in data]
+    else:
+        return message
+    return {**message, 'data': data}
+
+def _ws_dumps(message: Dict[str, Any]) -> str:
+    # Same encoding as WebSocket.send_json
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False, default=str)
+
+ws_hub = BroadcastHub()
+
+async def ws_broadcast(message: Dict[str, Any], coalesce_key: Optional[str] = None):
+    """Broadcast a JSON message to all connected WebSocket clients (non-blocking)."""
+    ws_hub.publish(message, coalesce_key)
 
 @app.websocket('/ws')
 async def ws_endpoint(ws: WebSocket):
     await ws.accept()
-    ws_clients.append(ws)
+    ws_hub.register(ws)
     try:
         client_host = ws.client.host if ws.client else 'unknown'
-        print(f"[WS] client connected from {client_host}; active={len(ws_clients)}")
+        print(f"[WS] client connected from {client_host}; active={len(ws_hub.clients)}")
     except Exception:
         pass
     try:
         # On connect: send a brief status snapshot
-        await ws.send_json({
+        ws_hub.send(ws, {
             'type': 'welcome',
             'diags_count': len(diags),
             'ts': time.time()
@@ -112,20 +498,30 @@ async def ws_endpoint(ws: WebSocket):
                 # Construct a fake Request with JSON body is non-trivial; call helper directly
                 # Refactor apply logic into a small helper
                 result = _apply_override_direct(prop, val)
-                await ws.send_json({'type': 'apply_ack', **result})
+                ws_hub.send(ws, {'type': 'apply_ack', **result})
             elif msg_type == 'recalculate':
                 result = _recalculate_direct()
-                await ws.send_json({'type': 'recalculate_ack', **result})
+                ws_hub.send(ws, {'type': 'recalculate_ack', **result})
+            elif msg_type == 'subscribe':
+                # {'type':'subscribe','topics':['diag'],'fields':['barIndex','open',...] or {'diag':[...]}}
+                topics = data.get('topics') or list(WS_TOPICS)
+                fields = data.get('fields')
+                unknown = [t for t in topics if t not in WS_TOPICS]
+                if unknown or (fields is not None and not isinstance(fields, (list, dict))):
+                    ws_hub.send(ws, {'type': 'error', 'message': 'invalid_subscription', 'unknown_topics': unknown, 'valid_topics': list(WS_TOPICS)})
+                    continue
+                client = ws_hub.clients.get(ws)
+                if client is not None:
+                    client.subscribe(topics, fields)
+                    ws_hub.send(ws, {'type': 'subscribe_ack', 'topics': sorted(client.topics),
+                                     'fields': {t: list(f) if f else None for t, f in client.fields.items()}})
             else:
-                await ws.send_json({'type': 'error', 'message': 'unknown_ws_message', 'received': data})
+                ws_hub.send(ws, {'type': 'error', 'message': 'unknown_ws_message', 'received': data})
     except WebSocketDisconnect:
         # Client disconnected
+        ws_hub.unregister(ws)
         try:
-            ws_clients.remove(ws)
-        except ValueError:
-            pass
-        try:
-            print(f"[WS] client disconnected; active={len(ws_clients)}")
+            print(f"[WS] client disconnected; active={len(ws_hub.clients)}")
         except Exception:
             pass
     except Exception as ex:
@@ -133,15 +529,17 @@ async def ws_endpoint(ws: WebSocket):
             await ws.send_json({'type': 'error', 'message': str(ex)})
         except Exception:
             pass
+        ws_hub.unregister(ws)
         try:
-            ws_clients.remove(ws)
-        except ValueError:
-            pass
-        try:
-            print(f"[WS] client error: {ex}; active={len(ws_clients)}")
+            print(f"[WS] client error: {ex}; active={len(ws_hub.clients)}")
         except Exception:
             pass
 
+@app.get('/api/ws/stats')
+def ws_stats():
+    """Per-client WebSocket queue depth, lag and drop counters."""
+    return JSONResponse(ws_hub.stats())
+
 def parse_bool(val):
     """Parse strategy's string booleans (true/false) to Python bool."""
     if isinstance(val, bool):
@@ -154,33 +552,343 @@ def parse_bool(val):
 USE_SQLITE = True
 DB_PATH = os.path.join(os.path.dirname(__file__), 'dashboard.db')
 BARS_DB_PATH = os.path.join(os.path.dirname(__file__), 'bars.db')
-_db_connection = None
-_bars_db_connection = None
+VOLATILITY_DB_PATH = os.path.join(os.path.dirname(__file__), 'volatility.db')
+
+# Pragmas applied once per connection (never on the request path)
+SQLITE_CACHE_KIB = int(os.environ.get('SQLITE_CACHE_KIB', '10000'))            # cache_size=-N (KiB)
+SQLITE_MMAP_BYTES = int(os.environ.get('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_SEC = 10.0
+# WAL checkpoint policy: readers see committed rows without a checkpoint, so checkpoints only
+# bound WAL growth. TRUNCATE once the WAL passes the size limit, PASSIVE once it is this old.
+SQLITE_CHECKPOINT_WAL_BYTES = int(os.environ.get('SQLITE_CHECKPOINT_WAL_BYTES', str(64 * 1024 * 1024)))
+SQLITE_CHECKPOINT_AGE_SEC = float(os.environ.get('SQLITE_CHECKPOINT_AGE_SEC', '300'))
+
+class SQLiteDB:
+    """Access layer for one SQLite file: one serialized writer plus per-thread read-only connections.
+
+    Use `with db.write() as conn:` for anything that modifies the database (commit on
+    success, rollback on error, serialized by `db.lock`) and `db.reader()` for queries.
+    """
+
+    def __init__(self, label: str, path: str):
+        self.label = label
+        self.path = path
+        self.lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # Schema is settled by the startup migrations, so column sets are read once per table
+        self._columns: Dict[str, frozenset] = {}
+        self._insert_sql: Dict[tuple, tuple] = {}
+        self._last_checkpoint = time.monotonic()
+        self.checkpoints = 0
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_SEC)
+        if not readonly:
+            # WAL is persistent in the file; set it once from the writer
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_KIB}')
+        conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_BYTES}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if readonly:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def writer(self) -> sqlite3.Connection:
+        """The single write connection. Multi-statement work must hold `self.lock`."""
+        if self._writer is None:
+            with self.lock:
+                if self._writer is None:
+                    self._writer = self._connect(readonly=False)
+                    print(f'[{self.label}] Writer connection initialized with WAL mode')
+        return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        """This thread's read-only connection (created on first use and reused)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not os.path.exists(self.path):
+                self.writer()  # create the file (and switch it to WAL) before opening readers
+            conn = self._connect(readonly=True)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextmanager
+    def write(self):
+        """Serialized write transaction on the writer connection."""
+        with self.lock:
+            conn = self.writer()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def columns(self, table: str) -> frozenset:
+        """Column names of `table`, read with PRAGMA table_info once and then served from memory."""
+        cols = self._columns.get(table)
+        if cols is None:
+            with self.lock:
+                cols = frozenset(row[1] for row in self.writer().execute(f'PRAGMA table_info({table})'))
+            if not cols:
+                raise sqlite3.OperationalError(f'no such table: {table}')
+            self._columns[table] = cols
+        return cols
+
+    def insert_sql(self, table: str, columns, verb: str = 'INSERT') -> tuple:
+        """(sql, column names) for a named-parameter INSERT of the `columns` that exist in `table`.
+
+        Built once per statement shape so the sqlite3 statement cache reuses the prepared INSERT;
+        pass a dict of values (extra keys are ignored).
+        """
+        key = (table, verb, tuple(columns))
+        cached = self._insert_sql.get(key)
+        if cached is None:
+            present = self.columns(table)
+            names = tuple(c for c in columns if c in present)
+            sql = (f'{verb} INTO {table} ({", ".join(names)}) '
+                   f'VALUES ({", ".join(":" + c for c in names)})')
+            cached = self._insert_sql[key] = (sql, names)
+        return cached
+
+    def maybe_checkpoint(self) -> Optional[tuple]:
+        """Checkpoint the WAL if it is over the size or age limit; call after a write, not inside one.
+
+        Returns the (busy, log, checkpointed) result, or None when no checkpoint was due.
+        """
+        try:
+            wal_bytes = os.path.getsize(self.path + '-wal')
+        except OSError:
+            return None
+        too_big = wal_bytes >= SQLITE_CHECKPOINT_WAL_BYTES
+        if not wal_bytes or (not too_big and time.monotonic() - self._last_checkpoint < SQLITE_CHECKPOINT_AGE_SEC):
+            return None
+        mode = 'TRUNCATE' if too_big else 'PASSIVE'
+        try:
+            with self.lock:
+                result = self.writer().execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        except sqlite3.Error as ex:
+            print(f'[{self.label}] WAL checkpoint ({mode}) failed: {ex}')
+            return None
+        self._last_checkpoint = time.monotonic()
+        self.checkpoints += 1
+        print(f'[{self.label}] WAL checkpoint ({mode}, {wal_bytes // 1024} KiB): {result}')
+        return result
+
+    def forget_schema(self):
+        """Drop cached column sets and INSERT statements (call after changing the schema)."""
+        self._columns = {}
+        self._insert_sql = {}
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._readers = []
+        self._local = threading.local()
+        with self.lock:
+            if self._writer is not None:
+                try:
+                    self._writer.close()
+                except Exception:
+                    pass
+                self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'writer_open': self._writer is not None,
+            'readers_open': len(self._readers),
+            'checkpoints': self.checkpoints,
+        }
+
+dashboard_db = SQLiteDB('DB', DB_PATH)
+bars_db = SQLiteDB('BARS_DB', BARS_DB_PATH)
+volatility_db = SQLiteDB('VOLATILITY_DB', VOLATILITY_DB_PATH)
+DATABASES = {
+    'dashboard.db': dashboard_db,
+    'bars.db': bars_db,
+    'volatility.db': volatility_db,
+}
 
 def get_db_connection():
-    """Get or create persistent database connection with optimizations."""
-    global _db_connection
-    if _db_connection is None:
-        _db_connection = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=10.0)
-        # Enable WAL mode for better concurrent access
-        _db_connection.execute('PRAGMA journal_mode=WAL')
-        # Increase cache size (default 2MB -> 10MB)
-        _db_connection.execute('PRAGMA cache_size=-10000')
-        # Faster synchronous mode (still safe)
-        _db_connection.execute('PRAGMA synchronous=NORMAL')
-        print('[DB] Connection pool initialized with WAL mode')
-    return _db_connection
+    """Writer connection for dashboard.db (hold dashboard_db.lock for multi-statement writes)."""
+    return dashboard_db.writer()
 
 def get_bars_db_connection():
-    """Get or create persistent bars database connection."""
-    global _bars_db_connection
-    if _bars_db_connection is None:
-        _bars_db_connection = sqlite3.connect(BARS_DB_PATH, check_same_thread=False, timeout=10.0)
-        _bars_db_connection.execute('PRAGMA journal_mode=WAL')
-        _bars_db_connection.execute('PRAGMA cache_size=-10000')
-        _bars_db_connection.execute('PRAGMA synchronous=NORMAL')
-        print('[BARS_DB] Connection pool initialized with WAL mode')
-    return _bars_db_connection
+    """Writer connection for bars.db (hold bars_db.lock for multi-statement writes)."""
+    return bars_db.writer()
+
+# Serialize use of the shared connections between writer threads and request handlers
+_db_lock = dashboard_db.lock
+_bars_db_lock = bars_db.lock
+
+# --- Write-behind batch writer (group commit) ---
+class BatchWriter:
+    """Single long-lived writer thread that group-commits queued rows.
+
+    Rows are written in one transaction every `batch_rows` rows or `flush_ms`
+    milliseconds, whichever comes first. When the queue is full new rows are
+    dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, name: str, get_conn, sql: str, lock, max_queue: int = 5000,
+                 batch_rows: int = 200, flush_ms: int = 250, after_commit=None):
+        self.name = name
+        self.get_conn = get_conn
+        self.sql = sql
+        self.lock = lock
+        self.max_queue = max_queue
+        self.batch_rows = batch_rows
+        self.flush_ms = flush_ms
+        self.after_commit = after_commit  # optional callable(conn, batches) run under the lock
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self.total_commit_ms = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-writer', daemon=True)
+            self._thread.start()
+            print(f'[WRITER] {self.name} writer started (batch={self.batch_rows} rows / {self.flush_ms}ms, queue={self.max_queue})')
+
+    def submit(self, row) -> bool:
+        """Queue one parameter tuple. Returns False (and counts a drop) when the queue is full."""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                print(f'[WRITER] {self.name} queue full, dropped {self.dropped} rows so far')
+            return False
+        self.enqueued += 1
+        return True
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_ms / 1000.0
+        while len(batch) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        t0 = time.perf_counter()
+        with self.lock:
+            conn = self.get_conn()
+            try:
+                conn.executemany(self.sql, batch)
+                conn.commit()
+                self.written += len(batch)
+            except Exception as ex:
+                conn.rollback()
+                print(f'[WRITER] {self.name} batch of {len(batch)} failed ({ex}), retrying row by row')
+                for row in batch:
+                    try:
+                        conn.execute(self.sql, row)
+                        self.written += 1
+                    except Exception as row_ex:
+                        self.errors += 1
+                        print(f'[WRITER] {self.name} row error: {row_ex}')
+                conn.commit()
+            if self.after_commit is not None:
+                try:
+                    self.after_commit(conn, self.batches + 1)
+                except Exception as hook_ex:
+                    print(f'[WRITER] {self.name} after-commit hook error: {hook_ex}')
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        self.batches += 1
+        self.batched_rows += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_commit_ms = elapsed_ms
+        self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+        self.total_commit_ms += elapsed_ms
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as ex:
+                self.errors += len(batch)
+                print(f'[WRITER] {self.name} write error: {ex}')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until every queued row has been written (or timeout)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks > 0:
+            if time.monotonic() >= deadline or self._thread is None or not self._thread.is_alive():
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        print(f'[WRITER] {self.name} writer stopped (written={self.written}, dropped={self.dropped}, pending={self._queue.qsize()})')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queue_depth': self._queue.qsize(),
+            'queue_max': self.max_queue,
+            'batch_rows': self.batch_rows,
+            'flush_ms': self.flush_ms,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'max_batch_size': self.max_batch_size,
+            'avg_batch_size': round(self.batched_rows / self.batches, 1) if self.batches else 0,
+            'last_commit_ms': round(self.last_commit_ms, 2),
+            'max_commit_ms': round(self.max_commit_ms, 2),
+            'avg_commit_ms': round(self.total_commit_ms / self.batches, 2) if self.batches else 0,
+        }
 
 def init_db():
     if not USE_SQLITE:
@@ -473,8 +1181,10 @@ def init_bars_db():
             losingTradesCount INTEGER,
             winRate REAL,
             
-            -- Full state JSON for reference
+            -- Per-bar part of the state payload (run parameters live in runs, keyed by runParamsHash;
+            -- rows with runParamsHash NULL hold the full payload)
             stateJson TEXT,
+            runParamsHash TEXT,
             
             created_at TEXT DEFAULT (datetime('now')),
             
@@ -489,6 +1199,17 @@ def init_bars_db():
         cur.execute("CREATE INDEX IF NOT EXISTS idx_botf_position ON BarsOnTheFlowStateAndBar(positionMarketPosition)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_botf_currentbar ON BarsOnTheFlowStateAndBar(currentBar)")
         
+        # Strategy parameter sets, stored once per run instead of in every bar's stateJson
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            paramsHash TEXT PRIMARY KEY,
+            strategyName TEXT,
+            paramsJson TEXT NOT NULL,
+            firstSeenTs REAL,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """)
+        
         conn.commit()
         print('[BARS_DB] BarsOnTheFlowStateAndBar table initialized')
     except Exception as ex:
@@ -516,6 +1237,8 @@ def ensure_db_columns():
             except sqlite3.OperationalError as e:
                 if 'UNIQUE constraint failed' in str(e) or 'duplicate' in str(e).lower():
                     print('[DB] Warning: Cannot add UNIQUE constraint - duplicates exist. Run cleanup first.')
+                elif 'no such table' in str(e):
+                    pass  # bar_samples lives in volatility.db; don't abort the remaining migrations
                 else:
                     raise
 
@@ -530,13 +1253,13 @@ def ensure_db_columns():
                 cur.execute("ALTER TABLE entry_cancellations ADD COLUMN volume REAL")
         except Exception as ex:
             print('[DB] cancellations add volume failed:', ex)
-        # Add contracts column to trades table if missing
+        # Add contracts / EMA / exit-bar columns to trades if missing (same set as volatility.db trades)
         try:
-            if not has_column('trades', 'contracts'):
-                cur.execute("ALTER TABLE trades ADD COLUMN contracts INTEGER")
-                print('[DB] Added contracts column to trades table')
+            added = add_missing_columns(cur, 'trades', TRADES_ADDED_COLUMNS)
+            if added:
+                print(f'[DB] Added trades columns: {", ".join(added)}')
         except Exception as ex:
-            print('[DB] trades add contracts failed:', ex)
+            print('[DB] trades add columns failed:', ex)
         
         # Add minMatchingBars column to BarsOnTheFlowStateAndBar if missing
         try:
@@ -556,6 +1279,9 @@ def ensure_db_columns():
             if 'slowGradDeg' not in bars_columns:
                 bars_cur.execute("ALTER TABLE BarsOnTheFlowStateAndBar ADD COLUMN slowGradDeg REAL")
                 print('[DB] Added slowGradDeg column to BarsOnTheFlowStateAndBar table')
+            if 'runParamsHash' not in bars_columns:
+                bars_cur.execute("ALTER TABLE BarsOnTheFlowStateAndBar ADD COLUMN runParamsHash TEXT")
+                print('[DB] Added runParamsHash column to BarsOnTheFlowStateAndBar table')
             bars_conn.commit()
         except Exception as ex:
             print('[DB] BarsOnTheFlowStateAndBar column migration failed:', ex)
@@ -565,7 +1291,11 @@ def ensure_db_columns():
             ('accel','ALTER TABLE diags ADD COLUMN accel REAL'),
             ('fastEMA','ALTER TABLE diags ADD COLUMN fastEMA REAL'),
             ('slowEMA','ALTER TABLE diags ADD COLUMN slowEMA REAL'),
-            ('close','ALTER TABLE diags ADD COLUMN close REAL')
+            ('open','ALTER TABLE diags ADD COLUMN open REAL'),
+            ('high','ALTER TABLE diags ADD COLUMN high REAL'),
+            ('low','ALTER TABLE diags ADD COLUMN low REAL'),
+            ('close','ALTER TABLE diags ADD COLUMN close REAL'),
+            ('payloadJson','ALTER TABLE diags ADD COLUMN payloadJson TEXT')
         ]:
             try:
                 if not has_column('diags', col):
@@ -582,32 +1312,20 @@ def ensure_db_columns():
 def db_exec(sql: str, params=()):
     if not USE_SQLITE:
         return
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(sql, params)
-        conn.commit()
-    except sqlite3.OperationalError as e:
-        # Handle locked database - retry once
-        print(f'[DB] Operational error, retrying: {e}')
-        time.sleep(0.1)
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(sql, params)
-        conn.commit()
+    # Single serialized writer: no "database is locked" retry needed
+    with dashboard_db.write() as conn:
+        conn.execute(sql, params)
 
 def db_query_one(sql: str, params=()):
     if not USE_SQLITE:
         return None
-    conn = get_db_connection()
-    cur = conn.cursor()
+    cur = dashboard_db.reader().cursor()
     cur.execute(sql, params)
     row = cur.fetchone()
     return row
 
-init_db()
-init_bars_db()
-ensure_db_columns()
+# init_db / init_bars_db / ensure_db_columns run in startup_event, not at import: process-pool
+# workers (spawn on Windows) re-import this module and must not repeat them
 
 # --- Trade performance tracking for exit optimization ---
 recent_trades: List[Dict[str, Any]] = []  # stores last N trades for analysis
@@ -830,9 +1548,116 @@ def evaluate_auto_apply(now_ts: float):
         property_streaks[prop] = 0
 
 
-# In-memory store (simple ring buffer)
-diags: List[Dict[str, Any]] = []
+# In-memory store (ring buffer; oldest entries fall off in O(1))
 MAX_DIAGS = 5000
+diags: deque[Dict[str, Any]] = deque(maxlen=MAX_DIAGS)
+diags_received_total = 0
+
+def _recent_diags(n: int) -> List[Dict[str, Any]]:
+    """Return the newest n diags (oldest first) without copying the whole ring."""
+    n = max(0, min(n, len(diags)))
+    if n == 0:
+        return []
+    out = []
+    for d in reversed(diags):
+        out.append(d)
+        if len(out) >= n:
+            break
+    out.reverse()
+    return out
+
+# Diags are also persisted to dashboard.db by a batched background writer
+DIAGS_INSERT_SQL = '''
+    INSERT INTO diags (
+        ts, barIndex, fastGrad, rsi, adx, gradStab, bandwidth, volume,
+        blockersLong, blockersShort, trendSide, accel, fastEMA, slowEMA,
+        open, high, low, close, payloadJson
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+DIAGS_WRITER_QUEUE_MAX = int(os.environ.get('DIAGS_WRITER_QUEUE_MAX', '10000'))
+DIAGS_WRITER_BATCH_ROWS = int(os.environ.get('DIAGS_WRITER_BATCH_ROWS', '200'))
+DIAGS_WRITER_FLUSH_MS = int(os.environ.get('DIAGS_WRITER_FLUSH_MS', '500'))
+DIAGS_DB_MAX_ROWS = int(os.environ.get('DIAGS_DB_MAX_ROWS', '200000'))  # 0 = keep everything
+
+def _diag_value(p: Dict[str, Any], key: str, alt: str):
+    v = p.get(key)
+    return v if v is not None else p.get(alt)
+
+def _diag_row_from_payload(p: Dict[str, Any]) -> tuple:
+    """Flatten a diag payload into a diags table row."""
+    def num(key, alt):
+        v = _diag_value(p, key, alt)
+        try:
+            return float(v) if v is not None else None
+        except (TypeError, ValueError):
+            return None
+    def text(v):
+        if v is None or isinstance(v, str):
+            return v
+        return json.dumps(v)
+    bar_index = p.get('barIndex')
+    try:
+        payload_json = json.dumps(p, default=str)
+    except (TypeError, ValueError):
+        payload_json = None
+    return (
+        p.get('receivedTs'),
+        bar_index if isinstance(bar_index, int) else None,
+        num('fastGrad', 'FastGrad'),
+        num('rsi', 'RSI'),
+        num('adx', 'ADX'),
+        num('gradStab', 'GradStab'),
+        num('bandwidth', 'Bandwidth'),
+        num('volume', 'Volume'),
+        text(p.get('blockersLong')),
+        text(p.get('blockersShort')),
+        text(_diag_value(p, 'trendSide', 'TrendSide')),
+        num('accel', 'Accel'),
+        num('fastEMA', 'FastEMA'),
+        num('slowEMA', 'SlowEMA'),
+        num('open', 'Open'),
+        num('high', 'High'),
+        num('low', 'Low'),
+        num('close', 'Close'),
+        payload_json,
+    )
+
+def _prune_diags_table(conn, batches: int):
+    """Keep the diags table bounded to roughly DIAGS_DB_MAX_ROWS rows."""
+    if DIAGS_DB_MAX_ROWS <= 0 or batches % 50 != 0:
+        return
+    conn.execute('DELETE FROM diags WHERE id <= (SELECT MAX(id) FROM diags) - ?', (DIAGS_DB_MAX_ROWS,))
+    conn.commit()
+
+diags_writer = BatchWriter('diags', get_db_connection, DIAGS_INSERT_SQL, _db_lock,
+                           max_queue=DIAGS_WRITER_QUEUE_MAX,
+                           batch_rows=DIAGS_WRITER_BATCH_ROWS,
+                           flush_ms=DIAGS_WRITER_FLUSH_MS,
+                           after_commit=_prune_diags_table)
+
+def _load_recent_diags_from_db(limit: int = MAX_DIAGS) -> int:
+    """Refill the in-memory ring (and bar cache) from the diags table after a restart."""
+    if not USE_SQLITE or diags:
+        return 0
+    try:
+        rows = dashboard_db.reader().execute(
+            'SELECT payloadJson FROM diags WHERE payloadJson IS NOT NULL ORDER BY id DESC LIMIT ?', (limit,)
+        ).fetchall()
+        for (payload_json,) in reversed(rows):
+            try:
+                p = json.loads(payload_json)
+            except Exception:
+                continue
+            diags.append(p)
+            try:
+                bar_cache.append(_normalize_bar(p))
+            except Exception:
+                pass
+        print(f'[DIAG] Restored {len(diags)} diags from database')
+        return len(diags)
+    except Exception as ex:
+        print(f'[DIAG] Could not restore diags from database: {ex}')
+        return 0
 
 # --- Lightweight in-memory recent bar cache (normalized subset for fast queries) ---
 # Stores only the most recent BAR_CACHE_MAX normalized bar diagnostic entries.
@@ -852,6 +1677,616 @@ strategy_state_cache: Dict[str, Dict[str, Any]] = {}
 # Path is relative to the Custom folder (two levels up from web/dashboard, then into strategy_logs)
 LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'strategy_logs'))
 
+# --- Indexed CSV log cache ---
+# Strategy CSV logs are parsed once into per-column string lists and kept keyed by
+# (path, mtime, size). Growth is tailed from the last consumed byte offset, any other change
+# (truncate/rewrite) triggers a full re-parse. A bar -> row index makes bar lookups O(1).
+# Tables are evicted least-recently-used once the estimated footprint exceeds the budget.
+CSV_LOG_CACHE_MB = int(os.environ.get('CSV_LOG_CACHE_MB', '256'))
+CSV_BAR_COLUMNS = ('bar', 'Bar', 'bar_index', 'barIndex')
+_CELL_OVERHEAD_BYTES = 56  # rough per-cell cost of a list slot + str object
+
+def _csv_bar_key(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+class CsvLogTable:
+    """Columnar, append-only view of one CSV file.
+
+    header=False keeps positional columns (named '0', '1', ...). Rows are exposed as dicts like
+    csv.DictReader (short rows padded with None). Bar indexes are built per column on first use.
+    """
+
+    def __init__(self, path: str, header: bool = True):
+        self.path = path
+        self.has_header = header
+        self.header: List[str] = []
+        self.columns: List[List[Optional[str]]] = []
+        self.bar_column: Optional[str] = None
+        self._bar_indexes: Dict[int, Dict[int, List[int]]] = {}
+        self.n_rows = 0
+        self.offset = 0          # bytes consumed (always at a line boundary)
+        self.mtime = 0.0
+        self.size = 0
+        self.cells = 0
+        self.parse_ms = 0.0
+        self._pool: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def approx_bytes(self) -> int:
+        return self.offset + self.cells * _CELL_OVERHEAD_BYTES
+
+    def _set_header(self, names: List[str]):
+        if names and names[0].startswith('\ufeff'):
+            names[0] = names[0][1:]
+        self.header = names
+        self.columns = [[] for _ in names]
+        self.bar_column = next((c for c in CSV_BAR_COLUMNS if c in names), None)
+
+    def _append(self, records: List[List[str]]):
+        pool = self._pool
+        for rec in records:
+            if not rec:
+                continue
+            if not self.header:
+                if self.has_header:
+                    self._set_header(list(rec))
+                    continue
+                self._set_header([str(i) for i in range(len(rec))])
+            width = len(self.header)
+            if len(rec) > width:
+                # Headerless files may widen; header files drop extras like DictReader's restkey would
+                if self.has_header:
+                    rec = rec[:width]
+                else:
+                    for i in range(width, len(rec)):
+                        self.header.append(str(i))
+                        self.columns.append([None] * self.n_rows)
+                    width = len(rec)
+            row = self.n_rows
+            for i in range(width):
+                v = rec[i] if i < len(rec) else None
+                if v is not None and len(v) <= 16:
+                    v = pool.setdefault(v, v)
+                self.columns[i].append(v)
+            for col_idx, index in self._bar_indexes.items():
+                key = _csv_bar_key(rec[col_idx]) if col_idx < len(rec) else None
+                if key is not None:
+                    index.setdefault(key, []).append(row)
+            self.n_rows = row + 1
+            self.cells += width
+
+    def refresh(self, st: os.stat_result) -> bool:
+        """Consume bytes appended since the last refresh; returns False if a full re-parse is needed."""
+        if st.st_size < self.offset:
+            return False
+        if st.st_size == self.size and st.st_mtime == self.mtime:
+            return True
+        t0 = time.perf_counter()
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        cut = data.rfind(b'\n')
+        if cut >= 0:
+            chunk = data[:cut + 1]
+            self._append(list(csv.reader(io.StringIO(chunk.decode('utf-8', errors='replace'), newline=''))))
+            self.offset += len(chunk)
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self.parse_ms += (time.perf_counter() - t0) * 1000.0
+        return True
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def row(self, i: int) -> Dict[str, Optional[str]]:
+        return {name: col[i] for name, col in zip(self.header, self.columns)}
+
+    def rows(self, start: int = 0):
+        """Iterate rows as dicts; rows appended during iteration are not included."""
+        end = self.n_rows
+        names = self.header
+        cols = self.columns
+        for i in range(start, end):
+            yield {name: col[i] for name, col in zip(names, cols)}
+
+    def bar_index(self, column: Optional[str] = None) -> Dict[int, List[int]]:
+        """bar -> row numbers for `column` (default: the detected bar column)."""
+        column = column or self.bar_column
+        if column not in self.header:
+            return {}
+        col_idx = self.header.index(column)
+        with self.lock:
+            index = self._bar_indexes.get(col_idx)
+            if index is None:
+                index = {}
+                for i, v in enumerate(self.columns[col_idx][:self.n_rows]):
+                    key = _csv_bar_key(v)
+                    if key is not None:
+                        index.setdefault(key, []).append(i)
+                self._bar_indexes[col_idx] = index
+        return index
+
+    def rows_for_bar(self, bar: int, column: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+        return [self.row(i) for i in list(self.bar_index(column).get(bar, ()))]
+
+    def column(self, name: str) -> List[Optional[str]]:
+        """Snapshot of one column (raw strings)."""
+        if name not in self.header:
+            return [None] * self.n_rows
+        return self.columns[self.header.index(name)][:self.n_rows]
+
+class CsvLogIndex:
+    """LRU cache of CsvLogTable objects with a memory budget."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._tables: 'OrderedDict[tuple, CsvLogTable]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.tails = 0
+        self.parses = 0
+        self.evictions = 0
+
+    def table(self, path: str, header: bool = True) -> CsvLogTable:
+        """Return an up-to-date table for `path` (raises OSError if the file is missing)."""
+        path = os.path.abspath(path)
+        key = (path, header)
+        st = os.stat(path)
+        with self._lock:
+            tbl = self._tables.get(key)
+            if tbl is not None:
+                self._tables.move_to_end(key)
+        if tbl is not None:
+            with tbl.lock:
+                fresh = st.st_size == tbl.size and st.st_mtime == tbl.mtime
+                if fresh or tbl.refresh(st):
+                    if fresh:
+                        self.hits += 1
+                    else:
+                        self.tails += 1
+                    self._evict()
+                    return tbl
+        tbl = CsvLogTable(path, header=header)
+        with tbl.lock:
+            tbl.refresh(st)
+        self.parses += 1
+        with self._lock:
+            self._tables[key] = tbl
+            self._tables.move_to_end(key)
+        self._evict()
+        return tbl
+
+    def rows(self, path: str, header: bool = True):
+        return self.table(path, header=header).rows()
+
+    def _evict(self):
+        with self._lock:
+            total = sum(t.approx_bytes for t in self._tables.values())
+            # Always keep the most recently used table, even if it alone exceeds the budget
+            while total > self.budget_bytes and len(self._tables) > 1:
+                _, old = self._tables.popitem(last=False)
+                total -= old.approx_bytes
+                self.evictions += 1
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._tables.clear()
+                return
+            path = os.path.abspath(path)
+            for key in [k for k in self._tables if k[0] == path]:
+                del self._tables[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tables = list(self._tables.values())
+        return {
+            'tables': len(tables),
+            'approx_mb': round(sum(t.approx_bytes for t in tables) / 1048576, 2),
+            'budget_mb': round(self.budget_bytes / 1048576, 2),
+            'hits': self.hits,
+            'tails': self.tails,
+            'parses': self.parses,
+            'evictions': self.evictions,
+            'files': [{'file': os.path.basename(t.path), 'rows': t.n_rows, 'bar_indexes': len(t._bar_indexes),
+                       'approx_mb': round(t.approx_bytes / 1048576, 2), 'parse_ms': round(t.parse_ms, 1)} for t in tables],
+        }
+
+csv_logs = CsvLogIndex(CSV_LOG_CACHE_MB * 1024 * 1024)
+
+# --- Analysis result cache ---
+# Heavy historical analyses (streaks, profitability, trends/trades) are memoized on the
+# (path, mtime, size) of every log they read plus the canonical request params, so a finished
+# run's analysis is computed once. Response bodies live in a memory LRU and, gzipped, in
+# RESULT_CACHE_DIR so they survive restarts; both tiers evict least-recently-used by size.
+RESULT_CACHE_MEM_MB = int(os.environ.get('RESULT_CACHE_MEM_MB', '64'))
+RESULT_CACHE_DISK_MB = int(os.environ.get('RESULT_CACHE_DISK_MB', '512'))
+RESULT_CACHE_DIR = os.path.join(LOG_DIR, '.analysis_cache')
+RESULT_CACHE_VERSION = 1  # bump when an analysis' output changes so stale disk entries are ignored
+
+class ResultCache:
+    """Two-tier (memory LRU + gzip files) cache of JSON response bodies."""
+
+    def __init__(self, directory: str, mem_budget_bytes: int, disk_budget_bytes: int):
+        self.directory = directory
+        self.mem_budget_bytes = mem_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self._mem: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._mem_bytes = 0
+        self._disk: Optional['OrderedDict[str, int]'] = None  # key -> file size, oldest access first
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    @staticmethod
+    def key(endpoint: str, paths: List[str], params: Dict[str, Any]) -> str:
+        """Fingerprint of the source files (missing files included as such) and the params."""
+        sources = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                sources.append([os.path.abspath(path), st.st_mtime_ns, st.st_size])
+            except OSError:
+                sources.append([os.path.abspath(path), None, None])
+        material = json.dumps([RESULT_CACHE_VERSION, endpoint, sources, params], sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json.gz')
+
+    def _load_disk_index(self):
+        if self._disk is not None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.json.gz'):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name[:-len('.json.gz')], st.st_size))
+        except FileNotFoundError:
+            pass
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    def _remember(self, key: str, body: bytes):
+        """Insert into the memory tier (caller holds the lock)."""
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = body
+        self._mem_bytes += len(body)
+        while self._mem_bytes > self.mem_budget_bytes and len(self._mem) > 1:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+            self.memory_evictions += 1
+
+    def get(self, key: str):
+        """(body, tier) or (None, None)."""
+        with self._lock:
+            body = self._mem.get(key)
+            if body is not None:
+                self._mem.move_to_end(key)
+                self.memory_hits += 1
+                return body, 'memory'
+            self._load_disk_index()
+            on_disk = key in self._disk
+        if on_disk:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    body = gzip.decompress(f.read())
+                os.utime(path)
+            except (OSError, EOFError, zlib.error) as ex:
+                print(f'[RESULT_CACHE] Dropping unreadable entry {key}: {ex}')
+                with self._lock:
+                    self._disk.pop(key, None)
+                body = None
+            if body is not None:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, body)
+                    self.disk_hits += 1
+                return body, 'disk'
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, key: str, body: bytes):
+        with self._lock:
+            self._remember(key, body)
+            self.stores += 1
+            self._load_disk_index()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(gzip.compress(body, compresslevel=6))
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError as ex:
+            print(f'[RESULT_CACHE] Disk write failed for {key}: {ex}')
+            return
+        with self._lock:
+            self._disk.pop(key, None)
+            self._disk[key] = size
+            total = sum(self._disk.values())
+            victims = []
+            while total > self.disk_budget_bytes and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                total -= old_size
+                victims.append(old_key)
+                self.disk_evictions += 1
+        for old_key in victims:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._load_disk_index()
+            keys = list(self._disk)
+            self._mem.clear()
+            self._mem_bytes = 0
+            self._disk.clear()
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        return len(keys)
+
+    def run(self, endpoint: str, params: Dict[str, Any], paths: List[str], compute):
+        """Return the cached response for (endpoint, paths, params), or compute() and cache a 200 JSON result."""
+        key = self.key(endpoint, paths, params)
+        body, tier = self.get(key)
+        if body is not None:
+            return Response(content=body, media_type='application/json', headers={'X-Result-Cache': f'hit-{tier}'})
+        response = compute(params)
+        if isinstance(response, JSONResponse) and response.status_code == 200:
+            self.put(key, bytes(response.body))
+            response.headers['X-Result-Cache'] = 'miss'
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk = dict(self._disk) if self._disk is not None else {}
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._mem),
+                'memory_mb': round(self._mem_bytes / 1048576, 2),
+                'memory_budget_mb': round(self.mem_budget_bytes / 1048576, 2),
+                'disk_entries': len(disk),
+                'disk_mb': round(sum(disk.values()) / 1048576, 2),
+                'disk_budget_mb': round(self.disk_budget_bytes / 1048576, 2),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'stores': self.stores,
+                'memory_evictions': self.memory_evictions,
+                'disk_evictions': self.disk_evictions,
+            }
+
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MEM_MB * 1024 * 1024, RESULT_CACHE_DISK_MB * 1024 * 1024)
+
+# --- Strategy log catalog ---
+# Keeps an always-current {name: entry} map of the files directly under LOG_DIR so the
+# "latest log" helpers and file-list endpoints never listdir/stat per request. On Linux the
+# directory is watched with inotify; elsewhere (or if inotify is unavailable) it is rescanned
+# every LOG_CATALOG_POLL_SEC in a background thread.
+LOG_CATALOG_POLL_SEC = float(os.environ.get('LOG_CATALOG_POLL_SEC', '2.0'))
+LOG_KINDS = ('main', 'fastgrad_debug', 'opportunities', 'output_window', 'params', 'log', 'csv')
+
+_IN_MODIFY, _IN_ATTRIB, _IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+_IN_MOVED_FROM, _IN_MOVED_TO, _IN_CREATE, _IN_DELETE = 0x40, 0x80, 0x100, 0x200
+_IN_DELETE_SELF, _IN_MOVE_SELF, _IN_Q_OVERFLOW, _IN_IGNORED = 0x400, 0x800, 0x4000, 0x8000
+_IN_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+                  | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+def _log_kind(name: str) -> Optional[str]:
+    """Classify a strategy_logs file name; None for files the catalog ignores."""
+    lower = name.lower()
+    if lower.endswith('_params.json'):
+        return 'params'
+    if lower.endswith('.log'):
+        return 'log'
+    if not lower.endswith('.csv'):
+        return None
+    if 'opportunities' in lower:
+        return 'opportunities'
+    if 'outputwindow' in lower:
+        return 'output_window'
+    if lower.startswith('barsontheflow'):
+        return 'fastgrad_debug' if 'fastgraddebug' in lower else 'main'
+    return 'csv'
+
+class LogCatalog:
+    """Watched catalog of strategy log files with mtime/size per entry."""
+
+    def __init__(self, directory: str, poll_sec: float):
+        self.directory = directory
+        self.poll_sec = poll_sec
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._line_counts: Dict[str, tuple] = {}  # path -> (mtime, size, newlines, ends_with_newline)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify_ok = sys.platform.startswith('linux')
+        self.mode = 'idle'
+        self.events = 0
+        self.rescans = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._rescan()
+            self._thread = threading.Thread(target=self._run, name='log-catalog', daemon=True)
+            self._thread.start()
+
+    def _entry_for(self, name: str, st: os.stat_result) -> Dict[str, Any]:
+        return {'name': name, 'path': os.path.join(self.directory, name), 'kind': _log_kind(name),
+                'mtime': st.st_mtime, 'size': st.st_size}
+
+    def _rescan(self):
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for de in it:
+                    if _log_kind(de.name) is None:
+                        continue
+                    try:
+                        if de.is_file():
+                            entries[de.name] = self._entry_for(de.name, de.stat())
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        with self._lock:
+            self._entries = entries
+            self.rescans += 1
+
+    def _update(self, name: str):
+        import stat
+        if _log_kind(name) is None:
+            return
+        try:
+            st = os.stat(os.path.join(self.directory, name))
+            entry = self._entry_for(name, st) if stat.S_ISREG(st.st_mode) else None
+        except OSError:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._entries.pop(name, None)
+            else:
+                self._entries[name] = entry
+
+    def _watch_inotify(self) -> bool:
+        """Block on inotify events; returns False if inotify cannot be used at all."""
+        import ctypes
+        import ctypes.util
+        import select
+        import struct
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        try:
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), _IN_WATCH_MASK) < 0:
+                return False
+            self.mode = 'inotify'
+            self._rescan()  # pick up anything that changed before the watch existed
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                buf = os.read(fd, 65536)
+                names = set()
+                rescan = False
+                pos = 0
+                while pos + 16 <= len(buf):
+                    _wd, mask, _cookie, length = struct.unpack_from('iIII', buf, pos)
+                    name = buf[pos + 16:pos + 16 + length].rstrip(b'\0')
+                    pos += 16 + length
+                    self.events += 1
+                    if mask & _IN_Q_OVERFLOW:
+                        rescan = True
+                    elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                        return True  # directory went away; caller falls back to polling
+                    elif name:
+                        names.add(os.fsdecode(name))
+                if rescan:
+                    self._rescan()
+                else:
+                    for name in names:
+                        self._update(name)
+            return True
+        finally:
+            os.close(fd)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._inotify_ok and os.path.isdir(self.directory):
+                try:
+                    if self._watch_inotify():
+                        self._rescan()
+                        continue
+                except Exception as ex:
+                    print(f'[LOG_CATALOG] inotify watch failed, polling instead: {ex}')
+                self._inotify_ok = False
+            self.mode = 'poll'
+            if self._stop.wait(self.poll_sec):
+                break
+            self._rescan()
+
+    def stop(self):
+        self._stop.set()
+
+    def files(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries of one kind (all kinds if None), newest first."""
+        self._ensure_started()
+        with self._lock:
+            entries = [dict(e) for e in self._entries.values() if kind is None or e['kind'] == kind]
+        entries.sort(key=lambda e: e['mtime'], reverse=True)
+        return entries
+
+    def latest(self, kind: str) -> Optional[Dict[str, Any]]:
+        self._ensure_started()
+        with self._lock:
+            return max((e for e in self._entries.values() if e['kind'] == kind), key=lambda e: e['mtime'], default=None)
+
+    def row_count(self, entry: Dict[str, Any]) -> int:
+        """Data rows (lines minus header); counted incrementally as an append-only log grows."""
+        path, mtime, size = entry['path'], entry['mtime'], entry['size']
+        with self._lock:
+            cached = self._line_counts.get(path)
+        if cached and cached[0] == mtime and cached[1] == size:
+            newlines, ends_nl = cached[2], cached[3]
+        else:
+            start, newlines = (cached[1], cached[2]) if cached and size >= cached[1] else (0, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        newlines += chunk.count(b'\n')
+                    if size:
+                        f.seek(size - 1)
+                        ends_nl = f.read(1) == b'\n'
+                    else:
+                        ends_nl = True
+            except OSError:
+                return 0
+            with self._lock:
+                self._line_counts[path] = (mtime, size, newlines, ends_nl)
+        lines = newlines + (0 if ends_nl else 1)
+        return max(lines - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = {k: 0 for k in LOG_KINDS}
+            for e in self._entries.values():
+                kinds[e['kind']] += 1
+        return {'mode': self.mode, 'directory': self.directory, 'files': kinds,
+                'events': self.events, 'rescans': self.rescans}
+
+log_catalog = LogCatalog(LOG_DIR, LOG_CATALOG_POLL_SEC)
+
 # --- Command queue for page -> strategy signals ---
 COMMAND_QUEUE_MAX = 200
 command_queue: deque[Dict[str, Any]] = deque(maxlen=COMMAND_QUEUE_MAX)
@@ -876,13 +2311,169 @@ def log_command_payload(data: Dict[str, Any]):
     except Exception as ex:
         print('[CMD] payload file log error:', ex)
 
+# Long-poll cap for GET /commands/next?wait=N and ack timeout for the /ws/commands push channel
+COMMAND_LONGPOLL_MAX_SEC = float(os.environ.get('COMMAND_LONGPOLL_MAX_SEC', '30'))
+COMMAND_ACK_TIMEOUT_SEC = float(os.environ.get('COMMAND_ACK_TIMEOUT_SEC', '5'))
+COMMAND_ACKED_REMEMBER = 1000
+
+def _resolve_waiter(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+class CommandSubscriber:
+    """One strategy on /ws/commands: outbox of commands to send plus its unacknowledged set."""
+
+    def __init__(self, ws: WebSocket, name: str, loop: asyncio.AbstractEventLoop):
+        self.ws = ws
+        self.name = name
+        self.loop = loop
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.unacked: Dict[int, list] = {}  # id -> [command, last sent (monotonic)]
+        self.sent = 0
+        self.resent = 0
+        self.acked = 0
+
+    def offer(self, cmd: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self.outbox.put_nowait, cmd)
+
+    async def run(self):
+        """Send queued commands; resend any left unacknowledged for COMMAND_ACK_TIMEOUT_SEC."""
+        while True:
+            try:
+                cmd = await asyncio.wait_for(self.outbox.get(), timeout=COMMAND_ACK_TIMEOUT_SEC / 2)
+            except asyncio.TimeoutError:
+                cmd = None
+            now = time.monotonic()
+            if cmd is not None and cmd['id'] not in self.unacked:
+                self.unacked[cmd['id']] = [cmd, now]
+                await self.ws.send_json({'type': 'command', 'command': cmd})
+                self.sent += 1
+            for entry in list(self.unacked.values()):
+                if now - entry[1] >= COMMAND_ACK_TIMEOUT_SEC:
+                    entry[1] = now
+                    await self.ws.send_json({'type': 'command', 'command': entry[0], 'redelivery': True})
+                    self.resent += 1
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Commands this subscriber has not acknowledged (sent or still in the outbox)."""
+        cmds = {cid: entry[0] for cid, entry in self.unacked.items()}
+        while not self.outbox.empty():
+            cmd = self.outbox.get_nowait()
+            cmds.setdefault(cmd['id'], cmd)
+        return [cmds[cid] for cid in sorted(cmds)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'name': self.name, 'unacked': len(self.unacked), 'outbox': self.outbox.qsize(),
+                'sent': self.sent, 'resent': self.resent, 'acked': self.acked}
+
+class CommandBridge:
+    """Page -> strategy command delivery over HTTP polling (short or long) and WebSocket push.
+
+    Commands wait in `queue` for GET /commands/next unless push subscribers are connected, in
+    which case every subscriber gets them and they are resent until acknowledged (at-least-once;
+    strategies dedupe by id). Commands unacknowledged when the last subscriber disconnects go
+    back to the front of the queue.
+    """
+
+    def __init__(self, queue: deque):
+        self.queue = queue
+        self.subscribers: Dict[WebSocket, CommandSubscriber] = {}
+        self._waiters: set = set()
+        self._acked_ids: deque = deque(maxlen=COMMAND_ACKED_REMEMBER)
+        self.polled = 0
+        self.pushed = 0
+        self.acked = 0
+        self.requeued = 0
+
+    def put(self, cmd: Dict[str, Any]):
+        if self.subscribers:
+            for sub in list(self.subscribers.values()):
+                sub.offer(cmd)
+            self.pushed += 1
+        else:
+            self.queue.append(cmd)
+            self._wake()
+
+    def _wake(self):
+        for fut in list(self._waiters):
+            fut.get_loop().call_soon_threadsafe(_resolve_waiter, fut)
+
+    def take(self, limit: int = 1) -> List[Dict[str, Any]]:
+        """Pop up to `limit` queued commands (0 = all)."""
+        out = []
+        while self.queue and (limit <= 0 or len(out) < limit):
+            out.append(self.queue.popleft())
+        self.polled += len(out)
+        return out
+
+    async def wait_take(self, limit: int, timeout: float) -> List[Dict[str, Any]]:
+        """take(), blocking up to `timeout` seconds for a command when the queue is empty."""
+        deadline = time.monotonic() + timeout
+        while True:
+            out = self.take(limit)
+            remaining = deadline - time.monotonic()
+            if out or remaining <= 0:
+                return out
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.add(fut)
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters.discard(fut)
+
+    def requeue(self, cmds: List[Dict[str, Any]]):
+        """Put undelivered commands back at the front of the queue, oldest first."""
+        cmds = [c for c in cmds if c['id'] not in self._acked_ids]
+        for cmd in reversed(cmds):
+            self.queue.appendleft(cmd)
+        self.requeued += len(cmds)
+        if cmds:
+            self._wake()
+
+    def subscribe(self, ws: WebSocket, name: str) -> CommandSubscriber:
+        sub = CommandSubscriber(ws, name, asyncio.get_running_loop())
+        self.subscribers[ws] = sub
+        for cmd in self.take(0):  # hand over anything that was waiting for a poller
+            sub.offer(cmd)
+        return sub
+
+    def unsubscribe(self, ws: WebSocket):
+        sub = self.subscribers.pop(ws, None)
+        if sub is not None and not self.subscribers:
+            self.requeue(sub.pending())
+
+    def ack(self, sub: CommandSubscriber, ids) -> int:
+        done = 0
+        for cid in ids:
+            if sub.unacked.pop(cid, None) is not None:
+                done += 1
+            self._acked_ids.append(cid)
+        sub.acked += done
+        self.acked += done
+        return done
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': len(self.queue),
+            'long_poll_waiters': len(self._waiters),
+            'polled': self.polled,
+            'pushed': self.pushed,
+            'acked': self.acked,
+            'requeued': self.requeued,
+            'subscribers': [sub.stats() for sub in self.subscribers.values()],
+        }
+
+command_bridge = CommandBridge(command_queue)
+
 def enqueue_command(cmd: Dict[str, Any]) -> Dict[str, Any]:
-    """Assign id/timestamp and enqueue a command for strategies to poll."""
+    """Assign id/timestamp and hand a command to polling or push-subscribed strategies."""
     global command_seq
     command_seq += 1
     cmd['id'] = command_seq
     cmd['ts'] = time.time()
-    command_queue.append(cmd)
+    command_bridge.put(cmd)
     return cmd
 
 def _normalize_bar(p: Dict[str, Any]) -> Dict[str, Any]:
@@ -1062,8 +2653,7 @@ def save_overrides_to_disk():
         except Exception:
             pass
 
-# Initial load at import time
-load_overrides_from_disk()
+# Initial load happens in startup_event (not at import, see init_db above)
 
 # Baseline default parameters used for suggestion logic (tunable)
 DEFAULT_PARAMS = {
@@ -1202,21 +2792,17 @@ def api_bar_data(bar: int):
         return JSONResponse({'status': 'error', 'message': 'No log files found'}, status_code=404)
     
     try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            row_count = 0
-            for row in reader:
-                row_count += 1
-                if int(row.get('bar', -1)) == bar:
-                    print(f'[API] bar-data: Found bar {bar} at row {row_count}')
-                    # Convert boolean string values to actual booleans
-                    bar_data = dict(row)
-                    for key in ['allowLongThisBar', 'allowShortThisBar', 'trendUpAtDecision', 'trendDownAtDecision', 'pendingShortFromGood', 'pendingLongFromBad']:
-                        if key in bar_data:
-                            bar_data[key] = bar_data[key].lower() == 'true'
-                    return JSONResponse(bar_data)
-        
-        print(f'[API] bar-data: Bar {bar} not found in log (scanned {row_count} rows)')
+        table = csv_logs.table(csv_path)
+        rows = table.rows_for_bar(bar)
+        if rows:
+            # First logged row for the bar, as the old linear scan returned
+            bar_data = rows[0]
+            for key in ['allowLongThisBar', 'allowShortThisBar', 'trendUpAtDecision', 'trendDownAtDecision', 'pendingShortFromGood', 'pendingLongFromBad']:
+                if bar_data.get(key) is not None:
+                    bar_data[key] = bar_data[key].lower() == 'true'
+            return JSONResponse(bar_data)
+        
+        print(f'[API] bar-data: Bar {bar} not found in log ({len(table)} rows indexed)')
         return JSONResponse({'status': 'error', 'message': f'Bar {bar} not found in log'}, status_code=404)
     except Exception as ex:
         print(f'[API] bar-data error: {ex}')
@@ -1250,19 +2836,13 @@ def api_strategy_params():
 def api_bar_analysis(bar_index: int):
     """Get detailed analysis for a specific bar index including trade exits, entry conditions, etc."""
     try:
-        dashboard_db_path = DB_PATH
-        volatility_db_path = os.path.join(os.path.dirname(__file__), 'volatility.db')
-        
-        if not os.path.exists(dashboard_db_path) or not os.path.exists(volatility_db_path):
+        if not os.path.exists(DB_PATH) or not os.path.exists(VOLATILITY_DB_PATH):
             return JSONResponse({'error': 'Database not found'}, status_code=404)
         
-        conn_dashboard = sqlite3.connect(dashboard_db_path)
-        conn_volatility = sqlite3.connect(volatility_db_path)
-        conn_dashboard.row_factory = sqlite3.Row
-        conn_volatility.row_factory = sqlite3.Row
-        
-        cur_dashboard = conn_dashboard.cursor()
-        cur_volatility = conn_volatility.cursor()
+        cur_dashboard = dashboard_db.reader().cursor()
+        cur_volatility = volatility_db.reader().cursor()
+        cur_dashboard.row_factory = sqlite3.Row
+        cur_volatility.row_factory = sqlite3.Row
         
         result = {
             'bar_index': bar_index,
@@ -1348,8 +2928,6 @@ def api_bar_analysis(bar_index: int):
         # Try to get log entries for this bar
         result['log_entries'] = get_log_entries_for_bar(bar_index)
         
-        conn_dashboard.close()
-        conn_volatility.close()
         
         return JSONResponse(result)
     except Exception as ex:
@@ -1362,50 +2940,37 @@ def get_log_entries_for_bar(bar_index: int, max_entries: int = 50) -> List[Dict[
     """Extract log entries for a specific bar from the output window log file."""
     log_entries = []
     try:
-        # Find the most recent log file
-        log_files = []
-        if os.path.exists(LOG_DIR):
-            for file in os.listdir(LOG_DIR):
-                if file.startswith('BarsOnTheFlow_OutputWindow_') and file.endswith('.csv'):
-                    log_files.append(os.path.join(LOG_DIR, file))
-        
-        if not log_files:
+        # Use the most recent output window log (by modification time)
+        latest = log_catalog.latest('output_window')
+        if not latest:
             return log_entries
-        
-        # Use the most recent log file (by modification time)
-        latest_log = max(log_files, key=os.path.getmtime)
+        latest_log = latest['path']
         
         # Search for entries related to this bar
-        import csv
-        with open(latest_log, 'r', encoding='utf-8', errors='ignore') as f:
-            # CSV format: timestamp,bar_index,level,message (with quotes)
-            csv_reader = csv.reader(f)
-            bar_entries = []
-            for row in csv_reader:
-                if len(row) >= 4:
-                    try:
-                        bar_idx = int(row[1]) if row[1].isdigit() else 0
-                        if bar_idx == bar_index:
-                            bar_entries.append({
-                                'timestamp': row[0],
-                                'bar_index': row[1],
-                                'level': row[2],
-                                'message': row[3]  # CSV reader already handles quotes
-                            })
-                    except (ValueError, IndexError):
-                        continue
-            
-            # Return the most relevant entries (entry/exit decisions, filters)
-            relevant_keywords = ['ENTRY', 'EXIT', 'FILTER', 'BLOCK', 'trendUp', 'trendDown', 'skip', 'allow', 'EmaCrossoverFilterPasses', 'TREND_SIGNAL', 'conditionsMet', 'emaLongSignal']
-            filtered_entries = []
-            for entry in bar_entries:
-                message = entry.get('message', '').upper()
-                if any(keyword.upper() in message for keyword in relevant_keywords):
-                    filtered_entries.append(entry)
-            
-            # If we have filtered entries, use them; otherwise use all entries
-            log_entries = filtered_entries[:max_entries] if filtered_entries else bar_entries[:max_entries]
-            
+        # CSV format: timestamp,bar_index,level,message (with quotes); no header row
+        table = csv_logs.table(latest_log, header=False)
+        bar_entries = []
+        for row in table.rows_for_bar(bar_index, column='1'):
+            if row.get('3') is None or not row['1'].isdigit():
+                continue
+            bar_entries.append({
+                'timestamp': row['0'],
+                'bar_index': row['1'],
+                'level': row['2'],
+                'message': row['3']
+            })
+        
+        # Return the most relevant entries (entry/exit decisions, filters)
+        relevant_keywords = ['ENTRY', 'EXIT', 'FILTER', 'BLOCK', 'trendUp', 'trendDown', 'skip', 'allow', 'EmaCrossoverFilterPasses', 'TREND_SIGNAL', 'conditionsMet', 'emaLongSignal']
+        filtered_entries = []
+        for entry in bar_entries:
+            message = entry.get('message', '').upper()
+            if any(keyword.upper() in message for keyword in relevant_keywords):
+                filtered_entries.append(entry)
+        
+        # If we have filtered entries, use them; otherwise use all entries
+        log_entries = filtered_entries[:max_entries] if filtered_entries else bar_entries[:max_entries]
+        
     except Exception as ex:
         print(f'[API] Error reading log entries for bar {bar_index}: {ex}')
         import traceback
@@ -1448,7 +3013,105 @@ def api_strategy_state():
 # VOLATILITY / DYNAMIC STOP LOSS API
 # ============================================================================
 
-VOLATILITY_DB_PATH = os.path.join(os.path.dirname(__file__), 'volatility.db')
+# --- In-memory volatility stats for the recommended-stop hot path ---
+# All-days volatility_stats rows (symbol x 96 quarter hours) are held in a dict. Writers in this
+# process refresh just the (symbol, quarter_hour) rows their inserts touched; the whole table is
+# reloaded after VOLATILITY_STATS_TTL_SEC to pick up external writers (import scripts), or when
+# marked dirty by a bulk write.
+VOLATILITY_STATS_TTL_SEC = float(os.environ.get('VOLATILITY_STATS_TTL_SEC', '30'))
+STOP_MIN_SAMPLES = 10
+STOP_DEFAULT_TICKS = 16  # 4 points
+STOP_VOLUME_BUCKETS = (('LOW', 0.85), ('NORMAL', 1.0), ('HIGH', 1.25))  # volume condition -> stop multiplier
+
+class VolatilityStatsTable:
+    """Process-local copy of the all-days volatility_stats rows keyed by (symbol, quarter_hour)."""
+
+    def __init__(self, ttl_sec: float):
+        self.ttl_sec = ttl_sec
+        self._rows: Dict[tuple, tuple] = {}
+        self._loaded_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.refreshes = 0
+
+    _SELECT = '''
+        SELECT symbol, quarter_hour, avg_bar_range, avg_volume, avg_range_per_1k_volume, sample_count
+        FROM volatility_stats
+        WHERE day_of_week IS NULL AND quarter_hour IS NOT NULL
+    '''
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    @staticmethod
+    def _row(avg_range, avg_volume, avg_rp1k, count) -> tuple:
+        return (avg_range or 0.0, avg_volume or 0.0, avg_rp1k, count or 0)
+
+    def refresh(self, cursor, keys):
+        """Re-read the all-days rows for (symbol, quarter_hour) `keys` through `cursor`, e.g. inside the
+        write transaction whose bar_samples inserts just updated them via the stats trigger."""
+        if self._dirty or not keys:
+            return  # a full reload is due anyway
+        with self._lock:
+            for symbol, qh in set(keys):
+                for sym, q, avg_range, avg_volume, avg_rp1k, count in cursor.execute(
+                        self._SELECT + ' AND symbol = ? AND quarter_hour = ?', (symbol, qh)):
+                    self._rows[(sym, q)] = self._row(avg_range, avg_volume, avg_rp1k, count)
+            self.refreshes += 1
+
+    def _reload(self):
+        rows: Dict[tuple, tuple] = {}
+        try:
+            cur = volatility_db.reader().cursor()
+            for symbol, qh, avg_range, avg_volume, avg_rp1k, count in cur.execute(self._SELECT):
+                rows[(symbol, qh)] = self._row(avg_range, avg_volume, avg_rp1k, count)
+        except sqlite3.Error as ex:
+            print(f'[VOLATILITY] stats table reload failed: {ex}')
+            return
+        self._rows = rows
+        self._loaded_at = time.time()
+        self._dirty = False
+        self.reloads += 1
+
+    def _ensure_fresh(self):
+        if self._dirty or time.time() - self._loaded_at > self.ttl_sec:
+            with self._lock:
+                if self._dirty or time.time() - self._loaded_at > self.ttl_sec:
+                    self._reload()
+
+    def get(self, symbol: str, quarter_hour: int) -> Optional[tuple]:
+        """(avg_bar_range, avg_volume, avg_range_per_1k_volume, sample_count) or None."""
+        self._ensure_fresh()
+        return self._rows.get((symbol, quarter_hour))
+
+    def symbol_rows(self, symbol: str) -> Dict[int, tuple]:
+        self._ensure_fresh()
+        return {qh: row for (sym, qh), row in self._rows.items() if sym == symbol}
+
+volatility_stats_table = VolatilityStatsTable(VOLATILITY_STATS_TTL_SEC)
+
+def _stop_confidence(sample_count: int) -> str:
+    if sample_count >= 100:
+        return 'HIGH'
+    if sample_count >= 30:
+        return 'MEDIUM'
+    return 'LOW'
+
+def _stop_ticks(avg_range: float, volume_multiplier: float) -> int:
+    # Base: average bar range * 1.2 buffer * volume adjustment, 4 ticks per point,
+    # clamped to a reasonable range (2-20 points = 8-80 ticks)
+    return max(8, min(80, int(avg_range * 1.2 * volume_multiplier * 4)))
+
+def _volume_condition(volume: int, avg_volume: float) -> tuple:
+    """(condition, stop multiplier) for the current bar volume vs. the quarter-hour average."""
+    if volume > 0 and avg_volume > 0:
+        volume_ratio = volume / avg_volume
+        if volume_ratio < 0.7:
+            return 'LOW', 0.85  # Tighter stops in low volume
+        if volume_ratio > 1.3:
+            return 'HIGH', 1.25  # Wider stops in high volume
+    return 'NORMAL', 1.0
 
 @app.get('/api/volatility/recommended-stop')
 def api_volatility_recommended_stop(hour: int = None, volume: int = 0, symbol: str = 'MNQ'):
@@ -1474,22 +3137,11 @@ def api_volatility_recommended_stop(hour: int = None, volume: int = 0, symbol: s
         # Calculate quarter hour: 0-95 (0=00:00-00:14, 1=00:15-00:29, ..., 95=23:45-23:59)
         quarter_hour = hour * 4 + (now.minute // 15)
         
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        cursor = conn.cursor()
-        
-        # Get stats for this quarter hour
-        cursor.execute('''
-            SELECT avg_bar_range, avg_volume, avg_range_per_1k_volume, sample_count
-            FROM volatility_stats
-            WHERE quarter_hour = ? AND symbol = ? AND day_of_week IS NULL
-        ''', (quarter_hour, symbol))
-        
-        row = cursor.fetchone()
-        conn.close()
+        row = volatility_stats_table.get(symbol, quarter_hour)
         
-        if not row or row[3] < 10:  # Need at least 10 samples
+        if not row or row[3] < STOP_MIN_SAMPLES:
             return JSONResponse({
-                'recommended_stop_ticks': 16,  # Default 4 points
+                'recommended_stop_ticks': STOP_DEFAULT_TICKS,
                 'avg_bar_range': 0,
                 'avg_volume': 0,
                 'volume_condition': 'UNKNOWN',
@@ -1498,45 +3150,14 @@ def api_volatility_recommended_stop(hour: int = None, volume: int = 0, symbol: s
             })
         
         avg_range, avg_volume, avg_range_per_vol, sample_count = row
-        
-        # Determine volume condition
-        if volume > 0 and avg_volume > 0:
-            volume_ratio = volume / avg_volume
-            if volume_ratio < 0.7:
-                volume_condition = 'LOW'
-                volume_multiplier = 0.85  # Tighter stops in low volume
-            elif volume_ratio > 1.3:
-                volume_condition = 'HIGH'
-                volume_multiplier = 1.25  # Wider stops in high volume
-            else:
-                volume_condition = 'NORMAL'
-                volume_multiplier = 1.0
-        else:
-            volume_condition = 'NORMAL'
-            volume_multiplier = 1.0
-        
-        # Calculate recommended stop
-        # Base: average bar range * 1.2 buffer * volume adjustment
-        base_stop_points = avg_range * 1.2 * volume_multiplier
-        recommended_ticks = int(base_stop_points * 4)  # 4 ticks per point
-        
-        # Confidence based on sample count
-        if sample_count >= 100:
-            confidence = 'HIGH'
-        elif sample_count >= 30:
-            confidence = 'MEDIUM'
-        else:
-            confidence = 'LOW'
-        
-        # Clamp to reasonable range (2-20 points = 8-80 ticks)
-        recommended_ticks = max(8, min(80, recommended_ticks))
+        volume_condition, volume_multiplier = _volume_condition(volume, avg_volume)
         
         return JSONResponse({
-            'recommended_stop_ticks': recommended_ticks,
+            'recommended_stop_ticks': _stop_ticks(avg_range, volume_multiplier),
             'avg_bar_range': round(avg_range, 2),
             'avg_volume': int(avg_volume),
             'volume_condition': volume_condition,
-            'confidence': confidence,
+            'confidence': _stop_confidence(sample_count),
             'sample_count': sample_count,
             'hour': hour,
             'quarter_hour': quarter_hour
@@ -1546,6 +3167,73 @@ def api_volatility_recommended_stop(hour: int = None, volume: int = 0, symbol: s
         print(f'[API] volatility recommended-stop error: {ex}')
         return JSONResponse({'status': 'error', 'message': str(ex)}, status_code=500)
 
+@app.get('/api/volatility/recommended-stop-curve')
+def api_volatility_recommended_stop_curve(symbol: str = 'MNQ'):
+    """Recommended stop for every quarter hour and volume bucket, for caching at session start.
+    
+    Each entry gives the LOW/NORMAL/HIGH stop in ticks plus the volume thresholds that select
+    the bucket (LOW below low_volume_below, HIGH above high_volume_above, else NORMAL; a volume
+    of 0 counts as NORMAL). Quarter hours with fewer than min_samples samples use default_stop_ticks.
+    """
+    try:
+        rows = volatility_stats_table.symbol_rows(symbol)
+        curve = []
+        for quarter_hour in range(96):
+            row = rows.get(quarter_hour)
+            entry = {
+                'quarter_hour': quarter_hour,
+                'time': f'{quarter_hour // 4:02d}:{(quarter_hour % 4) * 15:02d}',
+                'sample_count': row[3] if row else 0,
+            }
+            if not row or row[3] < STOP_MIN_SAMPLES:
+                entry.update({
+                    'confidence': 'LOW',
+                    'avg_bar_range': 0,
+                    'avg_volume': 0,
+                    'low_volume_below': None,
+                    'high_volume_above': None,
+                    'stops': {name: STOP_DEFAULT_TICKS for name, _ in STOP_VOLUME_BUCKETS},
+                })
+            else:
+                avg_range, avg_volume = row[0], row[1]
+                entry.update({
+                    'confidence': _stop_confidence(row[3]),
+                    'avg_bar_range': round(avg_range, 2),
+                    'avg_volume': int(avg_volume),
+                    'low_volume_below': round(avg_volume * 0.7, 1),
+                    'high_volume_above': round(avg_volume * 1.3, 1),
+                    'stops': {name: _stop_ticks(avg_range, mult) for name, mult in STOP_VOLUME_BUCKETS},
+                })
+            curve.append(entry)
+        
+        return JSONResponse({
+            'symbol': symbol,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'min_samples': STOP_MIN_SAMPLES,
+            'default_stop_ticks': STOP_DEFAULT_TICKS,
+            'curve': curve
+        })
+        
+    except Exception as ex:
+        print(f'[API] volatility recommended-stop-curve error: {ex}')
+        return JSONResponse({'status': 'error', 'message': str(ex)}, status_code=500)
+
+# bar_samples columns written by record-bar and batch-record-bars (schema settled by migrate_volatility_db)
+BAR_SAMPLE_INSERT_COLUMNS = (
+    'timestamp', 'bar_index', 'symbol', 'hour_of_day', 'quarter_hour', 'day_of_week',
+    'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+    'bar_range', 'body_size', 'upper_wick', 'lower_wick', 'ema_fast_period', 'ema_slow_period',
+    'ema_fast_value', 'ema_slow_value', 'fast_ema_grad_deg', 'stop_loss_points',
+    'range_per_1k_volume', 'direction', 'in_trade', 'trade_result_ticks',
+    'candle_type', 'trend_up', 'trend_down', 'allow_long_this_bar', 'allow_short_this_bar',
+    'pending_long_from_bad', 'pending_short_from_good', 'avoid_longs_on_bad_candle',
+    'avoid_shorts_on_good_candle', 'entry_reason',
+)
+
+BATCH_BARS_CHUNK_ROWS = int(os.environ.get('BATCH_BARS_CHUNK_ROWS', '500'))
+# Parses the next chunk of a batch while the current one is inserted (sqlite3 releases the GIL while stepping)
+_bar_parse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bar-parse')
+
 @app.post('/api/volatility/batch-record-bars')
 async def api_volatility_batch_record_bars(request: Request):
     """Batch insert multiple bar samples at once.
@@ -1553,12 +3241,14 @@ async def api_volatility_batch_record_bars(request: Request):
     Used when transitioning from historical to real-time mode.
     Receives all accumulated historical bars in one request.
     
-    POST body: JSON array of bar objects
+    POST body: array of bar objects, or positional rows (schema "bar"); see wire_format
     """
     try:
-        bars = await request.json()
+        bars = await read_payload(request)
     except ClientDisconnect:
         return JSONResponse({"status": "ok", "message": "client_disconnected"}, status_code=200)
+    except UnsupportedWireFormat:
+        raise
     except Exception as e:
         print(f'[BATCH_API] Error parsing JSON: {e}')
         return JSONResponse({"status": "error", "message": f"Invalid JSON: {str(e)}"}, status_code=400)
@@ -1567,217 +3257,134 @@ async def api_volatility_batch_record_bars(request: Request):
         return JSONResponse({"status": "error", "message": "Expected JSON array"}, status_code=400)
     
     print(f'[BATCH_API] Received batch of {len(bars)} bars')
-    
+
+    return await run_blocking('ingest', _api_volatility_batch_record_bars, bars)
+
+def _batch_bar_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """One batch-record-bars bar object -> bar_samples row keyed by column."""
+    timestamp = data.get('timestamp', '')
+    open_p = float(data.get('open', 0))
+    high_p = float(data.get('high', 0))
+    low_p = float(data.get('low', 0))
+    close_p = float(data.get('close', 0))
+    volume = int(data.get('volume', 0))
+
+    # Parse timestamp
     try:
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        # Set WAL mode and other pragmas
-        conn.execute('PRAGMA journal_mode=WAL')
-        conn.execute('PRAGMA synchronous=NORMAL')  # Faster writes
-        cursor = conn.cursor()
-        
+        dt = datetime.strptime(timestamp.split('.')[0], '%Y-%m-%d %H:%M:%S')
+    except:
+        dt = datetime.now()
+
+    # Calculate metrics
+    bar_range = high_p - low_p
+    if close_p > open_p:  # Bullish candle
+        upper_wick = high_p - close_p
+        lower_wick = open_p - low_p
+    else:  # Bearish or doji
+        upper_wick = high_p - open_p
+        lower_wick = close_p - low_p
+
+    # Handle null strings for EMA values
+    def ema_value(key):
+        value = data.get(key)
+        if value == 'null' or value is None:
+            return None
+        return float(value) if value else None
+
+    return {
+        'timestamp': timestamp,
+        'bar_index': data.get('bar_index', 0),
+        'symbol': data.get('symbol', 'MNQ'),
+        'hour_of_day': dt.hour,
+        'quarter_hour': dt.hour * 4 + (dt.minute // 15),
+        'day_of_week': dt.weekday(),
+        'open_price': open_p, 'high_price': high_p, 'low_price': low_p, 'close_price': close_p,
+        'volume': volume,
+        'bar_range': bar_range,
+        'body_size': abs(close_p - open_p),
+        'upper_wick': upper_wick,
+        'lower_wick': lower_wick,
+        'ema_fast_period': data.get('ema_fast_period', 5),
+        'ema_slow_period': data.get('ema_slow_period', 13),
+        'ema_fast_value': ema_value('ema_fast_value'),
+        'ema_slow_value': ema_value('ema_slow_value'),
+        'fast_ema_grad_deg': ema_value('fast_ema_grad_deg'),
+        'stop_loss_points': data.get('stop_loss_points', 0),
+        'range_per_1k_volume': (bar_range / (volume / 1000)) if volume > 0 else 0,
+        'direction': data.get('direction', 'FLAT'),
+        'in_trade': 1 if data.get('in_trade', False) else 0,
+        'trade_result_ticks': data.get('trade_result_ticks'),
+        # Debugging fields
+        'candle_type': data.get('candle_type', 'flat'),
+        'trend_up': 1 if data.get('trend_up', False) else 0,
+        'trend_down': 1 if data.get('trend_down', False) else 0,
+        'allow_long_this_bar': 1 if data.get('allow_long_this_bar', False) else 0,
+        'allow_short_this_bar': 1 if data.get('allow_short_this_bar', False) else 0,
+        'pending_long_from_bad': 1 if data.get('pending_long_from_bad', False) else 0,
+        'pending_short_from_good': 1 if data.get('pending_short_from_good', False) else 0,
+        'avoid_longs_on_bad_candle': 1 if data.get('avoid_longs_on_bad_candle', False) else 0,
+        'avoid_shorts_on_good_candle': 1 if data.get('avoid_shorts_on_good_candle', False) else 0,
+        'entry_reason': data.get('entry_reason', ''),
+    }
+
+def _parse_bar_chunk(chunk: List[Dict[str, Any]]):
+    """(rows, errors) for one chunk; bad bars are counted and the first few logged."""
+    rows = []
+    errors = 0
+    for data in chunk:
+        try:
+            rows.append(_batch_bar_row(data))
+        except Exception as row_ex:
+            errors += 1
+            if errors <= 5:  # Only log first 5 errors per chunk
+                print(f'[BATCH_API] Error on bar {data.get("bar_index", "?") if isinstance(data, dict) else "?"}: {row_ex}')
+    return rows, errors
+
+def _api_volatility_batch_record_bars(bars: List[Dict[str, Any]]):
+    try:
+        t0 = time.perf_counter()
+        insert_sql, _ = volatility_db.insert_sql('bar_samples', BAR_SAMPLE_INSERT_COLUMNS, 'INSERT OR IGNORE')
+        chunks = [bars[i:i + BATCH_BARS_CHUNK_ROWS] for i in range(0, len(bars), BATCH_BARS_CHUNK_ROWS)]
         inserted = 0
         skipped = 0
         errors = 0
-        
-        # Process in chunks of 500 for better performance
-        chunk_size = 500
-        total_chunks = (len(bars) + chunk_size - 1) // chunk_size
-        
-        for chunk_idx in range(total_chunks):
-            chunk_start = chunk_idx * chunk_size
-            chunk_end = min(chunk_start + chunk_size, len(bars))
-            chunk = bars[chunk_start:chunk_end]
-            
-            if chunk_idx % 2 == 0:  # Log every other chunk
-                print(f'[BATCH_API] Processing chunk {chunk_idx + 1}/{total_chunks} (bars {chunk_start}-{chunk_end})')
-            
-            rows_to_insert = []
-            
-            for data in chunk:
-                try:
-                    timestamp = data.get('timestamp', '')
-                    bar_index = data.get('bar_index', 0)
-                    symbol = data.get('symbol', 'MNQ')
-                    open_p = float(data.get('open', 0))
-                    high_p = float(data.get('high', 0))
-                    low_p = float(data.get('low', 0))
-                    close_p = float(data.get('close', 0))
-                    volume = int(data.get('volume', 0))
-                    direction = data.get('direction', 'FLAT')
-                    in_trade = data.get('in_trade', False)
-                    trade_result = data.get('trade_result_ticks')
-                    
-                    # Parse timestamp
-                    try:
-                        dt = datetime.strptime(timestamp.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    except:
-                        dt = datetime.now()
-                    
-                    hour_of_day = dt.hour
-                    quarter_hour = hour_of_day * 4 + (dt.minute // 15)
-                    day_of_week = dt.weekday()
-                    
-                    # Calculate metrics
-                    bar_range = high_p - low_p
-                    body_size = abs(close_p - open_p)
-                    
-                    # Calculate wicks (required NOT NULL columns)
-                    if close_p > open_p:  # Bullish candle
-                        upper_wick = high_p - close_p
-                        lower_wick = open_p - low_p
-                    else:  # Bearish or doji
-                        upper_wick = high_p - open_p
-                        lower_wick = close_p - low_p
-                    
-                    range_per_1k_volume = (bar_range / (volume / 1000)) if volume > 0 else 0
-                    
-                    # Get EMA values if provided
-                    ema_fast_period = data.get('ema_fast_period', 5)
-                    ema_slow_period = data.get('ema_slow_period', 13)
-                    ema_fast_value = data.get('ema_fast_value')
-                    ema_slow_value = data.get('ema_slow_value')
-                    fast_ema_grad_deg = data.get('fast_ema_grad_deg')
-                    stop_loss_points = data.get('stop_loss_points', 0)
-                    
-                    # Handle null strings for EMA values
-                    if ema_fast_value == 'null' or ema_fast_value is None:
-                        ema_fast_value = None
-                    else:
-                        ema_fast_value = float(ema_fast_value) if ema_fast_value else None
-                        
-                    if ema_slow_value == 'null' or ema_slow_value is None:
-                        ema_slow_value = None
-                    else:
-                        ema_slow_value = float(ema_slow_value) if ema_slow_value else None
-                        
-                    if fast_ema_grad_deg == 'null' or fast_ema_grad_deg is None:
-                        fast_ema_grad_deg = None
-                    else:
-                        fast_ema_grad_deg = float(fast_ema_grad_deg) if fast_ema_grad_deg else None
-                    
-                    # Debugging fields
-                    candle_type = data.get('candle_type', 'flat')
-                    trend_up = 1 if data.get('trend_up', False) else 0
-                    trend_down = 1 if data.get('trend_down', False) else 0
-                    allow_long = 1 if data.get('allow_long_this_bar', False) else 0
-                    allow_short = 1 if data.get('allow_short_this_bar', False) else 0
-                    pending_long = 1 if data.get('pending_long_from_bad', False) else 0
-                    pending_short = 1 if data.get('pending_short_from_good', False) else 0
-                    avoid_longs = 1 if data.get('avoid_longs_on_bad_candle', False) else 0
-                    avoid_shorts = 1 if data.get('avoid_shorts_on_good_candle', False) else 0
-                    entry_reason = data.get('entry_reason', '')
-                    
-                    rows_to_insert.append((timestamp, bar_index, symbol, open_p, high_p, low_p, close_p, volume,
-                          direction, 1 if in_trade else 0, trade_result, hour_of_day, day_of_week, bar_range, body_size,
-                          upper_wick, lower_wick, range_per_1k_volume,
-                          ema_fast_period, ema_slow_period, ema_fast_value, ema_slow_value, fast_ema_grad_deg,
-                          stop_loss_points, quarter_hour, candle_type, trend_up, trend_down,
-                          allow_long, allow_short, pending_long, pending_short, avoid_longs, avoid_shorts, entry_reason))
-                        
-                except Exception as row_ex:
-                    errors += 1
-                    if errors <= 5:  # Only log first 5 errors
-                        print(f'[BATCH_API] Error on bar {data.get("bar_index", "?")}: {row_ex}')
-            
-            # Insert chunk - try first row to see error, then use executemany
-            if rows_to_insert:
-                try:
-                    # Get count before insert
-                    cursor.execute('SELECT COUNT(*) FROM bar_samples')
-                    count_before = cursor.fetchone()[0]
-                    
-                    # Test first row to see if there's an error
-                    if chunk_idx == 0 and len(rows_to_insert) > 0:
-                        test_row = rows_to_insert[0]
-                        try:
-                            cursor.execute('''
-                                INSERT INTO bar_samples 
-                                (timestamp, bar_index, symbol, open_price, high_price, low_price, close_price, volume, 
-                                 direction, in_trade, trade_result_ticks, hour_of_day, day_of_week, bar_range, body_size,
-                                 upper_wick, lower_wick, range_per_1k_volume,
-                                 ema_fast_period, ema_slow_period, ema_fast_value, ema_slow_value, fast_ema_grad_deg,
-                                 stop_loss_points, quarter_hour, candle_type, trend_up, trend_down,
-                                 allow_long_this_bar, allow_short_this_bar, pending_long_from_bad, pending_short_from_good,
-                                 avoid_longs_on_bad_candle, avoid_shorts_on_good_candle, entry_reason)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', test_row)
-                            print(f'[BATCH_API] Test insert succeeded - rowcount={cursor.rowcount}')
-                            conn.rollback()  # Rollback test
-                        except Exception as test_ex:
-                            print(f'[BATCH_API] TEST INSERT FAILED: {test_ex}')
-                            print(f'[BATCH_API] Test row data: bar_index={test_row[1]}, symbol={test_row[2]}, timestamp={test_row[0]}')
-                            import traceback
-                            traceback.print_exc()
-                            conn.rollback()
-                    
-                    # Use executemany for performance
-                    cursor.executemany('''
-                        INSERT OR IGNORE INTO bar_samples 
-                        (timestamp, bar_index, symbol, open_price, high_price, low_price, close_price, volume, 
-                         direction, in_trade, trade_result_ticks, hour_of_day, day_of_week, bar_range, body_size,
-                         upper_wick, lower_wick, range_per_1k_volume,
-                         ema_fast_period, ema_slow_period, ema_fast_value, ema_slow_value, fast_ema_grad_deg,
-                         stop_loss_points, quarter_hour, candle_type, trend_up, trend_down,
-                         allow_long_this_bar, allow_short_this_bar, pending_long_from_bad, pending_short_from_good,
-                         avoid_longs_on_bad_candle, avoid_shorts_on_good_candle, entry_reason)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', rows_to_insert)
-                    
-                    conn.commit()  # Commit each chunk - CRITICAL!
-                    
-                    # Verify count after insert (accurate way to know what was inserted)
-                    cursor.execute('SELECT COUNT(*) FROM bar_samples')
-                    count_after = cursor.fetchone()[0]
-                    actual_inserted_this_chunk = count_after - count_before
-                    actual_skipped_this_chunk = len(rows_to_insert) - actual_inserted_this_chunk
-                    
-                    inserted += actual_inserted_this_chunk
-                    skipped += actual_skipped_this_chunk
-                    
-                    if chunk_idx % 2 == 0 or actual_inserted_this_chunk == 0:  # Log every other chunk OR if nothing inserted
-                        print(f'[BATCH_API] Chunk {chunk_idx + 1}: {actual_inserted_this_chunk} inserted (verified), {actual_skipped_this_chunk} skipped, count_before={count_before}, count_after={count_after}')
-                except Exception as chunk_ex:
-                    print(f'[BATCH_API] ERROR inserting chunk {chunk_idx + 1}: {chunk_ex}')
-                    import traceback
-                    traceback.print_exc()
-                    conn.rollback()  # Rollback this chunk
-                    errors += len(rows_to_insert)
-        
-        # Final commit to ensure everything is saved
-        conn.commit()
-        
-        # Checkpoint WAL to ensure data is visible immediately to other connections
-        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
-        checkpoint_result = cursor.fetchone()
-        print(f'[BATCH_API] WAL checkpoint result: {checkpoint_result}')
-        
-        # Verify data was actually inserted (on same connection)
-        cursor.execute('SELECT COUNT(*) FROM bar_samples')
-        actual_count = cursor.fetchone()[0]
-        print(f'[BATCH_API] Verification: bar_samples table now has {actual_count} rows (on this connection)')
-        
-        # Also verify by querying a fresh connection to ensure WAL checkpoint worked
-        import sqlite3 as sqlite3_check
-        check_conn = sqlite3_check.connect(VOLATILITY_DB_PATH)
-        check_cursor = check_conn.cursor()
-        check_cursor.execute('SELECT COUNT(*) FROM bar_samples')
-        check_count = check_cursor.fetchone()[0]
-        check_conn.close()
-        print(f'[BATCH_API] Verification (fresh connection): bar_samples table has {check_count} rows')
-        
-        if actual_count != check_count:
-            print(f'[BATCH_API] WARNING: Count mismatch! Same connection={actual_count}, fresh connection={check_count}')
-        
-        conn.close()
-        
-        print(f'[BATCH_API] Batch complete: {inserted} inserted, {skipped} skipped (duplicates), {errors} errors')
+
+        pending = _bar_parse_executor.submit(_parse_bar_chunk, chunks[0]) if chunks else None
+        for chunk_idx in range(len(chunks)):
+            rows, chunk_errors = pending.result()
+            if chunk_idx + 1 < len(chunks):
+                pending = _bar_parse_executor.submit(_parse_bar_chunk, chunks[chunk_idx + 1])
+            errors += chunk_errors
+            if not rows:
+                continue
+            try:
+                # One transaction per chunk: a bad chunk rolls back alone, and live record-bar
+                # requests can take the writer between chunks of a long historical batch
+                with volatility_db.write() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany(insert_sql, rows)
+                    # rowcount sums changes() per row: INSERT OR IGNORE duplicates add 0, trigger writes are excluded
+                    chunk_inserted = cursor.rowcount
+                    if chunk_inserted:
+                        volatility_stats_table.refresh(cursor, [(r['symbol'], r['quarter_hour']) for r in rows])
+                inserted += chunk_inserted
+                skipped += len(rows) - chunk_inserted
+            except Exception as chunk_ex:
+                print(f'[BATCH_API] ERROR inserting chunk {chunk_idx + 1}/{len(chunks)}: {chunk_ex}')
+                errors += len(rows)
+
+        volatility_db.maybe_checkpoint()
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        print(f'[BATCH_API] Batch complete: {inserted} inserted, {skipped} skipped (duplicates), {errors} errors '
+              f'in {len(chunks)} chunks, {elapsed_ms:.0f} ms')
         
         return JSONResponse({
             "status": "ok",
             "inserted": inserted,
             "skipped": skipped,
             "errors": errors,
-            "total": len(bars)
+            "total": len(bars),
+            "elapsed_ms": round(elapsed_ms, 1)
         })
         
     except Exception as ex:
@@ -1804,201 +3411,79 @@ async def api_volatility_record_trade(request: Request):
         import traceback
         traceback.print_exc()
         return JSONResponse({"status": "error", "message": f"Invalid JSON: {str(e)}"}, status_code=400)
-    
+
+    return await run_blocking('ingest', _api_volatility_record_trade, data)
+
+def _optional_float(value):
+    """float(value), or None for missing values and the "null" string NinjaTrader sends."""
+    return float(value) if value is not None and value != 'null' else None
+
+# Column order shared by the volatility.db and dashboard.db trades inserts
+TRADE_INSERT_COLUMNS = (
+    'entry_time', 'entry_bar', 'direction', 'entry_price',
+    'exit_time', 'exit_bar', 'exit_price', 'bars_held',
+    'realized_points', 'mfe', 'mae', 'exit_reason', 'entry_reason', 'contracts',
+    'ema_fast_period', 'ema_slow_period', 'ema_fast_value', 'ema_slow_value',
+    'candle_type', 'open_final', 'high_final', 'low_final', 'close_final',
+    'fast_ema', 'fast_ema_grad_deg', 'bar_pattern',
+)
+
+def _completed_trade_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Completed-trade payload (NinjaTrader field names) -> trades row keyed by column."""
+    return {
+        'entry_time': float(data.get('EntryTime', time.time())),
+        'entry_bar': int(data.get('EntryBar', 0)),
+        'direction': data.get('Direction', 'LONG'),
+        'entry_price': float(data.get('EntryPrice', 0)),
+        'exit_time': float(data.get('ExitTime', time.time())),
+        'exit_bar': int(data.get('ExitBar', 0)),
+        'exit_price': float(data.get('ExitPrice', 0)),
+        'bars_held': int(data.get('BarsHeld', 0)),
+        'realized_points': float(data.get('RealizedPoints', 0)),
+        'mfe': float(data.get('MFE', 0)),
+        'mae': float(data.get('MAE', 0)),
+        'exit_reason': data.get('ExitReason', ''),
+        'entry_reason': data.get('EntryReason', ''),
+        'contracts': int(data.get('Contracts', 0)),
+        'ema_fast_period': int(data.get('EmaFastPeriod', 0)),
+        'ema_slow_period': int(data.get('EmaSlowPeriod', 0)),
+        'ema_fast_value': _optional_float(data.get('EmaFastValue')),
+        'ema_slow_value': _optional_float(data.get('EmaSlowValue')),
+        'candle_type': data.get('CandleType', ''),
+        'open_final': _optional_float(data.get('OpenFinal')),
+        'high_final': _optional_float(data.get('HighFinal')),
+        'low_final': _optional_float(data.get('LowFinal')),
+        'close_final': _optional_float(data.get('CloseFinal')),
+        'fast_ema': _optional_float(data.get('FastEma')),
+        'fast_ema_grad_deg': _optional_float(data.get('FastEmaGradDeg')),
+        'bar_pattern': data.get('BarPattern', ''),
+    }
+
+def _api_volatility_record_trade(data: Dict[str, Any]):
     try:
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        conn.execute('PRAGMA journal_mode=WAL')
-        cursor = conn.cursor()
-        
-        # Ensure trades table exists in volatility.db
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                entry_time REAL NOT NULL,
-                entry_bar INTEGER,
-                direction TEXT,
-                entry_price REAL,
-                exit_time REAL,
-                exit_bar INTEGER,
-                exit_price REAL,
-                bars_held INTEGER,
-                realized_points REAL,
-                mfe REAL,
-                mae REAL,
-                exit_reason TEXT,
-                entry_reason TEXT,
-                contracts INTEGER,
-                ema_fast_period INTEGER,
-                ema_slow_period INTEGER,
-                ema_fast_value REAL,
-                ema_slow_value REAL,
-                candle_type TEXT,
-                open_final REAL,
-                high_final REAL,
-                low_final REAL,
-                close_final REAL,
-                fast_ema REAL,
-                fast_ema_grad_deg REAL,
-                bar_pattern TEXT
-            )
-        """)
-        
-        # Create indexes if they don't exist
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_entry_time ON trades(entry_time DESC)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_direction ON trades(direction)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_volatility_trades_exit_reason ON trades(exit_reason)")
+        # trades table, columns and indexes come from migrate_volatility_db at startup
+        row = _completed_trade_row(data)
+        insert_sql, _ = volatility_db.insert_sql('trades', TRADE_INSERT_COLUMNS)
+        with volatility_db.write() as conn:
+            cursor = conn.cursor()
         
-        # Create unique index to prevent exact duplicates (same entry_time, entry_price, direction)
-        # This prevents the same trade from being recorded multiple times
-        try:
+            # Check for duplicate before inserting (same entry_time, entry_price, direction)
             cursor.execute("""
-                CREATE UNIQUE INDEX IF NOT EXISTS idx_volatility_trades_unique_entry 
-                ON trades(entry_time, entry_price, direction)
-            """)
-            print('[API] volatility record-trade: Created unique index on (entry_time, entry_price, direction)')
-        except sqlite3.OperationalError as e:
-            if 'duplicate' not in str(e).lower() and 'UNIQUE constraint' not in str(e):
-                print(f'[API] volatility record-trade: Warning creating unique index: {e}')
-        
-        # Check which columns exist
-        cursor.execute("PRAGMA table_info(trades)")
-        columns = [row[1] for row in cursor.fetchall()]
-        has_contracts = 'contracts' in columns
-        has_ema_fast = 'ema_fast_period' in columns
-        has_ema_slow = 'ema_slow_period' in columns
-        has_ema_fast_value = 'ema_fast_value' in columns
-        has_ema_slow_value = 'ema_slow_value' in columns
-        has_candle_type = 'candle_type' in columns
-        has_open_final = 'open_final' in columns
-        has_high_final = 'high_final' in columns
-        has_low_final = 'low_final' in columns
-        has_close_final = 'close_final' in columns
-        has_fast_ema = 'fast_ema' in columns
-        has_fast_ema_grad_deg = 'fast_ema_grad_deg' in columns
-        has_bar_pattern = 'bar_pattern' in columns
-        has_entry_reason = 'entry_reason' in columns
-        
-        # Add missing columns
-        if not has_contracts:
-            cursor.execute("ALTER TABLE trades ADD COLUMN contracts INTEGER")
-        if not has_ema_fast:
-            cursor.execute("ALTER TABLE trades ADD COLUMN ema_fast_period INTEGER")
-        if not has_ema_slow:
-            cursor.execute("ALTER TABLE trades ADD COLUMN ema_slow_period INTEGER")
-        if not has_ema_fast_value:
-            cursor.execute("ALTER TABLE trades ADD COLUMN ema_fast_value REAL")
-        if not has_ema_slow_value:
-            cursor.execute("ALTER TABLE trades ADD COLUMN ema_slow_value REAL")
-        if not has_candle_type:
-            cursor.execute("ALTER TABLE trades ADD COLUMN candle_type TEXT")
-        if not has_open_final:
-            cursor.execute("ALTER TABLE trades ADD COLUMN open_final REAL")
-        if not has_high_final:
-            cursor.execute("ALTER TABLE trades ADD COLUMN high_final REAL")
-        if not has_low_final:
-            cursor.execute("ALTER TABLE trades ADD COLUMN low_final REAL")
-        if not has_close_final:
-            cursor.execute("ALTER TABLE trades ADD COLUMN close_final REAL")
-        if not has_fast_ema:
-            cursor.execute("ALTER TABLE trades ADD COLUMN fast_ema REAL")
-        if not has_fast_ema_grad_deg:
-            cursor.execute("ALTER TABLE trades ADD COLUMN fast_ema_grad_deg REAL")
-        if not has_bar_pattern:
-            cursor.execute("ALTER TABLE trades ADD COLUMN bar_pattern TEXT")
-        if not has_entry_reason:
-            cursor.execute("ALTER TABLE trades ADD COLUMN entry_reason TEXT")
-        
-        conn.commit()
-        
-        # Get values from request
-        ema_fast_val = data.get('EmaFastValue')
-        ema_slow_val = data.get('EmaSlowValue')
-        ema_fast_value = float(ema_fast_val) if ema_fast_val is not None and ema_fast_val != 'null' else None
-        ema_slow_value = float(ema_slow_val) if ema_slow_val is not None and ema_slow_val != 'null' else None
-        
-        open_final = data.get('OpenFinal')
-        high_final = data.get('HighFinal')
-        low_final = data.get('LowFinal')
-        close_final = data.get('CloseFinal')
-        fast_ema = data.get('FastEma')
-        fast_ema_grad_deg = data.get('FastEmaGradDeg')
-        candle_type = data.get('CandleType', '')
-        bar_pattern = data.get('BarPattern', '')
-        entry_reason = data.get('EntryReason', '')
-        
-        open_final_val = float(open_final) if open_final is not None and open_final != 'null' else None
-        high_final_val = float(high_final) if high_final is not None and high_final != 'null' else None
-        low_final_val = float(low_final) if low_final is not None and low_final != 'null' else None
-        close_final_val = float(close_final) if close_final is not None and close_final != 'null' else None
-        fast_ema_val = float(fast_ema) if fast_ema is not None and fast_ema != 'null' else None
-        fast_ema_grad_deg_val = float(fast_ema_grad_deg) if fast_ema_grad_deg is not None and fast_ema_grad_deg != 'null' else None
-        
-        # Check for duplicate before inserting (same entry_time, entry_price, direction)
-        entry_time_val = float(data.get('EntryTime', time.time()))
-        entry_price_val = float(data.get('EntryPrice', 0))
-        direction_val = data.get('Direction', 'LONG')
-        
-        cursor.execute("""
-            SELECT id FROM trades 
-            WHERE entry_time = ? AND entry_price = ? AND direction = ?
-        """, (entry_time_val, entry_price_val, direction_val))
-        
-        existing = cursor.fetchone()
-        if existing:
-            print(f'[API] volatility record-trade: DUPLICATE DETECTED - Skipping trade EntryBar={data.get("EntryBar")}, EntryTime={entry_time_val}, EntryPrice={entry_price_val}, Direction={direction_val} (existing id={existing[0]})')
-            conn.close()
-            return JSONResponse({"status": "ok", "message": "Trade already exists (duplicate skipped)", "duplicate": True})
-        
-        # Insert trade (no duplicate found)
-        cursor.execute("""
-            INSERT INTO trades (
-                entry_time, entry_bar, direction, entry_price,
-                exit_time, exit_bar, exit_price, bars_held,
-                realized_points, mfe, mae, exit_reason, entry_reason, contracts,
-                ema_fast_period, ema_slow_period, ema_fast_value, ema_slow_value,
-                candle_type, open_final, high_final, low_final, close_final,
-                fast_ema, fast_ema_grad_deg, bar_pattern
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            float(data.get('EntryTime', time.time())),
-            int(data.get('EntryBar', 0)),
-            data.get('Direction', 'LONG'),
-            float(data.get('EntryPrice', 0)),
-            float(data.get('ExitTime', time.time())),
-            int(data.get('ExitBar', 0)),
-            float(data.get('ExitPrice', 0)),
-            int(data.get('BarsHeld', 0)),
-            float(data.get('RealizedPoints', 0)),
-            float(data.get('MFE', 0)),
-            float(data.get('MAE', 0)),
-            data.get('ExitReason', ''),
-            entry_reason,
-            int(data.get('Contracts', 0)),
-            int(data.get('EmaFastPeriod', 0)),
-            int(data.get('EmaSlowPeriod', 0)),
-            ema_fast_value,
-            ema_slow_value,
-            candle_type,
-            open_final_val,
-            high_final_val,
-            low_final_val,
-            close_final_val,
-            fast_ema_val,
-            fast_ema_grad_deg_val,
-            bar_pattern
-        ))
-        
-        conn.commit()
-        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                SELECT id FROM trades 
+                WHERE entry_time = ? AND entry_price = ? AND direction = ?
+            """, (row['entry_time'], row['entry_price'], row['direction']))
         
-        # Verify the trade was inserted
-        cursor.execute('SELECT COUNT(*) FROM trades WHERE entry_bar = ? AND exit_bar = ?', 
-                      (int(data.get('EntryBar', 0)), int(data.get('ExitBar', 0))))
-        count = cursor.fetchone()[0]
+            existing = cursor.fetchone()
+            if existing:
+                print(f'[API] volatility record-trade: DUPLICATE DETECTED - Skipping trade EntryBar={data.get("EntryBar")}, EntryTime={row["entry_time"]}, EntryPrice={row["entry_price"]}, Direction={row["direction"]} (existing id={existing[0]})')
+                return JSONResponse({"status": "ok", "message": "Trade already exists (duplicate skipped)", "duplicate": True})
         
-        conn.close()
+            # Insert trade (no duplicate found)
+            cursor.execute(insert_sql, row)
+            count = cursor.rowcount
+        volatility_db.maybe_checkpoint()
         
-        print(f'[API] volatility record-trade: Trade recorded - EntryBar={data.get("EntryBar")}, ExitBar={data.get("ExitBar")}, Direction={data.get("Direction")}, Points={data.get("RealizedPoints")}, Verified count={count}')
+        print(f'[API] volatility record-trade: Trade recorded - EntryBar={data.get("EntryBar")}, ExitBar={data.get("ExitBar")}, Direction={data.get("Direction")}, Points={data.get("RealizedPoints")}, Inserted={count}')
         
         return JSONResponse({"status": "ok", "message": "Trade recorded", "verified": count > 0})
     except Exception as ex:
@@ -2020,335 +3505,130 @@ async def api_volatility_record_bar(request: Request):
         direction: LONG/SHORT/FLAT
         in_trade: Boolean
         trade_result_ticks: P/L in ticks if exiting (optional)
+    
+    Also accepts a single positional row ({"schema": "bar", "v": 1, "row": [...]}), msgpack and gzip.
     """
     try:
-        data = await request.json()
+        data = await read_payload(request)
     except ClientDisconnect:
         # Client disconnected before request completed - this is normal when strategy is cancelled
         return JSONResponse({"status": "ok", "message": "client_disconnected"}, status_code=200)
+    except UnsupportedWireFormat:
+        raise
     except Exception as e:
         print(f'[API] volatility record-bar: Error parsing JSON: {e}')
         return JSONResponse({"status": "error", "message": f"Invalid JSON: {str(e)}"}, status_code=400)
-    
+
+    return await run_blocking('ingest', _api_volatility_record_bar, data)
+
+def _api_volatility_record_bar(data: Dict[str, Any]):
     try:
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        # Enable WAL mode for better concurrent access (if not already enabled)
-        conn.execute('PRAGMA journal_mode=WAL')
-        cursor = conn.cursor()
+        with volatility_db.write() as conn:
+            cursor = conn.cursor()
+        
+            timestamp = data['timestamp']
+            bar_index = data.get('bar_index', 0)
+            symbol = data.get('symbol', 'MNQ')
+            open_p = float(data['open'])
+            high_p = float(data['high'])
+            low_p = float(data['low'])
+            close_p = float(data['close'])
+            volume = int(data['volume'])
+            direction = data.get('direction', 'FLAT')
+            in_trade = data.get('in_trade', False)
+            trade_result = data.get('trade_result_ticks')
+        
+            # Parse timestamp
+            try:
+                dt = datetime.strptime(timestamp.split('.')[0], '%Y-%m-%d %H:%M:%S')
+            except:
+                dt = datetime.now()
         
-        timestamp = data['timestamp']
-        bar_index = data.get('bar_index', 0)
-        symbol = data.get('symbol', 'MNQ')
-        open_p = float(data['open'])
-        high_p = float(data['high'])
-        low_p = float(data['low'])
-        close_p = float(data['close'])
-        volume = int(data['volume'])
-        direction = data.get('direction', 'FLAT')
-        in_trade = data.get('in_trade', False)
-        trade_result = data.get('trade_result_ticks')
-        
-        # Parse timestamp
-        try:
-            dt = datetime.strptime(timestamp.split('.')[0], '%Y-%m-%d %H:%M:%S')
-        except:
-            dt = datetime.now()
+            hour_of_day = dt.hour
+            # Calculate quarter hour: 0-95 (0=00:00-00:14, 1=00:15-00:29, ..., 95=23:45-23:59)
+            quarter_hour = hour_of_day * 4 + (dt.minute // 15)
+            day_of_week = dt.weekday()
         
-        hour_of_day = dt.hour
-        # Calculate quarter hour: 0-95 (0=00:00-00:14, 1=00:15-00:29, ..., 95=23:45-23:59)
-        quarter_hour = hour_of_day * 4 + (dt.minute // 15)
-        day_of_week = dt.weekday()
+            # Calculate metrics
+            bar_range = high_p - low_p
+            body_size = abs(close_p - open_p)
         
-        # Calculate metrics
-        bar_range = high_p - low_p
-        body_size = abs(close_p - open_p)
+            if close_p >= open_p:
+                upper_wick = high_p - close_p
+                lower_wick = open_p - low_p
+            else:
+                upper_wick = high_p - open_p
+                lower_wick = close_p - low_p
         
-        if close_p >= open_p:
-            upper_wick = high_p - close_p
-            lower_wick = open_p - low_p
-        else:
-            upper_wick = high_p - open_p
-            lower_wick = close_p - low_p
-        
-        range_per_1k_volume = (bar_range / (volume / 1000)) if volume > 0 else 0
-        
-        # Check if EMA columns exist, add them if missing
-        cursor.execute("PRAGMA table_info(bar_samples)")
-        columns = [row[1] for row in cursor.fetchall()]
-        has_ema_fast = 'ema_fast_period' in columns
-        has_ema_slow = 'ema_slow_period' in columns
-        has_ema_fast_value = 'ema_fast_value' in columns
-        has_ema_slow_value = 'ema_slow_value' in columns
-        has_grad_deg = 'fast_ema_grad_deg' in columns
-        has_stop_loss = 'stop_loss_points' in columns
-        has_candle_type = 'candle_type' in columns
-        has_trend_up = 'trend_up' in columns
-        has_trend_down = 'trend_down' in columns
-        has_allow_long = 'allow_long_this_bar' in columns
-        has_allow_short = 'allow_short_this_bar' in columns
-        has_pending_long = 'pending_long_from_bad' in columns
-        has_pending_short = 'pending_short_from_good' in columns
-        has_avoid_longs = 'avoid_longs_on_bad_candle' in columns
-        has_avoid_shorts = 'avoid_shorts_on_good_candle' in columns
-        has_entry_reason = 'entry_reason' in columns
-        
-        if not has_ema_fast:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN ema_fast_period INTEGER")
-        if not has_ema_slow:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN ema_slow_period INTEGER")
-        if not has_ema_fast_value:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN ema_fast_value REAL")
-        if not has_ema_slow_value:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN ema_slow_value REAL")
-        if not has_grad_deg:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN fast_ema_grad_deg REAL")
-        if not has_stop_loss:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN stop_loss_points REAL")
-        if not has_candle_type:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN candle_type TEXT")
-        if not has_trend_up:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN trend_up INTEGER")
-        if not has_trend_down:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN trend_down INTEGER")
-        if not has_allow_long:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN allow_long_this_bar INTEGER")
-        if not has_allow_short:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN allow_short_this_bar INTEGER")
-        if not has_pending_long:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN pending_long_from_bad INTEGER")
-        if not has_pending_short:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN pending_short_from_good INTEGER")
-        if not has_avoid_longs:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN avoid_longs_on_bad_candle INTEGER")
-        if not has_avoid_shorts:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN avoid_shorts_on_good_candle INTEGER")
-        if not has_entry_reason:
-            cursor.execute("ALTER TABLE bar_samples ADD COLUMN entry_reason TEXT")
-        
-        # Get EMA values and gradient degree, handle null/None
-        # C# sends string "null" when EMA is not ready, Python json.loads() parses it as string "null"
-        ema_fast_val = data.get('ema_fast_value')
-        ema_slow_val = data.get('ema_slow_value')
-        grad_deg_val = data.get('fast_ema_grad_deg')
-        stop_loss_val = data.get('stop_loss_points')
-        
-        # Handle string "null", actual None, empty string, or 0.0 (which might indicate not ready)
-        def parse_ema_value(val):
-            if val is None:
-                return None
-            if isinstance(val, str):
-                if val.lower() == 'null' or val.strip() == '':
+            range_per_1k_volume = (bar_range / (volume / 1000)) if volume > 0 else 0
+        
+            # Get EMA values and gradient degree, handle null/None
+            # C# sends string "null" when EMA is not ready, Python json.loads() parses it as string "null"
+            ema_fast_val = data.get('ema_fast_value')
+            ema_slow_val = data.get('ema_slow_value')
+            grad_deg_val = data.get('fast_ema_grad_deg')
+            stop_loss_val = data.get('stop_loss_points')
+        
+            # Handle string "null", actual None, empty string, or 0.0 (which might indicate not ready)
+            def parse_ema_value(val):
+                if val is None:
                     return None
+                if isinstance(val, str):
+                    if val.lower() == 'null' or val.strip() == '':
+                        return None
+                    try:
+                        fval = float(val)
+                        # If value is exactly 0.0, it might be a sentinel for "not ready" - check if it's actually valid
+                        # For now, accept 0.0 as valid (could be real EMA value)
+                        return fval
+                    except (ValueError, TypeError):
+                        return None
                 try:
                     fval = float(val)
-                    # If value is exactly 0.0, it might be a sentinel for "not ready" - check if it's actually valid
-                    # For now, accept 0.0 as valid (could be real EMA value)
                     return fval
                 except (ValueError, TypeError):
                     return None
-            try:
-                fval = float(val)
-                return fval
-            except (ValueError, TypeError):
-                return None
-        
-        ema_fast_value = parse_ema_value(ema_fast_val)
-        ema_slow_value = parse_ema_value(ema_slow_val)
-        fast_ema_grad_deg = parse_ema_value(grad_deg_val)
-        stop_loss_points = parse_ema_value(stop_loss_val)
-        
-        # Get debugging fields
-        candle_type = data.get('candle_type', '')
-        trend_up = 1 if data.get('trend_up', False) in (True, 'true', 1, '1') else 0
-        trend_down = 1 if data.get('trend_down', False) in (True, 'true', 1, '1') else 0
-        allow_long_this_bar = 1 if data.get('allow_long_this_bar', False) in (True, 'true', 1, '1') else 0
-        allow_short_this_bar = 1 if data.get('allow_short_this_bar', False) in (True, 'true', 1, '1') else 0
-        pending_long_from_bad = 1 if data.get('pending_long_from_bad', False) in (True, 'true', 1, '1') else 0
-        pending_short_from_good = 1 if data.get('pending_short_from_good', False) in (True, 'true', 1, '1') else 0
-        avoid_longs_on_bad_candle = 1 if data.get('avoid_longs_on_bad_candle', False) in (True, 'true', 1, '1') else 0
-        avoid_shorts_on_good_candle = 1 if data.get('avoid_shorts_on_good_candle', False) in (True, 'true', 1, '1') else 0
-        entry_reason = data.get('entry_reason', '') or ''
-        
-        has_all_debug_cols = (has_candle_type and has_trend_up and has_trend_down and has_allow_long and 
-                              has_allow_short and has_pending_long and has_pending_short and 
-                              has_avoid_longs and has_avoid_shorts and has_entry_reason)
-        
-        try:
-            if has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value and has_grad_deg and has_stop_loss and has_all_debug_cols:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                        ema_fast_value, ema_slow_value, fast_ema_grad_deg, stop_loss_points,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks,
-                        candle_type, trend_up, trend_down, allow_long_this_bar, allow_short_this_bar,
-                        pending_long_from_bad, pending_short_from_good, avoid_longs_on_bad_candle, avoid_shorts_on_good_candle, entry_reason
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                    ema_fast_value, ema_slow_value, fast_ema_grad_deg, stop_loss_points,
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result,
-                    candle_type, trend_up, trend_down, allow_long_this_bar, allow_short_this_bar,
-                    pending_long_from_bad, pending_short_from_good, avoid_longs_on_bad_candle, avoid_shorts_on_good_candle, entry_reason
-                ))
-            elif has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value and has_grad_deg and has_stop_loss:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                        ema_fast_value, ema_slow_value, fast_ema_grad_deg, stop_loss_points,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                    ema_fast_value, ema_slow_value, fast_ema_grad_deg, stop_loss_points,
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                ))
-            elif has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value and has_grad_deg:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                        ema_fast_value, ema_slow_value, fast_ema_grad_deg,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                    ema_fast_value, ema_slow_value, fast_ema_grad_deg,
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                ))
-            elif has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value:
-                # Fallback if gradient column doesn't exist yet
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                        ema_fast_value, ema_slow_value,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                    ema_fast_value, ema_slow_value,
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                ))
-            elif has_ema_fast and has_ema_slow:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                            timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                ))
-            else:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bar_samples (
-                            timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                        open_price, high_price, low_price, close_price, volume,
-                        bar_range, body_size, upper_wick, lower_wick,
-                        range_per_1k_volume, direction, in_trade, trade_result_ticks
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                        timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                    open_p, high_p, low_p, close_p, volume,
-                    bar_range, body_size, upper_wick, lower_wick,
-                    range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                ))
-        except sqlite3.OperationalError as col_error:
-            if 'no such column: quarter_hour' in str(col_error):
-                # Column missing - try to add it
-                print('[API] quarter_hour column missing, adding it...')
-                try:
-                    cursor.execute("ALTER TABLE bar_samples ADD COLUMN quarter_hour INTEGER")
-                    cursor.execute("UPDATE bar_samples SET quarter_hour = hour_of_day * 4 WHERE quarter_hour IS NULL")
-                    conn.commit()
-                    # Retry the insert
-                    if has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO bar_samples (
-                                timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                                open_price, high_price, low_price, close_price, volume,
-                                bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                                ema_fast_value, ema_slow_value,
-                                range_per_1k_volume, direction, in_trade, trade_result_ticks
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                            open_p, high_p, low_p, close_p, volume,
-                            bar_range, body_size, upper_wick, lower_wick,
-                            int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                            ema_fast_value, ema_slow_value,
-                            range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                        ))
-                    elif has_ema_fast and has_ema_slow:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO bar_samples (
-                                timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                                open_price, high_price, low_price, close_price, volume,
-                                bar_range, body_size, upper_wick, lower_wick, ema_fast_period, ema_slow_period,
-                                range_per_1k_volume, direction, in_trade, trade_result_ticks
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                            open_p, high_p, low_p, close_p, volume,
-                            bar_range, body_size, upper_wick, lower_wick,
-                            int(data.get('ema_fast_period', 0) or 0), int(data.get('ema_slow_period', 0) or 0),
-                            range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                        ))
-                    else:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO bar_samples (
-                                timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                                open_price, high_price, low_price, close_price, volume,
-                                bar_range, body_size, upper_wick, lower_wick,
-                                range_per_1k_volume, direction, in_trade, trade_result_ticks
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            timestamp, bar_index, symbol, hour_of_day, quarter_hour, day_of_week,
-                            open_p, high_p, low_p, close_p, volume,
-                            bar_range, body_size, upper_wick, lower_wick,
-                            range_per_1k_volume, direction, 1 if in_trade else 0, trade_result
-                        ))
-                    print('[API] [OK] Added quarter_hour column and retried insert')
-                except Exception as add_ex:
-                    conn.close()
-                    raise add_ex
-            else:
-                raise
-        
-        conn.commit()
         
-        # Checkpoint WAL periodically to ensure data is visible (every 10 bars or every 100th bar)
-        if bar_index <= 10 or bar_index % 100 == 0:
-            try:
-                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
-                cursor.fetchone()  # Execute the checkpoint
-            except:
-                pass  # Ignore checkpoint errors
-        
-        conn.close()
+            ema_fast_value = parse_ema_value(ema_fast_val)
+            ema_slow_value = parse_ema_value(ema_slow_val)
+            fast_ema_grad_deg = parse_ema_value(grad_deg_val)
+            stop_loss_points = parse_ema_value(stop_loss_val)
+        
+            # Get debugging fields
+            candle_type = data.get('candle_type', '')
+            trend_up = 1 if data.get('trend_up', False) in (True, 'true', 1, '1') else 0
+            trend_down = 1 if data.get('trend_down', False) in (True, 'true', 1, '1') else 0
+            allow_long_this_bar = 1 if data.get('allow_long_this_bar', False) in (True, 'true', 1, '1') else 0
+            allow_short_this_bar = 1 if data.get('allow_short_this_bar', False) in (True, 'true', 1, '1') else 0
+            pending_long_from_bad = 1 if data.get('pending_long_from_bad', False) in (True, 'true', 1, '1') else 0
+            pending_short_from_good = 1 if data.get('pending_short_from_good', False) in (True, 'true', 1, '1') else 0
+            avoid_longs_on_bad_candle = 1 if data.get('avoid_longs_on_bad_candle', False) in (True, 'true', 1, '1') else 0
+            avoid_shorts_on_good_candle = 1 if data.get('avoid_shorts_on_good_candle', False) in (True, 'true', 1, '1') else 0
+            entry_reason = data.get('entry_reason', '') or ''
+        
+            insert_sql, _ = volatility_db.insert_sql('bar_samples', BAR_SAMPLE_INSERT_COLUMNS, 'INSERT OR IGNORE')
+            cursor.execute(insert_sql, {
+                'timestamp': timestamp, 'bar_index': bar_index, 'symbol': symbol,
+                'hour_of_day': hour_of_day, 'quarter_hour': quarter_hour, 'day_of_week': day_of_week,
+                'open_price': open_p, 'high_price': high_p, 'low_price': low_p, 'close_price': close_p,
+                'volume': volume, 'bar_range': bar_range, 'body_size': body_size,
+                'upper_wick': upper_wick, 'lower_wick': lower_wick,
+                'ema_fast_period': int(data.get('ema_fast_period', 0) or 0),
+                'ema_slow_period': int(data.get('ema_slow_period', 0) or 0),
+                'ema_fast_value': ema_fast_value, 'ema_slow_value': ema_slow_value,
+                'fast_ema_grad_deg': fast_ema_grad_deg, 'stop_loss_points': stop_loss_points,
+                'range_per_1k_volume': range_per_1k_volume, 'direction': direction,
+                'in_trade': 1 if in_trade else 0, 'trade_result_ticks': trade_result,
+                'candle_type': candle_type, 'trend_up': trend_up, 'trend_down': trend_down,
+                'allow_long_this_bar': allow_long_this_bar, 'allow_short_this_bar': allow_short_this_bar,
+                'pending_long_from_bad': pending_long_from_bad, 'pending_short_from_good': pending_short_from_good,
+                'avoid_longs_on_bad_candle': avoid_longs_on_bad_candle,
+                'avoid_shorts_on_good_candle': avoid_shorts_on_good_candle,
+                'entry_reason': entry_reason,
+            })
+            if cursor.rowcount:
+                volatility_stats_table.refresh(cursor, [(symbol, quarter_hour)])
+        volatility_db.maybe_checkpoint()
         
         # Log successful save (first 20 bars or every 100th bar to avoid spam)
         if bar_index <= 20 or bar_index % 100 == 0:
@@ -2364,8 +3644,7 @@ async def api_volatility_record_bar(request: Request):
 def api_volatility_stats(symbol: str = 'MNQ'):
     """Get volatility statistics by quarter hour (15 minutes) for analysis."""
     try:
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        cursor = conn.cursor()
+        cursor = volatility_db.reader().cursor()
         
         cursor.execute('''
             SELECT quarter_hour, hour_of_day, sample_count, avg_bar_range, avg_volume, 
@@ -2376,7 +3655,6 @@ def api_volatility_stats(symbol: str = 'MNQ'):
         ''', (symbol,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         stats = []
         for row in rows:
@@ -2404,53 +3682,17 @@ def api_volatility_stats(symbol: str = 'MNQ'):
 
 @app.post('/api/volatility/update-aggregates')
 def api_volatility_update_aggregates(symbol: str = 'MNQ'):
-    """Recalculate aggregated volatility statistics from bar samples (by quarter hour)."""
+    """Rebuild aggregated volatility statistics from bar samples in a single GROUP BY pass.
+
+    volatility_stats is kept current by the bar_samples insert trigger; this is only needed
+    after editing bar_samples by hand.
+    """
     try:
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        cursor = conn.cursor()
-        
-        # Calculate stats for each quarter hour (0-95)
-        for quarter_hour in range(96):
-            cursor.execute('''
-                SELECT 
-                    AVG(volume) as avg_vol,
-                    MIN(volume) as min_vol,
-                    MAX(volume) as max_vol,
-                    AVG(bar_range) as avg_range,
-                    MIN(bar_range) as min_range,
-                    MAX(bar_range) as max_range,
-                    AVG(range_per_1k_volume) as avg_range_per_1k,
-                    COUNT(*) as sample_count,
-                    MIN(timestamp) as first_sample,
-                    MAX(timestamp) as last_sample
-                FROM bar_samples
-                WHERE quarter_hour = ? AND symbol = ?
-            ''', (quarter_hour, symbol))
-            
-            row = cursor.fetchone()
-            if row and row[7] > 0:  # sample_count > 0
-                # Calculate hour_of_day from quarter_hour for backward compatibility
-                hour_of_day = quarter_hour // 4
-                cursor.execute('''
-                    INSERT OR REPLACE INTO volatility_stats (
-                        hour_of_day, quarter_hour, day_of_week, symbol,
-                        avg_volume, min_volume, max_volume,
-                        avg_bar_range, min_bar_range, max_bar_range,
-                        avg_range_per_1k_volume,
-                        sample_count, first_sample_time, last_sample_time, last_updated
-                    ) VALUES (?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-                ''', (
-                    hour_of_day, quarter_hour, symbol,
-                    row[0], row[1], row[2],  # volume stats
-                    row[3], row[4], row[5],  # range stats
-                    row[6],                   # range per 1k volume
-                    row[7], row[8], row[9]   # counts and times
-                ))
+        with volatility_db.write() as conn:
+            rebuild_aggregated_stats(conn.cursor(), symbol or None)
+        volatility_stats_table.mark_dirty()
         
-        conn.commit()
-        conn.close()
-        
-        return JSONResponse({'status': 'ok', 'message': 'Aggregates updated (by quarter hour)'})
+        return JSONResponse({'status': 'ok', 'message': 'Aggregates rebuilt (by quarter hour)'})
         
     except Exception as ex:
         print(f'[API] volatility update-aggregates error: {ex}')
@@ -2494,7 +3736,7 @@ def get_diags(since: float = 0.0):
     """Return recent diagnostics since a given timestamp."""
     out = []
     # Use last 500 to bound work
-    search_list =  diags[-500:] if len(diags) > 500 else diags
+    search_list = _recent_diags(500)
     for d in search_list:
         ts = d.get('receivedTs') or d.get('receivedAt') or 0
         if ts > since:
@@ -2526,20 +3768,20 @@ def get_diags(since: float = 0.0):
 
 @app.post('/diag')
 async def receive_diag(request: Request):
-    # Accept either a single dict or a list of dicts (batched)
+    # Accept either a single dict or a list of dicts (batched), in any wire_format encoding
     try:
-        payload = await request.json()
+        payload = await read_payload(request)
     except ClientDisconnect:
         # client closed early; treat as best-effort
         return JSONResponse({"status": "client_disconnected"}, status_code=499)
+    except UnsupportedWireFormat:
+        raise
     except Exception:
-        text = await request.body()
-        try:
-            payload = json.loads(text)
-        except Exception:
-            return JSONResponse({"error": "invalid_json"}, status_code=400)
+        return JSONResponse({"error": "invalid_json"}, status_code=400)
 
+    global diags_received_total
     items = payload if isinstance(payload, list) else [payload]
+    compacts: List[Dict[str, Any]] = []
     for p in items:
         try:
             # Enrich
@@ -2553,8 +3795,11 @@ async def receive_diag(request: Request):
                     p["barIndex"] = bar_index
 
             diags.append(p)
-            if len(diags) > MAX_DIAGS:
-                del diags[:len(diags) - MAX_DIAGS]
+            diags_received_total += 1
+            try:
+                diags_writer.submit(_diag_row_from_payload(p))
+            except Exception as _ex_dw:
+                print('[DIAG] persist queue error:', _ex_dw)
 
             # Update recent bar cache with normalized record
             try:
@@ -2563,12 +3808,12 @@ async def receive_diag(request: Request):
                 print('[BARCACHE] append error:', _ex_bc)
 
             # Log every 50 and show keys to verify what's being sent
-            if len(diags) % 50 == 0:
+            if diags_received_total % 50 == 0:
                 keys = sorted(p.keys())
-                print(f"[SERVER] Received diags: {len(diags)} last barIndex={p.get('barIndex')} time={p.get('localTime')}")
+                print(f"[SERVER] Received diags: {diags_received_total} last barIndex={p.get('barIndex')} time={p.get('localTime')}")
                 print(f"[SERVER] Keys in payload: {keys}")
 
-            # Broadcast compact diagnostic to WebSocket clients
+            # Compact diagnostic for WebSocket clients (broadcast once per POST below)
             try:
                 compact = {
                     'receivedAt': p.get('receivedTs'),
@@ -2635,43 +3880,59 @@ async def receive_diag(request: Request):
                     'streakShort': p.get('streakShort'),
                     'entryBarDelay': p.get('entryBarDelay')
                 }
-                await ws_broadcast({'type': 'diag', 'data': compact})
+                compacts.append(compact)
             except Exception as _ex_ws:
                 # Non-fatal
                 pass
         except Exception as ex:
             print(f"[DIAG] Error processing item: {ex}")
+
+    # One frame per POST: a single diag keeps the legacy shape, batches go out as diag_batch
+    try:
+        if len(compacts) == 1:
+            await ws_broadcast({'type': 'diag', 'data': compacts[0]})
+        elif compacts:
+            await ws_broadcast({'type': 'diag_batch', 'count': len(compacts), 'data': compacts})
+    except Exception:
+        pass
     
     return JSONResponse({"status": "ok", "count": len(items)})
 
 # --- Strategy State Endpoints ---
 @app.post('/state')
 async def receive_state(request: Request):
-    """Receive strategy state updates and cache them for real-time monitoring."""
+    """Receive strategy state updates and cache them for real-time monitoring.
+
+    A payload with "delta": true carries only the fields that changed since the last post
+    (plus optional "removed": [keys]) and is merged onto the cached state; if the server has
+    no cached state for the strategy (e.g. after a restart) it answers 409 with "resync": true
+    and the strategy should send the full state.
+    """
     try:
-        payload = await request.json()
+        payload = await read_payload(request)
     except ClientDisconnect:
         # Client disconnected before request completed - this is normal when strategy is cancelled
         return JSONResponse({"status": "ok", "message": "client_disconnected"}, status_code=200)
+    except UnsupportedWireFormat:
+        raise
     except Exception:
-        try:
-            text = await request.body()
-            try:
-                payload = json.loads(text)
-            except Exception:
-                print("[STATE] Failed to parse JSON from request body")
-                return JSONResponse({"error": "invalid_json"}, status_code=400)
-        except ClientDisconnect:
-            # Client disconnected while reading body
-            return JSONResponse({"status": "ok", "message": "client_disconnected"}, status_code=200)
+        print("[STATE] Failed to parse JSON from request body")
+        return JSONResponse({"error": "invalid_json"}, status_code=400)
     
     try:
+        # Get strategy name (default to BarsOnTheFlow if not provided)
+        strategy_name = payload.get("strategyName", "BarsOnTheFlow")
+        is_delta = bool(payload.get("delta"))
+        if is_delta:
+            base = strategy_state_cache.get(strategy_name)
+            if base is None:
+                return JSONResponse({"error": "state_base_missing", "strategy": strategy_name, "resync": True}, status_code=409)
+            payload = merge_state_delta(base, payload)
+        
         # Enrich with server timestamp
         payload["receivedTs"] = time.time()
         payload["receivedAt"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Get strategy name (default to BarsOnTheFlow if not provided)
-        strategy_name = payload.get("strategyName", "BarsOnTheFlow")
         bar_idx = payload.get("barIndex", "?")
         
         print(f"[STATE] Received bar {bar_idx} from {strategy_name}")
@@ -2690,19 +3951,22 @@ async def receive_state(request: Request):
                 'type': 'state',
                 'strategy': strategy_name,
                 'data': payload
-            })
+            }, coalesce_key=f'state:{strategy_name}')
         except Exception as _ex_ws:
             pass
         
-        # Persist to bars.db for historical analysis (fire-and-forget, don't block response)
+        # Persist to bars.db for historical analysis (write-behind queue, don't block response)
+        queued = None
         if strategy_name == "BarsOnTheFlow":
-            # Run DB insert in background thread to avoid blocking the HTTP response
-            import threading
-            db_thread = threading.Thread(target=_save_state_to_db, args=(payload, strategy_name), daemon=True)
-            db_thread.start()
-            print(f"[STATE] Started background save thread for bar {bar_idx}")
-        
-        return JSONResponse({"status": "ok", "strategy": strategy_name})
+            params_hash, _ = _run_params_hash(payload)
+            if params_hash not in _known_run_hashes:
+                # Once per run, off the event loop; the runs row is written before bars that reference it are queued
+                params_hash = await run_blocking('ingest', _register_run_params, payload, strategy_name)
+            queued = _save_state_to_db(payload, strategy_name, params_hash)
+            if not queued:
+                print(f"[STATE] State writer queue full, bar {bar_idx} not persisted")
+        
+        return JSONResponse({"status": "ok", "strategy": strategy_name, "queued": queued, "delta": is_delta})
     
     except Exception as ex:
         print(f"[STATE] Error processing state: {ex}")
@@ -2710,128 +3974,191 @@ async def receive_state(request: Request):
         traceback.print_exc()
         return JSONResponse({"error": str(ex)}, status_code=500)
 
-def _save_state_to_db(payload: dict, strategy_name: str):
-    """Save state to database in background thread."""
+STATE_INSERT_SQL = """
+    INSERT OR REPLACE INTO BarsOnTheFlowStateAndBar (
+        timestamp, receivedTs, strategyName, enableDashboardDiagnostics,
+        barIndex, barTime, currentBar,
+        open, high, low, close, volume, candleType,
+        positionMarketPosition, positionQuantity, positionAveragePrice,
+        intendedPosition, lastEntryBarIndex, lastEntryDirection,
+        stopLossPoints, calculatedStopTicks, calculatedStopPoints,
+        useTrailingStop, useDynamicStopLoss, lookback, multiplier,
+        useBreakEven, breakEvenTrigger, breakEvenOffset, breakEvenActivated,
+        contracts, enableShorts, avoidLongsOnBadCandle, avoidShortsOnGoodCandle,
+        exitOnTrendBreak, reverseOnTrendBreak, fastEmaPeriod,
+        gradientThresholdSkipLongs, gradientThresholdSkipShorts, gradientFilterEnabled,
+        fastGradDeg, slowGradDeg,
+        trendLookbackBars, minMatchingBars, usePnLTiebreaker,
+        pendingLongFromBad, pendingShortFromGood,
+        unrealizedPnL, realizedPnL, totalTradesCount,
+        winningTradesCount, losingTradesCount, winRate,
+        stateJson, runParamsHash
+    ) VALUES (
+        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    )
+"""
+
+# Strategy parameters in the /state payload: constant for a run, so they are stored once in
+# bars.db runs (keyed by a hash of the set) and left out of each bar's stateJson.
+STATE_RUN_PARAM_KEYS = frozenset((
+    'strategyName', 'enableDashboardDiagnostics', 'contracts',
+    'stopLossPoints', 'useTrailingStop', 'useDynamicStopLoss', 'lookback', 'multiplier',
+    'dynamicStopLookback', 'dynamicStopMultiplier',
+    'useBreakEven', 'breakEvenTrigger', 'breakEvenOffset',
+    'useEmaTrailingStop', 'emaStopTriggerMode', 'emaStopProfitProtectionPoints',
+    'enableShorts', 'avoidLongsOnBadCandle', 'avoidShortsOnGoodCandle',
+    'exitOnTrendBreak', 'reverseOnTrendBreak', 'fastEmaPeriod',
+    'gradientThresholdSkipLongs', 'gradientThresholdSkipShorts', 'gradientFilterEnabled',
+    'skipLongsBelowGradient', 'skipShortsAboveGradient',
+    'useEmaCrossoverFilter', 'emaFastPeriod', 'emaSlowPeriod', 'emaCrossoverWindowBars',
+    'emaCrossoverRequireCrossover', 'emaCrossoverCooldownBars', 'emaCrossoverRequireBodyBelow',
+    'emaCrossoverMinTicksCloseToFast', 'emaCrossoverMinTicksFastToSlow',
+    'enableBarsOnTheFlowTrendDetection', 'trendLookbackBars', 'minMatchingBars', 'usePnLTiebreaker',
+    'recordBarSamplesInHistorical', 'barSampleDelayMs',
+))
+
+# Per-bar payload fields copied verbatim into their own column; stateJson omits them when
+# non-null and _state_payload_from_row puts them back.
+STATE_DIRECT_COLUMNS = (
+    'timestamp', 'receivedTs', 'barIndex', 'barTime', 'currentBar',
+    'open', 'high', 'low', 'close', 'volume',
+    'positionMarketPosition', 'positionQuantity', 'positionAveragePrice',
+    'intendedPosition', 'lastEntryBarIndex', 'lastEntryDirection',
+    'calculatedStopTicks', 'calculatedStopPoints', 'fastGradDeg', 'slowGradDeg',
+    'unrealizedPnL', 'realizedPnL', 'totalTradesCount', 'winningTradesCount', 'losingTradesCount', 'winRate',
+)
+STATE_DIRECT_COLUMN_SET = frozenset(STATE_DIRECT_COLUMNS)
+
+_known_run_hashes: set = set()
+
+def _run_params_hash(payload: dict) -> tuple:
+    """(hash, canonical JSON) of the payload's run parameters."""
+    params = {k: v for k, v in payload.items() if k in STATE_RUN_PARAM_KEYS}
+    params_json = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(params_json.encode('utf-8')).hexdigest(), params_json
+
+def _register_run_params(payload: dict, strategy_name: str) -> str:
+    """Write the runs row for a parameter set not seen yet (blocking; run it in the ingest pool)."""
+    params_hash, params_json = _run_params_hash(payload)
+    if params_hash not in _known_run_hashes:
+        with bars_db.write() as conn:
+            conn.execute('INSERT OR IGNORE INTO runs (paramsHash, strategyName, paramsJson, firstSeenTs) VALUES (?, ?, ?, ?)',
+                         (params_hash, strategy_name, params_json, payload.get('receivedTs')))
+        _known_run_hashes.add(params_hash)
+        print(f"[STATE] New run parameter set {params_hash[:10]} for {strategy_name} at bar {payload.get('barIndex', '?')}")
+    return params_hash
+
+# Write-behind queue for /state persistence: one writer thread, group commit per batch
+STATE_WRITER_QUEUE_MAX = int(os.environ.get('STATE_WRITER_QUEUE_MAX', '10000'))
+STATE_WRITER_BATCH_ROWS = int(os.environ.get('STATE_WRITER_BATCH_ROWS', '200'))
+STATE_WRITER_FLUSH_MS = int(os.environ.get('STATE_WRITER_FLUSH_MS', '250'))
+state_writer = BatchWriter('state', get_bars_db_connection, STATE_INSERT_SQL, _bars_db_lock,
+                           max_queue=STATE_WRITER_QUEUE_MAX,
+                           batch_rows=STATE_WRITER_BATCH_ROWS,
+                           flush_ms=STATE_WRITER_FLUSH_MS)
+
+def _state_row_from_payload(payload: dict, strategy_name: str, params_hash: str) -> tuple:
+    """Build the 55-column BarsOnTheFlowStateAndBar row for a state payload whose runs row exists."""
+    bar_idx = payload.get('barIndex', '?')
+
+    # Determine candle type
+    candle_type = "flat"
+    if payload.get('open') and payload.get('close'):
+        if payload['close'] > payload['open']:
+            candle_type = "good"
+        elif payload['close'] < payload['open']:
+            candle_type = "bad"
+
+    # stateJson keeps only what neither runs nor the direct columns already hold
+    bar_fields = {k: v for k, v in payload.items()
+                  if k not in STATE_RUN_PARAM_KEYS and not (k in STATE_DIRECT_COLUMN_SET and v is not None)}
     try:
-        bar_idx = payload.get('barIndex', '?')
-        print(f"[BG_SAVE] Starting save for bar {bar_idx}")
-        
-        # Determine candle type
-        candle_type = "flat"
-        if payload.get('open') and payload.get('close'):
-            if payload['close'] > payload['open']:
-                candle_type = "good"
-            elif payload['close'] < payload['open']:
-                candle_type = "bad"
-        
-        conn = get_bars_db_connection()
-        cur = conn.cursor()
-        
-        # Safely convert payload to JSON, handling any serialization errors
-        try:
-            state_json = json.dumps(payload)
-        except (TypeError, ValueError) as json_err:
-            print(f"[BG_SAVE] Warning: Could not serialize payload to JSON: {json_err}")
-            state_json = json.dumps({"error": "Failed to serialize state", "barIndex": bar_idx})
-        
-        # Prepare parameters, ensuring all values are properly typed
-        params = (
-            payload.get('timestamp'),
-            payload.get('receivedTs'),  # Changed from payload['receivedTs'] to .get() for safety
-            strategy_name,
-            1 if payload.get('enableDashboardDiagnostics') else 0,
-            payload.get('barIndex'),
-            payload.get('barTime'),
-            payload.get('currentBar'),
-            payload.get('open'),
-            payload.get('high'),
-            payload.get('low'),
-            payload.get('close'),
-            payload.get('volume'),
-            candle_type,
-            payload.get('positionMarketPosition'),
-            payload.get('positionQuantity'),
-            payload.get('positionAveragePrice'),
-            payload.get('intendedPosition'),
-            payload.get('lastEntryBarIndex'),
-            payload.get('lastEntryDirection'),
-            payload.get('stopLossPoints'),
-            payload.get('calculatedStopTicks'),
-            payload.get('calculatedStopPoints'),
-            1 if payload.get('useTrailingStop') else 0,
-            1 if payload.get('useDynamicStopLoss') else 0,
-            payload.get('lookback'),
-            payload.get('multiplier'),
-            1 if payload.get('useBreakEven') else 0,
-            payload.get('breakEvenTrigger'),
-            payload.get('breakEvenOffset'),
-            1 if payload.get('breakEvenActivated') else 0,
-            payload.get('contracts'),
-            1 if payload.get('enableShorts') else 0,
-            1 if payload.get('avoidLongsOnBadCandle') else 0,
-            1 if payload.get('avoidShortsOnGoodCandle') else 0,
-            1 if payload.get('exitOnTrendBreak') else 0,
-            1 if payload.get('reverseOnTrendBreak') else 0,
-            payload.get('fastEmaPeriod'),
-            payload.get('gradientThresholdSkipLongs'),
-            payload.get('gradientThresholdSkipShorts'),
-            1 if payload.get('gradientFilterEnabled') else 0,
-            payload.get('fastGradDeg'),
-            payload.get('slowGradDeg'),
-            payload.get('trendLookbackBars'),
-            payload.get('minMatchingBars'),
-            1 if payload.get('usePnLTiebreaker') else 0,
-            1 if payload.get('pendingLongFromBad') else 0,
-            1 if payload.get('pendingShortFromGood') else 0,
-            payload.get('unrealizedPnL'),
-            payload.get('realizedPnL'),
-            payload.get('totalTradesCount'),
-            payload.get('winningTradesCount'),
-            payload.get('losingTradesCount'),
-            payload.get('winRate'),
-            state_json
-        )
-        
-        # Verify parameter count matches (54 parameters)
-        if len(params) != 54:
-            raise ValueError(f"Parameter count mismatch: expected 54, got {len(params)}")
-        
-        cur.execute("""
-            INSERT OR REPLACE INTO BarsOnTheFlowStateAndBar (
-                timestamp, receivedTs, strategyName, enableDashboardDiagnostics,
-                barIndex, barTime, currentBar,
-                open, high, low, close, volume, candleType,
-                positionMarketPosition, positionQuantity, positionAveragePrice,
-                intendedPosition, lastEntryBarIndex, lastEntryDirection,
-                stopLossPoints, calculatedStopTicks, calculatedStopPoints,
-                useTrailingStop, useDynamicStopLoss, lookback, multiplier,
-                useBreakEven, breakEvenTrigger, breakEvenOffset, breakEvenActivated,
-                contracts, enableShorts, avoidLongsOnBadCandle, avoidShortsOnGoodCandle,
-                exitOnTrendBreak, reverseOnTrendBreak, fastEmaPeriod,
-                gradientThresholdSkipLongs, gradientThresholdSkipShorts, gradientFilterEnabled,
-                fastGradDeg, slowGradDeg,
-                trendLookbackBars, minMatchingBars, usePnLTiebreaker,
-                pendingLongFromBad, pendingShortFromGood,
-                unrealizedPnL, realizedPnL, totalTradesCount,
-                winningTradesCount, losingTradesCount, winRate,
-                stateJson
-            ) VALUES (
-                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-            )
-        """, params)
-        conn.commit()
-        # Don't close global connection - keep it open for reuse
-        print(f"[BG_SAVE] [OK] Saved bar {bar_idx} to BarsOnTheFlowStateAndBar")
-    except sqlite3.IntegrityError as integrity_ex:
-        # UNIQUE constraint violation - bar already exists (this is normal with INSERT OR REPLACE)
-        print(f"[BG_SAVE] Bar {bar_idx} already exists (replaced): {integrity_ex}")
-        conn.rollback()
-    except Exception as db_ex:
-        print(f"[BG_SAVE] ✗ ERROR saving bar {bar_idx} to database: {db_ex}")
-        import traceback
-        traceback.print_exc()
-        # Don't re-raise - let it fail silently to avoid crashing the background thread
+        state_json = json.dumps(bar_fields, separators=(',', ':'))
+    except (TypeError, ValueError) as json_err:
+        print(f"[BG_SAVE] Warning: Could not serialize payload to JSON: {json_err}")
+        state_json = json.dumps({"error": "Failed to serialize state", "barIndex": bar_idx})
+
+    # Prepare parameters, ensuring all values are properly typed
+    params = (
+        payload.get('timestamp'),
+        payload.get('receivedTs'),
+        strategy_name,
+        1 if payload.get('enableDashboardDiagnostics') else 0,
+        payload.get('barIndex'),
+        payload.get('barTime'),
+        payload.get('currentBar'),
+        payload.get('open'),
+        payload.get('high'),
+        payload.get('low'),
+        payload.get('close'),
+        payload.get('volume'),
+        candle_type,
+        payload.get('positionMarketPosition'),
+        payload.get('positionQuantity'),
+        payload.get('positionAveragePrice'),
+        payload.get('intendedPosition'),
+        payload.get('lastEntryBarIndex'),
+        payload.get('lastEntryDirection'),
+        payload.get('stopLossPoints'),
+        payload.get('calculatedStopTicks'),
+        payload.get('calculatedStopPoints'),
+        1 if payload.get('useTrailingStop') else 0,
+        1 if payload.get('useDynamicStopLoss') else 0,
+        payload.get('lookback'),
+        payload.get('multiplier'),
+        1 if payload.get('useBreakEven') else 0,
+        payload.get('breakEvenTrigger'),
+        payload.get('breakEvenOffset'),
+        1 if payload.get('breakEvenActivated') else 0,
+        payload.get('contracts'),
+        1 if payload.get('enableShorts') else 0,
+        1 if payload.get('avoidLongsOnBadCandle') else 0,
+        1 if payload.get('avoidShortsOnGoodCandle') else 0,
+        1 if payload.get('exitOnTrendBreak') else 0,
+        1 if payload.get('reverseOnTrendBreak') else 0,
+        payload.get('fastEmaPeriod'),
+        payload.get('gradientThresholdSkipLongs'),
+        payload.get('gradientThresholdSkipShorts'),
+        1 if payload.get('gradientFilterEnabled') else 0,
+        payload.get('fastGradDeg'),
+        payload.get('slowGradDeg'),
+        payload.get('trendLookbackBars'),
+        payload.get('minMatchingBars'),
+        1 if payload.get('usePnLTiebreaker') else 0,
+        1 if payload.get('pendingLongFromBad') else 0,
+        1 if payload.get('pendingShortFromGood') else 0,
+        payload.get('unrealizedPnL'),
+        payload.get('realizedPnL'),
+        payload.get('totalTradesCount'),
+        payload.get('winningTradesCount'),
+        payload.get('losingTradesCount'),
+        payload.get('winRate'),
+        state_json,
+        params_hash
+    )
+
+    # Verify parameter count matches (55 parameters)
+    if len(params) != 55:
+        raise ValueError(f"Parameter count mismatch: expected 55, got {len(params)}")
+    return params
+
+def _state_payload_from_row(row: sqlite3.Row, params_json: Optional[str]) -> dict:
+    """Rebuild the original /state payload from a bar row and its runs.paramsJson."""
+    payload = json.loads(params_json) if params_json else {}
+    for key in STATE_DIRECT_COLUMNS:
+        if row[key] is not None:
+            payload[key] = row[key]
+    payload.update(json.loads(row['stateJson']) if row['stateJson'] else {})
+    return payload
+
+def _save_state_to_db(payload: dict, strategy_name: str, params_hash: str) -> bool:
+    """Queue a state row for the write-behind writer. Returns False if it was dropped."""
+    try:
+        return state_writer.submit(_state_row_from_payload(payload, strategy_name, params_hash))
+    except Exception as ex:
+        print(f"[BG_SAVE] ✗ ERROR preparing bar {payload.get('barIndex', '?')} for database: {ex}")
+        return False
 
 @app.get('/strategy/state')
 async def get_strategy_state(strategy: str = "BarsOnTheFlow"):
@@ -2909,10 +4236,11 @@ async def list_strategies():
     return JSONResponse({"strategies": strategies, "count": len(strategies)})
 
 @app.get('/api/bars/state-history')
-async def get_state_history(limit: int = 100, strategy: str = "BarsOnTheFlow"):
+@offload('db')
+def get_state_history(limit: int = 100, strategy: str = "BarsOnTheFlow"):
     """Get historical strategy state + bar data from bars.db."""
     try:
-        conn = get_bars_db_connection()
+        conn = bars_db.reader()
         cur = conn.cursor()
         
         cur.execute("""
@@ -2964,11 +4292,64 @@ async def get_state_history(limit: int = 100, strategy: str = "BarsOnTheFlow"):
     except Exception as ex:
         return JSONResponse({"error": str(ex)}, status_code=500)
 
+@app.get('/api/bars/state-payload')
+@offload('db')
+def get_state_payload(bar_index: int, strategy: str = "BarsOnTheFlow"):
+    """Full /state payload for one stored bar, rebuilt from its row and its run's parameters."""
+    try:
+        cur = bars_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
+        cur.execute("""
+            SELECT b.*, r.paramsJson AS runParamsJson
+            FROM BarsOnTheFlowStateAndBar b
+            LEFT JOIN runs r ON r.paramsHash = b.runParamsHash
+            WHERE b.strategyName = ? AND b.barIndex = ?
+        """, (strategy, bar_index))
+        row = cur.fetchone()
+        if row is None:
+            return JSONResponse({"error": "bar_not_found", "strategy": strategy, "barIndex": bar_index}, status_code=404)
+        return JSONResponse({"runParamsHash": row['runParamsHash'], "payload": _state_payload_from_row(row, row['runParamsJson'])})
+    except Exception as ex:
+        return JSONResponse({"error": str(ex)}, status_code=500)
+
+@app.get('/api/bars/runs')
+@offload('db')
+def get_state_runs(strategy: Optional[str] = None):
+    """Run parameter sets recorded in bars.db, with the bar range stored for each."""
+    try:
+        cur = bars_db.reader().cursor()
+        cur.execute("""
+            SELECT r.paramsHash, r.strategyName, r.paramsJson, r.firstSeenTs,
+                   COALESCE(b.bars, 0), b.firstBar, b.lastBar
+            FROM runs r
+            LEFT JOIN (
+                SELECT runParamsHash, COUNT(*) AS bars, MIN(barIndex) AS firstBar, MAX(barIndex) AS lastBar
+                FROM BarsOnTheFlowStateAndBar
+                WHERE runParamsHash IS NOT NULL
+                GROUP BY runParamsHash
+            ) b ON b.runParamsHash = r.paramsHash
+            WHERE ? IS NULL OR r.strategyName = ?
+            ORDER BY r.firstSeenTs DESC
+        """, (strategy, strategy))
+        runs = [{
+            "paramsHash": row[0],
+            "strategyName": row[1],
+            "params": json.loads(row[2]),
+            "firstSeenTs": row[3],
+            "bars": row[4],
+            "firstBar": row[5],
+            "lastBar": row[6],
+        } for row in cur.fetchall()]
+        return JSONResponse({"runs": runs, "count": len(runs)})
+    except Exception as ex:
+        return JSONResponse({"error": str(ex)}, status_code=500)
+
 @app.get('/api/bars/gaps')
-async def get_bar_gaps(strategy: str = "BarsOnTheFlow"):
+@offload('db')
+def get_bar_gaps(strategy: str = "BarsOnTheFlow"):
     """Identify missing bars (gaps) in the recorded sequence."""
     try:
-        conn = get_bars_db_connection()
+        conn = bars_db.reader()
         cur = conn.cursor()
         
         # Get min and max barIndex
@@ -3103,7 +4484,6 @@ def _apply_override_direct(prop: Any, val: Any) -> Dict[str, Any]:
         effective = { k: float(active_overrides.get(k, v)) for k, v in DEFAULT_PARAMS.items() }
         # Also broadcast new effective params to all clients
         try:
-            import asyncio
             asyncio.create_task(ws_broadcast({'type': 'overrides', 'effectiveParams': effective, 'overrides': active_overrides}))
         except Exception:
             pass
@@ -3111,11 +4491,30 @@ def _apply_override_direct(prop: Any, val: Any) -> Dict[str, Any]:
     except Exception as ex:
         return {'status': 'error', 'message': str(ex)}
 
+@app.get('/api/result-cache')
+def result_cache_stats():
+    """Hit/miss counters and tier sizes of the analysis result cache."""
+    return JSONResponse(result_cache.stats())
+
+@app.delete('/api/result-cache')
+@offload('analytics')
+def result_cache_clear():
+    """Drop every cached analysis result (memory and disk)."""
+    removed = result_cache.clear()
+    print(f'[RESULT_CACHE] Cleared {removed} disk entries')
+    return JSONResponse({'status': 'ok', 'removed': removed})
+
 @app.get('/stats')
 def stats():
     return JSONResponse({
         'diags_count': len(diags),
         'last_diag': diags[-1] if diags else None,
+        'diags_writer': diags_writer.stats(),
+        'csv_logs': csv_logs.stats(),
+        'result_cache': result_cache.stats(),
+        'log_catalog': log_catalog.stats(),
+        'tick_cache': tick_cache.stats(),
+        'instrument_catalog': instrument_catalog.stats(),
         'trend_segments': len(trend_segments),
         'current_trend': current_trend,
         'overrides': active_overrides,
@@ -3140,7 +4539,7 @@ def analytics(days: int = 7, min_trades: int = 10):
         if not USE_SQLITE:
             return JSONResponse({'error': 'Database not enabled'}, status_code=500)
         
-        conn = get_db_connection()
+        conn = dashboard_db.reader()
         cutoff_ts = time.time() - (days * 86400)
         
         # Check if trades table exists, create if it doesn't
@@ -3151,27 +4550,28 @@ def analytics(days: int = 7, min_trades: int = 10):
         """)
         if not cur.fetchone():
             # Table doesn't exist, create it
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    entry_time REAL NOT NULL,
-                    entry_bar INTEGER,
-                    direction TEXT,
-                    entry_price REAL,
-                    exit_time REAL,
-                    exit_bar INTEGER,
-                    exit_price REAL,
-                    bars_held INTEGER,
-                    realized_points REAL,
-                    mfe REAL,
-                    mae REAL,
-                    exit_reason TEXT
-                )
-            """)
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON trades(entry_time DESC)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_trades_direction ON trades(direction)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_trades_exit_reason ON trades(exit_reason)")
-            conn.commit()
+            with dashboard_db.write() as wconn:
+                wcur = wconn.cursor()
+                wcur.execute("""
+                    CREATE TABLE IF NOT EXISTS trades (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        entry_time REAL NOT NULL,
+                        entry_bar INTEGER,
+                        direction TEXT,
+                        entry_price REAL,
+                        exit_time REAL,
+                        exit_bar INTEGER,
+                        exit_price REAL,
+                        bars_held INTEGER,
+                        realized_points REAL,
+                        mfe REAL,
+                        mae REAL,
+                        exit_reason TEXT
+                    )
+                """)
+                wcur.execute("CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON trades(entry_time DESC)")
+                wcur.execute("CREATE INDEX IF NOT EXISTS idx_trades_direction ON trades(direction)")
+                wcur.execute("CREATE INDEX IF NOT EXISTS idx_trades_exit_reason ON trades(exit_reason)")
         
         # Overall performance
         cur.execute("""
@@ -3320,7 +4720,7 @@ def analytics(days: int = 7, min_trades: int = 10):
 def debugdump(n: int = 50):
     n = max(1, min(500, n))
     return JSONResponse({
-        'recent': diags[-n:],
+        'recent': _recent_diags(n),
         'count': len(diags),
     })
 
@@ -3335,7 +4735,7 @@ def bars_latest(limit: int = 50):
         if idx:
             try:
                 placeholders = ','.join(['?'] * len(idx))
-                cur = get_db_connection().cursor()
+                cur = dashboard_db.reader().cursor()
                 cur.execute(f"SELECT barIndex, isBad, reason FROM dev_classifications WHERE barIndex IN ({placeholders}) ORDER BY id DESC", idx)
                 cls_map = {}
                 for row in cur.fetchall():
@@ -3352,11 +4752,12 @@ def bars_latest(limit: int = 50):
     return JSONResponse({'bars': bars, 'count': len(bars)})
 
 @app.get('/api/monitor/stats')
-async def get_monitor_stats():
+@offload('db')
+def get_monitor_stats():
     """Get database statistics for monitoring."""
     try:
         # Use bars.db, not dashboard.db
-        conn = get_bars_db_connection()
+        conn = bars_db.reader()
         cur = conn.cursor()
         
         # Check if table exists
@@ -3373,6 +4774,7 @@ async def get_monitor_stats():
                 'expected_count': 0,
                 'gaps': 0,
                 'latest_bars': [],
+                'state_writer': state_writer.stats(),
                 'message': 'No data yet - waiting for strategy to start',
                 'ts': time.time()
             })
@@ -3390,6 +4792,7 @@ async def get_monitor_stats():
                 'expected_count': 0,
                 'gaps': 0,
                 'latest_bars': [],
+                'state_writer': state_writer.stats(),
                 'message': 'Waiting for first bar...',
                 'ts': time.time()
             })
@@ -3479,6 +4882,7 @@ async def get_monitor_stats():
             'gaps': gaps,
             'latest_bars': response_bars,
             'latest_stop': latest_stop,
+            'state_writer': state_writer.stats(),
             'ts': time.time()
         })
     except Exception as e:
@@ -3493,6 +4897,7 @@ async def get_monitor_stats():
             'expected_count': 0,
             'gaps': 0,
             'latest_bars': [],
+            'state_writer': state_writer.stats(),
             'message': f'Data pending: {str(e)}',
             'ts': time.time()
         })
@@ -3587,6 +4992,10 @@ async def commands_trend(request: Request):
         'note': data.get('note'),
         'source': data.get('source', 'dashboard')
     })
+    try:
+        await ws_broadcast({'type': 'command', 'data': cmd})
+    except Exception:
+        pass
     try:
         print(f"[CMD] queued trend #{cmd['id']} dir={direction} bar={cmd.get('barIndex')} price={cmd.get('price')}")
     except Exception:
@@ -3594,12 +5003,57 @@ async def commands_trend(request: Request):
     return JSONResponse({'status': 'ok', 'command': cmd, 'queued': len(command_queue)})
 
 @app.get('/commands/next')
-def commands_next():
-    """Pop the next pending command for the strategy to consume."""
-    if not command_queue:
-        return JSONResponse({'status': 'empty', 'remaining': 0})
-    cmd = command_queue.popleft()
-    return JSONResponse({'status': 'ok', 'command': cmd, 'remaining': len(command_queue)})
+async def commands_next(request: Request, wait: float = 0.0, limit: Optional[int] = None):
+    """Pop the next pending command for the strategy to consume.
+
+    wait=N (seconds, capped at COMMAND_LONGPOLL_MAX_SEC) long-polls: the request blocks until a
+    command is queued or the timeout passes, and returns every pending command (up to `limit`)
+    as `commands`. Without wait/limit the response is the original single `command`.
+    """
+    wait = max(0.0, min(wait, COMMAND_LONGPOLL_MAX_SEC))
+    batch = wait > 0 or limit is not None
+    cmds = await command_bridge.wait_take(limit if limit is not None else 0 if batch else 1, wait)
+    if cmds and await request.is_disconnected():
+        # Poller went away while we waited; keep the commands for the next one
+        command_bridge.requeue(cmds)
+        return JSONResponse({'status': 'client_disconnected'}, status_code=499)
+    if not cmds:
+        return JSONResponse({'status': 'empty', 'remaining': 0, **({'commands': []} if batch else {})})
+    if batch:
+        return JSONResponse({'status': 'ok', 'commands': cmds, 'remaining': len(command_queue)})
+    return JSONResponse({'status': 'ok', 'command': cmds[0], 'remaining': len(command_queue)})
+
+@app.websocket('/ws/commands')
+async def ws_commands(ws: WebSocket, client: str = 'strategy'):
+    """Push channel for strategies: {"type": "command", "command": {...}} per command.
+
+    Reply {"type": "ack", "id": N} (or "ids": [...]) once a command is handled; unacknowledged
+    commands are resent every COMMAND_ACK_TIMEOUT_SEC with "redelivery": true.
+    """
+    await ws.accept()
+    await ws.send_json({'type': 'welcome', 'ack_timeout_sec': COMMAND_ACK_TIMEOUT_SEC, 'ts': time.time()})
+    sub = command_bridge.subscribe(ws, client)
+    sender = asyncio.create_task(sub.run())
+    print(f'[CMD] push subscriber {client} connected; subscribers={len(command_bridge.subscribers)}')
+    try:
+        while True:
+            data = await ws.receive_json()
+            if data.get('type') == 'ack':
+                ids = data.get('ids') if data.get('ids') is not None else [data.get('id')]
+                command_bridge.ack(sub, [int(i) for i in ids if i is not None])
+    except WebSocketDisconnect:
+        pass
+    except Exception as ex:
+        print(f'[CMD] push subscriber {client} error: {ex}')
+    finally:
+        sender.cancel()
+        command_bridge.unsubscribe(ws)
+        print(f'[CMD] push subscriber {client} disconnected; subscribers={len(command_bridge.subscribers)}')
+
+@app.get('/commands/stats')
+def commands_stats():
+    """Queue depth, long-poll waiters and push delivery/ack counters."""
+    return JSONResponse(command_bridge.stats())
 
 @app.get('/logs/latest-csv')
 def get_latest_csv():
@@ -3619,50 +5073,17 @@ def get_latest_csv():
         return JSONResponse({'status': 'error', 'message': str(ex)}, status_code=500)
 
 def _pick_latest_file(ext: str, exclude_substrings: List[str] | None = None) -> str | None:
-    if not os.path.isdir(LOG_DIR):
-        return None
-    exclude_substrings = exclude_substrings or []
-    newest_path = None
-    newest_mtime = -1.0
-    for name in os.listdir(LOG_DIR):
-        lower = name.lower()
-        if not lower.endswith(ext.lower()):
-            continue
-        if any(sub.lower() in lower for sub in exclude_substrings):
-            continue
-        path = os.path.join(LOG_DIR, name)
-        try:
-            mtime = os.path.getmtime(path)
-        except OSError:
-            continue
-        if mtime > newest_mtime:
-            newest_mtime = mtime
-            newest_path = path
-    return newest_path
+    exclude_substrings = [sub.lower() for sub in (exclude_substrings or [])]
+    for entry in log_catalog.files():
+        lower = entry['name'].lower()
+        if lower.endswith(ext.lower()) and not any(sub in lower for sub in exclude_substrings):
+            return entry['path']
+    return None
 
 def _pick_recent_csv() -> str | None:
-    # Look specifically for BarsOnTheFlow strategy CSV files (exclude Opportunities and OutputWindow logs)
-    if not os.path.isdir(LOG_DIR):
-        return None
-    newest_path = None
-    newest_mtime = -1.0
-    for name in os.listdir(LOG_DIR):
-        lower = name.lower()
-        # Only select BarsOnTheFlow CSV files (not NinjaTrader Grid exports or other CSVs)
-        if not lower.startswith('barsontheflow') or not lower.endswith('.csv'):
-            continue
-        # Exclude the opportunity log and output window log
-        if 'opportunities' in lower or 'outputwindow' in lower:
-            continue
-        path = os.path.join(LOG_DIR, name)
-        try:
-            mtime = os.path.getmtime(path)
-        except OSError:
-            continue
-        if mtime > newest_mtime:
-            newest_mtime = mtime
-            newest_path = path
-    return newest_path
+    # Newest BarsOnTheFlow strategy CSV, FastGradDebug included (Opportunities and OutputWindow logs are other kinds)
+    entries = [e for e in (log_catalog.latest('main'), log_catalog.latest('fastgrad_debug')) if e]
+    return max(entries, key=lambda e: e['mtime'])['path'] if entries else None
 
 def _pick_recent_log() -> str | None:
     return _pick_latest_file('.log')
@@ -3670,23 +5091,13 @@ def _pick_recent_log() -> str | None:
 def _load_csv_rows_for_bars(csv_path: str, bars: List[int]) -> Dict[int, List[Dict[str, Any]]]:
     rows_by_bar: Dict[int, List[Dict[str, Any]]] = {b: [] for b in bars}
     keep_keys = ['Timestamp', 'Bar', 'PrevSignal', 'NewSignal', 'MyPosition', 'Action', 'Notes', 'ActualPosition', 'EntryBar', 'EntryPrice']
-    targets = set(bars)
     try:
-        with open(csv_path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for r in reader:
-                try:
-                    bar_val = r.get('Bar')
-                    if bar_val is None:
-                        continue
-                    bar_int = int(float(bar_val))
-                except Exception:
-                    continue
-                if bar_int not in targets:
-                    continue
+        table = csv_logs.table(csv_path)
+        for bar_int in bars:
+            for r in table.rows_for_bar(bar_int, column='Bar'):
                 filtered = {k: r.get(k) for k in keep_keys if k in r}
                 filtered['Bar'] = bar_int
-                rows_by_bar.setdefault(bar_int, []).append(filtered)
+                rows_by_bar[bar_int].append(filtered)
     except Exception as ex:
         print('[BAR-REPORT] CSV read error:', ex)
     return rows_by_bar
@@ -3789,7 +5200,7 @@ def bars_around(center: int, window: int = 10):
         if idx:
             try:
                 placeholders = ','.join(['?'] * len(idx))
-                cur = get_db_connection().cursor()
+                cur = dashboard_db.reader().cursor()
                 cur.execute(f"SELECT barIndex, isBad, reason FROM dev_classifications WHERE barIndex IN ({placeholders}) ORDER BY id DESC", idx)
                 cls_map = {}
                 for row in cur.fetchall():
@@ -3845,7 +5256,8 @@ def get_bar_detail(barIndex: int):
     return JSONResponse(result)
 
 @app.get('/api/trades/by-bar')
-async def get_trades_by_bar(entry_bar: int = None, exit_bar: int = None):
+@offload('db')
+def get_trades_by_bar(entry_bar: int = None, exit_bar: int = None):
     """Query trades by entry_bar or exit_bar number"""
     try:
         if not USE_SQLITE:
@@ -3854,7 +5266,7 @@ async def get_trades_by_bar(entry_bar: int = None, exit_bar: int = None):
         if entry_bar is None and exit_bar is None:
             return JSONResponse({'error': 'Must provide entry_bar or exit_bar parameter'}, status_code=400)
         
-        conn = get_db_connection()
+        conn = dashboard_db.reader()
         cur = conn.cursor()
         
         # Build query based on provided parameters
@@ -3925,241 +5337,17 @@ async def trade_completed(request: Request):
     try:
         data = await request.json()
         
-        # Save to database
-        if USE_SQLITE:
-            try:
-                # Check if columns exist before inserting
-                conn = get_db_connection()
-                cur = conn.cursor()
-                cur.execute("PRAGMA table_info(trades)")
-                columns = [row[1] for row in cur.fetchall()]
-                has_contracts = 'contracts' in columns
-                has_ema_fast = 'ema_fast_period' in columns
-                has_ema_slow = 'ema_slow_period' in columns
-                has_ema_fast_value = 'ema_fast_value' in columns
-                has_ema_slow_value = 'ema_slow_value' in columns
-                has_candle_type = 'candle_type' in columns
-                has_open_final = 'open_final' in columns
-                has_high_final = 'high_final' in columns
-                has_low_final = 'low_final' in columns
-                has_close_final = 'close_final' in columns
-                has_fast_ema = 'fast_ema' in columns
-                has_fast_ema_grad_deg = 'fast_ema_grad_deg' in columns
-                has_bar_pattern = 'bar_pattern' in columns
-                has_entry_reason = 'entry_reason' in columns
-                
-                # Add missing columns if needed
-                if not has_ema_fast:
-                    cur.execute("ALTER TABLE trades ADD COLUMN ema_fast_period INTEGER")
-                    conn.commit()
-                    has_ema_fast = True
-                if not has_ema_slow:
-                    cur.execute("ALTER TABLE trades ADD COLUMN ema_slow_period INTEGER")
-                    conn.commit()
-                    has_ema_slow = True
-                if not has_ema_fast_value:
-                    cur.execute("ALTER TABLE trades ADD COLUMN ema_fast_value REAL")
-                    conn.commit()
-                    has_ema_fast_value = True
-                if not has_ema_slow_value:
-                    cur.execute("ALTER TABLE trades ADD COLUMN ema_slow_value REAL")
-                    conn.commit()
-                    has_ema_slow_value = True
-                if not has_candle_type:
-                    cur.execute("ALTER TABLE trades ADD COLUMN candle_type TEXT")
-                    conn.commit()
-                    has_candle_type = True
-                if not has_open_final:
-                    cur.execute("ALTER TABLE trades ADD COLUMN open_final REAL")
-                    conn.commit()
-                    has_open_final = True
-                if not has_high_final:
-                    cur.execute("ALTER TABLE trades ADD COLUMN high_final REAL")
-                    conn.commit()
-                    has_high_final = True
-                if not has_low_final:
-                    cur.execute("ALTER TABLE trades ADD COLUMN low_final REAL")
-                    conn.commit()
-                    has_low_final = True
-                if not has_close_final:
-                    cur.execute("ALTER TABLE trades ADD COLUMN close_final REAL")
-                    conn.commit()
-                    has_close_final = True
-                if not has_fast_ema:
-                    cur.execute("ALTER TABLE trades ADD COLUMN fast_ema REAL")
-                    conn.commit()
-                    has_fast_ema = True
-                if not has_fast_ema_grad_deg:
-                    cur.execute("ALTER TABLE trades ADD COLUMN fast_ema_grad_deg REAL")
-                    conn.commit()
-                    has_fast_ema_grad_deg = True
-                if not has_bar_pattern:
-                    cur.execute("ALTER TABLE trades ADD COLUMN bar_pattern TEXT")
-                    conn.commit()
-                    has_bar_pattern = True
-                if not has_entry_reason:
-                    cur.execute("ALTER TABLE trades ADD COLUMN entry_reason TEXT")
-                    conn.commit()
-                    has_entry_reason = True
-                
-                # Get EMA values, handle null/None
-                ema_fast_val = data.get('EmaFastValue')
-                ema_slow_val = data.get('EmaSlowValue')
-                ema_fast_value = float(ema_fast_val) if ema_fast_val is not None and ema_fast_val != 'null' else None
-                ema_slow_value = float(ema_slow_val) if ema_slow_val is not None and ema_slow_val != 'null' else None
-                
-                # Get exit bar OHLC and other exit bar data
-                open_final = data.get('OpenFinal')
-                high_final = data.get('HighFinal')
-                low_final = data.get('LowFinal')
-                close_final = data.get('CloseFinal')
-                fast_ema = data.get('FastEma')
-                fast_ema_grad_deg = data.get('FastEmaGradDeg')
-                candle_type = data.get('CandleType', '')
-                bar_pattern = data.get('BarPattern', '')
-                
-                open_final_val = float(open_final) if open_final is not None and open_final != 'null' else None
-                high_final_val = float(high_final) if high_final is not None and high_final != 'null' else None
-                low_final_val = float(low_final) if low_final is not None and low_final != 'null' else None
-                close_final_val = float(close_final) if close_final is not None and close_final != 'null' else None
-                fast_ema_val = float(fast_ema) if fast_ema is not None and fast_ema != 'null' else None
-                fast_ema_grad_deg_val = float(fast_ema_grad_deg) if fast_ema_grad_deg is not None and fast_ema_grad_deg != 'null' else None
-                
-                # Get entry reason
-                entry_reason = data.get('EntryReason', '')
-                
-                # Check for duplicate before inserting (same entry_time, entry_price, direction)
-                entry_time_val = float(data.get('EntryTime', time.time()))
-                entry_price_val = float(data.get('EntryPrice', 0))
-                direction_val = data.get('Direction', 'LONG')
-                
-                cur.execute("""
-                    SELECT id FROM trades 
-                    WHERE entry_time = ? AND entry_price = ? AND direction = ?
-                """, (entry_time_val, entry_price_val, direction_val))
-                
-                existing = cur.fetchone()
-                if existing:
-                    print(f'[trade_completed] DUPLICATE DETECTED - Skipping trade EntryBar={data.get("EntryBar")}, EntryTime={entry_time_val}, EntryPrice={entry_price_val}, Direction={direction_val} (existing id={existing[0]})')
-                    return JSONResponse({"status": "ok", "message": "Trade already exists (duplicate skipped)", "duplicate": True})
-                
-                # Check if all new columns exist
-                has_all_new_cols = (has_candle_type and has_open_final and has_high_final and 
-                                   has_low_final and has_close_final and has_fast_ema and 
-                                   has_fast_ema_grad_deg and has_bar_pattern and has_entry_reason)
-                
-                if has_contracts and has_ema_fast and has_ema_slow and has_ema_fast_value and has_ema_slow_value and has_all_new_cols:
-                    db_exec("""
-                        INSERT INTO trades (
-                            entry_time, entry_bar, direction, entry_price,
-                            exit_time, exit_bar, exit_price, bars_held,
-                            realized_points, mfe, mae, exit_reason, entry_reason, contracts,
-                            ema_fast_period, ema_slow_period, ema_fast_value, ema_slow_value,
-                            candle_type, open_final, high_final, low_final, close_final,
-                            fast_ema, fast_ema_grad_deg, bar_pattern
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        float(data.get('EntryTime', time.time())),
-                        int(data.get('EntryBar', 0)),
-                        data.get('Direction', 'LONG'),
-                        float(data.get('EntryPrice', 0)),
-                        float(data.get('ExitTime', time.time())),
-                        int(data.get('ExitBar', 0)),
-                        float(data.get('ExitPrice', 0)),
-                        int(data.get('BarsHeld', 0)),
-                        float(data.get('RealizedPoints', 0)),
-                        float(data.get('MFE', 0)),
-                        float(data.get('MAE', 0)),
-                        data.get('ExitReason', ''),
-                        entry_reason,
-                        int(data.get('Contracts', 0)),
-                        int(data.get('EmaFastPeriod', 0)),
-                        int(data.get('EmaSlowPeriod', 0)),
-                        ema_fast_value,
-                        ema_slow_value,
-                        candle_type,
-                        open_final_val,
-                        high_final_val,
-                        low_final_val,
-                        close_final_val,
-                        fast_ema_val,
-                        fast_ema_grad_deg_val,
-                        bar_pattern
-                    ))
-                elif has_contracts and has_ema_fast and has_ema_slow:
-                    db_exec("""
-                        INSERT INTO trades (
-                            entry_time, entry_bar, direction, entry_price,
-                            exit_time, exit_bar, exit_price, bars_held,
-                            realized_points, mfe, mae, exit_reason, contracts,
-                            ema_fast_period, ema_slow_period
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        float(data.get('EntryTime', time.time())),
-                        int(data.get('EntryBar', 0)),
-                        data.get('Direction', 'LONG'),
-                        float(data.get('EntryPrice', 0)),
-                        float(data.get('ExitTime', time.time())),
-                        int(data.get('ExitBar', 0)),
-                        float(data.get('ExitPrice', 0)),
-                        int(data.get('BarsHeld', 0)),
-                        float(data.get('RealizedPoints', 0)),
-                        float(data.get('MFE', 0)),
-                        float(data.get('MAE', 0)),
-                        data.get('ExitReason', ''),
-                        int(data.get('Contracts', 0)),
-                        int(data.get('EmaFastPeriod', 0)),
-                        int(data.get('EmaSlowPeriod', 0))
-                    ))
-                elif has_contracts:
-                    db_exec("""
-                        INSERT INTO trades (
-                            entry_time, entry_bar, direction, entry_price,
-                            exit_time, exit_bar, exit_price, bars_held,
-                            realized_points, mfe, mae, exit_reason, contracts
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        float(data.get('EntryTime', time.time())),
-                        int(data.get('EntryBar', 0)),
-                        data.get('Direction', 'LONG'),
-                        float(data.get('EntryPrice', 0)),
-                        float(data.get('ExitTime', time.time())),
-                        int(data.get('ExitBar', 0)),
-                        float(data.get('ExitPrice', 0)),
-                        int(data.get('BarsHeld', 0)),
-                        float(data.get('RealizedPoints', 0)),
-                        float(data.get('MFE', 0)),
-                        float(data.get('MAE', 0)),
-                        data.get('ExitReason', ''),
-                        int(data.get('Contracts', 0))
-                    ))
-                else:
-                    # Fallback for older schema without contracts column
-                    db_exec("""
-                        INSERT INTO trades (
-                            entry_time, entry_bar, direction, entry_price,
-                            exit_time, exit_bar, exit_price, bars_held,
-                            realized_points, mfe, mae, exit_reason
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        float(data.get('EntryTime', time.time())),
-                        int(data.get('EntryBar', 0)),
-                        data.get('Direction', 'LONG'),
-                        float(data.get('EntryPrice', 0)),
-                        float(data.get('ExitTime', time.time())),
-                        int(data.get('ExitBar', 0)),
-                        float(data.get('ExitPrice', 0)),
-                        int(data.get('BarsHeld', 0)),
-                        float(data.get('RealizedPoints', 0)),
-                        float(data.get('MFE', 0)),
-                        float(data.get('MAE', 0)),
-                        data.get('ExitReason', '')
-                    ))
-            except Exception as db_ex:
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"[TRADE_COMPLETED] DB insert failed: {db_ex}")
-                print(f"[TRADE_COMPLETED] DB insert traceback: {error_trace}")
+        # Save to database (blocking sqlite work runs in the ingest pool)
+        saved = await run_blocking('ingest', _save_completed_trade, data)
+        if saved == 'duplicate':
+            # Re-posted trade: don't broadcast, analyze or count it again
+            return JSONResponse({"status": "ok", "message": "Trade already exists (duplicate skipped)", "duplicate": True})
+
+        # Push to WebSocket subscribers of the 'trade' topic
+        try:
+            await ws_broadcast({'type': 'trade', 'data': data})
+        except Exception:
+            pass
         
         # Analyze performance for auto-optimization
         try:
@@ -4182,8 +5370,41 @@ async def trade_completed(request: Request):
         print(f"[TRADE_COMPLETED] Traceback: {error_trace}")
         return JSONResponse({'status': 'error', 'message': str(ex)}, status_code=500)
 
+def _save_completed_trade(data: Dict[str, Any]):
+    """Insert a completed trade into dashboard.db (errors are logged, not raised).
+
+    Returns 'saved', 'duplicate' (same entry_time, entry_price, direction already stored) or None
+    when SQLite is disabled or the insert failed.
+    """
+    if USE_SQLITE:
+        try:
+            # trades columns are added once by ensure_db_columns at startup
+            row = _completed_trade_row(data)
+            insert_sql, _ = dashboard_db.insert_sql('trades', TRADE_INSERT_COLUMNS)
+            with dashboard_db.write() as conn:
+                cur = conn.cursor()
+                # Check for duplicate before inserting (same entry_time, entry_price, direction)
+                cur.execute("""
+                    SELECT id FROM trades 
+                    WHERE entry_time = ? AND entry_price = ? AND direction = ?
+                """, (row['entry_time'], row['entry_price'], row['direction']))
+            
+                existing = cur.fetchone()
+                if existing:
+                    print(f'[trade_completed] DUPLICATE DETECTED - Skipping trade EntryBar={data.get("EntryBar")}, EntryTime={row["entry_time"]}, EntryPrice={row["entry_price"]}, Direction={row["direction"]} (existing id={existing[0]})')
+                    return 'duplicate'
+            
+                cur.execute(insert_sql, row)
+            return 'saved'
+        except Exception as db_ex:
+            import traceback
+            error_trace = traceback.format_exc()
+            print(f"[TRADE_COMPLETED] DB insert failed: {db_ex}")
+            print(f"[TRADE_COMPLETED] DB insert traceback: {error_trace}")
+
 @app.get('/api/trades/stop-loss-analysis')
-async def analyze_stop_loss(format: str = 'json'):
+@offload('analytics')
+def analyze_stop_loss(format: str = 'json'):
     """Analyze trades table to check if stop loss is working correctly.
     Supports format='json' (default) or format='text' for plain text output.
     """
@@ -4193,7 +5414,7 @@ async def analyze_stop_loss(format: str = 'json'):
             return JSONResponse({'error': 'Database not enabled'}, status_code=500)
         
         import re
-        conn = get_db_connection()
+        conn = dashboard_db.reader()
         cursor = conn.cursor()
         
         # Get all trades ordered by entry_time DESC (newest first)
@@ -4372,26 +5593,27 @@ async def analyze_stop_loss(format: str = 'json'):
         return JSONResponse({'error': str(ex), 'trace': error_trace}, status_code=500)
 
 @app.post('/api/trades/clear')
-async def clear_trades():
+@offload('db')
+def clear_trades():
     """Clear all trades from the trades table (for fresh runs)."""
     try:
         if not USE_SQLITE:
             return JSONResponse({'error': 'Database not enabled'}, status_code=500)
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with dashboard_db.write() as conn:
+            cur = conn.cursor()
         
-        # Get count before deletion
-        cur.execute("SELECT COUNT(*) FROM trades")
-        count_before = cur.fetchone()[0]
+            # Get count before deletion
+            cur.execute("SELECT COUNT(*) FROM trades")
+            count_before = cur.fetchone()[0]
         
-        # Delete all trades
-        cur.execute("DELETE FROM trades")
+            # Delete all trades
+            cur.execute("DELETE FROM trades")
         
-        # Reset AUTOINCREMENT counter so IDs start from 1 again
-        cur.execute("DELETE FROM sqlite_sequence WHERE name='trades'")
+            # Reset AUTOINCREMENT counter so IDs start from 1 again
+            cur.execute("DELETE FROM sqlite_sequence WHERE name='trades'")
         
-        conn.commit()
+            conn.commit()
         
         print(f"[TRADES_CLEAR] Cleared {count_before} trades from database and reset AUTOINCREMENT counter")
         
@@ -4408,27 +5630,27 @@ async def clear_trades():
         return JSONResponse({'error': str(ex)}, status_code=500)
 
 @app.post('/api/databases/clear-bars-table')
-async def clear_bars_table():
+@offload('db')
+def clear_bars_table():
     """Clear all rows from BarsOnTheFlowStateAndBar table (for fresh runs)."""
     try:
         if not os.path.exists(BARS_DB_PATH):
             return JSONResponse({'error': 'Database not found'}, status_code=404)
         
-        conn = sqlite3.connect(BARS_DB_PATH)
-        cursor = conn.cursor()
+        with bars_db.write() as conn:
+            cursor = conn.cursor()
         
-        # Get count before deletion
-        cursor.execute("SELECT COUNT(*) FROM BarsOnTheFlowStateAndBar")
-        count_before = cursor.fetchone()[0]
+            # Get count before deletion
+            cursor.execute("SELECT COUNT(*) FROM BarsOnTheFlowStateAndBar")
+            count_before = cursor.fetchone()[0]
         
-        # Delete all rows
-        cursor.execute("DELETE FROM BarsOnTheFlowStateAndBar")
+            # Delete all rows
+            cursor.execute("DELETE FROM BarsOnTheFlowStateAndBar")
         
-        # Reset AUTOINCREMENT counter so IDs start from 1 again
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='BarsOnTheFlowStateAndBar'")
+            # Reset AUTOINCREMENT counter so IDs start from 1 again
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name='BarsOnTheFlowStateAndBar'")
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
         print(f"[BARS_CLEAR] Cleared {count_before} rows from BarsOnTheFlowStateAndBar and reset AUTOINCREMENT counter")
         
@@ -4445,27 +5667,31 @@ async def clear_bars_table():
         return JSONResponse({'error': str(ex)}, status_code=500)
 
 @app.post('/api/databases/clear-bar-samples')
-async def clear_bar_samples():
+@offload('db')
+def clear_bar_samples():
     """Clear all rows from bar_samples table (for fresh runs)."""
     try:
         if not os.path.exists(VOLATILITY_DB_PATH):
             return JSONResponse({'error': 'Database not found'}, status_code=404)
         
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        cursor = conn.cursor()
+        with volatility_db.write() as conn:
+            cursor = conn.cursor()
         
-        # Get count before deletion
-        cursor.execute("SELECT COUNT(*) FROM bar_samples")
-        count_before = cursor.fetchone()[0]
+            # Get count before deletion
+            cursor.execute("SELECT COUNT(*) FROM bar_samples")
+            count_before = cursor.fetchone()[0]
         
-        # Delete all rows
-        cursor.execute("DELETE FROM bar_samples")
+            # Delete all rows
+            cursor.execute("DELETE FROM bar_samples")
         
-        # Reset AUTOINCREMENT counter so IDs start from 1 again
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='bar_samples'")
+            # Reset AUTOINCREMENT counter so IDs start from 1 again
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name='bar_samples'")
         
-        conn.commit()
-        conn.close()
+            # The stats trigger only folds inserts in; drop the running sums with the samples
+            rebuild_aggregated_stats(cursor)
+        
+            conn.commit()
+        volatility_stats_table.mark_dirty()
         
         import time
         print(f"[BAR_SAMPLES_CLEAR] *** CLEARED {count_before} rows from bar_samples at {time.strftime('%H:%M:%S')} ***")
@@ -4483,37 +5709,36 @@ async def clear_bar_samples():
         return JSONResponse({'error': str(ex)}, status_code=500)
 
 @app.post('/api/volatility/clear-trades')
-async def clear_volatility_trades():
+@offload('db')
+def clear_volatility_trades():
     """Clear all trades from volatility.db trades table (for fresh runs)."""
     try:
         if not os.path.exists(VOLATILITY_DB_PATH):
             return JSONResponse({'error': 'Database not found'}, status_code=404)
         
-        conn = sqlite3.connect(VOLATILITY_DB_PATH)
-        cursor = conn.cursor()
+        with volatility_db.write() as conn:
+            cursor = conn.cursor()
         
-        # Check if trades table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='trades'")
-        if not cursor.fetchone():
-            conn.close()
-            return JSONResponse({
-                'status': 'ok',
-                'message': 'Trades table does not exist (nothing to clear)',
-                'trades_deleted': 0
-            })
+            # Check if trades table exists
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='trades'")
+            if not cursor.fetchone():
+                return JSONResponse({
+                    'status': 'ok',
+                    'message': 'Trades table does not exist (nothing to clear)',
+                    'trades_deleted': 0
+                })
         
-        # Get count before deletion
-        cursor.execute("SELECT COUNT(*) FROM trades")
-        count_before = cursor.fetchone()[0]
+            # Get count before deletion
+            cursor.execute("SELECT COUNT(*) FROM trades")
+            count_before = cursor.fetchone()[0]
         
-        # Delete all trades
-        cursor.execute("DELETE FROM trades")
+            # Delete all trades
+            cursor.execute("DELETE FROM trades")
         
-        # Reset AUTOINCREMENT counter so IDs start from 1 again
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='trades'")
+            # Reset AUTOINCREMENT counter so IDs start from 1 again
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name='trades'")
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
         import time
         print(f"[VOLATILITY_TRADES_CLEAR] *** CLEARED {count_before} trades from volatility.db at {time.strftime('%H:%M:%S')} ***")
@@ -4796,9 +6021,8 @@ def get_cancellations(limit: int = 100, minStreak: int = 1):
         return JSONResponse({'error': 'sqlite_disabled'}, status_code=500)
     
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         
         query = """
             SELECT * FROM entry_cancellations 
@@ -4808,7 +6032,6 @@ def get_cancellations(limit: int = 100, minStreak: int = 1):
         """
         cur.execute(query, (minStreak, min(limit, 1000)))
         rows = cur.fetchall()
-        conn.close()
         
         results = []
         for row in rows:
@@ -5027,7 +6250,7 @@ def create_strategy_snapshot(notes: str = "") -> Dict[str, Any]:
         perf_summary = {}
         if USE_SQLITE:
             try:
-                conn = get_db_connection()
+                conn = dashboard_db.reader()
                 cur = conn.cursor()
                 cutoff_ts = time.time() - (7 * 86400)  # last 7 days
                 cur.execute("""
@@ -5149,9 +6372,8 @@ def create_strategy_snapshot(notes: str = "") -> Dict[str, Any]:
         def get_structure_index_latest():
             """Retrieve the latest saved strategy structure index document."""
             try:
-                conn = get_db_connection()
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
+                cur = dashboard_db.reader().cursor()
+                cur.row_factory = sqlite3.Row
                 cur.execute("SELECT * FROM strategy_index ORDER BY ts DESC LIMIT 1")
                 row = cur.fetchone()
                 if not row:
@@ -5174,9 +6396,8 @@ def get_latest_snapshot():
         return JSONResponse(create_strategy_snapshot())
     
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT * FROM strategy_snapshots ORDER BY ts DESC LIMIT 1")
         row = cur.fetchone()
         
@@ -5204,9 +6425,8 @@ def get_latest_snapshot():
 def dev_metrics_latest(limit: int = 50):
     """Return latest development/debug metrics."""
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT ts, metric, value, details FROM dev_metrics ORDER BY ts DESC LIMIT ?", (min(limit,200),))
         rows = cur.fetchall()
         return JSONResponse({'metrics': [dict(r) for r in rows], 'count': len(rows)})
@@ -5217,9 +6437,8 @@ def dev_metrics_latest(limit: int = 50):
 def dev_classifications_latest(limit: int = 100):
     """Return latest per-bar classification decisions."""
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT ts, barIndex, side, fastGrad, accel, isBad, reason FROM dev_classifications ORDER BY ts DESC LIMIT ?", (min(limit,500),))
         rows = cur.fetchall()
         return JSONResponse({'classifications': [dict(r) for r in rows], 'count': len(rows)})
@@ -5230,9 +6449,8 @@ def dev_classifications_latest(limit: int = 100):
 def dev_scan_anomalies():
     """Scan recent metrics for anomalies (e.g., missing bad bars)."""
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT ts, metric, value, details FROM dev_metrics WHERE metric='anomaly_no_bad_bars' ORDER BY ts DESC LIMIT 20")
         anomalies = [dict(r) for r in cur.fetchall()]
         cur.execute("SELECT COUNT(*) FROM dev_classifications WHERE isBad=1")
@@ -5255,16 +6473,15 @@ def dev_scan_anomalies():
 def dev_dedup_diags():
     """Remove duplicate diags entries keeping latest per barIndex."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        # Count before
-        cur.execute('SELECT COUNT(*) FROM diags')
-        before = cur.fetchone()[0]
-        # Delete rows whose id is not the max id for their barIndex
-        cur.execute('DELETE FROM diags WHERE id NOT IN (SELECT MAX(id) FROM diags GROUP BY barIndex)')
-        conn.commit()
-        cur.execute('SELECT COUNT(*) FROM diags')
-        after = cur.fetchone()[0]
+        with dashboard_db.write() as conn:
+            cur = conn.cursor()
+            # Count before
+            cur.execute('SELECT COUNT(*) FROM diags')
+            before = cur.fetchone()[0]
+            # Delete rows whose id is not the max id for their barIndex
+            cur.execute('DELETE FROM diags WHERE id NOT IN (SELECT MAX(id) FROM diags GROUP BY barIndex)')
+            cur.execute('SELECT COUNT(*) FROM diags')
+            after = cur.fetchone()[0]
         removed = before - after
         # Metric record
         try:
@@ -5279,9 +6496,8 @@ def dev_dedup_diags():
 def dev_scan_bad(limit: int = 500):
     """Recompute bad classifications from stored diags and compare with dev_classifications."""
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         # Fetch latest diags with needed fields including open/high/low
         cur.execute("SELECT id, ts, barIndex, fastGrad, accel, fastEMA, open, high, low, close, trendSide FROM diags ORDER BY id DESC LIMIT ?", (min(limit,2000),))
         rows = cur.fetchall()
@@ -5414,9 +6630,8 @@ def list_snapshots(limit: int = 20):
         return JSONResponse({'error': 'Database not enabled'}, status_code=500)
     
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("""
             SELECT id, ts, version, notes, created_at
             FROM strategy_snapshots 
@@ -5505,9 +6720,8 @@ def advisor_recommendations_latest(limit: int = 50):
     if not USE_SQLITE:
         return JSONResponse({'error': 'Database not enabled'}, status_code=500)
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT ts, details, reasoning FROM ai_footprints WHERE action='TIMEFRAME_ADVICE' ORDER BY ts DESC LIMIT ?", (min(limit,200),))
         rows = cur.fetchall()
         recs = []
@@ -5529,9 +6743,8 @@ def get_ai_footprints(limit: int = 50, action: str = None):
         return JSONResponse({'error': 'Database not enabled'}, status_code=500)
     
     try:
-        conn = get_db_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
+        cur.row_factory = sqlite3.Row
         
         if action:
             cur.execute("""
@@ -5583,25 +6796,15 @@ def get_opportunity_files():
     """List available opportunity log CSV files"""
     try:
         files = []
-        for filename in os.listdir(LOG_DIR):
-            if filename.startswith('BarsOnTheFlow_Opportunities_') and filename.endswith('.csv'):
-                filepath = os.path.join(LOG_DIR, filename)
-                # Get file stats
-                stat = os.stat(filepath)
-                mtime = datetime.fromtimestamp(stat.st_mtime)
-                
-                # Count rows
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        row_count = sum(1 for _ in f) - 1  # Subtract header
-                except:
-                    row_count = 0
-                
+        for entry in log_catalog.files('opportunities'):
+            filename = entry['name']
+            if filename.startswith('BarsOnTheFlow_Opportunities_'):
+                mtime = datetime.fromtimestamp(entry['mtime'])
                 files.append({
                     'filename': filename,
                     'timestamp': mtime.strftime('%Y-%m-%d %H:%M:%S'),
-                    'bars': row_count,
-                    'size': stat.st_size
+                    'bars': log_catalog.row_count(entry),  # header excluded
+                    'size': entry['size']
                 })
         
         # Sort by timestamp descending (newest first)
@@ -5617,6 +6820,37 @@ async def analyze_streaks(request: Request):
     """Analyze opportunity log for directional streaks"""
     try:
         params = await request.json()
+    except Exception as e:
+        return JSONResponse({'error': f'Invalid JSON: {e}'}, status_code=400)
+    filepath = os.path.join(LOG_DIR, str(params.get('filename') or ''))
+    return await run_blocking('analytics', result_cache.run, 'analyze-streaks', params, [filepath], _analyze_streaks)
+
+def _load_opportunity_bars(filepath: str) -> List[Dict[str, Any]]:
+    """Opportunity log CSV -> bar dicts used by the streak analysis."""
+    bars = []
+    for row in csv_logs.rows(filepath):
+        bars.append({
+            'bar': int(row['bar']),
+            'timestamp': row['timestamp'],
+            'open': float(row['open']),
+            'high': float(row['high']),
+            'low': float(row['low']),
+            'close': float(row['close']),
+            'candleType': row['candleType'],
+            'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row['fastEmaGradDeg'] not in ('', 'NaN') else None,
+            'trendUpSignal': row['trendUpSignal'] == 'True',
+            'trendDownSignal': row['trendDownSignal'] == 'True',
+            'currentPosition': row['currentPosition'],
+            'entryBar': int(row['entryBar']) if row['entryBar'] not in ('', '-1') else -1,
+            'actionTaken': row['actionTaken'],
+            'blockReason': row['blockReason'],
+            'opportunityType': row['opportunityType'],
+            'barPattern': row.get('barPattern', '')
+        })
+    return bars
+
+def _analyze_streaks(params: Dict[str, Any]):
+    try:
         filename = params.get('filename')
         min_streak = params.get('min_streak', 5)
         max_streak = params.get('max_streak', 8)
@@ -5629,102 +6863,22 @@ async def analyze_streaks(request: Request):
         
         if not filename:
             return JSONResponse({'error': 'filename required'}, status_code=400)
+        if streak_engine is None:
+            return JSONResponse({'error': 'numpy is required for streak analysis (pip install numpy)'}, status_code=501)
         
         filepath = os.path.join(LOG_DIR, filename)
         if not os.path.exists(filepath):
             return JSONResponse({'error': 'file not found'}, status_code=404)
         
-        # Read CSV data
-        bars = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                bars.append({
-                    'bar': int(row['bar']),
-                    'timestamp': row['timestamp'],
-                    'open': float(row['open']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'close': float(row['close']),
-                    'candleType': row['candleType'],
-                    'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row['fastEmaGradDeg'] not in ('', 'NaN') else None,
-                    'trendUpSignal': row['trendUpSignal'] == 'True',
-                    'trendDownSignal': row['trendDownSignal'] == 'True',
-                    'currentPosition': row['currentPosition'],
-                    'entryBar': int(row['entryBar']) if row['entryBar'] not in ('', '-1') else -1,
-                    'actionTaken': row['actionTaken'],
-                    'blockReason': row['blockReason'],
-                    'opportunityType': row['opportunityType'],
-                    'barPattern': row.get('barPattern', '')
-                })
+        bars = _load_opportunity_bars(filepath)
         
         # Find streaks
         streaks = find_streaks(bars, min_streak, max_streak, long_gradient_threshold, 
                                short_gradient_threshold, min_movement, breakeven_trigger, 
                                breakeven_offset, streak_type)
         
-        # Calculate statistics
-        total = len(streaks)
-        caught = sum(1 for s in streaks if s['status'] == 'caught')
-        missed = sum(1 for s in streaks if s['status'] == 'missed')
-        partial = sum(1 for s in streaks if s['status'] == 'partial')
-        avg_length = sum(s['length'] for s in streaks) / total if total > 0 else 0
-        avg_missed_points = sum(s['missed_points'] for s in streaks if s['missed_points'] > 0) / missed if missed > 0 else 0
-        
-        # Calculate PnL with break-even awareness
-        total_pnl = 0.0
-        missed_pnl = 0.0
-        breakeven_locked_pnl = 0.0
-        
-        for streak in streaks:
-            if streak['status'] == 'caught':
-                # Check if break-even would have triggered
-                if breakeven_trigger > 0 and abs(streak['net_movement']) >= breakeven_trigger:
-                    # Break-even triggered - lock in partial profit
-                    locked_profit = breakeven_offset  # e.g., entry + 2 points
-                    remaining_profit = abs(streak['net_movement']) - locked_profit
-                    total_pnl += locked_profit
-                    breakeven_locked_pnl += locked_profit
-                    
-                    # Remaining profit would be captured if streak continued favorably
-                    # But for conservative estimate, we only count locked profit
-                    missed_pnl += remaining_profit
-                else:
-                    # No break-even or didn't hit trigger - full profit captured
-                    total_pnl += abs(streak['net_movement'])
-            elif streak['status'] == 'partial':
-                # Partial profit (net movement - missed points)
-                caught_pnl = abs(streak['net_movement']) - streak['missed_points']
-                
-                # Check if break-even would have triggered on the caught portion
-                if breakeven_trigger > 0 and caught_pnl >= breakeven_trigger:
-                    locked_profit = breakeven_offset
-                    total_pnl += locked_profit
-                    breakeven_locked_pnl += locked_profit
-                    missed_pnl += (caught_pnl - locked_profit) + streak['missed_points']
-                else:
-                    total_pnl += caught_pnl
-                    missed_pnl += streak['missed_points']
-            elif streak['status'] == 'missed':
-                # All profit missed
-                missed_pnl += abs(streak['net_movement'])
-        
-        potential_pnl = total_pnl + missed_pnl
-        
-        stats = {
-            'total_streaks': total,
-            'caught': caught,
-            'missed': missed,
-            'partial': partial,
-            'avg_length': avg_length,
-            'avg_missed_points': avg_missed_points,
-            'total_bars': len(bars),
-            'total_pnl': total_pnl,
-            'missed_pnl': missed_pnl,
-            'potential_pnl': potential_pnl,
-            'breakeven_locked_pnl': breakeven_locked_pnl,
-            'breakeven_enabled': breakeven_trigger > 0
-        }
+        # Counts and break-even aware PnL
+        stats = streak_engine.streak_stats(streaks, len(bars), breakeven_trigger, breakeven_offset)
         
         return JSONResponse({
             'streaks': streaks,
@@ -5738,144 +6892,165 @@ async def analyze_streaks(request: Request):
         traceback.print_exc()
         return JSONResponse({'error': str(ex)}, status_code=500)
 
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', str(os.cpu_count() or 2)))
+SWEEP_MAX_COMBINATIONS = int(os.environ.get('SWEEP_MAX_COMBINATIONS', '20000'))
+_sweep_pool = None
+_sweep_pool_lock = threading.Lock()
+
+def _get_sweep_pool():
+    global _sweep_pool
+    with _sweep_pool_lock:
+        if _sweep_pool is None:
+            _sweep_pool = ProcessPoolExecutor(max_workers=SWEEP_WORKERS)
+            print(f'[SWEEP] Process pool started with {SWEEP_WORKERS} workers')
+        return _sweep_pool
+
+@app.post('/api/analyze-streaks/sweep')
+async def analyze_streaks_sweep(request: Request):
+    """Evaluate /api/analyze-streaks over a parameter grid in one request.
+
+    Body: the /api/analyze-streaks params, where min_streak, max_streak, min_movement,
+    long/short_gradient_threshold, breakeven_trigger and breakeven_offset may each be a value,
+    a list, or {"start", "stop", "step"}; plus rank_by (total_pnl | potential_pnl | missed_pnl |
+    catch_rate) and limit (top N rows, 0 = all).
+    Streams NDJSON: a "start" line, "progress" lines as pool tasks finish, one "row" line per
+    combination best-first, then "done".
+    """
+    try:
+        params = await request.json()
+    except Exception as e:
+        return JSONResponse({'error': f'Invalid JSON: {e}'}, status_code=400)
+    prepared = await run_blocking('analytics', _prepare_streak_sweep, params)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    return StreamingResponse(_stream_streak_sweep(prepared), media_type='application/x-ndjson')
+
+def _prepare_streak_sweep(params: Dict[str, Any]):
+    """Validate the grid and load the log once; the stream publishes its columns to shared memory."""
+    filename = params.get('filename')
+    if not filename:
+        return JSONResponse({'error': 'filename required'}, status_code=400)
+    if streak_sweep is None:
+        return JSONResponse({'error': 'numpy is required for streak analysis (pip install numpy)'}, status_code=501)
+    rank_by = params.get('rank_by', 'total_pnl')
+    if rank_by not in streak_sweep.RANK_KEYS:
+        return JSONResponse({'error': f"rank_by must be one of {', '.join(streak_sweep.RANK_KEYS)}"}, status_code=400)
+    try:
+        window_combos, score_combos = streak_sweep.build_grid(params)
+    except (ValueError, KeyError, TypeError) as ex:
+        return JSONResponse({'error': f'Invalid parameter range: {ex}'}, status_code=400)
+    combinations = len(window_combos) * len(score_combos)
+    if combinations > SWEEP_MAX_COMBINATIONS:
+        return JSONResponse({'error': f'{combinations} combinations exceeds SWEEP_MAX_COMBINATIONS ({SWEEP_MAX_COMBINATIONS})'}, status_code=400)
+    filepath = os.path.join(LOG_DIR, filename)
+    if not os.path.exists(filepath):
+        return JSONResponse({'error': 'file not found'}, status_code=404)
+    try:
+        bars = _load_opportunity_bars(filepath)
+        columns = streak_engine.StreakArrays(bars).columns()
+    except Exception as ex:
+        print(f"[SWEEP] Load error: {ex}")
+        return JSONResponse({'error': str(ex)}, status_code=500)
+    return {
+        'filename': filename,
+        'bars': len(bars),
+        'columns': columns,
+        'window_combos': window_combos,
+        'score_combos': score_combos,
+        'combinations': combinations,
+        'streak_type': params.get('streak_type', 'both'),
+        'rank_by': rank_by,
+        'limit': int(params.get('limit') or 0),
+    }
+
+async def _stream_streak_sweep(prep: Dict[str, Any]):
+    t0 = time.perf_counter()
+    window_combos = prep['window_combos']
+    # A few tasks per worker so progress lines keep flowing and slow groups balance out
+    chunk = max(1, -(-len(window_combos) // (SWEEP_WORKERS * 4)))
+    tasks = [window_combos[k:k + chunk] for k in range(0, len(window_combos), chunk)]
+    futures = []
+    shared = None
+    try:
+        yield json.dumps({'type': 'start', 'filename': prep['filename'], 'bars': prep['bars'],
+                          'combinations': prep['combinations'], 'tasks': len(tasks), 'workers': SWEEP_WORKERS}) + '\n'
+        # Created only once the response streams, so this finally always unlinks it
+        shared = streak_sweep.SharedColumns(prep['columns'])
+        pool = _get_sweep_pool()
+        futures = [asyncio.wrap_future(pool.submit(streak_sweep.sweep_groups, shared.handle, group, prep['score_combos'],
+                                                   prep['streak_type'])) for group in tasks]
+        rows = []
+        for done, fut in enumerate(asyncio.as_completed(futures), 1):
+            rows.extend(await fut)
+            yield json.dumps({'type': 'progress', 'tasks_done': done, 'tasks': len(tasks), 'rows': len(rows)}) + '\n'
+        ranked = streak_sweep.rank_rows(rows, prep['rank_by'])
+        if prep['limit'] > 0:
+            ranked = ranked[:prep['limit']]
+        for row in ranked:
+            yield json.dumps({'type': 'row', **row}) + '\n'
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        print(f"[SWEEP] {prep['filename']}: {prep['combinations']} combinations in {elapsed_ms} ms")
+        yield json.dumps({'type': 'done', 'combinations': prep['combinations'], 'rank_by': prep['rank_by'],
+                          'elapsed_ms': elapsed_ms}) + '\n'
+    except Exception as ex:
+        print(f"[SWEEP] Error: {ex}")
+        yield json.dumps({'type': 'error', 'error': str(ex)}) + '\n'
+    finally:
+        for fut in futures:
+            fut.cancel()
+        if shared is not None:
+            shared.close()
+
+def _candle_pattern(bar_list):
+    """Run-length candle pattern, e.g. "3G2B" for 3 good then 2 bad bars."""
+    pattern_parts = []
+    for bar_type, run in itertools.groupby('G' if bar['candleType'] == 'good' else 'B' for bar in bar_list):
+        pattern_parts.append(f"{sum(1 for _ in run)}{bar_type}")
+    return ''.join(pattern_parts)
+
 def find_streaks(bars, min_streak, max_streak, long_grad_thresh, short_grad_thresh, 
                  min_movement, breakeven_trigger, breakeven_offset, streak_type):
     """
     Find directional streaks in the bar data similar to BarsOnTheFlow's 5-bar patterns.
     
-    A streak is a sequence of bars with consistent overall direction (net positive/negative movement).
-    Break-even logic: if movement >= breakeven_trigger, only breakeven_offset profit is locked.
+    A streak is a sequence of bars with consistent overall direction (net positive/negative movement),
+    at most 40% counter-trend bars, and either an entry or a blocked signal inside it.
+    Window search is done by streak_engine; break-even is applied by the caller.
     """
-    streaks = []
-    i = 0
     counter_ratio = 0.4  # Allow up to 40% counter-trend bars in a streak
-    
-    while i < len(bars) - min_streak + 1:
-        # Try to find a streak starting at bar i
-        for length in range(max_streak, min_streak - 1, -1):
-            if i + length > len(bars):
-                continue
-            
-            streak_bars = bars[i:i+length]
-            
-            # Calculate net movement and direction
-            start_price = streak_bars[0]['open']
-            end_price = streak_bars[-1]['close']
-            net_movement = end_price - start_price
-            
-            if abs(net_movement) < min_movement:
-                continue
-            
-            direction = 'LONG' if net_movement > 0 else 'SHORT'
-            
-            # Filter by streak type
-            if streak_type == 'long' and direction != 'LONG':
-                continue
-            if streak_type == 'short' and direction != 'SHORT':
-                continue
-            
-            # Count good/bad bars (good = candle matches direction)
-            good_bars = 0
-            bad_bars = 0
-            for bar in streak_bars:
-                is_good_candle = bar['candleType'] == 'good'
-                if (direction == 'LONG' and is_good_candle) or (direction == 'SHORT' and not is_good_candle):
-                    good_bars += 1
-                else:
-                    bad_bars += 1
-            
-            # Check counter-trend ratio
-            actual_counter_ratio = bad_bars / length if length > 0 else 0
-            if actual_counter_ratio > counter_ratio:
-                continue
-            
-            # Calculate average gradient
-            gradients = [b['fastEmaGradDeg'] for b in streak_bars if b['fastEmaGradDeg'] is not None]
-            avg_gradient = sum(gradients) / len(gradients) if gradients else 0
-            
-            # Check if gradient meets threshold
-            gradient_ok = True
-            if direction == 'LONG' and avg_gradient < long_grad_thresh:
-                gradient_ok = False
-            if direction == 'SHORT' and avg_gradient > short_grad_thresh:
-                gradient_ok = False
-            
-            # Determine entry status
-            entry_bar = -1
-            entry_status = 'missed'
-            missed_points = abs(net_movement)
-            block_reason = ''
-            
-            # Check if we entered during this streak
-            for idx, bar in enumerate(streak_bars):
-                if bar['entryBar'] >= 0 and bar['currentPosition'] != 'Flat':
-                    entry_bar = bar['bar']
-                    if idx == 0:
-                        entry_status = 'caught'
-                        missed_points = 0
-                    else:
-                        entry_status = 'partial'
-                        # Calculate how many points were missed before entry
-                        entry_price = streak_bars[idx]['open']
-                        missed_points = abs(entry_price - start_price)
-                    break
-                
-                # Capture block reason from missed opportunities
-                if bar['opportunityType'] in ('LONG_SIGNAL', 'SHORT_SIGNAL'):
-                    if 'SKIPPED' in bar['actionTaken'] or 'BLOCKED' in bar['actionTaken']:
-                        block_reason = bar['blockReason']
-            
-            # Only add valid streaks (either caught or had valid signal but was blocked)
-            if entry_status != 'missed' or block_reason:
-                # Build pattern string from streak bars (e.g., "3G2B" for 3 good then 2 bad)
-                def build_pattern(bar_list):
-                    pattern_parts = []
-                    current_type = None
-                    current_count = 0
-                    for bar in bar_list:
-                        bar_type = 'G' if bar['candleType'] == 'good' else 'B'
-                        if bar_type == current_type:
-                            current_count += 1
-                        else:
-                            if current_type is not None:
-                                pattern_parts.append(f"{current_count}{current_type}")
-                            current_type = bar_type
-                            current_count = 1
-                    if current_type is not None:
-                        pattern_parts.append(f"{current_count}{current_type}")
-                    return ''.join(pattern_parts)
-
-                # Get 5 bars before the streak (if available)
-                lookback_n = 5
-                lookback_start = max(0, i - lookback_n)
-                lookback_bars = bars[lookback_start:i] if i > 0 else []
-                lookback_pattern = build_pattern(lookback_bars) if lookback_bars else ''
-                streak_pattern = build_pattern(streak_bars)
-                full_pattern = (lookback_pattern + '-' if lookback_pattern else '') + streak_pattern
-
-                streaks.append({
-                    'start_bar': streak_bars[0]['bar'],
-                    'end_bar': streak_bars[-1]['bar'],
-                    'length': length,
-                    'direction': direction,
-                    'net_movement': abs(net_movement),
-                    'avg_gradient': avg_gradient,
-                    'good_bars': good_bars,
-                    'bad_bars': bad_bars,
-                    'status': entry_status,
-                    'entry_bar': entry_bar,
-                    'missed_points': missed_points,
-                    'block_reason': block_reason,
-                    'pattern': full_pattern,
-                    'gradient_ok': gradient_ok
-                })
-                
-                # Skip ahead to avoid overlapping streaks
-                i += length
-                break
-        else:
-            i += 1
-    
+    streaks = []
+    for streak in streak_engine.find_streak_windows(bars, min_streak, max_streak, min_movement,
+                                                    streak_type, counter_ratio, block_rule='last'):
+        streak_bars = streak['bars']
+        direction = streak['direction']
+        avg_gradient = streak['avg_gradient']
+        gradient_ok = True
+        if direction == 'LONG' and avg_gradient < long_grad_thresh:
+            gradient_ok = False
+        if direction == 'SHORT' and avg_gradient > short_grad_thresh:
+            gradient_ok = False
+
+        # Pattern: 5 bars before the streak (if available), then the streak itself
+        i = streak['start']
+        lookback_pattern = _candle_pattern(bars[max(0, i - 5):i])
+        full_pattern = (lookback_pattern + '-' if lookback_pattern else '') + _candle_pattern(streak_bars)
+
+        streaks.append({
+            'start_bar': streak_bars[0]['bar'],
+            'end_bar': streak_bars[-1]['bar'],
+            'length': streak['length'],
+            'direction': direction,
+            'net_movement': abs(streak['net_movement']),
+            'avg_gradient': avg_gradient,
+            'good_bars': streak['good_bars'],
+            'bad_bars': streak['bad_bars'],
+            'status': streak['status'],
+            'entry_bar': streak['entry_bar'],
+            'missed_points': streak['missed_points'],
+            'block_reason': streak['block_reason'],
+            'pattern': full_pattern,
+            'gradient_ok': gradient_ok
+        })
     return streaks
 
 @app.get('/api/strategy-log-files')
@@ -5883,23 +7058,15 @@ def get_strategy_log_files():
     """List available main strategy log CSV files"""
     try:
         files = []
-        for filename in os.listdir(LOG_DIR):
-            if filename.startswith('BarsOnTheFlow_') and filename.endswith('.csv') and 'Opportunities' not in filename and 'OutputWindow' not in filename and 'FastGradDebug' not in filename:
-                filepath = os.path.join(LOG_DIR, filename)
-                stat = os.stat(filepath)
-                mtime = datetime.fromtimestamp(stat.st_mtime)
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        row_count = sum(1 for _ in f) - 1
-                except:
-                    row_count = 0
-                
+        for entry in log_catalog.files('main'):
+            filename = entry['name']
+            if filename.startswith('BarsOnTheFlow_'):
+                mtime = datetime.fromtimestamp(entry['mtime'])
                 files.append({
                     'filename': filename,
                     'timestamp': mtime.strftime('%Y-%m-%d %H:%M:%S'),
-                    'bars': row_count,
-                    'size': stat.st_size
+                    'bars': log_catalog.row_count(entry),
+                    'size': entry['size']
                 })
         
         files.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -5913,6 +7080,19 @@ async def analyze_historical_profitability(request: Request):
     """Analyze historical strategy run to identify profitable patterns and bad trades"""
     try:
         params = await request.json()
+    except Exception as e:
+        return JSONResponse({'error': f'Invalid JSON: {e}'}, status_code=400)
+    return await run_blocking('analytics', result_cache.run, 'analyze-historical-profitability', params,
+                              _main_and_opportunity_logs(params.get('filename')), _analyze_historical_profitability)
+
+def _main_and_opportunity_logs(filename: Optional[str]) -> List[str]:
+    """Paths of a main strategy log and its matching opportunity log (the inputs of the historical analyses)."""
+    filename = str(filename or '')
+    return [os.path.join(LOG_DIR, filename),
+            os.path.join(LOG_DIR, filename.replace('BarsOnTheFlow_', 'BarsOnTheFlow_Opportunities_'))]
+
+def _analyze_historical_profitability(params: Dict[str, Any]):
+    try:
         filename = params.get('filename')
         min_profit = params.get('minProfit', 10.0)
         max_loss = params.get('maxLoss', -20.0)
@@ -5932,71 +7112,66 @@ async def analyze_historical_profitability(request: Request):
         
         # Parse main log
         trades = []
+        open_trades = []  # entries not exited yet; an EXIT closes the most recent one
         bars = []
-        with open(main_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                bar_data = {
-                    'bar': int(row['bar']),
-                    'timestamp': row['timestamp'],
-                    'action': row['action'],
-                    'direction': row['direction'],
-                    'orderName': row.get('orderName', ''),
-                    'quantity': int(row['quantity']) if row['quantity'] else 0,
-                    'price': float(row['price']) if row['price'] else 0,
-                    'pnl': float(row['pnl']) if row['pnl'] else 0,
-                    'reason': row.get('reason', ''),
-                    'barPattern': row.get('barPattern', ''),
-                    'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
-                    'open': float(row['open']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'close': float(row['close']),
-                    'candleType': row.get('candleType', ''),
-                    'trendUpAtDecision': row.get('trendUpAtDecision', '') == 'True',
-                    'trendDownAtDecision': row.get('trendDownAtDecision', '') == 'True'
-                }
-                bars.append(bar_data)
+        for row in csv_logs.rows(main_log_path):
+            bar_data = {
+                'bar': int(row['bar']),
+                'timestamp': row['timestamp'],
+                'action': row['action'],
+                'direction': row['direction'],
+                'orderName': row.get('orderName', ''),
+                'quantity': int(row['quantity']) if row['quantity'] else 0,
+                'price': float(row['price']) if row['price'] else 0,
+                'pnl': float(row['pnl']) if row['pnl'] else 0,
+                'reason': row.get('reason', ''),
+                'barPattern': row.get('barPattern', ''),
+                'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
+                'open': float(row['open']),
+                'high': float(row['high']),
+                'low': float(row['low']),
+                'close': float(row['close']),
+                'candleType': row.get('candleType', ''),
+                'trendUpAtDecision': row.get('trendUpAtDecision', '') == 'True',
+                'trendDownAtDecision': row.get('trendDownAtDecision', '') == 'True'
+            }
+            bars.append(bar_data)
                 
-                # Track entries
-                if bar_data['action'] == 'ENTRY':
-                    trades.append({
-                        'entryBar': bar_data['bar'],
-                        'entryTimestamp': bar_data['timestamp'],
-                        'direction': bar_data['direction'],
-                        'entryPrice': bar_data['price'],
-                        'entryPattern': bar_data['barPattern'],
-                        'entryGradient': bar_data['fastEmaGradDeg'],
-                        'entryTrend': 'UP' if bar_data['trendUpAtDecision'] else 'DOWN' if bar_data['trendDownAtDecision'] else 'NONE',
-                        'entryCandleType': bar_data['candleType']
-                    })
-                # Track exits and complete trades
-                elif bar_data['action'] == 'EXIT' and trades:
-                    # Find the most recent open trade
-                    for trade in reversed(trades):
-                        if 'exitBar' not in trade:
-                            trade['exitBar'] = bar_data['bar']
-                            trade['exitTimestamp'] = bar_data['timestamp']
-                            trade['exitPrice'] = bar_data['price']
-                            trade['exitReason'] = bar_data['reason']
-                            trade['pnl'] = bar_data['pnl']
-                            trade['barsHeld'] = trade['exitBar'] - trade['entryBar']
-                            break
+            # Track entries
+            if bar_data['action'] == 'ENTRY':
+                open_trades.append({
+                    'entryBar': bar_data['bar'],
+                    'entryTimestamp': bar_data['timestamp'],
+                    'direction': bar_data['direction'],
+                    'entryPrice': bar_data['price'],
+                    'entryPattern': bar_data['barPattern'],
+                    'entryGradient': bar_data['fastEmaGradDeg'],
+                    'entryTrend': 'UP' if bar_data['trendUpAtDecision'] else 'DOWN' if bar_data['trendDownAtDecision'] else 'NONE',
+                    'entryCandleType': bar_data['candleType']
+                })
+                trades.append(open_trades[-1])
+            # Track exits and complete trades
+            elif bar_data['action'] == 'EXIT' and open_trades:
+                trade = open_trades.pop()
+                trade['exitBar'] = bar_data['bar']
+                trade['exitTimestamp'] = bar_data['timestamp']
+                trade['exitPrice'] = bar_data['price']
+                trade['exitReason'] = bar_data['reason']
+                trade['pnl'] = bar_data['pnl']
+                trade['barsHeld'] = trade['exitBar'] - trade['entryBar']
         
         # Parse opportunity log if available
         opp_data = {}
         if has_opp_log:
-            with open(opp_log_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    bar_num = int(row['bar'])
-                    opp_data[bar_num] = {
-                        'actionTaken': row.get('actionTaken', ''),
-                        'blockReason': row.get('blockReason', ''),
-                        'opportunityType': row.get('opportunityType', ''),
-                        'gradientFilterLong': row.get('gradientFilterLong', '') == 'True',
-                        'gradientFilterShort': row.get('gradientFilterShort', '') == 'True'
-                    }
+            for row in csv_logs.rows(opp_log_path):
+                bar_num = int(row['bar'])
+                opp_data[bar_num] = {
+                    'actionTaken': row.get('actionTaken', ''),
+                    'blockReason': row.get('blockReason', ''),
+                    'opportunityType': row.get('opportunityType', ''),
+                    'gradientFilterLong': row.get('gradientFilterLong', '') == 'True',
+                    'gradientFilterShort': row.get('gradientFilterShort', '') == 'True'
+                }
         
         # Enrich trades with opportunity data
         for trade in trades:
@@ -6006,7 +7181,10 @@ async def analyze_historical_profitability(request: Request):
                 trade['entryBlockReason'] = opp['blockReason']
                 trade['opportunityType'] = opp['opportunityType']
         
-        # Calculate max profit for each trade (from bars data)
+        # Calculate max profit for each trade (from bars data); bars sorted by bar number so each
+        # trade's entry..exit range is a bisect instead of a scan over the whole log
+        bars_by_number = sorted(bars, key=lambda b: b['bar'])
+        bar_numbers = [b['bar'] for b in bars_by_number]
         for trade in trades:
             if 'exitBar' in trade:
                 max_profit = 0
@@ -6015,17 +7193,18 @@ async def analyze_historical_profitability(request: Request):
                 direction = trade['direction']
                 
                 # Find bars between entry and exit
-                for bar in bars:
-                    if trade['entryBar'] <= bar['bar'] <= trade['exitBar']:
-                        if direction == 'LONG':
-                            profit = bar['high'] - entry_price
-                            loss = entry_price - bar['low']
-                        else:  # SHORT
-                            profit = entry_price - bar['low']
-                            loss = bar['high'] - entry_price
-                        
-                        max_profit = max(max_profit, profit)
-                        max_loss = max(max_loss, loss)
+                first = bisect.bisect_left(bar_numbers, trade['entryBar'])
+                last = bisect.bisect_right(bar_numbers, trade['exitBar'])
+                for bar in bars_by_number[first:last]:
+                    if direction == 'LONG':
+                        profit = bar['high'] - entry_price
+                        loss = entry_price - bar['low']
+                    else:  # SHORT
+                        profit = entry_price - bar['low']
+                        loss = bar['high'] - entry_price
+                    
+                    max_profit = max(max_profit, profit)
+                    max_loss = max(max_loss, loss)
                 
                 trade['maxProfit'] = max_profit
                 trade['maxLoss'] = max_loss
@@ -6145,7 +7324,8 @@ async def analyze_historical_profitability(request: Request):
         return JSONResponse({'error': str(ex)}, status_code=500)
 
 @app.get('/api/strategy-log-data')
-async def get_strategy_log_data(filename: str):
+@offload('analytics')
+def get_strategy_log_data(filename: str):
     """Get bar data from strategy log file for chart visualization"""
     try:
         if not filename:
@@ -6160,41 +7340,39 @@ async def get_strategy_log_data(filename: str):
         bars_dict = {}
         bars_by_action = {}  # Track BAR action rows separately
         
-        with open(main_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    bar_num = int(row['bar'])
-                    action = row.get('action', '').upper()
+        for row in csv_logs.rows(main_log_path):
+            try:
+                bar_num = int(row['bar'])
+                action = row.get('action', '').upper()
                     
-                    # Use Final OHLC values if available, otherwise fall back to regular OHLC
-                    open_val = float(row.get('openFinal') or row.get('open') or 0)
-                    high_val = float(row.get('highFinal') or row.get('high') or 0)
-                    low_val = float(row.get('lowFinal') or row.get('low') or 0)
-                    close_val = float(row.get('closeFinal') or row.get('close') or 0)
+                # Use Final OHLC values if available, otherwise fall back to regular OHLC
+                open_val = float(row.get('openFinal') or row.get('open') or 0)
+                high_val = float(row.get('highFinal') or row.get('high') or 0)
+                low_val = float(row.get('lowFinal') or row.get('low') or 0)
+                close_val = float(row.get('closeFinal') or row.get('close') or 0)
                     
-                    # Skip if no valid price data
-                    if open_val == 0 and high_val == 0 and low_val == 0 and close_val == 0:
-                        continue
+                # Skip if no valid price data
+                if open_val == 0 and high_val == 0 and low_val == 0 and close_val == 0:
+                    continue
                     
-                    bar_data = {
-                        'bar': bar_num,
-                        'timestamp': row.get('timestamp', ''),
-                        'open': open_val,
-                        'high': high_val,
-                        'low': low_val,
-                        'close': close_val,
-                        'candleType': row.get('candleType', '')
-                    }
+                bar_data = {
+                    'bar': bar_num,
+                    'timestamp': row.get('timestamp', ''),
+                    'open': open_val,
+                    'high': high_val,
+                    'low': low_val,
+                    'close': close_val,
+                    'candleType': row.get('candleType', '')
+                }
                     
-                    # Store BAR action rows separately (these are finalized bars)
-                    if action == 'BAR':
-                        bars_by_action[bar_num] = bar_data
-                    # Otherwise, store as fallback (last row for each bar wins)
-                    else:
-                        bars_dict[bar_num] = bar_data
-                except Exception as e:
-                    continue
+                # Store BAR action rows separately (these are finalized bars)
+                if action == 'BAR':
+                    bars_by_action[bar_num] = bar_data
+                # Otherwise, store as fallback (last row for each bar wins)
+                else:
+                    bars_dict[bar_num] = bar_data
+            except Exception as e:
+                continue
         
         # Use BAR action rows where available, otherwise use the last row for that bar
         final_bars = {}
@@ -6221,6 +7399,13 @@ async def analyze_trends_and_trades(request: Request):
     """Analyze historical data to find trends and match trades to them, identifying optimal parameters"""
     try:
         params = await request.json()
+    except Exception as e:
+        return JSONResponse({'error': f'Invalid JSON: {e}'}, status_code=400)
+    return await run_blocking('analytics', result_cache.run, 'analyze-trends-and-trades', params,
+                              _main_and_opportunity_logs(params.get('filename')), _analyze_trends_and_trades)
+
+def _analyze_trends_and_trades(params: Dict[str, Any]):
+    try:
         filename = params.get('filename')
         min_trend_length = params.get('minTrendLength', 3)
         min_trend_movement = params.get('minTrendMovement', 5.0)
@@ -6239,50 +7424,46 @@ async def analyze_trends_and_trades(request: Request):
         
         # Parse main log to get all bars
         bars = []
-        with open(main_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    bar_data = {
-                        'bar': int(row['bar']),
-                        'timestamp': row['timestamp'],
-                        'open': float(row['open']),
-                        'high': float(row['high']),
-                        'low': float(row['low']),
-                        'close': float(row['close']),
-                        'candleType': row.get('candleType', ''),
-                        'direction': row.get('direction', 'FLAT'),
-                        'action': row.get('action', ''),
-                        'pnl': float(row['pnl']) if row.get('pnl') else 0,
-                        'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
-                        'trendUpAtDecision': row.get('trendUpAtDecision', '') == 'True',
-                        'trendDownAtDecision': row.get('trendDownAtDecision', '') == 'True',
-                        'barPattern': row.get('barPattern', '')
-                    }
-                    bars.append(bar_data)
-                except:
-                    continue
+        for row in csv_logs.rows(main_log_path):
+            try:
+                bar_data = {
+                    'bar': int(row['bar']),
+                    'timestamp': row['timestamp'],
+                    'open': float(row['open']),
+                    'high': float(row['high']),
+                    'low': float(row['low']),
+                    'close': float(row['close']),
+                    'candleType': row.get('candleType', ''),
+                    'direction': row.get('direction', 'FLAT'),
+                    'action': row.get('action', ''),
+                    'pnl': float(row['pnl']) if row.get('pnl') else 0,
+                    'fastEmaGradDeg': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
+                    'trendUpAtDecision': row.get('trendUpAtDecision', '') == 'True',
+                    'trendDownAtDecision': row.get('trendDownAtDecision', '') == 'True',
+                    'barPattern': row.get('barPattern', '')
+                }
+                bars.append(bar_data)
+            except:
+                continue
         
         # Parse opportunity log if available
         opp_data = {}
         if has_opp_log:
-            with open(opp_log_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        bar_num = int(row['bar'])
-                        opp_data[bar_num] = {
-                            'trendUpSignal': row.get('trendUpSignal', '') == 'True',
-                            'trendDownSignal': row.get('trendDownSignal', '') == 'True',
-                            'goodCount': int(row.get('goodCount', 0)),
-                            'badCount': int(row.get('badCount', 0)),
-                            'netPnl': float(row.get('netPnl', 0)),
-                            'actionTaken': row.get('actionTaken', ''),
-                            'blockReason': row.get('blockReason', ''),
-                            'gradientValue': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None
-                        }
-                    except:
-                        continue
+            for row in csv_logs.rows(opp_log_path):
+                try:
+                    bar_num = int(row['bar'])
+                    opp_data[bar_num] = {
+                        'trendUpSignal': row.get('trendUpSignal', '') == 'True',
+                        'trendDownSignal': row.get('trendDownSignal', '') == 'True',
+                        'goodCount': int(row.get('goodCount', 0)),
+                        'badCount': int(row.get('badCount', 0)),
+                        'netPnl': float(row.get('netPnl', 0)),
+                        'actionTaken': row.get('actionTaken', ''),
+                        'blockReason': row.get('blockReason', ''),
+                        'gradientValue': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None
+                    }
+                except:
+                    continue
         
         # Find complete trends (one direction from start to end)
         trends = find_complete_trends(bars, opp_data, min_trend_length, min_trend_movement)
@@ -6290,40 +7471,38 @@ async def analyze_trends_and_trades(request: Request):
         # Parse trades from main log - need to re-read to get price field
         trades = []
         current_trade = None
-        with open(main_log_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    bar_num = int(row['bar'])
-                    action = row.get('action', '')
-                    direction = row.get('direction', '')
-                    price_str = row.get('price', '')
-                    pnl_str = row.get('pnl', '')
+        for row in csv_logs.rows(main_log_path):
+            try:
+                bar_num = int(row['bar'])
+                action = row.get('action', '')
+                direction = row.get('direction', '')
+                price_str = row.get('price', '')
+                pnl_str = row.get('pnl', '')
                     
-                    if action == 'ENTRY':
-                        current_trade = {
-                            'entryBar': bar_num,
-                            'entryTimestamp': row.get('timestamp', ''),
-                            'direction': direction,
-                            'entryPrice': float(price_str) if price_str and price_str not in ('', '0') else 0,
-                            'entryPattern': row.get('barPattern', ''),
-                            'entryGradient': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
-                            'entryTrend': 'UP' if row.get('trendUpAtDecision', '') == 'True' else 'DOWN' if row.get('trendDownAtDecision', '') == 'True' else 'NONE'
-                        }
-                    elif action == 'EXIT' and current_trade:
-                        current_trade['exitBar'] = bar_num
-                        current_trade['exitTimestamp'] = row.get('timestamp', '')
-                        current_trade['exitPrice'] = float(price_str) if price_str and price_str not in ('', '0') else 0
-                        current_trade['exitReason'] = row.get('reason', '')
-                        current_trade['pnl'] = float(pnl_str) if pnl_str and pnl_str not in ('', '') else 0
-                        current_trade['barsHeld'] = current_trade['exitBar'] - current_trade['entryBar']
-                        trades.append(current_trade)
-                        current_trade = None
-                except Exception as e:
-                    continue
+                if action == 'ENTRY':
+                    current_trade = {
+                        'entryBar': bar_num,
+                        'entryTimestamp': row.get('timestamp', ''),
+                        'direction': direction,
+                        'entryPrice': float(price_str) if price_str and price_str not in ('', '0') else 0,
+                        'entryPattern': row.get('barPattern', ''),
+                        'entryGradient': float(row['fastEmaGradDeg']) if row.get('fastEmaGradDeg') and row['fastEmaGradDeg'] not in ('', 'NaN') else None,
+                        'entryTrend': 'UP' if row.get('trendUpAtDecision', '') == 'True' else 'DOWN' if row.get('trendDownAtDecision', '') == 'True' else 'NONE'
+                    }
+                elif action == 'EXIT' and current_trade:
+                    current_trade['exitBar'] = bar_num
+                    current_trade['exitTimestamp'] = row.get('timestamp', '')
+                    current_trade['exitPrice'] = float(price_str) if price_str and price_str not in ('', '0') else 0
+                    current_trade['exitReason'] = row.get('reason', '')
+                    current_trade['pnl'] = float(pnl_str) if pnl_str and pnl_str not in ('', '') else 0
+                    current_trade['barsHeld'] = current_trade['exitBar'] - current_trade['entryBar']
+                    trades.append(current_trade)
+                    current_trade = None
+            except Exception as e:
+                continue
         
-        # Match trades to trends
-        matched_trends = match_trades_to_trends(trends, trades, bars)
+        # Match trades to trends (matchAllTrades: report every overlapping trade per trend)
+        matched_trends = match_trades_to_trends(trends, trades, bars, all_matches=bool(params.get('matchAllTrades', False)))
         
         # Analyze parameters for each trend
         analyzed_trends = analyze_trend_parameters(matched_trends, bars, opp_data)
@@ -6455,10 +7634,46 @@ def find_complete_trends(bars, opp_data, min_length=3, min_movement=5.0):
     
     return filtered_trends
 
-def match_trades_to_trends(trends, trades, bars):
-    """Match trades to trends and calculate how well they captured the trend"""
-    matched = []
+TREND_TRADE_DIRECTION = {'UP': 'LONG', 'DOWN': 'SHORT'}
+
+def _trend_capture(trend, trade):
+    """How much of `trend` the (direction-matched) trade captured and missed before/after."""
+    entry_price = trade['entryPrice']
+    exit_price = trade['exitPrice']
+    if trend['direction'] == 'UP':
+        # LONG trade in UP trend
+        captured = exit_price - entry_price
+        missed_before = max(0, entry_price - trend['startPrice'])
+        missed_after = max(0, trend['endPrice'] - exit_price)
+    else:
+        # SHORT trade in DOWN trend
+        captured = entry_price - exit_price
+        missed_before = max(0, trend['startPrice'] - entry_price)
+        missed_after = max(0, exit_price - trend['endPrice'])
+    return {
+        'trade': trade,
+        'entryBar': trade['entryBar'],
+        'exitBar': trade['exitBar'],
+        'capturedMovement': captured,
+        'capturePercentage': (captured / abs(trend['netMovement']) * 100) if trend['netMovement'] != 0 else 0,
+        'missedMovement': missed_before + missed_after,
+        'missedBefore': missed_before,
+        'missedAfter': missed_after,
+    }
+
+def match_trades_to_trends(trends, trades, bars, all_matches=False):
+    """Match trades to trends and calculate how well they captured the trend
+
+    UP trends match LONG trades and DOWN trends SHORT trades whose bar range overlaps the trend
+    (interval_match). The first such trade fills the trend's trade fields; with all_matches,
+    'matchedTrades' also lists the capture of every overlapping trade.
+    """
+    candidates = {}
+    for direction in TREND_TRADE_DIRECTION.values():
+        positions = [i for i, t in enumerate(trades) if t['direction'] == direction]
+        candidates[direction] = (positions, IntervalIndex([(trades[i]['entryBar'], trades[i]['exitBar']) for i in positions]))
     
+    matched = []
     for trend in trends:
         trend_info = trend.copy()
         trend_info['tradeMatched'] = False
@@ -6469,57 +7684,21 @@ def match_trades_to_trends(trends, trades, bars):
         trend_info['capturePercentage'] = 0
         trend_info['missedMovement'] = abs(trend['netMovement'])
         
-        # Find trades that overlap with this trend
-        for trade in trades:
-            # Check if trade direction matches trend direction
-            # UP trend = LONG trades, DOWN trend = SHORT trades
-            trade_dir = trade['direction']
-            if (trend['direction'] == 'UP' and trade_dir != 'LONG') or \
-               (trend['direction'] == 'DOWN' and trade_dir != 'SHORT'):
-                continue
-            
-            # Check if trade overlaps with trend
-            trade_start = trade['entryBar']
-            trade_end = trade['exitBar']
-            trend_start = trend['startBar']
-            trend_end = trend['endBar']
-            
-            # Overlap if trade starts/ends within trend or trend starts/ends within trade
-            if (trend_start <= trade_start <= trend_end) or (trend_start <= trade_end <= trend_end) or \
-               (trade_start <= trend_start <= trade_end) or (trade_start <= trend_end <= trade_end):
-                
-                # Calculate how much of the trend was captured
-                entry_price = trade['entryPrice']
-                exit_price = trade['exitPrice']
-                
-                if trend['direction'] == 'UP' and trade_dir == 'LONG':
-                    # LONG trade in UP trend
-                    captured = exit_price - entry_price
-                    # Calculate what was missed before entry and after exit
-                    missed_before = max(0, entry_price - trend['startPrice'])
-                    missed_after = max(0, trend['endPrice'] - exit_price)
-                elif trend['direction'] == 'DOWN' and trade_dir == 'SHORT':
-                    # SHORT trade in DOWN trend
-                    captured = entry_price - exit_price
-                    missed_before = max(0, trend['startPrice'] - entry_price)
-                    missed_after = max(0, exit_price - trend['endPrice'])
-                else:
-                    # Mismatch - shouldn't happen but handle gracefully
-                    continue
-                
-                total_missed = missed_before + missed_after
-                capture_pct = (captured / abs(trend['netMovement']) * 100) if trend['netMovement'] != 0 else 0
-                
-                trend_info['tradeMatched'] = True
-                trend_info['trade'] = trade
-                trend_info['entryBar'] = trade['entryBar']
-                trend_info['exitBar'] = trade['exitBar']
-                trend_info['capturedMovement'] = captured
-                trend_info['capturePercentage'] = capture_pct
-                trend_info['missedMovement'] = total_missed
-                trend_info['missedBefore'] = missed_before
-                trend_info['missedAfter'] = missed_after
-                break
+        hits = []
+        direction = TREND_TRADE_DIRECTION.get(trend['direction'])
+        if direction is not None:
+            positions, index = candidates[direction]
+            if all_matches:
+                hits = [positions[k] for k in index.overlapping(trend['startBar'], trend['endBar'])]
+            else:
+                first = index.first(trend['startBar'], trend['endBar'])
+                hits = [] if first is None else [positions[first]]
+        captures = [_trend_capture(trend, trades[i]) for i in hits]
+        if captures:
+            trend_info['tradeMatched'] = True
+            trend_info.update(captures[0])
+        if all_matches:
+            trend_info['matchedTrades'] = captures
         
         matched.append(trend_info)
     
@@ -6753,20 +7932,14 @@ def aggregate_optimal_parameters(analyzed_trends):
     }
 
 @app.get('/api/databases/status')
-async def get_databases_status():
+@offload('db')
+def get_databases_status():
     """Get status of all databases and tables with their current state and history."""
     try:
         databases = {}
-        # VOLATILITY_DB_PATH is defined later in the file, but will be available at runtime
-        volatility_db_path = os.path.join(os.path.dirname(__file__), 'volatility.db')
-        db_files = {
-            'dashboard.db': DB_PATH,
-            'bars.db': BARS_DB_PATH,
-            'volatility.db': volatility_db_path
-        }
+        db_files = {name: db.path for name, db in DATABASES.items()}
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        cur = dashboard_db.reader().cursor()
         
         for db_name, db_path in db_files.items():
             if not os.path.exists(db_path):
@@ -6784,8 +7957,7 @@ async def get_databases_status():
             
             # Connect to each database to get table information
             try:
-                db_conn = sqlite3.connect(db_path)
-                db_cur = db_conn.cursor()
+                db_cur = DATABASES[db_name].reader().cursor()
                 
                 # Get all tables
                 db_cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
@@ -6878,7 +8050,6 @@ async def get_databases_status():
                         'history': history
                     }
                 
-                db_conn.close()
             except Exception as db_ex:
                 databases[db_name]['error'] = str(db_ex)
         
@@ -6895,6 +8066,12 @@ async def record_table_event(request: Request):
     """Record an event for a table (populated, emptied, populating, etc.)"""
     try:
         data = await request.json()
+    except Exception as e:
+        return JSONResponse({'error': f'Invalid JSON: {e}'}, status_code=400)
+    return await run_blocking('db', _record_table_event, data)
+
+def _record_table_event(data: Dict[str, Any]):
+    try:
         database_name = data.get('database_name')
         table_name = data.get('table_name')
         status = data.get('status')  # 'populated', 'empty', 'populating', 'emptied'
@@ -6906,34 +8083,24 @@ async def record_table_event(request: Request):
             return JSONResponse({'error': 'database_name, table_name, and status are required'}, status_code=400)
         
         # Get current row count
-        volatility_db_path = os.path.join(os.path.dirname(__file__), 'volatility.db')
-        db_files = {
-            'dashboard.db': DB_PATH,
-            'bars.db': BARS_DB_PATH,
-            'volatility.db': volatility_db_path
-        }
+        db_files = {name: db.path for name, db in DATABASES.items()}
         
         row_count = 0
         if database_name in db_files and os.path.exists(db_files[database_name]):
             try:
-                db_conn = sqlite3.connect(db_files[database_name])
-                db_cur = db_conn.cursor()
+                db_cur = DATABASES[database_name].reader().cursor()
                 db_cur.execute(f'SELECT COUNT(*) FROM "{table_name}"')
                 row_count = db_cur.fetchone()[0]
-                db_conn.close()
             except:
                 pass
         
         # Record event in history (safely handle if table doesn't exist)
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute("""
+            db_exec("""
                 INSERT INTO table_status_history 
                 (database_name, table_name, status, strategy_name, row_count, event_type, event_details, timestamp)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (database_name, table_name, status, strategy_name, row_count, event_type, event_details, time.time()))
-            conn.commit()
         except Exception as insert_ex:
             # Table might not exist yet, that's okay - just log and continue
             print(f'[TABLE_EVENT] Could not record event (table may not exist): {insert_ex}')
@@ -6952,16 +8119,12 @@ async def record_table_event(request: Request):
         return JSONResponse({'error': str(ex)}, status_code=500)
 
 @app.get('/api/databases/table-data')
-async def get_table_data(database_name: str, table_name: str, limit: int = 1000, offset: int = 0, barIndex: int = None):
+@offload('db')
+def get_table_data(database_name: str, table_name: str, limit: int = 1000, offset: int = 0, barIndex: int = None):
     """Get table data with pagination. Optionally filter by barIndex."""
     try:
         # Get database path
-        volatility_db_path = os.path.join(os.path.dirname(__file__), 'volatility.db')
-        db_files = {
-            'dashboard.db': DB_PATH,
-            'bars.db': BARS_DB_PATH,
-            'volatility.db': volatility_db_path
-        }
+        db_files = {name: db.path for name, db in DATABASES.items()}
         
         if database_name not in db_files:
             return JSONResponse({'error': f'Database {database_name} not found'}, status_code=404)
@@ -6971,16 +8134,14 @@ async def get_table_data(database_name: str, table_name: str, limit: int = 1000,
             return JSONResponse({'error': f'Database file not found: {db_path}'}, status_code=404)
         
         # Connect to database
-        db_conn = sqlite3.connect(db_path)
-        db_conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        db_cur = db_conn.cursor()
+        db_cur = DATABASES[database_name].reader().cursor()
+        db_cur.row_factory = sqlite3.Row  # Return rows as dictionaries
         
         # Get column information
         db_cur.execute(f'PRAGMA table_info("{table_name}")')
         columns = [{'name': row[1], 'type': row[2]} for row in db_cur.fetchall()]
         
         if not columns:
-            db_conn.close()
             return JSONResponse({'error': f'Table {table_name} not found'}, status_code=404)
         
         # Build WHERE clause if barIndex filter is provided
@@ -7064,7 +8225,6 @@ async def get_table_data(database_name: str, table_name: str, limit: int = 1000,
         for row in db_cur.fetchall():
             rows.append(dict(row))
         
-        db_conn.close()
         
         return JSONResponse({
             'database_name': database_name,
@@ -7103,33 +8263,33 @@ async def serve_database_monitor():
         return HTMLResponse('<h1>Database Monitor page not found</h1>', status_code=404)
 
 @app.post('/api/databases/reset-bars-table')
-async def reset_bars_table_endpoint():
+@offload('db')
+def reset_bars_table_endpoint():
     """Reset (delete and recreate) the BarsOnTheFlowStateAndBar table."""
     try:
         if not os.path.exists(BARS_DB_PATH):
             return JSONResponse({'error': 'Database not found'}, status_code=404)
         
-        conn = sqlite3.connect(BARS_DB_PATH)
-        cursor = conn.cursor()
+        with bars_db.write() as conn:
+            cursor = conn.cursor()
         
-        # Get current row count
-        cursor.execute("SELECT COUNT(*) FROM BarsOnTheFlowStateAndBar")
-        row_count = cursor.fetchone()[0]
+            # Get current row count
+            cursor.execute("SELECT COUNT(*) FROM BarsOnTheFlowStateAndBar")
+            row_count = cursor.fetchone()[0]
         
-        # Drop the table
-        cursor.execute("DROP TABLE IF EXISTS BarsOnTheFlowStateAndBar")
+            # Drop the table
+            cursor.execute("DROP TABLE IF EXISTS BarsOnTheFlowStateAndBar")
         
-        # Drop indexes
-        cursor.execute("DROP INDEX IF EXISTS idx_botf_bar")
-        cursor.execute("DROP INDEX IF EXISTS idx_botf_ts")
-        cursor.execute("DROP INDEX IF EXISTS idx_botf_position")
-        cursor.execute("DROP INDEX IF EXISTS idx_botf_currentbar")
+            # Drop indexes
+            cursor.execute("DROP INDEX IF EXISTS idx_botf_bar")
+            cursor.execute("DROP INDEX IF EXISTS idx_botf_ts")
+            cursor.execute("DROP INDEX IF EXISTS idx_botf_position")
+            cursor.execute("DROP INDEX IF EXISTS idx_botf_currentbar")
         
-        # Recreate the table (call init_bars_db to recreate it)
-        init_bars_db()
+            # Recreate the table (call init_bars_db to recreate it)
+            init_bars_db()
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
         return JSONResponse({
             'status': 'ok',
@@ -7236,216 +8396,434 @@ def find_ninjatrader_db_directory() -> Optional[str]:
     
     return None
 
-@app.get('/api/data/download-tick')
-async def download_tick_data(
-    instrument: str = Query(..., description="Instrument symbol (e.g., 'MNQ 03-26')"),
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    format: str = Query('csv', description="Output format: 'csv' or 'json'"),
-    db_path_override: Optional[str] = Query(None, description="Override database path (optional)"),
-    max_ticks: Optional[int] = Query(None, description="Maximum number of ticks to return (for large files)")
-):
-    """
-    Download historical tick data from NinjaTrader's local database.
-    
-    This endpoint attempts to read tick data from NinjaTrader's data files.
-    Note: The exact file location and format depends on your data feed provider.
+TICK_STREAM_CHUNK_ROWS = int(os.environ.get('TICK_STREAM_CHUNK_ROWS', '5000'))
+TICK_STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def _tick_stream(ticks, fmt, meta, stats, max_ticks=None):
+    """Encode ticks as CSV / NDJSON / JSON text, TICK_STREAM_CHUNK_ROWS rows per chunk.
+
+    Closing the generator (client disconnect) closes the underlying tick file.
     """
+    count = 0
+    buf = []
+    completed = False
     try:
-        # Parse dates
-        start_dt = None
-        end_dt = None
-        if start_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        if end_date:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            # Set to end of day
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-        
-        # Try to find and read tick data
-        tick_data = []
-        
-        # Find database path
-        if db_path_override:
-            db_path = db_path_override
-            if not os.path.exists(db_path):
-                return JSONResponse({
-                    'error': 'Specified database path does not exist',
-                    'path': db_path
-                }, status_code=404)
-        else:
-            db_path = find_ninjatrader_db_directory()
-            if db_path is None:
-                # Return helpful error with all paths we tried
-                all_tried_paths = []
-                try:
-                    docs_path = os.path.join(os.path.expanduser("~"), "Documents", "NinjaTrader 8", "db")
-                    all_tried_paths.append(docs_path)
-                except:
-                    pass
-                try:
-                    userprofile = os.environ.get('USERPROFILE', '')
-                    if userprofile:
-                        all_tried_paths.append(os.path.join(userprofile, "Documents", "NinjaTrader 8", "db"))
-                except:
-                    pass
-                all_tried_paths.extend([
-                    "C:/Users/Public/Documents/NinjaTrader 8/db",
-                    "C:\\Users\\Public\\Documents\\NinjaTrader 8\\db",
-                    "/Users/mm/Documents/NinjaTrader 8/db",
-                ])
-                
-                return JSONResponse({
-                    'error': 'NinjaTrader database directory not found',
-                    'message': 'Please ensure NinjaTrader is installed and data has been downloaded.',
-                    'searched_paths': all_tried_paths,
-                    'suggestion': 'You can specify a custom path using the db_path_override parameter, or check the NinjaTrader installation directory.'
-                }, status_code=404)
-        
+        if fmt == 'csv':
+            yield 'timestamp,price,volume\r\n'
+        elif fmt == 'json':
+            yield '{' + json.dumps(meta)[1:-1] + ', "data": ['
+        for tick_time, price, volume in ticks:
+            timestamp = tick_time.isoformat()
+            if fmt == 'csv':
+                buf.append(f"{timestamp},{price},{volume}\r\n")
+            else:
+                row = json.dumps({'timestamp': timestamp, 'price': price, 'volume': volume})
+                if fmt == 'ndjson':
+                    buf.append(row + '\n')
+                else:
+                    buf.append(row if count == 0 else ',' + row)
+            count += 1
+            if len(buf) >= TICK_STREAM_CHUNK_ROWS:
+                yield ''.join(buf)
+                buf.clear()
+            if max_ticks and count >= max_ticks:
+                print(f"[DOWNLOAD_TICK] Reached max_ticks limit ({max_ticks}), stopping stream")
+                break
+        if buf:
+            yield ''.join(buf)
+        if fmt == 'json':
+            yield f'], "count": {count}}}'
+        completed = True
+    finally:
+        close = getattr(ticks, 'close', None)
+        if close:
+            close()
+        state = 'Streamed' if completed else 'Stream cancelled after'
+        print(f"[DOWNLOAD_TICK] {state} {count:,} ticks from {stats.get('file')} "
+              f"(lines: {stats.get('lines', 0):,}, parse errors: {stats.get('parse_errors', 0):,}, skipped: {stats.get('skipped', 0):,})")
+
+
+def _resolve_tick_db_path(db_path_override=None):
+    """NinjaTrader db directory for tick lookups: (path, None) or (None, error JSONResponse)."""
+    if db_path_override:
+        db_path = db_path_override
+        if not os.path.exists(db_path):
+            return None, JSONResponse({
+                'error': 'Specified database path does not exist',
+                'path': db_path
+            }, status_code=404)
+    else:
+        db_path = instrument_catalog.db_path()
         if db_path is None:
-            return JSONResponse({
+            # Return helpful error with all paths we tried
+            all_tried_paths = []
+            try:
+                docs_path = os.path.join(os.path.expanduser("~"), "Documents", "NinjaTrader 8", "db")
+                all_tried_paths.append(docs_path)
+            except:
+                pass
+            try:
+                userprofile = os.environ.get('USERPROFILE', '')
+                if userprofile:
+                    all_tried_paths.append(os.path.join(userprofile, "Documents", "NinjaTrader 8", "db"))
+            except:
+                pass
+            all_tried_paths.extend([
+                "C:/Users/Public/Documents/NinjaTrader 8/db",
+                "C:\\Users\\Public\\Documents\\NinjaTrader 8\\db",
+                "/Users/mm/Documents/NinjaTrader 8/db",
+            ])
+            
+            return None, JSONResponse({
                 'error': 'NinjaTrader database directory not found',
                 'message': 'Please ensure NinjaTrader is installed and data has been downloaded.',
-                'searched_paths': possible_paths
+                'searched_paths': all_tried_paths,
+                'suggestion': 'You can specify a custom path using the db_path_override parameter, or check the NinjaTrader installation directory.'
             }, status_code=404)
+    return db_path, None
+
+
+TICK_CATALOG_RESCAN_SEC = float(os.environ.get('TICK_CATALOG_RESCAN_SEC', '300'))
+TICK_CATALOG_MISS_RESCAN_SEC = 10.0
+TICK_TEXT_EXTENSIONS = ('.txt', '.csv', '.Last', '.last')
+TICK_DIR_EXTENSIONS = ('.txt', '.csv', '.Last', '.last', '.bid', '.ask', '.Bid.txt', '.Ask.txt', '.bin', '.dat', '.ncd')
+TICK_SPAN_PROBE_BYTES = 65536
+TICK_NAME_SUFFIXES = ('.Last.txt', '.last.txt', '.Bid.txt', '.Ask.txt', '.Last', '.last', '.txt', '.csv', '.ncd')
+
+
+def _tick_file_format(name):
+    lower = name.lower()
+    for suffix, fmt in (('.last.txt', 'last'), ('.last', 'last'), ('.bid.txt', 'bid'), ('.bid', 'bid'),
+                        ('.ask.txt', 'ask'), ('.ask', 'ask'), ('.ncd', 'ncd'), ('.csv', 'csv'), ('.txt', 'txt')):
+        if lower.endswith(suffix):
+            return fmt
+    return 'other'
+
+
+def _tick_file_span(path, fmt, size):
+    """(first, last) tick timestamps, read from the two ends of a text file only."""
+    if fmt == 'ncd':
+        # NinjaTrader names binary day files yyyyMMdd.Last.ncd
+        stem = os.path.basename(path).split('.')[0]
+        if len(stem) == 8 and stem.isdigit():
+            try:
+                day = datetime.strptime(stem, '%Y%m%d')
+                return day.isoformat(), day.replace(hour=23, minute=59, second=59).isoformat()
+            except ValueError:
+                pass
+        return None, None
+    if fmt == 'other' or size == 0:
+        return None, None
+    first = last = None
+    with open(path, 'rb') as f:
+        for line in f.read(TICK_SPAN_PROBE_BYTES).decode('utf-8', 'ignore').splitlines():
+            tick = parse_tick_line(line.strip()) if line.strip() and not line.startswith('#') else None
+            if tick:
+                first = tick[0].isoformat()
+                break
+        f.seek(max(0, size - TICK_SPAN_PROBE_BYTES))
+        tail = f.read().decode('utf-8', 'ignore').splitlines()
+        if size > TICK_SPAN_PROBE_BYTES:
+            tail = tail[1:]  # first line is probably partial
+        for line in reversed(tail):
+            tick = parse_tick_line(line.strip()) if line.strip() and not line.startswith('#') else None
+            if tick:
+                last = tick[0].isoformat()
+                break
+    return first, last
+
+
+def _tick_instrument_name(entry):
+    """Instrument name for a catalog entry: the directory for files inside instrument dirs."""
+    if entry['in_dir']:
+        return entry['key']
+    name = entry['key']
+    for suffix in TICK_NAME_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.replace('_', ' ')
+
+
+class InstrumentCatalog:
+    """Resolved NinjaTrader db path plus every tick file under it, kept in memory.
+
+    Built on first use (or by start()), refreshed by a background rescan every
+    TICK_CATALOG_RESCAN_SEC and by POST /api/data/instrument-catalog/refresh.
+    File spans (first/last tick) are re-read only when a file's size or mtime changes.
+    """
+
+    def __init__(self, rescan_sec):
+        self.rescan_sec = rescan_sec
+        self._lock = threading.RLock()
+        self._db_path = None
+        self._db_path_resolved = False
+        self._scans = {}  # db_path -> {'entries', 'tick_dir', 'tick_dir_items', 'scanned_at', 'scan_ms'}
+        self._spans = {}  # file path -> (size, mtime_ns, first, last)
+        self._stop = threading.Event()
+        self._thread = None
+        self.scans = 0
+        self.lookups = 0
+
+    def db_path(self):
+        """The NinjaTrader db directory (probed once, re-probed on refresh)."""
+        with self._lock:
+            if not self._db_path_resolved:
+                self._db_path = find_ninjatrader_db_directory()
+                self._db_path_resolved = True
+            return self._db_path
+
+    def _entry(self, path, key, source, in_dir, st):
+        fmt = _tick_file_format(path)
+        cached = self._spans.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            first, last = cached[2], cached[3]
+        else:
+            try:
+                first, last = _tick_file_span(path, fmt, st.st_size)
+            except OSError:
+                first = last = None
+            self._spans[path] = (st.st_size, st.st_mtime_ns, first, last)
+        return {
+            'path': path, 'key': key, 'source': source, 'in_dir': in_dir, 'format': fmt,
+            'size': st.st_size, 'mtime': st.st_mtime, 'first': first, 'last': last,
+            'priority': 0 if path.endswith(('.Last.txt', '.last.txt')) else 1,
+        }
+
+    def _add(self, entries, path, key, source, in_dir=False):
+        if path.endswith(SIDECAR_SUFFIX) or SIDECAR_SUFFIX + '.' in path:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        entries.append(self._entry(path, key, source, in_dir, st))
+
+    def _scan(self, db_path):
+        t0 = time.perf_counter()
+        entries = []
+        tick_dir_items = []
         
-        # Look for tick data files
-        # Format varies by provider - this is a generic approach
-        instrument_clean = instrument.replace(" ", "_").replace("/", "-")
-        tick_files = []
-        found_items = []  # Track what we found for debugging
-        
-        # Check custom Historical directory first (user's dedicated directory)
-        # Try multiple possible paths
+        # Custom Historical directory (first one that exists)
         historical_paths = [
-            # Path relative to server.py: web/dashboard -> web -> Custom -> Historical
             os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "Historical"),
-            # Direct path from workspace root
             os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), "Custom", "Historical"),
-            # Windows network share path
             r"\\Mac\Home\Documents\NinjaTrader 8\bin\Custom\Historical",
-            # Alternative path format
             r"c:\Mac\Home\Documents\NinjaTrader 8\bin\Custom\Historical",
         ]
-        
         for historical_dir in historical_paths:
             if os.path.exists(historical_dir):
                 try:
-                    print(f"[DOWNLOAD_TICK] Checking Historical directory: {historical_dir}")
-                    for item in os.listdir(historical_dir):
-                        item_path = os.path.join(historical_dir, item)
-                        if os.path.isfile(item_path):
-                            # Check if file matches instrument
-                            if instrument in item or instrument_clean in item:
-                                # Prioritize .Last.txt files
-                                if item.endswith('.Last.txt') or item.endswith('.last.txt'):
-                                    tick_files.insert(0, item_path)  # Highest priority
-                                    print(f"[DOWNLOAD_TICK] Found .Last.txt file: {item_path}")
-                                elif item.endswith(('.txt', '.csv', '.Last', '.last')):
-                                    tick_files.append(item_path)
-                    break  # Found the directory, no need to check other paths
-                except Exception as e:
-                    print(f"[DOWNLOAD_TICK] Error reading Historical directory {historical_dir}: {e}")
-                    continue
+                    for item in os.scandir(historical_dir):
+                        if item.is_file() and item.name.endswith(TICK_TEXT_EXTENSIONS):
+                            self._add(entries, item.path, item.name, 'historical')
+                    break
+                except OSError as e:
+                    print(f"[TICK_CATALOG] Error reading Historical directory {historical_dir}: {e}")
         
-        # Check tick subdirectory
+        # db/tick: instrument files, or instrument directories (up to two levels deep)
         tick_dir = os.path.join(db_path, "tick")
         if os.path.exists(tick_dir):
             try:
-                for item in os.listdir(tick_dir):
-                    item_path = os.path.join(tick_dir, item)
-                    found_items.append({
-                        'name': item,
-                        'path': item_path,
-                        'is_dir': os.path.isdir(item_path),
-                        'is_file': os.path.isfile(item_path)
-                    })
-                    
-                    # Check if item matches instrument
-                    if instrument in item or instrument_clean in item:
-                        if os.path.isfile(item_path):
-                            # Prioritize .Last.txt files (most common text format)
-                            if item.endswith('.Last.txt') or item.endswith('.last.txt'):
-                                tick_files.insert(0, item_path)  # Add to beginning (highest priority)
-                            else:
-                                tick_files.append(item_path)
-                        elif os.path.isdir(item_path):
-                            # It's a directory - look inside for files
-                            # NinjaTrader stores tick data in files inside instrument directories
-                            try:
-                                dir_contents = []
-                                for sub_item in os.listdir(item_path):
-                                    sub_item_path = os.path.join(item_path, sub_item)
-                                    is_file = os.path.isfile(sub_item_path)
-                                    is_dir = os.path.isdir(sub_item_path)
-                                    dir_contents.append({
-                                        'name': sub_item,
-                                        'path': sub_item_path,
-                                        'is_file': is_file,
-                                        'is_dir': is_dir,
-                                        'size': os.path.getsize(sub_item_path) if is_file else None
-                                    })
-                                    
-                                    if is_file:
-                                        # Accept ANY file in the directory - NinjaTrader might use various formats
-                                        # Common tick data file patterns
-                                        # NinjaTrader uses: .Last.txt, .Bid.txt, .Ask.txt, .ncd (compressed), or date-based files
-                                        # Priority: .Last.txt files are the most common text format
-                                        if sub_item.endswith('.Last.txt') or sub_item.endswith('.last.txt'):
-                                            tick_files.insert(0, sub_item_path)  # Add .Last.txt files first (highest priority)
-                                        elif any(sub_item.endswith(ext) for ext in ['.txt', '.csv', '.Last', '.last', '.bid', '.ask', '.Bid.txt', '.Ask.txt', '.bin', '.dat', '.ncd']):
-                                            tick_files.append(sub_item_path)
-                                        # Or if it has no extension but matches instrument
-                                        elif instrument in sub_item or instrument_clean in sub_item:
-                                            tick_files.append(sub_item_path)
-                                        # Or if it looks like a date-based file (e.g., 20251228.txt or 20251228)
-                                        elif sub_item.replace('.', '').replace('-', '').replace('_', '').isdigit():
-                                            tick_files.append(sub_item_path)
-                                        # Or if it's a non-empty file (might be tick data), accept it
-                                        elif os.path.getsize(sub_item_path) > 0:
-                                            # Accept any non-empty file as potential tick data
-                                            tick_files.append(sub_item_path)
-                                    elif is_dir:
-                                        # Nested directory - look one level deeper (e.g., by date)
-                                        try:
-                                            for deep_item in os.listdir(sub_item_path):
-                                                deep_item_path = os.path.join(sub_item_path, deep_item)
-                                                if os.path.isfile(deep_item_path):
-                                                    if any(deep_item.endswith(ext) for ext in ['.txt', '.csv', '.Last', '.last', '.bin', '.dat']):
-                                                        tick_files.append(deep_item_path)
-                                                    elif os.path.getsize(deep_item_path) > 0:
-                                                        tick_files.append(deep_item_path)
-                                        except:
-                                            pass
-                                
-                                # Store directory contents for debugging
-                                if not tick_files:
-                                    found_items[-1]['directory_contents'] = dir_contents
-                            except Exception as e:
-                                print(f"[DOWNLOAD_TICK] Error reading directory {item_path}: {e}")
-                                found_items[-1]['error'] = str(e)
-            except Exception as e:
-                print(f"[DOWNLOAD_TICK] Error reading tick directory {tick_dir}: {e}")
-        
-        # Also check root db directory
+                for item in os.scandir(tick_dir):
+                    is_dir = item.is_dir()
+                    tick_dir_items.append({'name': item.name, 'path': item.path, 'is_dir': is_dir, 'is_file': item.is_file()})
+                    if not is_dir:
+                        self._add(entries, item.path, item.name, 'tick')
+                        continue
+                    try:
+                        for sub in os.scandir(item.path):
+                            if sub.is_file():
+                                if sub.name.endswith(TICK_DIR_EXTENSIONS) or sub.stat().st_size > 0:
+                                    self._add(entries, sub.path, item.name, 'tick', in_dir=True)
+                            elif sub.is_dir():
+                                for deep in os.scandir(sub.path):
+                                    if deep.is_file() and (deep.name.endswith(TICK_DIR_EXTENSIONS) or deep.stat().st_size > 0):
+                                        self._add(entries, deep.path, item.name, 'tick', in_dir=True)
+                    except OSError as e:
+                        print(f"[TICK_CATALOG] Error reading directory {item.path}: {e}")
+            except OSError as e:
+                print(f"[TICK_CATALOG] Error reading tick directory {tick_dir}: {e}")
+        
+        # db root: loose text files and '*tick*' directories
         if os.path.exists(db_path):
             try:
-                for item in os.listdir(db_path):
-                    item_path = os.path.join(db_path, item)
-                    if (instrument in item or instrument_clean in item):
-                        if os.path.isfile(item_path) and item.endswith(('.txt', '.csv', '.Last', '.last')):
-                            tick_files.append(item_path)
-                        elif os.path.isdir(item_path) and 'tick' in item.lower():
-                            # Directory that might contain tick data
-                            try:
-                                for sub_item in os.listdir(item_path):
-                                    sub_item_path = os.path.join(item_path, sub_item)
-                                    if os.path.isfile(sub_item_path) and (instrument in sub_item or instrument_clean in sub_item):
-                                        tick_files.append(sub_item_path)
-                            except:
-                                pass
-            except Exception as e:
-                print(f"[DOWNLOAD_TICK] Error reading db directory {db_path}: {e}")
+                for item in os.scandir(db_path):
+                    if item.is_file() and item.name.endswith(TICK_TEXT_EXTENSIONS):
+                        self._add(entries, item.path, item.name, 'db')
+                    elif item.is_dir() and 'tick' in item.name.lower() and item.name != 'tick':
+                        try:
+                            for sub in os.scandir(item.path):
+                                if sub.is_file():
+                                    self._add(entries, sub.path, sub.name, 'db')
+                        except OSError:
+                            pass
+            except OSError as e:
+                print(f"[TICK_CATALOG] Error reading db directory {db_path}: {e}")
+        
+        scan = {
+            'entries': entries,
+            'tick_dir': tick_dir,
+            'tick_dir_items': tick_dir_items,
+            'scanned_at': time.time(),
+            'scan_ms': round((time.perf_counter() - t0) * 1000, 1),
+        }
+        self.scans += 1
+        print(f"[TICK_CATALOG] Scanned {db_path}: {len(entries)} files in {scan['scan_ms']}ms")
+        return scan
+
+    def _get_scan(self, db_path):
+        with self._lock:
+            scan = self._scans.get(db_path)
+            if scan is None:
+                scan = self._scans[db_path] = self._scan(db_path)
+            return scan
+
+    def refresh(self):
+        """Re-probe the db path and rescan every known db directory."""
+        with self._lock:
+            self._db_path_resolved = False
+            paths = set(self._scans)
+            default = self.db_path()
+            if default:
+                paths.add(default)
+            for path in paths:
+                if os.path.exists(path):
+                    self._scans[path] = self._scan(path)
+                else:
+                    self._scans.pop(path, None)
+            live = {e['path'] for scan in self._scans.values() for e in scan['entries']}
+            for path in [p for p in self._spans if p not in live]:
+                del self._spans[path]
+        return self.stats()
+
+    def tick_files(self, instrument, db_path):
+        """Same contract as the old directory walk: (tick_files best first, tick dir items, tick_dir)."""
+        self.lookups += 1
+        instrument_clean = instrument.replace(" ", "_").replace("/", "-")
+        scan = self._get_scan(db_path)
+        matches = [e for e in scan['entries'] if instrument in e['key'] or instrument_clean in e['key']]
+        if not matches and time.time() - scan['scanned_at'] > TICK_CATALOG_MISS_RESCAN_SEC:
+            # The file may have been exported since the last scan
+            with self._lock:
+                scan = self._scans[db_path] = self._scan(db_path)
+            matches = [e for e in scan['entries'] if instrument in e['key'] or instrument_clean in e['key']]
+        matches.sort(key=lambda e: e['priority'])
+        return [e['path'] for e in matches], scan['tick_dir_items'], scan['tick_dir']
+
+    def instruments(self, db_path):
+        """instrument -> {files, formats, size, first, last, coverage} for everything in db_path."""
+        result = {}
+        for entry in self._get_scan(db_path)['entries']:
+            name = _tick_instrument_name(entry)
+            if not name or name.startswith('.'):
+                continue
+            info = result.setdefault(name, {'files': [], 'formats': set(), 'size': 0, 'first': None, 'last': None, 'spans': []})
+            info['files'].append({k: entry[k] for k in ('path', 'format', 'size', 'first', 'last', 'source')})
+            info['formats'].add(entry['format'])
+            info['size'] += entry['size']
+            if entry['first'] and entry['last']:
+                info['spans'].append((entry['first'], entry['last']))
+        for info in result.values():
+            info['formats'] = sorted(info['formats'])
+            coverage = []
+            for first, last in sorted(info.pop('spans')):
+                if coverage and first <= coverage[-1][1]:
+                    coverage[-1][1] = max(coverage[-1][1], last)
+                else:
+                    coverage.append([first, last])
+            info['coverage'] = coverage
+            info['first'] = coverage[0][0] if coverage else None
+            info['last'] = max(c[1] for c in coverage) if coverage else None
+        return result
+
+    def _run(self):
+        try:
+            self.refresh()
+        except Exception as ex:
+            print(f'[TICK_CATALOG] Initial scan error: {ex}')
+        while not self._stop.wait(self.rescan_sec):
+            try:
+                self.refresh()
+            except Exception as ex:
+                print(f'[TICK_CATALOG] Rescan error: {ex}')
+
+    def start(self):
+        if self._thread is None and self.rescan_sec > 0:
+            self._thread = threading.Thread(target=self._run, name='tick-catalog', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'db_path': self._db_path,
+                'scans': self.scans,
+                'lookups': self.lookups,
+                'rescan_sec': self.rescan_sec,
+                'directories': {
+                    path: {'files': len(scan['entries']), 'scanned_at': datetime.fromtimestamp(scan['scanned_at']).isoformat(), 'scan_ms': scan['scan_ms']}
+                    for path, scan in self._scans.items()
+                },
+            }
+
+
+instrument_catalog = InstrumentCatalog(TICK_CATALOG_RESCAN_SEC)
+
+
+def _find_tick_files(instrument, db_path):
+    """Candidate tick files for an instrument, best first: (tick_files, found_items, tick_dir)."""
+    tick_files, tick_dir_items, tick_dir = instrument_catalog.tick_files(instrument, db_path)
+    return tick_files, [dict(item) for item in tick_dir_items], tick_dir
+
+@app.get('/api/data/download-tick')
+@offload('download')
+def download_tick_data(
+    instrument: str = Query(..., description="Instrument symbol (e.g., 'MNQ 03-26')"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    format: str = Query('csv', description="Output format: 'csv', 'ndjson' or 'json' (all streamed)"),
+    db_path_override: Optional[str] = Query(None, description="Override database path (optional)"),
+    max_ticks: Optional[int] = Query(None, description="Maximum number of ticks to return (for large files)"),
+    merge_files: bool = Query(False, description="Merge all matching tick files in time order instead of using the first one with data")
+):
+    """
+    Download historical tick data from NinjaTrader's local database.
+    
+    This endpoint attempts to read tick data from NinjaTrader's data files.
+    Note: The exact file location and format depends on your data feed provider.
+    
+    The response is streamed: ticks are parsed, date-filtered and written in
+    chunks as the client reads, so memory stays flat regardless of file size.
+    """
+    try:
+        # Parse dates
+        start_dt = None
+        end_dt = None
+        if start_date:
+            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+        if end_date:
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+            # Set to end of day
+            end_dt = end_dt.replace(hour=23, minute=59, second=59)
+        
+        fmt = format.lower()
+        if fmt not in TICK_STREAM_FORMATS:
+            return JSONResponse({'error': f"Unsupported format '{format}'", 'formats': list(TICK_STREAM_FORMATS)}, status_code=400)
+        
+        db_path, error = _resolve_tick_db_path(db_path_override)
+        if error is not None:
+            return error
+        
+        instrument_clean = instrument.replace(" ", "_").replace("/", "-")
+        tick_files, found_items, tick_dir = _find_tick_files(instrument, db_path)
         
         if not tick_files:
             # Provide helpful debugging info
@@ -7489,309 +8867,109 @@ async def download_tick_data(
         ncd_files = [f for f in tick_files if f.endswith('.ncd')]
         text_files = [f for f in tick_files if not f.endswith('.ncd')]
         
-        # Read tick data from text files first
-        for file_path in text_files:
+        if not text_files and ncd_files:
+            # .ncd files are NinjaTrader's proprietary binary format
+            # Check if there are exported CSV files in the tick_export directory
+            export_dir = os.path.join(db_path, "tick_export")
+            exported_files = []
+            if os.path.exists(export_dir):
+                try:
+                    for file in os.listdir(export_dir):
+                        if file.startswith(instrument_clean) and file.endswith('.csv'):
+                            exported_files.append(os.path.join(export_dir, file))
+                except:
+                    pass
+            
+            if exported_files:
+                # Use exported CSV files instead
+                text_files = exported_files
+            else:
+                # We cannot read .ncd files directly without NinjaTrader's API
+                return JSONResponse({
+                    'error': 'Tick data in binary format (.ncd)',
+                    'message': f'Found {len(ncd_files)} .ncd files for {instrument}, but these are NinjaTrader\'s proprietary binary format and cannot be read directly.',
+                    'files_found': ncd_files[:10],  # Show first 10 files
+                    'total_ncd_files': len(ncd_files),
+                    'export_directory': export_dir,
+                    'suggestion': 'To export tick data from .ncd files, you can:\n'
+                                  '1. Use the TickDataExporter AddOn in NinjaTrader to export data to CSV format\n'
+                                  '2. Use NinjaTrader\'s Historical Data Manager to export data to CSV/text format\n'
+                                  '3. The exported CSV files will be automatically detected in the tick_export directory'
+                }, status_code=400)
+        
+        # Stream from the first text file that yields data (or from all of them merged in
+        # time order). Only the first tick is read here; the rest is parsed, filtered
+        # and encoded as the client reads.
+        sources = [text_files] if merge_files and len(text_files) > 1 else [[f] for f in text_files]
+        for paths in sources:
+            stats = {'file': paths[0] if len(paths) == 1 else f"{len(paths)} files"}
             try:
-                print(f"[DOWNLOAD_TICK] Reading file: {file_path}")
-                file_size = os.path.getsize(file_path)
-                print(f"[DOWNLOAD_TICK] File size: {file_size / (1024*1024):.2f} MB")
-                
-                max_lines = 1000000  # Limit to 1 million lines to prevent freezing on huge files
-                max_ticks_limit = max_ticks if max_ticks is not None else None  # Store max_ticks parameter in local variable
-                lines_read = 0
-                lines_skipped = 0
-                parse_errors = 0
-                sample_parse_errors = []  # Store first few parse errors for debugging
-                
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line_num, line in enumerate(f, 1):
-                        if line_num > max_lines:
-                            print(f"[DOWNLOAD_TICK] Reached maximum line limit ({max_lines}), stopping read")
-                            break
-                        
-                        # Progress logging every 100k lines
-                        if line_num % 100000 == 0:
-                            print(f"[DOWNLOAD_TICK] Processed {line_num:,} lines, found {len(tick_data):,} valid ticks, {parse_errors:,} parse errors...")
-                        
-                        line = line.strip()
-                        if not line or line.startswith('#'):
-                            lines_skipped += 1
-                            continue
-                        
-                        # Show first few lines for debugging
-                        if line_num <= 5:
-                            print(f"[DOWNLOAD_TICK] Sample line {line_num}: {line[:80]}")
-                        
-                        lines_read = line_num
-                        
-                        # Try to parse different tick data formats
-                        # Format 1: yyyyMMdd HHmmss;price;volume (NinjaTrader .Last.txt standard format)
-                        # Format 2: timestamp,price,volume
-                        # Format 3: yyyyMMdd,HHmmss,price,volume
-                        # Format 4: Unix timestamp,price,volume
-                        
-                        tick_time = None
-                        price = None
-                        volume = 1
-                        
-                        # Try semicolon-separated format first (NinjaTrader standard)
-                        if ';' in line:
-                            parts = line.split(';')
-                            if len(parts) >= 3:
-                                try:
-                                    # Format variations:
-                                    # 1. yyyyMMdd HHmmss;price;volume (simple)
-                                    # 2. yyyyMMdd HHmmss mmmsss;bid;ask;last;volume (with milliseconds and bid/ask/last)
-                                    
-                                    date_time_str = parts[0].strip()
-                                    if line_num <= 5:
-                                        print(f"[DOWNLOAD_TICK] Debug: date_time_str='{date_time_str}', parts count={len(parts)}")
-                                    
-                                    # Check if it has milliseconds component (format 2)
-                                    if ' ' in date_time_str:
-                                        date_parts = date_time_str.split()
-                                        if len(date_parts) >= 3:
-                                            # Format: yyyyMMdd HHmmss mmmsss;bid;ask;last;volume
-                                            date_str = f"{date_parts[0]} {date_parts[1]}"
-                                            # Parse milliseconds/microseconds
-                                            try:
-                                                time_component = int(date_parts[2])
-                                                # The component appears to be in microseconds (e.g., 0160000 = 160000 microseconds = 160ms)
-                                                # Values like 0160000, 0200000 are already in microseconds
-                                                # Use directly as microseconds (ensure it's in valid range 0-999999)
-                                                microseconds = time_component % 1000000
-                                                
-                                                tick_time = datetime.strptime(date_str, "%Y%m%d %H%M%S")
-                                                tick_time = tick_time.replace(microsecond=microseconds)
-                                                
-                                                if line_num <= 5:
-                                                    print(f"[DOWNLOAD_TICK] Debug: time_component={time_component}, microseconds={microseconds}, tick_time={tick_time}")
-                                            except (ValueError, IndexError) as e:
-                                                # If milliseconds parsing fails, just use the date/time
-                                                if line_num <= 5:
-                                                    print(f"[DOWNLOAD_TICK] Error parsing time component: {e}, value: {date_parts[2] if len(date_parts) > 2 else 'N/A'}")
-                                                    import traceback
-                                                    traceback.print_exc()
-                                                tick_time = datetime.strptime(date_str, "%Y%m%d %H%M%S")
-                                            
-                                            # Get Last price (4th field: bid;ask;last;volume)
-                                            # parts[0] = date/time string
-                                            # parts[1] = bid
-                                            # parts[2] = ask
-                                            # parts[3] = last (this is what we want)
-                                            # parts[4] = volume
-                                            if len(parts) >= 4:
-                                                price = float(parts[3].strip())  # Last price
-                                                volume = int(float(parts[4].strip())) if len(parts) > 4 and parts[4].strip() else 1
-                                                if line_num <= 5:
-                                                    print(f"[DOWNLOAD_TICK] Debug: Parsed tick - time={tick_time}, price={price}, volume={volume}")
-                                            else:
-                                                # Fallback to first price if structure is different
-                                                price = float(parts[1].strip())
-                                                volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                                if line_num <= 5:
-                                                    print(f"[DOWNLOAD_TICK] Debug: Using fallback - price={price}, volume={volume}")
-                                        elif len(date_parts) == 2:
-                                            # Format: yyyyMMdd HHmmss;price;volume (simple format)
-                                            tick_time = datetime.strptime(date_time_str, "%Y%m%d %H%M%S")
-                                            price = float(parts[1].strip())
-                                            volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                        else:
-                                            raise ValueError("Unexpected date format")
-                                    elif len(date_time_str) == 14:
-                                        # Format: yyyyMMddHHmmss (no space)
-                                        tick_time = datetime.strptime(date_time_str, "%Y%m%d%H%M%S")
-                                        price = float(parts[1].strip())
-                                        volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                    else:
-                                        # Try as Unix timestamp
-                                        tick_time = datetime.fromtimestamp(float(date_time_str))
-                                        price = float(parts[1].strip())
-                                        volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                except (ValueError, IndexError) as e:
-                                    # Skip this line, try comma format below
-                                    if line_num <= 10:  # Log first few errors
-                                        print(f"[DOWNLOAD_TICK] Parse error on line {line_num}: {e}, line: {line[:60]}")
-                                        import traceback
-                                        traceback.print_exc()
-                                    parse_errors += 1
-                                    if len(sample_parse_errors) < 5:
-                                        sample_parse_errors.append(f"Line {line_num}: {str(e)} - {line[:60]}")
-                                    pass
-                        
-                        # Try comma-separated format
-                        if tick_time is None and ',' in line:
-                            parts = line.split(',')
-                            if len(parts) >= 2:
-                                try:
-                                    if ' ' in parts[0] and len(parts[0].strip()) >= 15:
-                                        # Format: yyyyMMdd HHmmss,price,volume
-                                        tick_time = datetime.strptime(parts[0].strip(), "%Y%m%d %H%M%S")
-                                        price = float(parts[1].strip())
-                                        volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                    else:
-                                        # Unix timestamp format
-                                        tick_time = datetime.fromtimestamp(float(parts[0].strip()))
-                                        price = float(parts[1].strip())
-                                        volume = int(float(parts[2].strip())) if len(parts) > 2 and parts[2].strip() else 1
-                                except (ValueError, IndexError):
-                                    pass
-                        
-                        # Try space-separated format
-                        if tick_time is None:
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                try:
-                                    if len(parts) >= 3 and ' ' in f"{parts[0]} {parts[1]}":
-                                        # Format: yyyyMMdd HHmmss price volume
-                                        tick_time = datetime.strptime(f"{parts[0]} {parts[1]}", "%Y%m%d %H%M%S")
-                                        price = float(parts[2])
-                                        volume = int(float(parts[3])) if len(parts) > 3 else 1
-                                    else:
-                                        # Unix timestamp
-                                        tick_time = datetime.fromtimestamp(float(parts[0]))
-                                        price = float(parts[1])
-                                        volume = int(float(parts[2])) if len(parts) > 2 else 1
-                                except (ValueError, IndexError):
-                                    pass
-                        
-                        # If we successfully parsed the line
-                        if tick_time is not None and price is not None:
-                            # Filter by date range
-                            if start_dt and tick_time < start_dt:
-                                continue
-                            if end_dt and tick_time > end_dt:
-                                continue
-                            
-                            tick_data.append({
-                                'timestamp': tick_time.isoformat(),
-                                'price': price,
-                                'volume': volume
-                            })
-                            
-                            # Limit results if max_ticks parameter is specified
-                            if max_ticks_limit and len(tick_data) >= max_ticks_limit:
-                                print(f"[DOWNLOAD_TICK] Reached max_ticks limit ({max_ticks_limit}), stopping read")
-                                break
-                        
-                        # If parsing failed, skip the line silently (we already tried all formats)
-                        if tick_time is None:
-                            parse_errors += 1
-                            if len(sample_parse_errors) < 5:
-                                sample_parse_errors.append(f"Line {line_num}: {line[:60]}")
-                
-                print(f"[DOWNLOAD_TICK] Finished reading file. Total lines: {lines_read:,}, Valid ticks: {len(tick_data):,}, Parse errors: {parse_errors:,}, Skipped: {lines_skipped:,}")
-                if parse_errors > 0 and len(tick_data) == 0:
-                    print(f"[DOWNLOAD_TICK] WARNING: All lines failed to parse. Sample errors:")
-                    for err in sample_parse_errors:
-                        print(f"  {err}")
-                
-                # If we found data, break (use first file that has data)
-                if tick_data:
-                    break
+                print(f"[DOWNLOAD_TICK] Reading {', '.join(paths)} ({sum(os.path.getsize(f) for f in paths) / (1024*1024):.2f} MB)")
+                if len(paths) == 1:
+                    ticks = tick_cache.iter_ticks(paths[0], start_dt, end_dt, stats)
+                else:
+                    ticks = tick_cache.iter_merged(paths, start_dt, end_dt, stats)
+                first = next(ticks, None)
             except Exception as e:
-                print(f"[DOWNLOAD_TICK] Error reading {file_path}: {e}")
-                import traceback
-                traceback.print_exc()
+                print(f"[DOWNLOAD_TICK] Error reading {', '.join(paths)}: {e}")
+                continue
+            if first is None:
+                print(f"[DOWNLOAD_TICK] No ticks in range. Total lines: {stats.get('lines', 0):,}, Parse errors: {stats.get('parse_errors', 0):,}, Skipped: {stats.get('skipped', 0):,}")
+                if stats.get('parse_errors'):
+                    print(f"[DOWNLOAD_TICK] WARNING: All lines failed to parse or fell outside the range. Sample errors:")
+                    for err in stats.get('sample_parse_errors', []):
+                        print(f"  {err}")
                 continue
+            
+            meta = {'instrument': instrument, 'start_date': start_date, 'end_date': end_date}
+            cached = all(f.get('sidecar') for f in stats.get('files', [stats]))
+            headers = {'X-Tick-File': ', '.join(os.path.basename(f) for f in paths), 'X-Tick-Cache': 'hit' if cached else 'miss'}
+            if fmt != 'json':
+                ext = 'csv' if fmt == 'csv' else 'ndjson'
+                filename = f"{instrument_clean}_tick_data_{start_date or 'all'}_{end_date or 'all'}.{ext}"
+                headers['Content-Disposition'] = f"attachment; filename={filename}"
+            return StreamingResponse(
+                _tick_stream(itertools.chain([first], ticks), fmt, meta, stats, max_ticks),
+                media_type=TICK_STREAM_FORMATS[fmt],
+                headers=headers
+            )
         
         # If no data was parsed, provide helpful error message
-        if not tick_data:
-            # Check if we tried to read text files
-            if text_files:
-                # We found text files but couldn't parse them
-                # Try to read a sample line to show the format
-                sample_line = None
-                if text_files:
-                    try:
-                        with open(text_files[0], 'r', encoding='utf-8', errors='ignore') as f:
-                            for i, line in enumerate(f):
-                                if i >= 5:  # Get a few sample lines
-                                    break
-                                line = line.strip()
-                                if line and not line.startswith('#'):
-                                    sample_line = line[:100]  # First 100 chars
-                                    break
-                    except:
-                        pass
-                
-                return JSONResponse({
-                    'error': 'No tick data parsed',
-                    'message': f'Found text file(s) but could not parse any tick data. This might indicate a format issue.',
-                    'text_files_found': text_files,
-                    'sample_line': sample_line,
-                    'suggestion': 'Please check the file format. Expected formats:\n'
-                                  '- yyyyMMdd HHmmss;price;volume (semicolon-separated)\n'
-                                  '- yyyyMMdd HHmmss,price,volume (comma-separated)\n'
-                                  '- Unix timestamp,price,volume'
-                }, status_code=400)
-            
-            # Check for .ncd files
-            if ncd_files:
-                # .ncd files are NinjaTrader's proprietary binary format
-                # Check if there are exported CSV files in the tick_export directory
-                export_dir = os.path.join(db_path, "tick_export")
-                exported_files = []
-                if os.path.exists(export_dir):
-                    try:
-                        for file in os.listdir(export_dir):
-                            if file.startswith(instrument.replace(" ", "_").replace("/", "-")) and file.endswith('.csv'):
-                                exported_files.append(os.path.join(export_dir, file))
-                    except:
-                        pass
-                
-                if exported_files:
-                    # Use exported CSV files instead
-                    tick_files = exported_files
-                    # Continue to read from CSV files (code below will handle this)
-                else:
-                    # .ncd files are NinjaTrader's proprietary binary format
-                    # We cannot read them directly without NinjaTrader's API
-                    return JSONResponse({
-                        'error': 'Tick data in binary format (.ncd)',
-                        'message': f'Found {len(ncd_files)} .ncd files for {instrument}, but these are NinjaTrader\'s proprietary binary format and cannot be read directly.',
-                        'files_found': ncd_files[:10],  # Show first 10 files
-                        'total_ncd_files': len(ncd_files),
-                        'export_directory': export_dir,
-                        'suggestion': 'To export tick data from .ncd files, you can:\n'
-                                      '1. Use the TickDataExporter AddOn in NinjaTrader to export data to CSV format\n'
-                                      '2. Use NinjaTrader\'s Historical Data Manager to export data to CSV/text format\n'
-                                      '3. The exported CSV files will be automatically detected in the tick_export directory'
-                    }, status_code=400)
+        if text_files:
+            # We found text files but couldn't parse them
+            # Try to read a sample line to show the format
+            sample_line = None
+            try:
+                with open(text_files[0], 'r', encoding='utf-8', errors='ignore') as f:
+                    for i, line in enumerate(f):
+                        if i >= 5:  # Get a few sample lines
+                            break
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            sample_line = line[:100]  # First 100 chars
+                            break
+            except:
+                pass
             
-            # No files found at all
             return JSONResponse({
-                'error': 'No tick data found',
-                'message': f'No tick data found for {instrument} in the specified date range.',
-                'files_checked': tick_files,
-                'text_files': text_files,
-                'ncd_files': ncd_files[:10] if ncd_files else []
-            }, status_code=404)
-        
-        # Return data in requested format
-        if format.lower() == 'json':
-            return JSONResponse({
-                'instrument': instrument,
-                'count': len(tick_data),
-                'start_date': start_date,
-                'end_date': end_date,
-                'data': tick_data
-            })
-        else:
-            # CSV format
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=['timestamp', 'price', 'volume'])
-            writer.writeheader()
-            for tick in tick_data:
-                writer.writerow(tick)
-            output.seek(0)
-            
-            filename = f"{instrument_clean}_tick_data_{start_date or 'all'}_{end_date or 'all'}.csv"
-            return StreamingResponse(
-                iter([output.getvalue()]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
+                'error': 'No tick data parsed',
+                'message': f'Found text file(s) but could not parse any tick data. This might indicate a format issue.',
+                'text_files_found': text_files,
+                'sample_line': sample_line,
+                'suggestion': 'Please check the file format. Expected formats:\n'
+                              '- yyyyMMdd HHmmss;price;volume (semicolon-separated)\n'
+                              '- yyyyMMdd HHmmss,price,volume (comma-separated)\n'
+                              '- Unix timestamp,price,volume'
+            }, status_code=400)
+        
+        # No files found at all
+        return JSONResponse({
+            'error': 'No tick data found',
+            'message': f'No tick data found for {instrument} in the specified date range.',
+            'files_checked': tick_files,
+            'text_files': text_files,
+            'ncd_files': ncd_files[:10] if ncd_files else []
+        }, status_code=404)
     
     except Exception as ex:
         import traceback
@@ -7802,15 +8980,327 @@ async def download_tick_data(
             'trace': error_trace
         }, status_code=500)
 
+def _resample_tick_bars(instrument, start_date, end_date, bar_type, timeframe, size, symbol, db_path_override):
+    """Resample an instrument's ticks into bar_samples rows: (result, None) or (None, error JSONResponse)."""
+    if tick_bars is None:
+        return None, JSONResponse({'error': 'numpy is required for tick resampling (pip install numpy)'}, status_code=501)
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if end_date else None
+    bar_type = bar_type.lower()
+    if bar_type not in tick_bars.BAR_TYPES:
+        return None, JSONResponse({'error': f"Unsupported bar_type '{bar_type}'", 'bar_types': list(tick_bars.BAR_TYPES)}, status_code=400)
+    try:
+        bar_size = tick_bars.parse_timeframe(timeframe) if bar_type == 'time' else int(size or 0)
+    except ValueError:
+        return None, JSONResponse({'error': f"Invalid timeframe '{timeframe}'", 'timeframes': list(tick_bars.TIMEFRAMES)}, status_code=400)
+    if bar_size <= 0:
+        return None, JSONResponse({'error': f'size (ticks or contracts per bar) is required for {bar_type} bars'}, status_code=400)
+    
+    db_path, error = _resolve_tick_db_path(db_path_override)
+    if error is not None:
+        return None, error
+    tick_files, _, _ = _find_tick_files(instrument, db_path)
+    text_files = [f for f in tick_files if not f.endswith('.ncd')]
+    if not text_files:
+        return None, JSONResponse({'error': 'Tick data file not found', 'message': f'No text tick files found for instrument: {instrument}'}, status_code=404)
+    
+    t0 = time.perf_counter()
+    for file_path in text_files:
+        cols = tick_cache.load_arrays(file_path, start_dt, end_dt)
+        if len(cols['ts']):
+            break
+    else:
+        return None, JSONResponse({'error': 'No tick data found', 'message': f'No ticks for {instrument} in the specified date range.', 'files_checked': text_files}, status_code=404)
+    t1 = time.perf_counter()
+    bars = tick_bars.resample(cols['ts'], cols['price'], cols['volume'], bar_type, bar_size)
+    rows = tick_bars.to_bar_samples(bars, symbol or instrument.split()[0], tick_bars.bar_numbers(bars, bar_type, bar_size))
+    t2 = time.perf_counter()
+    print(f"[RESAMPLE_TICK] {instrument} {bar_type}/{bar_size}: {len(cols['ts']):,} ticks -> {len(rows):,} bars (load {(t1-t0)*1000:.0f}ms, resample {(t2-t1)*1000:.0f}ms)")
+    return {
+        'instrument': instrument,
+        'file': os.path.basename(file_path),
+        'bar_type': bar_type,
+        'size': bar_size,
+        'ticks': int(len(cols['ts'])),
+        'count': len(rows),
+        'load_ms': round((t1 - t0) * 1000, 1),
+        'resample_ms': round((t2 - t1) * 1000, 1),
+        'bars': rows,
+    }, None
+
+
+@app.get('/api/data/resample-tick')
+@offload('analytics')
+def resample_tick_data(
+    instrument: str = Query(..., description="Instrument symbol (e.g., 'MNQ 03-26')"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    bar_type: str = Query('time', description="'time', 'tick' or 'volume'"),
+    timeframe: str = Query('1m', description="Time bar period: 30s, 1m, 3m, 5m (or seconds)"),
+    size: Optional[int] = Query(None, description="Ticks per bar (tick bars) or contracts per bar (volume bars)"),
+    symbol: Optional[str] = Query(None, description="bar_samples symbol (defaults to the instrument root, e.g. MNQ)"),
+    format: str = Query('json', description="Output format: 'json' or 'csv'"),
+    db_path_override: Optional[str] = Query(None, description="Override database path (optional)")
+):
+    """Resample tick data into OHLCV bars shaped like volatility.db bar_samples rows."""
+    try:
+        result, error = _resample_tick_bars(instrument, start_date, end_date, bar_type, timeframe, size, symbol, db_path_override)
+        if error is not None:
+            return error
+        if format.lower() == 'csv':
+            output = io.StringIO()
+            writer = csv.DictWriter(output, fieldnames=list(tick_bars.BAR_SAMPLE_COLUMNS))
+            writer.writeheader()
+            writer.writerows(result['bars'])
+            filename = f"{instrument.replace(' ', '_').replace('/', '-')}_{result['bar_type']}_{result['size']}_bars.csv"
+            return StreamingResponse(
+                iter([output.getvalue()]),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
+        return JSONResponse(result)
+    except Exception as ex:
+        print(f'[RESAMPLE_TICK] Error: {ex}')
+        return JSONResponse({'error': str(ex)}, status_code=500)
+
+
+@app.post('/api/data/resample-tick/import')
+@offload('ingest')
+def import_resampled_tick_bars(
+    instrument: str = Query(..., description="Instrument symbol (e.g., 'MNQ 03-26')"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    bar_type: str = Query('time', description="'time', 'tick' or 'volume'"),
+    timeframe: str = Query('1m', description="Time bar period: 30s, 1m, 3m, 5m (or seconds)"),
+    size: Optional[int] = Query(None, description="Ticks per bar (tick bars) or contracts per bar (volume bars)"),
+    symbol: Optional[str] = Query(None, description="bar_samples symbol (defaults to the instrument root, e.g. MNQ)"),
+    db_path_override: Optional[str] = Query(None, description="Override database path (optional)")
+):
+    """Resample tick data and insert the bars into volatility.db bar_samples."""
+    try:
+        result, error = _resample_tick_bars(instrument, start_date, end_date, bar_type, timeframe, size, symbol, db_path_override)
+        if error is not None:
+            return error
+        # bar_index differs from record-bar's (and tick/volume bars are numbered by position in the
+        # range), so the (symbol, timestamp, bar_index) unique index alone misses overlaps; skip bars
+        # already stored for this symbol/timestamp
+        # (idx_bar_samples_timestamp keeps the probe cheap) so re-imports are idempotent.
+        columns = tick_bars.BAR_SAMPLE_COLUMNS
+        sql = (f"INSERT INTO bar_samples ({', '.join(columns)}) SELECT {', '.join('?' * len(columns))} "
+               f"WHERE NOT EXISTS (SELECT 1 FROM bar_samples WHERE timestamp = ? AND symbol = ?)")
+        with volatility_db.write() as conn:
+            cursor = conn.executemany(sql, [tuple(row[c] for c in columns) + (row['timestamp'], row['symbol']) for row in result['bars']])
+            inserted = cursor.rowcount
+            if inserted:
+                volatility_stats_table.refresh(cursor, [(row['symbol'], row['quarter_hour']) for row in result['bars']])
+        print(f"[RESAMPLE_TICK] Imported {inserted:,}/{result['count']:,} bars into bar_samples")
+        result.pop('bars')
+        result['inserted'] = inserted
+        result['skipped'] = result['count'] - inserted
+        return JSONResponse(result)
+    except Exception as ex:
+        print(f'[RESAMPLE_TICK] Import error: {ex}')
+        return JSONResponse({'error': str(ex)}, status_code=500)
+
+TICK_INGEST_WORKERS = int(os.environ.get('TICK_INGEST_WORKERS', str(os.cpu_count() or 2)))
+TICK_INGEST_KEEP_JOBS = int(os.environ.get('TICK_INGEST_KEEP_JOBS', '20'))
+
+
+class TickIngestJob:
+    """Bulk build of tick sidecars for several instruments, tracked per file."""
+
+    def __init__(self, job_id, instruments, start_dt, end_dt, db_path):
+        self.id = job_id
+        self.instruments = instruments
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.db_path = db_path
+        self.state = 'queued'
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.files = []           # one dict per tick file, updated as workers finish
+        self.coverage = {}        # instrument -> time-ordered merge summary
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        # Lookups are served from the instrument catalog, no directory walks
+        for instrument in self.instruments:
+            for path in _find_tick_files(instrument, self.db_path)[0]:
+                if path.endswith('.ncd'):
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                self.files.append({'instrument': instrument, 'path': path, 'size': size, 'state': 'pending'})
+
+    def run(self):
+        self.state = 'running'
+        self.started = time.time()
+        try:
+            self._discover()
+            print(f"[TICK_INGEST] Job {self.id}: {len(self.files)} files for {', '.join(self.instruments)}")
+            pool = _get_tick_ingest_pool()
+            futures = {}
+            # Largest files first so the long parses start early
+            for entry in sorted(self.files, key=lambda f: -f['size']):
+                entry['state'] = 'running'
+                futures[pool.submit(build_sidecar, entry['path'])] = entry
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as ex:
+                    summary = {'error': str(ex)}
+                with self._lock:
+                    if summary.get('error'):
+                        entry.update(state='error', error=summary['error'])
+                    else:
+                        entry.update(state='done', **{k: summary[k] for k in ('ticks', 'first', 'last', 'built', 'elapsed_ms')})
+                print(f"[TICK_INGEST] Job {self.id}: {os.path.basename(entry['path'])} {entry['state']} ({entry.get('ticks', 0):,} ticks)")
+            self._merge()
+            self.state = 'done' if not any(f['state'] == 'error' for f in self.files) else 'done_with_errors'
+        except Exception as ex:
+            print(f"[TICK_INGEST] Job {self.id} failed: {ex}")
+            self.state = 'error'
+            self.error = str(ex)
+        finally:
+            self.finished = time.time()
+
+    def _merge(self):
+        """Order each instrument's files by first tick and count ticks in the date range."""
+        for instrument in self.instruments:
+            done = sorted((f for f in self.files if f['instrument'] == instrument and f['state'] == 'done' and f['ticks']),
+                          key=lambda f: f['first'])
+            in_range = 0
+            for entry in done:
+                sidecar = tick_cache.acquire(entry['path'])
+                if sidecar is None:
+                    continue
+                try:
+                    if sidecar.sorted:
+                        lo, hi = sidecar.range(self.start_dt, self.end_dt)
+                        in_range += hi - lo
+                    else:
+                        in_range += sum(1 for _ in sidecar.iter_ticks(self.start_dt, self.end_dt))
+                finally:
+                    sidecar.release()
+            overlaps = sum(1 for a, b in zip(done, done[1:]) if b['first'] <= a['last'])
+            self.coverage[instrument] = {
+                'files': [f['path'] for f in done],
+                'first': done[0]['first'] if done else None,
+                'last': max(f['last'] for f in done) if done else None,
+                'ticks_in_range': in_range,
+                'overlapping_files': overlaps,
+            }
+
+    def to_dict(self):
+        with self._lock:
+            files = [dict(f) for f in self.files]
+        total = sum(f['size'] for f in files)
+        done = sum(f['size'] for f in files if f['state'] in ('done', 'error'))
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'error': self.error,
+            'instruments': self.instruments,
+            'start_date': self.start_dt.date().isoformat() if self.start_dt else None,
+            'end_date': self.end_dt.date().isoformat() if self.end_dt else None,
+            'files_total': len(files),
+            'files_done': sum(1 for f in files if f['state'] in ('done', 'error')),
+            'bytes_total': total,
+            'progress_pct': round(done * 100.0 / total, 1) if total else (100.0 if self.finished else 0.0),
+            'ticks_total': sum(f.get('ticks', 0) for f in files),
+            'elapsed_sec': round((self.finished or time.time()) - self.started, 2) if self.started else None,
+            'files': files,
+            'coverage': self.coverage,
+        }
+
+
+tick_ingest_jobs = OrderedDict()
+_tick_ingest_pool = None
+_tick_ingest_pool_lock = threading.Lock()
+
+
+def _get_tick_ingest_pool():
+    global _tick_ingest_pool
+    with _tick_ingest_pool_lock:
+        if _tick_ingest_pool is None:
+            _tick_ingest_pool = ProcessPoolExecutor(max_workers=TICK_INGEST_WORKERS)
+            print(f'[TICK_INGEST] Process pool started with {TICK_INGEST_WORKERS} workers')
+        return _tick_ingest_pool
+
+
+@app.post('/api/data/tick-ingest')
+async def start_tick_ingest(request: Request):
+    """Start a bulk tick ingestion job.
+
+    Body: {"instruments": ["MNQ 03-26", "ES 03-26"], "start_date": "YYYY-MM-DD",
+           "end_date": "YYYY-MM-DD", "db_path_override": null}
+    Every matching text tick file is parsed into its binary sidecar in a process
+    pool; poll GET /api/data/tick-ingest/{job_id} for per-file progress.
+    """
+    try:
+        data = await request.json()
+    except Exception:
+        return JSONResponse({'error': 'Invalid JSON'}, status_code=400)
+    try:
+        instruments = data.get('instruments') or ([data['instrument']] if data.get('instrument') else [])
+        if isinstance(instruments, str):
+            instruments = [i.strip() for i in instruments.split(',') if i.strip()]
+        if not instruments:
+            return JSONResponse({'error': 'instruments is required'}, status_code=400)
+        try:
+            start_dt = datetime.strptime(data['start_date'], '%Y-%m-%d') if data.get('start_date') else None
+            end_dt = datetime.strptime(data['end_date'], '%Y-%m-%d').replace(hour=23, minute=59, second=59) if data.get('end_date') else None
+        except ValueError as ex:
+            return JSONResponse({'error': f'Invalid date: {ex}'}, status_code=400)
+        db_path, error = await run_blocking('download', _resolve_tick_db_path, data.get('db_path_override'))
+        if error is not None:
+            return error
+        
+        job = TickIngestJob(hashlib.sha1(f"{time.time()}{instruments}".encode()).hexdigest()[:12], instruments, start_dt, end_dt, db_path)
+        tick_ingest_jobs[job.id] = job
+        while len(tick_ingest_jobs) > TICK_INGEST_KEEP_JOBS:
+            oldest = next(iter(tick_ingest_jobs.values()))
+            if oldest.finished is None:
+                break
+            tick_ingest_jobs.popitem(last=False)
+        threading.Thread(target=job.run, name=f'tick-ingest-{job.id}', daemon=True).start()
+        return JSONResponse({'job_id': job.id, 'state': job.state, 'status_url': f'/api/data/tick-ingest/{job.id}'})
+    except Exception as ex:
+        print(f'[TICK_INGEST] Error: {ex}')
+        return JSONResponse({'error': str(ex)}, status_code=500)
+
+
+@app.get('/api/data/tick-ingest')
+async def list_tick_ingest_jobs():
+    return JSONResponse({'jobs': [{k: v for k, v in job.to_dict().items() if k not in ('files', 'coverage')}
+                                  for job in reversed(tick_ingest_jobs.values())]})
+
+
+@app.get('/api/data/tick-ingest/{job_id}')
+async def tick_ingest_status(job_id: str):
+    job = tick_ingest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({'error': 'Unknown job', 'job_id': job_id}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+
 @app.get('/api/data/find-db-path')
-async def find_db_path_diagnostic():
+@offload('download')
+def find_db_path_diagnostic():
     """
     Diagnostic endpoint to help find the NinjaTrader database directory.
     Returns information about paths checked and suggestions.
     """
     try:
-        # Try to find the path
+        # Re-probe (this endpoint is the diagnostic) and update the catalog's cached path
         db_path = find_ninjatrader_db_directory()
+        if db_path != instrument_catalog.db_path():
+            instrument_catalog.refresh()
         
         # Get all paths we checked
         checked_paths = []
@@ -7890,54 +9380,24 @@ async def find_db_path_diagnostic():
         }, status_code=500)
 
 @app.get('/api/data/list-instruments')
-async def list_available_instruments(
+@offload('download')
+def list_available_instruments(
     db_path_override: Optional[str] = Query(None, description="Override database path (optional)")
 ):
     """
     List available instruments with tick data in NinjaTrader's database.
     """
     try:
-        # Find database path
-        if db_path_override:
-            db_path = db_path_override
-            if not os.path.exists(db_path):
-                return JSONResponse({
-                    'error': 'Specified database path does not exist',
-                    'path': db_path
-                }, status_code=404)
-        else:
-            db_path = find_ninjatrader_db_directory()
-            if db_path is None:
-                return JSONResponse({
-                    'error': 'NinjaTrader database directory not found',
-                    'message': 'Use db_path_override parameter to specify the path manually.',
-                    'suggestion': 'The database is typically located at: [Your Documents]/NinjaTrader 8/db'
-                }, status_code=404)
-        
-        instruments = set()
-        
-        # Check tick directory
-        tick_dir = os.path.join(db_path, "tick")
-        if os.path.exists(tick_dir):
-            for file in os.listdir(tick_dir):
-                # Extract instrument name from filename
-                # Format: "MNQ 03-26.Last.txt" -> "MNQ 03-26"
-                name = file.replace('.Last.txt', '').replace('.txt', '').replace('_', ' ')
-                if name:
-                    instruments.add(name)
-        
-        # Also check root directory
-        if os.path.exists(db_path):
-            for file in os.listdir(db_path):
-                if file.endswith(('.Last', '.txt', '.csv')):
-                    name = file.replace('.Last', '').replace('.txt', '').replace('.csv', '').replace('_', ' ')
-                    if name and not name.startswith('.'):
-                        instruments.add(name)
+        db_path, error = _resolve_tick_db_path(db_path_override)
+        if error is not None:
+            return error
         
+        details = instrument_catalog.instruments(db_path)
         return JSONResponse({
             'db_path': db_path,
-            'instruments': sorted(list(instruments)),
-            'count': len(instruments)
+            'instruments': sorted(details),
+            'count': len(details),
+            'details': details
         })
     
     except Exception as ex:
@@ -7949,21 +9409,85 @@ async def list_available_instruments(
             'trace': error_trace
         }, status_code=500)
 
+@app.get('/api/data/instrument-catalog')
+@offload('download')
+def get_instrument_catalog(
+    instrument: Optional[str] = Query(None, description="Only this instrument (optional)"),
+    db_path_override: Optional[str] = Query(None, description="Override database path (optional)")
+):
+    """Cached tick file catalog: per-instrument files (size, format, first/last tick) and date coverage."""
+    try:
+        db_path, error = _resolve_tick_db_path(db_path_override)
+        if error is not None:
+            return error
+        details = instrument_catalog.instruments(db_path)
+        if instrument:
+            details = {name: info for name, info in details.items() if instrument in name}
+        return JSONResponse({'db_path': db_path, 'instruments': details, 'catalog': instrument_catalog.stats()})
+    except Exception as ex:
+        print(f'[TICK_CATALOG] Error: {ex}')
+        return JSONResponse({'error': str(ex)}, status_code=500)
+
+
+@app.post('/api/data/instrument-catalog/refresh')
+@offload('download')
+def refresh_instrument_catalog():
+    """Re-probe the NinjaTrader db path and rescan tick files now."""
+    try:
+        return JSONResponse(instrument_catalog.refresh())
+    except Exception as ex:
+        print(f'[TICK_CATALOG] Refresh error: {ex}')
+        return JSONResponse({'error': str(ex)}, status_code=500)
+
 @app.on_event("startup")
 async def startup_event():
     """Run migrations and initialization on server startup."""
+    init_db()
+    init_bars_db()
+    ensure_db_columns()
+    load_overrides_from_disk()
+    _load_recent_diags_from_db()
+    instrument_catalog.start()
+    try:
+        # Versioned volatility.db migrations run once here so the ingest paths skip schema checks
+        with volatility_db.write() as conn:
+            applied = migrate_volatility_db(conn)
+        volatility_db.forget_schema()
+        if applied:
+            print(f'[STARTUP] volatility.db migrated to v{applied[-1]}')
+    except Exception as mig_ex:
+        # Don't fail startup if migration fails - ingest reports the missing table/columns
+        print(f'[STARTUP] Migration warning: {mig_ex}')
     try:
-        # Run volatility database migration
+        with volatility_db.write() as conn:
+            if ensure_aggregate_maintenance(conn.cursor()):
+                print('[STARTUP] volatility_stats rebuilt; now maintained incrementally on insert')
+    except Exception as agg_ex:
+        print(f'[STARTUP] Volatility aggregate setup warning: {agg_ex}')
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush write-behind queues before the process exits."""
+    for writer in (state_writer, diags_writer):
         try:
-            from migrate_volatility_db import migrate_volatility_db
-            migrate_volatility_db()
-        except ImportError:
-            print('[STARTUP] Migration module not found, skipping')
-        except Exception as mig_ex:
-            print(f'[STARTUP] Migration warning: {mig_ex}')
-    except Exception as ex:
-        print(f'[STARTUP] Startup event error: {ex}')
-        # Don't fail startup if migration fails - might be first run or other issue
+            writer.stop(timeout=10.0)
+        except Exception as ex:
+            print(f'[SHUTDOWN] {writer.name} writer flush error: {ex}')
+    log_catalog.stop()
+    instrument_catalog.stop()
+    tick_cache.close()
+    if _tick_ingest_pool is not None:
+        _tick_ingest_pool.shutdown(wait=False, cancel_futures=True)
+    if _sweep_pool is not None:
+        _sweep_pool.shutdown(wait=False, cancel_futures=True)
+    _bar_parse_executor.shutdown(wait=False, cancel_futures=True)
+    for pool in WORK_POOLS.values():
+        pool.shutdown()
+    for db in DATABASES.values():
+        try:
+            db.close()
+        except Exception as ex:
+            print(f'[SHUTDOWN] {db.label} close error: {ex}')
 
 if __name__ == '__main__':
     import uvicorn
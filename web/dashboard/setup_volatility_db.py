@@ -20,6 +20,15 @@ def create_database():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    create_tables(cursor)
+    ensure_aggregate_maintenance(cursor)
+    
+    conn.commit()
+    conn.close()
+    print(f"Volatility database created/verified at: {DB_PATH}")
+
+def create_tables(cursor):
+    """Create the base volatility tables and indexes (idempotent)."""
     # Table for aggregated volatility statistics by quarter hour (15 minutes)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS volatility_stats (
@@ -47,6 +56,12 @@ def create_database():
             -- Sample count for confidence
             sample_count INTEGER DEFAULT 0,
             
+            -- Running sums behind the averages (maintained by trg_bar_samples_stats)
+            sum_volume REAL DEFAULT 0,
+            sum_bar_range REAL DEFAULT 0,
+            sum_range_per_1k REAL DEFAULT 0,
+            range_per_1k_count INTEGER DEFAULT 0,
+            
             -- Timestamps
             first_sample_time TEXT,
             last_sample_time TEXT,
@@ -145,10 +160,120 @@ def create_database():
             UNIQUE(hour_of_day, day_of_week, symbol, volume_condition)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
-    print(f"Volatility database created/verified at: {DB_PATH}")
+
+# Running-sum columns on volatility_stats used for incremental maintenance
+AGGREGATE_SUM_COLUMNS = (
+    ('sum_volume', 'REAL DEFAULT 0'),
+    ('sum_bar_range', 'REAL DEFAULT 0'),
+    ('sum_range_per_1k', 'REAL DEFAULT 0'),
+    ('range_per_1k_count', 'INTEGER DEFAULT 0'),
+)
+
+# Every inserted bar sample is folded into two volatility_stats rows: its own
+# (symbol, quarter_hour, day_of_week) row and the all-days row (day_of_week NULL).
+# NULLs never collide in the UNIQUE constraint, so rows are matched with IS, not upserted.
+_STATS_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS trg_bar_samples_stats AFTER INSERT ON bar_samples
+    WHEN NEW.quarter_hour IS NOT NULL
+    BEGIN
+        INSERT INTO volatility_stats (hour_of_day, quarter_hour, day_of_week, symbol, sample_count)
+        SELECT NEW.quarter_hour / 4, NEW.quarter_hour, NEW.day_of_week, NEW.symbol, 0
+        WHERE NOT EXISTS (SELECT 1 FROM volatility_stats WHERE quarter_hour = NEW.quarter_hour
+                          AND day_of_week IS NEW.day_of_week AND symbol = NEW.symbol);
+        INSERT INTO volatility_stats (hour_of_day, quarter_hour, day_of_week, symbol, sample_count)
+        SELECT NEW.quarter_hour / 4, NEW.quarter_hour, NULL, NEW.symbol, 0
+        WHERE NOT EXISTS (SELECT 1 FROM volatility_stats WHERE quarter_hour = NEW.quarter_hour
+                          AND day_of_week IS NULL AND symbol = NEW.symbol);
+        UPDATE volatility_stats SET
+            sample_count = sample_count + 1,
+            sum_volume = COALESCE(sum_volume, 0) + COALESCE(NEW.volume, 0),
+            avg_volume = (COALESCE(sum_volume, 0) + COALESCE(NEW.volume, 0)) * 1.0 / (sample_count + 1),
+            min_volume = COALESCE(MIN(min_volume, NEW.volume), NEW.volume, min_volume),
+            max_volume = COALESCE(MAX(max_volume, NEW.volume), NEW.volume, max_volume),
+            sum_bar_range = COALESCE(sum_bar_range, 0) + COALESCE(NEW.bar_range, 0),
+            avg_bar_range = (COALESCE(sum_bar_range, 0) + COALESCE(NEW.bar_range, 0)) / (sample_count + 1),
+            min_bar_range = COALESCE(MIN(min_bar_range, NEW.bar_range), NEW.bar_range, min_bar_range),
+            max_bar_range = COALESCE(MAX(max_bar_range, NEW.bar_range), NEW.bar_range, max_bar_range),
+            sum_range_per_1k = COALESCE(sum_range_per_1k, 0) + COALESCE(NEW.range_per_1k_volume, 0),
+            range_per_1k_count = COALESCE(range_per_1k_count, 0) + (NEW.range_per_1k_volume IS NOT NULL),
+            avg_range_per_1k_volume = CASE
+                WHEN COALESCE(range_per_1k_count, 0) + (NEW.range_per_1k_volume IS NOT NULL) > 0
+                THEN (COALESCE(sum_range_per_1k, 0) + COALESCE(NEW.range_per_1k_volume, 0))
+                     / (COALESCE(range_per_1k_count, 0) + (NEW.range_per_1k_volume IS NOT NULL))
+                ELSE avg_range_per_1k_volume END,
+            first_sample_time = COALESCE(MIN(first_sample_time, NEW.timestamp), NEW.timestamp),
+            last_sample_time = COALESCE(MAX(last_sample_time, NEW.timestamp), NEW.timestamp),
+            last_updated = datetime('now')
+        WHERE quarter_hour = NEW.quarter_hour AND symbol = NEW.symbol
+          AND (day_of_week IS NEW.day_of_week OR day_of_week IS NULL);
+    END
+'''
+
+def ensure_aggregate_maintenance(cursor):
+    """Add running-sum columns and the bar_samples insert trigger (idempotent).
+
+    Returns True if the sums had to be backfilled (existing database upgraded).
+    """
+    tables = {r[0] for r in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if 'bar_samples' not in tables or 'volatility_stats' not in tables:
+        return False
+    existing = {r[1] for r in cursor.execute('PRAGMA table_info(volatility_stats)')}
+    added = False
+    for name, decl in AGGREGATE_SUM_COLUMNS:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE volatility_stats ADD COLUMN {name} {decl}')
+            added = True
+    has_trigger = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_bar_samples_stats'").fetchone()
+    if added or not has_trigger:
+        # Stats written by the old batch recompute have no sums; rebuild once before going incremental
+        rebuild_aggregated_stats(cursor)
+        cursor.execute(_STATS_TRIGGER_SQL)
+        return True
+    return False
+
+def rebuild_aggregated_stats(cursor, symbol=None):
+    """Recompute volatility_stats from bar_samples in one GROUP BY pass.
+
+    Per-day rows come straight from bar_samples; the all-days rows (day_of_week NULL)
+    are rolled up from those, so bar_samples is scanned only once. symbol=None rebuilds all symbols.
+    """
+    cursor.execute('DELETE FROM volatility_stats WHERE ? IS NULL OR symbol = ?', (symbol, symbol))
+    cursor.execute('''
+        INSERT INTO volatility_stats (
+            hour_of_day, quarter_hour, day_of_week, symbol,
+            sample_count, sum_volume, avg_volume, min_volume, max_volume,
+            sum_bar_range, avg_bar_range, min_bar_range, max_bar_range,
+            sum_range_per_1k, range_per_1k_count, avg_range_per_1k_volume,
+            first_sample_time, last_sample_time, last_updated
+        )
+        SELECT quarter_hour / 4, quarter_hour, day_of_week, symbol,
+               COUNT(*), COALESCE(SUM(volume), 0), AVG(volume), MIN(volume), MAX(volume),
+               COALESCE(SUM(bar_range), 0), AVG(bar_range), MIN(bar_range), MAX(bar_range),
+               COALESCE(SUM(range_per_1k_volume), 0), COUNT(range_per_1k_volume), AVG(range_per_1k_volume),
+               MIN(timestamp), MAX(timestamp), datetime('now')
+        FROM bar_samples
+        WHERE quarter_hour IS NOT NULL AND (? IS NULL OR symbol = ?)
+        GROUP BY symbol, quarter_hour, day_of_week
+    ''', (symbol, symbol))
+    cursor.execute('''
+        INSERT INTO volatility_stats (
+            hour_of_day, quarter_hour, day_of_week, symbol,
+            sample_count, sum_volume, avg_volume, min_volume, max_volume,
+            sum_bar_range, avg_bar_range, min_bar_range, max_bar_range,
+            sum_range_per_1k, range_per_1k_count, avg_range_per_1k_volume,
+            first_sample_time, last_sample_time, last_updated
+        )
+        SELECT quarter_hour / 4, quarter_hour, NULL, symbol,
+               SUM(sample_count), SUM(sum_volume), SUM(sum_volume) * 1.0 / SUM(sample_count), MIN(min_volume), MAX(max_volume),
+               SUM(sum_bar_range), SUM(sum_bar_range) / SUM(sample_count), MIN(min_bar_range), MAX(max_bar_range),
+               SUM(sum_range_per_1k), SUM(range_per_1k_count),
+               CASE WHEN SUM(range_per_1k_count) > 0 THEN SUM(sum_range_per_1k) / SUM(range_per_1k_count) END,
+               MIN(first_sample_time), MAX(last_sample_time), datetime('now')
+        FROM volatility_stats
+        WHERE day_of_week IS NOT NULL AND (? IS NULL OR symbol = ?)
+        GROUP BY symbol, quarter_hour
+    ''', (symbol, symbol))
 
 def get_stats_summary():
     """Get a summary of collected statistics."""
@@ -230,51 +355,18 @@ def insert_bar_sample(timestamp, bar_index, symbol, open_p, high_p, low_p, close
     conn.close()
 
 def update_aggregated_stats(symbol='MNQ'):
-    """Update the aggregated volatility statistics from bar samples."""
+    """Rebuild the aggregated volatility statistics from bar samples.
+
+    Normally unnecessary: the bar_samples insert trigger keeps volatility_stats current.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Calculate stats for each quarter hour (0-95)
-    for quarter_hour in range(96):
-        cursor.execute('''
-            SELECT 
-                AVG(volume) as avg_vol,
-                MIN(volume) as min_vol,
-                MAX(volume) as max_vol,
-                AVG(bar_range) as avg_range,
-                MIN(bar_range) as min_range,
-                MAX(bar_range) as max_range,
-                AVG(range_per_1k_volume) as avg_range_per_1k,
-                COUNT(*) as sample_count,
-                MIN(timestamp) as first_sample,
-                MAX(timestamp) as last_sample
-            FROM bar_samples
-            WHERE quarter_hour = ? AND symbol = ?
-        ''', (quarter_hour, symbol))
-        
-        row = cursor.fetchone()
-        if row and row[7] > 0:  # sample_count > 0
-            # Calculate hour_of_day from quarter_hour for backward compatibility
-            hour_of_day = quarter_hour // 4
-            cursor.execute('''
-                INSERT OR REPLACE INTO volatility_stats (
-                    hour_of_day, quarter_hour, day_of_week, symbol,
-                    avg_volume, min_volume, max_volume,
-                    avg_bar_range, min_bar_range, max_bar_range,
-                    avg_range_per_1k_volume,
-                    sample_count, first_sample_time, last_sample_time, last_updated
-                ) VALUES (?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-            ''', (
-                hour_of_day, quarter_hour, symbol,
-                row[0], row[1], row[2],  # volume stats
-                row[3], row[4], row[5],  # range stats
-                row[6],                   # range per 1k volume
-                row[7], row[8], row[9]   # counts and times
-            ))
+    rebuild_aggregated_stats(cursor, symbol)
     
     conn.commit()
     conn.close()
-    print("Aggregated statistics updated (by quarter hour).")
+    print("Aggregated statistics rebuilt (by quarter hour).")
 
 def get_recommended_stop(hour_of_day, current_volume, symbol='MNQ'):
     """
@@ -0,0 +1,249 @@
+"""
+Vectorized directional-streak search over opportunity-log bars.
+
+Shared by /api/analyze-streaks (server.py) and analyze_opportunity_streaks.py.
+A streak window [i, i+L) qualifies when its net move (close of the last bar
+minus open of the first) is at least `min_movement`, it matches the requested
+direction, at most `counter_ratio` of its candles go against that direction,
+and the strategy either entered inside it or had a signal blocked in it.
+
+Candle, entry and block flags are turned into prefix sums / running
+next-entry and last-block indexes once, so each (start, length) window is
+checked in O(1) with whole-array NumPy operations per length. The greedy scan
+(longest qualifying window at each start, then skip past it) is the same as
+the original per-window Python loops, so results are identical.
+"""
+
+import numpy as np
+
+SIGNAL_TYPES = ('LONG_SIGNAL', 'SHORT_SIGNAL')
+STREAK_TYPES = ('long', 'short', 'both')
+
+# How a window without an entry qualifies through blocked signals:
+#   'last' - the last blocked signal in the window has a reason (server endpoint)
+#   'any'  - any blocked signal in the window has a reason (CLI script)
+BLOCK_RULES = ('last', 'any')
+
+
+def is_entry_bar(bar):
+    return bar['entryBar'] >= 0 and bar['currentPosition'] != 'Flat'
+
+
+def is_blocked_signal(bar):
+    return bar['opportunityType'] in SIGNAL_TYPES and ('SKIPPED' in bar['actionTaken'] or 'BLOCKED' in bar['actionTaken'])
+
+
+class StreakArrays:
+    """Column arrays and prefix sums for one list of opportunity bars; build once, search many times."""
+
+    # Numeric columns; enough to search and score windows without the bar dicts (see from_columns)
+    COLUMNS = ('open', 'close', 'gradient', 'good_prefix', 'reason_prefix', 'next_entry', 'last_blocked', 'has_reason')
+
+    def __init__(self, bars):
+        self.bars = bars
+        n = self.n = len(bars)
+        self.open = np.fromiter((b['open'] for b in bars), dtype=np.float64, count=n)
+        self.close = np.fromiter((b['close'] for b in bars), dtype=np.float64, count=n)
+        self.gradient = np.fromiter((np.nan if b['fastEmaGradDeg'] is None else b['fastEmaGradDeg'] for b in bars), dtype=np.float64, count=n)
+        good = np.fromiter((b['candleType'] == 'good' for b in bars), dtype=bool, count=n)
+        entry = np.fromiter((is_entry_bar(b) for b in bars), dtype=bool, count=n)
+        blocked = np.fromiter((is_blocked_signal(b) for b in bars), dtype=bool, count=n)
+        has_reason = np.fromiter((bool(b['blockReason']) for b in bars), dtype=bool, count=n)
+        idx = np.arange(n, dtype=np.int64)
+        # good_prefix[j] = good candles in bars[:j]; window count = good_prefix[i+L] - good_prefix[i]
+        self.good_prefix = np.concatenate(([0], np.cumsum(good, dtype=np.int64)))
+        self.reason_prefix = np.concatenate(([0], np.cumsum(blocked & has_reason, dtype=np.int64)))
+        # next_entry[j] = first entry bar at or after j (n if none); last_blocked[j] = last blocked signal at or before j (-1 if none)
+        self.next_entry = np.minimum.accumulate(np.where(entry, idx, n)[::-1])[::-1] if n else idx
+        self.last_blocked = np.maximum.accumulate(np.where(blocked, idx, -1)) if n else idx
+        self.has_reason = has_reason
+
+    def columns(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Rebuild from columns() output (e.g. views on shared memory); describe() is unavailable."""
+        arrays = cls.__new__(cls)
+        arrays.bars = None
+        for name in cls.COLUMNS:
+            setattr(arrays, name, columns[name])
+        arrays.n = len(arrays.open)
+        return arrays
+
+    def best_lengths(self, min_streak, max_streak, min_movement, streak_type='both', counter_ratio=0.4, block_rule='last'):
+        """Longest qualifying window length starting at each bar (0 = none)."""
+        n = self.n
+        best = np.zeros(n, dtype=np.int64)
+        for length in range(max(int(min_streak), 1), int(max_streak) + 1):
+            starts = n - length + 1
+            if starts <= 0:
+                break
+            net = self.close[length - 1:] - self.open[:starts]
+            ok = np.abs(net) >= min_movement
+            is_long = net > 0
+            if streak_type == 'long':
+                ok &= is_long
+            elif streak_type == 'short':
+                ok &= ~is_long
+            good = self.good_prefix[length:] - self.good_prefix[:starts]
+            bad = np.where(is_long, length - good, good)
+            ok &= bad / length <= counter_ratio
+            first = np.arange(starts)
+            entered = self.next_entry[:starts] < first + length
+            if block_rule == 'any':
+                blocked = self.reason_prefix[length:] - self.reason_prefix[:starts] > 0
+            else:
+                last = self.last_blocked[length - 1:]
+                blocked = (last >= first) & self.has_reason[np.maximum(last, 0)]
+            ok &= entered | blocked
+            best[:starts][ok] = length
+        return best
+
+    def windows(self, min_streak, max_streak, min_movement, streak_type='both', counter_ratio=0.4, block_rule='last'):
+        """Non-overlapping streak windows as (start, length, entry_offset) with entry_offset -1 when not entered."""
+        best = self.best_lengths(min_streak, max_streak, min_movement, streak_type, counter_ratio, block_rule).tolist()
+        next_entry = self.next_entry
+        found = []
+        i = 0
+        stop = self.n - int(min_streak) + 1
+        while i < stop:
+            length = best[i]
+            if length:
+                entry = int(next_entry[i])
+                found.append((i, length, entry - i if entry < i + length else -1))
+                i += length
+            else:
+                i += 1
+        return found
+
+    def window_arrays(self, found):
+        """windows() output as arrays: start, length, net (signed), entry_offset, missed_points, avg_gradient.
+
+        Values match describe(); the gradient sum is accumulated bar by bar in window order so
+        the averages are bit-identical to summing the window's gradients in Python.
+        """
+        found = np.asarray(found, dtype=np.int64).reshape(-1, 3)
+        start, length, entry_offset = found[:, 0], found[:, 1], found[:, 2]
+        start_price = self.open[start]
+        net = self.close[start + length - 1] - start_price
+        entry_price = self.open[start + np.maximum(entry_offset, 0)]
+        missed_points = np.where(entry_offset < 0, np.abs(net),
+                                 np.where(entry_offset == 0, 0.0, np.abs(entry_price - start_price)))
+        grad_sum = np.zeros(len(start))
+        grad_count = np.zeros(len(start), dtype=np.int64)
+        for k in range(int(length.max()) if len(start) else 0):
+            inside = k < length
+            g = self.gradient[np.minimum(start + k, self.n - 1)]
+            use = inside & ~np.isnan(g)
+            grad_sum = np.where(use, grad_sum + g, grad_sum)
+            grad_count += use
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_gradient = np.where(grad_count > 0, grad_sum / grad_count, 0.0)
+        return {'start': start, 'length': length, 'net': net, 'entry_offset': entry_offset,
+                'missed_points': missed_points, 'avg_gradient': avg_gradient}
+
+    def describe(self, start, length, entry_offset):
+        """Fields common to both streak reports for one window returned by windows()."""
+        bars = self.bars
+        streak_bars = bars[start:start + length]
+        start_price = streak_bars[0]['open']
+        end_price = streak_bars[-1]['close']
+        net_movement = end_price - start_price
+        direction = 'LONG' if net_movement > 0 else 'SHORT'
+        good = int(self.good_prefix[start + length] - self.good_prefix[start])
+        good_bars = good if direction == 'LONG' else length - good
+        bad_bars = length - good_bars
+        gradients = [b['fastEmaGradDeg'] for b in streak_bars if b['fastEmaGradDeg'] is not None]
+        if entry_offset < 0:
+            status, entry_bar, missed_points = 'missed', -1, abs(net_movement)
+        elif entry_offset == 0:
+            status, entry_bar, missed_points = 'caught', streak_bars[0]['bar'], 0
+        else:
+            status, entry_bar = 'partial', streak_bars[entry_offset]['bar']
+            missed_points = abs(streak_bars[entry_offset]['open'] - start_price)
+        # Blocked signals before the entry (or in the whole window when not entered)
+        blocked = [b['blockReason'] for b in streak_bars[:entry_offset if entry_offset >= 0 else length] if is_blocked_signal(b)]
+        block_reasons = []
+        for reason in blocked:
+            if reason and reason not in block_reasons:
+                block_reasons.append(reason)
+        return {
+            'start': start,
+            'length': length,
+            'bars': streak_bars,
+            'start_price': start_price,
+            'end_price': end_price,
+            'net_movement': net_movement,
+            'direction': direction,
+            'good_bars': good_bars,
+            'bad_bars': bad_bars,
+            'counter_ratio': bad_bars / length,
+            'avg_gradient': sum(gradients) / len(gradients) if gradients else 0,
+            'status': status,
+            'entry_bar': entry_bar,
+            'missed_points': missed_points,
+            'block_reason': blocked[-1] if blocked else '',
+            'block_reasons': block_reasons,
+        }
+
+
+def find_streak_windows(bars, min_streak, max_streak, min_movement, streak_type='both', counter_ratio=0.4, block_rule='last'):
+    """StreakArrays(bars).windows(...) plus describe() for each window."""
+    arrays = StreakArrays(bars)
+    return [arrays.describe(*w) for w in arrays.windows(min_streak, max_streak, min_movement, streak_type, counter_ratio, block_rule)]
+
+
+def streak_stats(streaks, total_bars, breakeven_trigger=0, breakeven_offset=2):
+    """Caught/partial/missed counts and PnL for /api/analyze-streaks style streaks (abs net_movement).
+
+    Break-even: once a caught (or the caught part of a partial) move reaches breakeven_trigger,
+    only breakeven_offset points are counted as locked; the rest is counted as missed.
+    """
+    total = len(streaks)
+    caught = sum(1 for s in streaks if s['status'] == 'caught')
+    missed = sum(1 for s in streaks if s['status'] == 'missed')
+    partial = sum(1 for s in streaks if s['status'] == 'partial')
+    avg_length = sum(s['length'] for s in streaks) / total if total > 0 else 0
+    avg_missed_points = sum(s['missed_points'] for s in streaks if s['missed_points'] > 0) / missed if missed > 0 else 0
+
+    total_pnl = 0.0
+    missed_pnl = 0.0
+    breakeven_locked_pnl = 0.0
+    for streak in streaks:
+        if streak['status'] == 'caught':
+            if breakeven_trigger > 0 and abs(streak['net_movement']) >= breakeven_trigger:
+                # Break-even triggered - conservative estimate counts only the locked profit
+                locked_profit = breakeven_offset
+                total_pnl += locked_profit
+                breakeven_locked_pnl += locked_profit
+                missed_pnl += abs(streak['net_movement']) - locked_profit
+            else:
+                total_pnl += abs(streak['net_movement'])
+        elif streak['status'] == 'partial':
+            caught_pnl = abs(streak['net_movement']) - streak['missed_points']
+            if breakeven_trigger > 0 and caught_pnl >= breakeven_trigger:
+                locked_profit = breakeven_offset
+                total_pnl += locked_profit
+                breakeven_locked_pnl += locked_profit
+                missed_pnl += (caught_pnl - locked_profit) + streak['missed_points']
+            else:
+                total_pnl += caught_pnl
+                missed_pnl += streak['missed_points']
+        elif streak['status'] == 'missed':
+            missed_pnl += abs(streak['net_movement'])
+
+    return {
+        'total_streaks': total,
+        'caught': caught,
+        'missed': missed,
+        'partial': partial,
+        'avg_length': avg_length,
+        'avg_missed_points': avg_missed_points,
+        'total_bars': total_bars,
+        'total_pnl': total_pnl,
+        'missed_pnl': missed_pnl,
+        'potential_pnl': total_pnl + missed_pnl,
+        'breakeven_locked_pnl': breakeven_locked_pnl,
+        'breakeven_enabled': breakeven_trigger > 0
+    }
@@ -0,0 +1,182 @@
+"""
+Parameter sweeps for the opportunity streak / break-even analysis.
+
+The grid is the cartesian product of:
+- window parameters (min_streak, max_streak, min_movement), which decide which
+  streak windows exist and are searched once per combination, and
+- score parameters (gradient thresholds, breakeven_trigger, breakeven_offset),
+  which only re-score those windows.
+
+The log's StreakArrays columns are copied once into a shared memory block
+(SharedColumns); pool workers attach to it by name (sweep_groups), so each
+task ships only parameter tuples, never the bars.
+"""
+
+import itertools
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from streak_engine import StreakArrays
+
+WINDOW_PARAMS = ('min_streak', 'max_streak', 'min_movement')
+SCORE_PARAMS = ('long_gradient_threshold', 'short_gradient_threshold', 'breakeven_trigger', 'breakeven_offset')
+DEFAULTS = {
+    'min_streak': 5,
+    'max_streak': 8,
+    'min_movement': 5.0,
+    'long_gradient_threshold': 7.0,
+    'short_gradient_threshold': -7.0,
+    'breakeven_trigger': 0,
+    'breakeven_offset': 2,
+}
+
+# rank_by -> (row key, descending)
+RANK_KEYS = {
+    'total_pnl': ('total_pnl', True),
+    'potential_pnl': ('potential_pnl', True),
+    'missed_pnl': ('missed_pnl', False),
+    'catch_rate': ('catch_score', True),
+}
+
+MAX_RANGE_VALUES = 1000
+
+
+def expand_range(value):
+    """Scalar, list, or {"start", "stop", "step"} (inclusive) -> list of values."""
+    if isinstance(value, dict):
+        start, stop = value['start'], value['stop']
+        step = value.get('step', 1)
+        if not step or (stop - start) / step < 0:
+            raise ValueError(f'Invalid range {value}')
+        count = int(round((stop - start) / step)) + 1
+        if count > MAX_RANGE_VALUES:
+            raise ValueError(f'Range {value} has more than {MAX_RANGE_VALUES} values')
+        values = [start + k * step for k in range(count)]
+        if all(isinstance(v, int) for v in (start, stop, step)):
+            return values
+        return [round(v, 10) for v in values]
+    if isinstance(value, (list, tuple)):
+        if not value:
+            raise ValueError('Empty parameter list')
+        return list(value)
+    return [value]
+
+
+def build_grid(params):
+    """Request params -> (window combos, score combos); each combo is a tuple in *_PARAMS order."""
+    axes = {name: expand_range(params.get(name, DEFAULTS[name])) for name in WINDOW_PARAMS + SCORE_PARAMS}
+    windows = [combo for combo in itertools.product(*(axes[name] for name in WINDOW_PARAMS))
+               if int(combo[0]) <= int(combo[1])]
+    scores = list(itertools.product(*(axes[name] for name in SCORE_PARAMS)))
+    return windows, scores
+
+
+class SharedColumns:
+    """StreakArrays.columns() copied into one shared memory block; `handle` is what workers need to attach."""
+
+    def __init__(self, columns):
+        layout = []
+        offset = 0
+        for name, array in columns.items():
+            array = np.ascontiguousarray(array)
+            layout.append((name, array.dtype.str, array.shape, offset))
+            offset += (array.nbytes + 7) // 8 * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for (name, dtype, shape, start), array in zip(layout, columns.values()):
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)[...] = array
+        self.handle = (self.shm.name, tuple(layout))
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _ordered_sum(values):
+    """Left-to-right float sum (np.cumsum is sequential, unlike np.sum), i.e. Python's sum()."""
+    return float(np.cumsum(values)[-1]) if len(values) else 0
+
+
+def _score_windows(arrays, window_combo, scores, streak_type):
+    """Rows for one window combo; numbers equal streak_stats() on the same streaks."""
+    min_streak, max_streak, min_movement = window_combo
+    w = arrays.window_arrays(arrays.windows(min_streak, max_streak, min_movement, streak_type, 0.4, 'last'))
+    net = np.abs(w['net'])
+    missed_points = w['missed_points']
+    is_long = w['net'] > 0
+    caught = w['entry_offset'] == 0
+    partial = w['entry_offset'] > 0
+    missed = w['entry_offset'] < 0
+    caught_pnl = net - missed_points  # partial streaks: move after the late entry
+    total = len(net)
+    n_caught, n_partial, n_missed = int(caught.sum()), int(partial.sum()), int(missed.sum())
+    avg_length = int(w['length'].sum()) / total if total else 0
+    rows = []
+    for long_grad, short_grad, breakeven_trigger, breakeven_offset in scores:
+        if breakeven_trigger > 0:
+            be_caught = caught & (net >= breakeven_trigger)
+            be_partial = partial & (caught_pnl >= breakeven_trigger)
+        else:
+            be_caught = be_partial = np.zeros(total, dtype=bool)
+        locked = be_caught | be_partial
+        # Per-streak contributions, added in streak order exactly as streak_stats() does
+        to_total = np.where(locked, float(breakeven_offset), np.where(caught, net, caught_pnl))
+        to_missed = np.where(be_caught, net - breakeven_offset,
+                             np.where(be_partial, (caught_pnl - breakeven_offset) + missed_points,
+                                      np.where(partial, missed_points, net)))
+        total_pnl = float(_ordered_sum(to_total[caught | partial]))
+        missed_pnl = float(_ordered_sum(to_missed[be_caught | partial | missed]))
+        gradient_ok = int((~((is_long & (w['avg_gradient'] < long_grad)) |
+                             (~is_long & (w['avg_gradient'] > short_grad)))).sum())
+        catch_rate = n_caught / total if total else 0
+        rows.append({
+            'min_streak': min_streak,
+            'max_streak': max_streak,
+            'min_movement': min_movement,
+            'long_gradient_threshold': long_grad,
+            'short_gradient_threshold': short_grad,
+            'breakeven_trigger': breakeven_trigger,
+            'breakeven_offset': breakeven_offset,
+            'total_streaks': total,
+            'caught': n_caught,
+            'partial': n_partial,
+            'missed': n_missed,
+            'gradient_ok': gradient_ok,
+            'catch_rate': catch_rate,
+            'catch_score': catch_rate * 1000 + total_pnl,
+            'total_pnl': total_pnl,
+            'missed_pnl': missed_pnl,
+            'potential_pnl': total_pnl + missed_pnl,
+            'breakeven_locked_pnl': float(_ordered_sum(np.full(int(locked.sum()), float(breakeven_offset)))),
+            'avg_length': avg_length,
+        })
+    return rows
+
+
+def sweep_groups(handle, window_combos, scores, streak_type):
+    """Pool task: attach to the shared columns and score every (window combo x score combo)."""
+    name, layout = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        columns = {col: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+                   for col, dtype, shape, start in layout}
+        arrays = StreakArrays.from_columns(columns)
+        rows = []
+        for combo in window_combos:
+            rows.extend(_score_windows(arrays, combo, scores, streak_type))
+        del arrays, columns  # release the buffer views before closing
+        return rows
+    finally:
+        shm.close()
+
+
+def rank_rows(rows, rank_by='total_pnl'):
+    """Sort sweep rows best-first by RANK_KEYS[rank_by] and number them."""
+    key, descending = RANK_KEYS[rank_by]
+    ranked = sorted(rows, key=lambda row: row[key], reverse=descending)
+    for rank, row in enumerate(ranked, 1):
+        row['rank'] = rank
+    return ranked
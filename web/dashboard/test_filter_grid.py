@@ -0,0 +1,142 @@
+"""
+FilterGrid scenarios against per-record loops: the what-if grid of analyze_gradient_strategy_logs
+(`if value > max: skip`, so missing values pass with keep_missing=True) and the confusion matrix of
+analyze_oc_diff.evaluate_filters (missing values never match).
+"""
+import itertools
+import math
+import random
+
+import pytest
+
+import filter_grid
+from filter_grid import Axis, FilterGrid, axes_from_config, expand_values
+
+FIELDS = ('a', 'b', 'c')
+EXCLUDE = {
+    '>=': lambda v, t: v < t,
+    '<=': lambda v, t: v > t,
+    '>': lambda v, t: v <= t,
+    '<': lambda v, t: v >= t,
+    '==': lambda v, t: v != t,
+    '!=': lambda v, t: v == t,
+}
+
+
+def random_records(rnd, count, nan_ratio=0.1):
+    records = []
+    for _ in range(count):
+        rec = {f: (math.nan if rnd.random() < nan_ratio else round(rnd.uniform(-5, 5), 1)) for f in FIELDS}
+        rec['pnl'] = rnd.choice([-4.25, -2.0, 0.0, 1.5, 3.75, 8.25])
+        records.append(rec)
+    return records
+
+
+def columns(records):
+    return {f: [r[f] for r in records] for f in FIELDS}
+
+
+def reference_grid(records, axes, keep_missing):
+    """One Python pass per scenario, as the original scripts did."""
+    rows = []
+    for combo in itertools.product(*(axis.values for axis in axes)):
+        sel = []
+        for rec in records:
+            ok = True
+            for axis, t in zip(axes, combo):
+                if t is None:
+                    continue
+                v = abs(rec[axis.field]) if axis.use_abs else rec[axis.field]
+                if keep_missing:
+                    ok = not EXCLUDE[axis.op](v, t)
+                else:
+                    ok = not math.isnan(v) and filter_grid.OPS[axis.op](v, t)
+                if not ok:
+                    break
+            if ok:
+                sel.append(rec['pnl'])
+        if sel:
+            label = ', '.join(axis.describe(t) for axis, t in zip(axes, combo) if t is not None) or 'No extra filters'
+            rows.append((label, len(sel), sum(sel) / len(sel), sum(1 for x in sel if x > 0) / len(sel) * 100.0))
+    return rows
+
+
+def test_grid_matches_loops_with_missing_values():
+    rnd = random.Random(25)
+    for keep_missing in (True, False):
+        for _ in range(20):
+            records = random_records(rnd, rnd.randint(1, 300))
+            axes = [Axis('a', rnd.choice(list(filter_grid.OPS)), [None, -1.0, 0.0, 2.5]),
+                    Axis('b', '<=', [None, 1.0, 3.0]),
+                    Axis('c', '>=', [None, 0.5, 1.5], label='|c|', use_abs=True)]
+            grid = FilterGrid(columns(records), pnl=[r['pnl'] for r in records], keep_missing=keep_missing)
+            got = [(r['label'], r['n'], r['avg'], r['win_rate']) for r in grid.evaluate_grid(axes)]
+            expected = reference_grid(records, axes, keep_missing)
+            assert [g[:2] for g in got] == [e[:2] for e in expected]
+            for g, e in zip(got, expected):
+                assert math.isclose(g[2], e[2], abs_tol=1e-9) and math.isclose(g[3], e[3], abs_tol=1e-9)
+
+
+def test_grid_chunking_and_min_n():
+    rnd = random.Random(3)
+    records = random_records(rnd, 500, nan_ratio=0.0)
+    axes = [Axis(f, '>=', [None] + [x / 2 for x in range(-8, 9)]) for f in FIELDS]
+    grid = FilterGrid(columns(records), pnl=[r['pnl'] for r in records])
+    whole = grid.evaluate_grid(axes, min_n=5)
+    saved = filter_grid.CHUNK_CELLS
+    filter_grid.CHUNK_CELLS = 500 * 37  # force many small chunks
+    try:
+        chunked = grid.evaluate_grid(axes, min_n=5)
+    finally:
+        filter_grid.CHUNK_CELLS = saved
+    assert whole == chunked
+    assert len(whole) and all(row['n'] >= 5 for row in whole)
+
+
+def reference_confusion(records, rules, positive, negative):
+    tp = fp = tn = fn = 0
+    for rec, pos, neg in zip(records, positive, negative):
+        cond = all(not math.isnan(rec[f]) and (lo is None or rec[f] >= lo) and (hi is None or rec[f] <= hi)
+                   for f, (lo, hi) in rules.items())
+        if pos:
+            tp, fn = tp + cond, fn + (not cond)
+        elif neg:
+            fp, tn = fp + cond, tn + (not cond)
+    return tp, fp, tn, fn
+
+
+def test_confusion_matrix_matches_rule_loop():
+    rnd = random.Random(5)
+    records = random_records(rnd, 2000)
+    diffs = [rnd.uniform(-2, 2) for _ in records]
+    positive = [d > 0.25 for d in diffs]
+    negative = [d < -0.25 for d in diffs]  # flat records are in neither class
+    filters = [
+        ('a>=1 & b<=2', {'a': (1.0, None), 'b': (None, 2.0)}),
+        ('c==0.5', {'c': (0.5, 0.5)}),
+        ('a in [-1, 1] & c>=0', {'a': (-1.0, 1.0), 'c': (0.0, None)}),
+    ]
+    grid = FilterGrid(columns(records), positive=positive, negative=negative)
+    conditions = [(name, [(f, '>=', lo) for f, (lo, hi) in rules.items() if lo is not None] +
+                         [(f, '<=', hi) for f, (lo, hi) in rules.items() if hi is not None])
+                  for name, rules in filters]
+    for row, (name, rules) in zip(grid.evaluate_filters(conditions), filters):
+        tp, fp, tn, fn = reference_confusion(records, rules, positive, negative)
+        assert (row['label'], row['tp'], row['fp'], row['tn'], row['fn']) == (name, tp, fp, tn, fn)
+        assert row['precision'] == (tp / (tp + fp) if tp + fp else 0.0)
+        assert row['recall'] == (tp / (tp + fn) if tp + fn else 0.0)
+
+
+def test_config_axes():
+    axes = axes_from_config({'axes': [
+        {'field': 'a', 'op': '<=', 'values': {'start': 0.1, 'stop': 0.3, 'step': 0.1}},
+        {'field': 'b', 'values': [1, 2], 'required': True},
+        {'field': 'c', 'op': '>=', 'abs': True, 'values': [None, 4]},
+    ]})
+    assert [a.values for a in axes] == [[None, 0.1, 0.2, 0.3], [1, 2], [None, 4]]
+    assert axes[1].op == '>=' and axes[2].label == '|c|'
+    assert expand_values(3) == [3]
+    for bad in ({'start': 1, 'stop': 0, 'step': 1}, {'start': 0, 'stop': 1, 'step': 0}):
+        with pytest.raises(ValueError):
+            expand_values(bad)
+
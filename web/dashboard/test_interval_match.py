@@ -0,0 +1,53 @@
+"""IntervalIndex / match_overlaps agree with the endpoint-inside overlap loop of match_trades_to_trends."""
+import random
+
+from interval_match import IntervalIndex, match_overlaps
+
+
+def overlaps(a, b):
+    """The original test: an endpoint of one range lies inside the other, inclusive."""
+    (a0, a1), (b0, b1) = a, b
+    return a0 <= b0 <= a1 or a0 <= b1 <= a1 or b0 <= a0 <= b1 or b0 <= a1 <= b1
+
+
+def brute_force(queries, ranges):
+    return [[pos for pos, r in enumerate(ranges) if overlaps(q, r)] for q in queries]
+
+
+def random_ranges(rnd, count, span, max_len, reversed_ratio=0.1):
+    out = []
+    for _ in range(count):
+        start = rnd.randint(0, span)
+        end = start + rnd.randint(0, max_len)
+        out.append((end, start) if rnd.random() < reversed_ratio else (start, end))
+    return out
+
+
+def test_overlapping_matches_brute_force():
+    rnd = random.Random(24)
+    for _ in range(200):
+        ranges = random_ranges(rnd, rnd.randint(0, 60), 200, rnd.choice([0, 3, 20, 80]))
+        queries = random_ranges(rnd, 40, 200, rnd.choice([0, 5, 40]))
+        index = IntervalIndex(ranges)
+        expected = brute_force(queries, ranges)
+        assert [index.overlapping(s, e) for s, e in queries] == expected
+        assert [index.first(s, e) for s, e in queries] == [m[0] if m else None for m in expected]
+
+
+def test_match_overlaps_modes():
+    rnd = random.Random(7)
+    ranges = random_ranges(rnd, 300, 5000, 50)
+    queries = random_ranges(rnd, 300, 5000, 120)
+    expected = brute_force(queries, ranges)
+    assert match_overlaps(queries, ranges, all_matches=True) == expected
+    assert match_overlaps(queries, ranges) == [m[:1] for m in expected]
+
+
+def test_empty_and_duplicate_ranges():
+    assert IntervalIndex([]).overlapping(0, 10) == []
+    index = IntervalIndex([(5, 5), (5, 5), (1, 9)])
+    assert index.overlapping(5, 5) == [0, 1, 2]
+    assert index.overlapping(6, 8) == [2]
+    # Two reversed ranges never match each other
+    assert IntervalIndex([(9, 1)]).overlapping(8, 2) == []
+
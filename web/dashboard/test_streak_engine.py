@@ -0,0 +1,77 @@
+"""
+Prefix-sum streak search against the per-window scan it replaced, for the server's 'last'
+block rule and the CLI's 'any' rule.
+"""
+import random
+
+from streak_engine import StreakArrays, find_streak_windows, is_blocked_signal, is_entry_bar
+
+
+def window_qualifies(window, min_movement, streak_type, counter_ratio, block_rule):
+    net = window[-1]['close'] - window[0]['open']
+    if abs(net) < min_movement:
+        return False
+    if (streak_type == 'long' and net <= 0) or (streak_type == 'short' and net > 0):
+        return False
+    bad = sum(1 for b in window if (b['candleType'] == 'good') != (net > 0))
+    if bad / len(window) > counter_ratio:
+        return False
+    if any(is_entry_bar(b) for b in window):
+        return True
+    blocked = [b for b in window if is_blocked_signal(b)]
+    if block_rule == 'any':
+        return any(b['blockReason'] for b in blocked)
+    return bool(blocked) and bool(blocked[-1]['blockReason'])
+
+
+def brute_force(bars, min_streak, max_streak, min_movement, streak_type, counter_ratio, block_rule):
+    """Greedy scan: longest qualifying window at each start, then skip past it."""
+    found = []
+    i = 0
+    while i <= len(bars) - min_streak:
+        best = None
+        for length in range(min_streak, max_streak + 1):
+            if i + length > len(bars):
+                break
+            if window_qualifies(bars[i:i + length], min_movement, streak_type, counter_ratio, block_rule):
+                best = length
+        if best is None:
+            i += 1
+            continue
+        entries = [k for k in range(best) if is_entry_bar(bars[i + k])]
+        found.append((i, best, entries[0] if entries else -1))
+        i += best
+    return found
+
+
+def test_windows_match_brute_force(opportunity_bars):
+    rnd = random.Random(21)
+    for seed in range(60):
+        bars = opportunity_bars(seed, rnd.randint(0, 150))
+        arrays = StreakArrays(bars)
+        for block_rule in ('last', 'any'):
+            for streak_type in ('long', 'short', 'both'):
+                min_streak = rnd.randint(1, 5)
+                params = (min_streak, min_streak + rnd.randint(0, 4), rnd.choice([0.0, 2.0, 5.0]),
+                          streak_type, rnd.choice([0.0, 0.25, 0.4, 1.0]), block_rule)
+                assert arrays.windows(*params) == brute_force(bars, *params), params
+
+
+def test_describe_fields(opportunity_bars):
+    bars = opportunity_bars(8, 400)
+    for streak in find_streak_windows(bars, 3, 7, 2.0):
+        window = streak['bars']
+        net = window[-1]['close'] - window[0]['open']
+        gradients = [b['fastEmaGradDeg'] for b in window if b['fastEmaGradDeg'] is not None]
+        entries = [k for k, b in enumerate(window) if is_entry_bar(b)]
+        assert streak['net_movement'] == net and streak['direction'] == ('LONG' if net > 0 else 'SHORT')
+        assert streak['good_bars'] + streak['bad_bars'] == len(window)
+        assert streak['avg_gradient'] == (sum(gradients) / len(gradients) if gradients else 0)
+        if not entries:
+            assert (streak['status'], streak['missed_points']) == ('missed', abs(net))
+        elif entries[0] == 0:
+            assert (streak['status'], streak['missed_points']) == ('caught', 0)
+        else:
+            assert streak['status'] == 'partial'
+            assert streak['missed_points'] == abs(window[entries[0]]['open'] - window[0]['open'])
+
@@ -0,0 +1,49 @@
+"""Sweep rows re-scored from shared-memory columns equal streak_stats() on the same windows."""
+from streak_engine import StreakArrays, find_streak_windows, streak_stats
+from streak_sweep import SharedColumns, build_grid, rank_rows, sweep_groups
+
+STAT_KEYS = ('total_streaks', 'caught', 'partial', 'missed', 'total_pnl', 'missed_pnl',
+             'potential_pnl', 'breakeven_locked_pnl', 'avg_length')
+
+
+def test_sweep_rows_match_streak_stats(opportunity_bars):
+    bars = opportunity_bars(22, 2000)
+    windows, scores = build_grid({
+        'min_streak': [2, 3, 5], 'max_streak': [4, 8], 'min_movement': {'start': 1.0, 'stop': 5.0, 'step': 2.0},
+        'long_gradient_threshold': [0.0, 7.0], 'short_gradient_threshold': -7.0,
+        'breakeven_trigger': [0, 2, 5], 'breakeven_offset': [1, 2],
+    })
+    shared = SharedColumns(StreakArrays(bars).columns())
+    try:
+        rows = sweep_groups(shared.handle, windows, scores, 'both')
+    finally:
+        shared.close()
+    assert len(rows) == len(windows) * len(scores)
+    for row in rows:
+        streaks = find_streak_windows(bars, row['min_streak'], row['max_streak'], row['min_movement'])
+        stats = streak_stats(streaks, len(bars), row['breakeven_trigger'], row['breakeven_offset'])
+        assert {k: row[k] for k in STAT_KEYS} == {k: stats[k] for k in STAT_KEYS}, row
+        gradient_ok = sum(1 for s in streaks
+                          if not ((s['direction'] == 'LONG' and s['avg_gradient'] < row['long_gradient_threshold']) or
+                                  (s['direction'] == 'SHORT' and s['avg_gradient'] > row['short_gradient_threshold'])))
+        assert row['gradient_ok'] == gradient_ok
+
+
+def test_window_arrays_match_describe(opportunity_bars):
+    arrays = StreakArrays(opportunity_bars(13, 1000))
+    found = arrays.windows(2, 8, 1.0)
+    w = arrays.window_arrays(found)
+    described = [arrays.describe(*f) for f in found]
+    assert w['net'].tolist() == [s['net_movement'] for s in described]
+    assert w['missed_points'].tolist() == [s['missed_points'] for s in described]
+    assert w['avg_gradient'].tolist() == [s['avg_gradient'] for s in described]
+    # Columns alone (as the sweep workers see them) give the same windows
+    assert StreakArrays.from_columns(arrays.columns()).windows(2, 8, 1.0) == found
+
+
+def test_grid_skips_inverted_windows_and_ranks():
+    windows, scores = build_grid({'min_streak': [3, 9], 'max_streak': [5, 8], 'min_movement': 1.0})
+    assert [w[:2] for w in windows] == [(3, 5), (3, 8)]
+    assert len(scores) == 1
+    rows = [{'total_pnl': 1.0}, {'total_pnl': 3.0}, {'total_pnl': 2.0}]
+    assert [r['total_pnl'] for r in rank_rows(rows)] == [3.0, 2.0, 1.0]
@@ -0,0 +1,84 @@
+"""resample() against a per-tick bar builder, and to_bar_samples() calendar fields against datetime."""
+import datetime
+import random
+
+import pytest
+
+from tick_bars import NS_PER_SEC, bar_numbers, parse_timeframe, resample, to_bar_samples
+
+T0 = 1_700_000_000 * NS_PER_SEC
+
+
+def random_ticks(rnd, count, shuffle=False):
+    ts, t = [], T0 + rnd.randint(0, 59) * NS_PER_SEC
+    for _ in range(count):
+        t += rnd.choice([0, 0, 1, 250_000_000, 3 * NS_PER_SEC, 70 * NS_PER_SEC])
+        ts.append(t)
+    ticks = [(stamp, round(20000 + rnd.uniform(-20, 20), 2), rnd.randint(1, 12)) for stamp in ts]
+    if shuffle:
+        rnd.shuffle(ticks)
+    return ticks
+
+
+def reference(ticks, bar_type, size):
+    """One pass over time-ordered ticks, opening a new bar when the key changes."""
+    bars, key_of, traded = [], None, 0
+    for position, (stamp, price, volume) in enumerate(sorted(ticks, key=lambda tick: tick[0])):  # stable
+        if bar_type == 'time':
+            key = stamp // (size * NS_PER_SEC)
+        elif bar_type == 'tick':
+            key = position // size
+        else:
+            key = traded // size
+        traded += volume
+        if not bars or key != key_of:
+            bars.append({'open': price, 'high': price, 'low': price, 'volume': 0, 'ticks': 0})
+            key_of = key
+        bar = bars[-1]
+        bar['high'], bar['low'] = max(bar['high'], price), min(bar['low'], price)
+        bar['close'], bar['volume'], bar['ticks'] = price, bar['volume'] + volume, bar['ticks'] + 1
+        bar['ts'] = (key + 1) * size * NS_PER_SEC if bar_type == 'time' else stamp
+    return bars
+
+
+def as_rows(bars):
+    keys = ('ts', 'open', 'high', 'low', 'close', 'volume', 'ticks')
+    return [dict(zip(keys, values)) for values in zip(*(bars[k].tolist() for k in keys))]
+
+
+def test_resample_matches_loop():
+    rnd = random.Random(13)
+    for _ in range(60):
+        ticks = random_ticks(rnd, rnd.randint(1, 400), shuffle=rnd.random() < 0.3)
+        ts, price, volume = (list(col) for col in zip(*ticks))
+        for bar_type, size in (('time', rnd.choice([1, 30, 60, 300])), ('tick', rnd.randint(1, 40)),
+                               ('volume', rnd.randint(1, 200))):
+            got = as_rows(resample(ts, price, volume, bar_type, size))
+            assert got == reference(ticks, bar_type, size), (bar_type, size)
+
+
+def test_edge_cases():
+    empty = resample([], [], [], 'volume', 10)
+    assert all(len(v) == 0 for v in empty.values())
+    for bad in (('time', 0), ('range', 5)):
+        with pytest.raises(ValueError):
+            resample([T0], [1.0], [1], *bad)
+    # A single large trade is not split: it ends its volume bar alone
+    bars = resample([T0, T0 + 1, T0 + 2], [1.0, 2.0, 3.0], [2, 50, 1], 'volume', 10)
+    assert bars['volume'].tolist() == [52, 1]
+    assert [parse_timeframe(v) for v in ('30s', '1m', '5m', '90s', '2m', 45)] == [30, 60, 300, 90, 120, 45]
+
+
+def test_bar_samples_calendar_fields():
+    rnd = random.Random(4)
+    ticks = random_ticks(rnd, 3000)
+    bars = resample(*zip(*ticks), bar_type='time', size=60)
+    rows = to_bar_samples(bars, 'MNQ', bar_numbers(bars, 'time', 60))
+    for row, stamp in zip(rows, bars['ts'].tolist()):
+        when = datetime.datetime.fromtimestamp(stamp // NS_PER_SEC, datetime.timezone.utc)
+        assert row['timestamp'] == when.strftime('%Y-%m-%d %H:%M:%S')
+        assert (row['hour_of_day'], row['quarter_hour'], row['day_of_week']) == \
+               (when.hour, when.hour * 4 + when.minute // 15, when.weekday())
+        assert row['bar_index'] == stamp // (60 * NS_PER_SEC) - 1
+        assert row['bar_range'] == row['high_price'] - row['low_price']
+
@@ -0,0 +1,66 @@
+"""Compact ingest encodings decode to the same payload as plain JSON; /state delta merge."""
+import gzip
+import json
+import zlib
+
+import pytest
+
+import wire_format
+from wire_format import WIRE_SCHEMAS, UnsupportedWireFormat, decode_body, merge_state_delta
+
+BAR_FIELDS = WIRE_SCHEMAS[('bar', 1)]
+BARS = [{field: (k * 31 + pos) % 7 or None for pos, field in enumerate(BAR_FIELDS)} for k in range(5)]
+
+
+def test_content_encodings_round_trip():
+    body = json.dumps(BARS).encode()
+    raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    variants = {
+        None: body,
+        'identity': body,
+        'gzip': gzip.compress(body),
+        'x-gzip': gzip.compress(body),
+        'deflate': zlib.compress(body),
+        ' Deflate ': raw.compress(body) + raw.flush(),  # raw deflate, as some clients send it
+    }
+    for encoding, data in variants.items():
+        assert decode_body(data, 'application/json', encoding) == BARS, encoding
+    with pytest.raises(UnsupportedWireFormat):
+        decode_body(body, 'application/json', 'br')
+
+
+def test_positional_rows_match_objects():
+    rows = [[bar[f] for f in BAR_FIELDS] for bar in BARS]
+    by_schema = {'schema': 'bar', 'v': 1, 'rows': rows}
+    by_fields = {'fields': list(BAR_FIELDS), 'rows': rows}
+    for payload in (by_schema, by_fields):
+        assert decode_body(json.dumps(payload).encode()) == BARS
+    assert decode_body(json.dumps({'schema': 'bar', 'row': rows[2]}).encode()) == BARS[2]
+    with pytest.raises(UnsupportedWireFormat):
+        decode_body(json.dumps({'schema': 'bar', 'v': 99, 'rows': rows}).encode())
+    # Plain objects that merely contain a "rows" key without fields/schema pass through
+    plain = {'rows': [1, 2], 'symbol': 'MNQ'}
+    assert decode_body(json.dumps(plain).encode(), 'application/json; charset=utf-8') == plain
+
+
+@pytest.mark.skipif(wire_format.msgpack is None, reason='msgpack not installed')
+def test_msgpack():
+    packed = wire_format.msgpack.packb({'schema': 'bar', 'v': 1, 'rows': [[b[f] for f in BAR_FIELDS] for b in BARS]})
+    for content_type in wire_format.MSGPACK_CONTENT_TYPES:
+        assert decode_body(packed, content_type) == BARS
+    assert decode_body(gzip.compress(packed), 'application/msgpack', 'gzip') == BARS
+
+
+@pytest.mark.skipif(wire_format.msgpack is not None, reason='msgpack installed')
+def test_msgpack_missing():
+    with pytest.raises(UnsupportedWireFormat):
+        decode_body(b'\x90', 'application/msgpack')
+
+
+def test_merge_state_delta():
+    base = {'barIndex': 10, 'position': 'Flat', 'pnl': 1.5, 'note': 'x'}
+    delta = {'delta': True, 'barIndex': 11, 'pnl': 2.0, 'removed': ['note', 'missing']}
+    assert merge_state_delta(base, delta) == {'barIndex': 11, 'position': 'Flat', 'pnl': 2.0}
+    assert base['note'] == 'x'  # base is not modified
+    assert merge_state_delta(base, {'delta': True}) == base
+
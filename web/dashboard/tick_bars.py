@@ -0,0 +1,128 @@
+"""
+Vectorized tick -> OHLCV bar resampling.
+
+Works on tick column arrays (int64 ns timestamps, float64 price, integer
+volume) as returned by tick_cache.TickCache.load_arrays, using NumPy group
+reductions (reduceat) instead of per-tick Python loops. Rows produced by
+to_bar_samples() follow the volatility.db bar_samples schema so they can be
+inserted directly.
+
+Bar types:
+- time:   fixed wall-clock periods (size = seconds), stamped at bar close
+- tick:   every `size` ticks, stamped with the last tick's time
+- volume: a new bar starts with the first tick after `size` contracts have
+          traded (ticks are not split, so a bar can exceed `size`)
+"""
+
+import numpy as np
+
+TIMEFRAMES = {'30s': 30, '1m': 60, '3m': 180, '5m': 300}
+BAR_TYPES = ('time', 'tick', 'volume')
+NS_PER_SEC = 1000000000
+
+BAR_SAMPLE_COLUMNS = (
+    'timestamp', 'bar_index', 'symbol', 'hour_of_day', 'quarter_hour', 'day_of_week',
+    'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+    'bar_range', 'body_size', 'upper_wick', 'lower_wick', 'range_per_1k_volume',
+    'direction', 'in_trade', 'trade_result_ticks',
+)
+
+
+def parse_timeframe(value):
+    """'30s' / '1m' / '3m' / '5m', or a plain number of seconds -> seconds."""
+    value = str(value).strip().lower()
+    if value in TIMEFRAMES:
+        return TIMEFRAMES[value]
+    if value.endswith('s'):
+        return int(value[:-1])
+    if value.endswith('m'):
+        return int(value[:-1]) * 60
+    return int(value)
+
+
+def _bar_starts(ts, volume, bar_type, size):
+    n = len(ts)
+    if bar_type == 'time':
+        period = int(size) * NS_PER_SEC
+        key = ts // period
+        starts = np.concatenate(([0], np.flatnonzero(key[1:] != key[:-1]) + 1))
+        return starts, (key[starts] + 1) * period
+    if bar_type == 'tick':
+        return np.arange(0, n, int(size)), None
+    if bar_type == 'volume':
+        cum_before = np.cumsum(volume, dtype=np.int64) - volume
+        key = cum_before // int(size)
+        return np.concatenate(([0], np.flatnonzero(key[1:] != key[:-1]) + 1)), None
+    raise ValueError(f"Unknown bar_type '{bar_type}' (expected one of {', '.join(BAR_TYPES)})")
+
+
+def resample(ts, price, volume, bar_type='time', size=60):
+    """OHLCV bars as a dict of arrays: ts (bar time, ns), open, high, low, close, volume, ticks."""
+    if int(size) <= 0:
+        raise ValueError('size must be positive')
+    ts = np.asarray(ts, dtype=np.int64)
+    price = np.asarray(price, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.int64)
+    n = len(ts)
+    if n == 0:
+        empty_f = np.empty(0, dtype=np.float64)
+        empty_i = np.empty(0, dtype=np.int64)
+        return {'ts': empty_i, 'open': empty_f, 'high': empty_f, 'low': empty_f,
+                'close': empty_f, 'volume': empty_i, 'ticks': empty_i}
+    if n > 1 and (ts[1:] < ts[:-1]).any():
+        order = np.argsort(ts, kind='stable')
+        ts, price, volume = ts[order], price[order], volume[order]
+    starts, bar_ts = _bar_starts(ts, volume, bar_type, size)
+    ends = np.append(starts[1:], n)
+    last = ends - 1
+    return {
+        'ts': bar_ts if bar_ts is not None else ts[last],
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[last],
+        'volume': np.add.reduceat(volume, starts),
+        'ticks': ends - starts,
+    }
+
+
+def bar_numbers(bars, bar_type, size):
+    """Stable bar_index values: epoch period number for time bars, else position."""
+    if bar_type == 'time':
+        return (bars['ts'] // (int(size) * NS_PER_SEC) - 1).tolist()
+    return range(len(bars['ts']))
+
+
+def to_bar_samples(bars, symbol, bar_index=None):
+    """Bar arrays -> list of bar_samples row dicts (see BAR_SAMPLE_COLUMNS)."""
+    ts = bars['ts']
+    open_p, high_p, low_p, close_p = bars['open'], bars['high'], bars['low'], bars['close']
+    volume = bars['volume']
+    secs = ts // NS_PER_SEC
+    hour = secs // 3600 % 24
+    quarter = hour * 4 + (secs // 60 % 60) // 15
+    day_of_week = (secs // 86400 + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+    bullish = close_p > open_p
+    bar_range = high_p - low_p
+    upper_wick = np.where(bullish, high_p - close_p, high_p - open_p)
+    lower_wick = np.where(bullish, open_p - low_p, close_p - low_p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        range_per_1k = np.where(volume > 0, bar_range / (volume / 1000.0), 0.0)
+    stamps = np.char.replace(np.datetime_as_string(secs.astype('datetime64[s]')), 'T', ' ')
+    columns = (
+        stamps.tolist(), bar_index if bar_index is not None else range(len(ts)), hour.tolist(), quarter.tolist(),
+        day_of_week.tolist(), open_p.tolist(), high_p.tolist(), low_p.tolist(), close_p.tolist(),
+        volume.tolist(), bar_range.tolist(), np.abs(close_p - open_p).tolist(),
+        upper_wick.tolist(), lower_wick.tolist(), range_per_1k.tolist(),
+    )
+    rows = []
+    for (stamp, idx, h, q, dow, o, hi, lo, c, v, rng, body, uw, lw, r1k) in zip(*columns):
+        rows.append({
+            'timestamp': stamp, 'bar_index': idx, 'symbol': symbol,
+            'hour_of_day': h, 'quarter_hour': q, 'day_of_week': dow,
+            'open_price': o, 'high_price': hi, 'low_price': lo, 'close_price': c, 'volume': v,
+            'bar_range': rng, 'body_size': body, 'upper_wick': uw, 'lower_wick': lw,
+            'range_per_1k_volume': r1k,
+            'direction': 'FLAT', 'in_trade': 0, 'trade_result_ticks': None,
+        })
+    return rows
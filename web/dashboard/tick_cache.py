@@ -0,0 +1,663 @@
+"""
+Tick file parsing and binary sidecar cache for NinjaTrader tick exports.
+
+The first full parse of a text tick file (.Last.txt / CSV export) writes a
+compact, memory-mappable sidecar next to it (``<file>.tickbin``, or under
+TICK_CACHE_DIR when the source directory is read-only). Later date-range
+queries binary-search a sparse time index and read column slices straight
+from the mmap instead of re-parsing text.
+
+Sidecar layout (native byte order, every column 8-byte aligned):
+    b'TICKBIN1' | uint64 header length | JSON header | columns...
+Columns: ts int64 (naive wall-clock ns since 1970), price float64,
+volume int64, bid/ask float64 (only when the source has them), and the
+sparse index int64 (ts of every index_stride-th tick).
+
+A sidecar is valid only while the source file's size and mtime match the
+values recorded in its header (and its version is SIDECAR_VERSION).
+
+Readers hold a reference on the sidecar they read (TickCache.acquire /
+TickSidecar.release); one that goes stale or is released from the cache is
+only closed once its last reader is done, so a streaming download keeps its
+views while a newer sidecar replaces it.
+"""
+
+import os
+import sys
+import json
+import mmap
+import array
+import bisect
+import heapq
+import shutil
+import hashlib
+import time
+import calendar
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'TICKBIN1'
+SIDECAR_VERSION = 2  # 2: volume int64 (was int32)
+SIDECAR_SUFFIX = '.tickbin'
+TICK_CACHE_DIR = os.environ.get('TICK_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'tick_cache'))
+TICK_INDEX_STRIDE = int(os.environ.get('TICK_INDEX_STRIDE', '4096'))
+TICK_WRITE_CHUNK = 65536
+TICK_READ_CHUNK = 65536
+
+_EPOCH = datetime(1970, 1, 1)
+_NAN = float('nan')
+
+
+def to_ns(dt):
+    """Naive datetime -> int ns since 1970 (wall clock, no timezone shift)."""
+    return calendar.timegm(dt.timetuple()) * 1000000000 + dt.microsecond * 1000
+
+
+def from_ns(ns):
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+
+def _tick_volume(parts, idx):
+    value = parts[idx].strip() if len(parts) > idx else ''
+    return int(float(value)) if value else 1
+
+
+def parse_tick_line(line):
+    """Parse one tick line into (datetime, price, volume, bid, ask), or None.
+
+    bid/ask are None unless the line carries them. Formats, tried in order:
+      yyyyMMdd HHmmss[ fffffff];[bid;ask;]last;volume  (NinjaTrader .Last.txt)
+      yyyyMMdd HHmmss,price,volume  or  unix_ts,price,volume
+      yyyyMMdd HHmmss price volume  or  unix_ts price volume
+    """
+    if ';' in line:
+        parts = line.split(';')
+        if len(parts) >= 3:
+            try:
+                date_time_str = parts[0].strip()
+                if ' ' in date_time_str:
+                    date_parts = date_time_str.split()
+                    if len(date_parts) >= 3:
+                        tick_time = datetime.strptime(f"{date_parts[0]} {date_parts[1]}", "%Y%m%d %H%M%S")
+                        try:
+                            # Sub-second component is in microseconds (e.g. 0160000 = 160ms)
+                            tick_time = tick_time.replace(microsecond=int(date_parts[2]) % 1000000)
+                        except ValueError:
+                            pass
+                        if len(parts) >= 4:
+                            # bid;ask;last;volume - use Last
+                            return tick_time, float(parts[3]), _tick_volume(parts, 4), float(parts[1]), float(parts[2])
+                        return tick_time, float(parts[1]), _tick_volume(parts, 2), None, None
+                    if len(date_parts) == 2:
+                        return datetime.strptime(date_time_str, "%Y%m%d %H%M%S"), float(parts[1]), _tick_volume(parts, 2), None, None
+                elif len(date_time_str) == 14:
+                    return datetime.strptime(date_time_str, "%Y%m%d%H%M%S"), float(parts[1]), _tick_volume(parts, 2), None, None
+                else:
+                    return datetime.fromtimestamp(float(date_time_str)), float(parts[1]), _tick_volume(parts, 2), None, None
+            except (ValueError, IndexError, OverflowError, OSError):
+                pass
+
+    if ',' in line:
+        parts = line.split(',')
+        if len(parts) >= 2:
+            try:
+                head = parts[0].strip()
+                if ' ' in head and len(head) >= 15:
+                    tick_time = datetime.strptime(head, "%Y%m%d %H%M%S")
+                else:
+                    tick_time = datetime.fromtimestamp(float(head))
+                return tick_time, float(parts[1]), _tick_volume(parts, 2), None, None
+            except (ValueError, IndexError, OverflowError, OSError):
+                pass
+
+    parts = line.split()
+    if len(parts) >= 2:
+        try:
+            if len(parts) >= 3:
+                tick_time = datetime.strptime(f"{parts[0]} {parts[1]}", "%Y%m%d %H%M%S")
+                return tick_time, float(parts[2]), _tick_volume(parts, 3), None, None
+            return datetime.fromtimestamp(float(parts[0])), float(parts[1]), 1, None, None
+        except (ValueError, IndexError, OverflowError, OSError):
+            pass
+    return None
+
+
+def iter_tick_file(file_path, start_dt=None, end_dt=None, stats=None, writer=None):
+    """Lazily yield date-filtered (datetime, price, volume) ticks from a text tick file.
+
+    Every parsed tick (before date filtering) is also fed to ``writer`` when
+    given; the writer is finished at EOF and aborted if the generator is
+    closed early. Counters (lines, skipped, parse_errors, ticks,
+    sample_parse_errors) are kept in ``stats`` as the file is consumed.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(lines=0, skipped=0, parse_errors=0, ticks=0, sample_parse_errors=[])
+    samples = stats['sample_parse_errors']
+    finished = False
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line_num, line in enumerate(f, 1):
+                stats['lines'] = line_num
+                if line_num % 1000000 == 0:
+                    print(f"[DOWNLOAD_TICK] {os.path.basename(file_path)}: {line_num:,} lines, {stats['ticks']:,} ticks, {stats['parse_errors']:,} parse errors...")
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    stats['skipped'] += 1
+                    continue
+                if line_num <= 5:
+                    print(f"[DOWNLOAD_TICK] Sample line {line_num}: {line[:80]}")
+                tick = parse_tick_line(line)
+                if tick is None:
+                    stats['parse_errors'] += 1
+                    if len(samples) < 5:
+                        samples.append(f"Line {line_num}: {line[:60]}")
+                    continue
+                if writer is not None:
+                    writer.append(tick)
+                tick_time = tick[0]
+                if start_dt and tick_time < start_dt:
+                    continue
+                if end_dt and tick_time > end_dt:
+                    continue
+                stats['ticks'] += 1
+                yield tick_time, tick[1], tick[2]
+        finished = True
+    finally:
+        if writer is not None:
+            if finished:
+                writer.finish()
+            else:
+                writer.abort()
+
+
+class TickSidecarWriter:
+    """Accumulates parsed ticks into per-column temp files, then assembles the sidecar."""
+
+    COLUMNS = (('ts', 'q'), ('price', 'd'), ('volume', 'q'), ('bid', 'd'), ('ask', 'd'))
+
+    def __init__(self, source_path, target_path, source_stat):
+        self.source_path = source_path
+        self.target_path = target_path
+        self.source_stat = source_stat
+        self.count = 0
+        self.has_bid_ask = False
+        self.sorted = True
+        self.last_ts = None
+        self.index = array.array('q')
+        self._tag = f"{os.getpid()}-{threading.get_ident()}"
+        self._tmp = {}
+        self._buf = {}
+        for name, code in self.COLUMNS:
+            self._tmp[name] = open(f"{target_path}.{self._tag}.{name}.tmp", 'w+b')
+            self._buf[name] = array.array(code)
+
+    def append(self, tick):
+        tick_time, price, volume, bid, ask = tick
+        ts = to_ns(tick_time)
+        if self.last_ts is not None and ts < self.last_ts:
+            self.sorted = False
+        self.last_ts = ts
+        if self.count % TICK_INDEX_STRIDE == 0:
+            self.index.append(ts)
+        buf = self._buf
+        buf['ts'].append(ts)
+        buf['price'].append(price)
+        buf['volume'].append(volume)
+        if bid is not None:
+            self.has_bid_ask = True
+            buf['bid'].append(bid)
+            buf['ask'].append(ask)
+        else:
+            buf['bid'].append(_NAN)
+            buf['ask'].append(_NAN)
+        self.count += 1
+        if len(buf['ts']) >= TICK_WRITE_CHUNK:
+            self._flush()
+
+    def _flush(self):
+        for name, values in self._buf.items():
+            values.tofile(self._tmp[name])
+            del values[:]
+
+    def _close_tmp(self, remove=True):
+        for f in self._tmp.values():
+            try:
+                f.close()
+                if remove:
+                    os.remove(f.name)
+            except OSError:
+                pass
+        self._tmp = {}
+
+    def abort(self):
+        self._close_tmp()
+
+    def finish(self):
+        """Write the sidecar unless the source changed while it was being parsed."""
+        try:
+            self._flush()
+            st = os.stat(self.source_path)
+            if st.st_size != self.source_stat.st_size or st.st_mtime_ns != self.source_stat.st_mtime_ns:
+                print(f"[TICK_CACHE] {self.source_path} changed during parse, sidecar not written")
+                return None
+            names = ['ts', 'price', 'volume'] + (['bid', 'ask'] if self.has_bid_ask else [])
+            sizes = {name: self._tmp[name].tell() for name in names}
+            sizes['index'] = len(self.index) * self.index.itemsize
+            header = {
+                'version': SIDECAR_VERSION,
+                'source': os.path.abspath(self.source_path),
+                'source_size': self.source_stat.st_size,
+                'source_mtime_ns': self.source_stat.st_mtime_ns,
+                'byteorder': sys.byteorder,
+                'count': self.count,
+                'sorted': self.sorted,
+                'has_bid_ask': self.has_bid_ask,
+                'index_stride': TICK_INDEX_STRIDE,
+                'index_count': len(self.index),
+                'columns': {},
+            }
+            # Offsets depend on the header length, which depends on the offsets;
+            # reserve a fixed-width header so one pass is enough.
+            header_len = 1024
+            offset = _align(len(MAGIC) + 8 + header_len)
+            for name in names + ['index']:
+                header['columns'][name] = offset
+                offset = _align(offset + sizes[name])
+            raw = json.dumps(header).encode('utf-8')
+            if len(raw) > header_len:
+                header_len = _align(len(raw))
+                offset = _align(len(MAGIC) + 8 + header_len)
+                for name in names + ['index']:
+                    header['columns'][name] = offset
+                    offset = _align(offset + sizes[name])
+                raw = json.dumps(header).encode('utf-8')
+            tmp_path = f"{self.target_path}.{self._tag}.tmp"
+            with open(tmp_path, 'wb') as out:
+                out.write(MAGIC)
+                out.write(header_len.to_bytes(8, 'little'))
+                out.write(raw.ljust(header_len, b' '))
+                for name in names:
+                    out.seek(header['columns'][name])
+                    src = self._tmp[name]
+                    src.seek(0)
+                    shutil.copyfileobj(src, out, 1 << 20)
+                out.seek(header['columns']['index'])
+                self.index.tofile(out)
+            tick_cache.release(self.source_path)
+            os.replace(tmp_path, self.target_path)
+            print(f"[TICK_CACHE] Wrote {self.target_path} ({self.count:,} ticks, {offset / (1024*1024):.1f} MB)")
+            tick_cache.builds += 1
+            return self.target_path
+        except OSError as e:
+            print(f"[TICK_CACHE] Failed to write sidecar for {self.source_path}: {e}")
+            return None
+        finally:
+            self._close_tmp()
+
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
+
+
+class TickSidecar:
+    """Read-only mmap view of one sidecar file.
+
+    Use it between TickCache.acquire() and release(); the cache retires it when it goes stale and
+    the map is closed when the last reader releases it.
+    """
+
+    def __init__(self, path, header, fh, mm):
+        self.path = path
+        self.header = header
+        self.count = header['count']
+        self.stride = header['index_stride']
+        self.sorted = header['sorted']
+        self.has_bid_ask = header['has_bid_ask']
+        self._fh = fh
+        self._mm = mm
+        self._views = {}
+        self._ref_lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+        self._closed = False
+        view = memoryview(mm)
+        codes = {'ts': 'q', 'price': 'd', 'volume': 'q', 'bid': 'd', 'ask': 'd', 'index': 'q'}
+        for name, offset in header['columns'].items():
+            n = header['index_count'] if name == 'index' else self.count
+            size = n * array.array(codes[name]).itemsize
+            self._views[name] = view[offset:offset + size].cast(codes[name])
+
+    def column(self, name):
+        """Zero-copy memoryview over a column (ts, price, volume, bid, ask, index)."""
+        return self._views[name]
+
+    def arrays(self, start_dt=None, end_dt=None):
+        """Zero-copy numpy views (ts, price, volume, and bid/ask if present) for the date range."""
+        dtypes = {'ts': np.int64, 'price': np.float64, 'volume': np.int64, 'bid': np.float64, 'ask': np.float64}
+        lo, hi = self.range(start_dt, end_dt) if self.sorted else (0, self.count)
+        out = {}
+        for name, offset in self.header['columns'].items():
+            if name in dtypes:
+                out[name] = np.frombuffer(self._mm, dtype=dtypes[name], count=self.count, offset=offset)[lo:hi]
+        if not self.sorted and (start_dt or end_dt):
+            mask = np.ones(len(out['ts']), dtype=bool)
+            if start_dt:
+                mask &= out['ts'] >= to_ns(start_dt)
+            if end_dt:
+                mask &= out['ts'] <= to_ns(end_dt)
+            out = {name: values[mask] for name, values in out.items()}
+        return out
+
+    def _search(self, value, side):
+        ts = self._views['ts']
+        search = bisect.bisect_left if side == 'left' else bisect.bisect_right
+        i = search(self._views['index'], value)
+        lo = max(0, (i - 1) * self.stride)
+        hi = min(self.count, i * self.stride)
+        return search(ts, value, lo, hi)
+
+    def range(self, start_dt=None, end_dt=None):
+        """[lo, hi) tick positions with start_dt <= ts <= end_dt (sorted sidecars only)."""
+        lo = 0 if start_dt is None else self._search(to_ns(start_dt), 'left')
+        hi = self.count if end_dt is None else self._search(to_ns(end_dt), 'right')
+        return lo, max(lo, hi)
+
+    def iter_ticks(self, start_dt=None, end_dt=None, stats=None):
+        """Yield (datetime, price, volume) for the date range, reading chunks off the mmap."""
+        ts, price, volume = self._views['ts'], self._views['price'], self._views['volume']
+        if self.sorted:
+            lo, hi = self.range(start_dt, end_dt)
+            start_ns = end_ns = None
+        else:
+            lo, hi = 0, self.count
+            start_ns = to_ns(start_dt) if start_dt else None
+            end_ns = to_ns(end_dt) if end_dt else None
+        if stats is not None:
+            stats.update(lines=hi - lo, skipped=0, parse_errors=0, ticks=0, sample_parse_errors=[], sidecar=self.path)
+        for chunk_lo in range(lo, hi, TICK_READ_CHUNK):
+            chunk_hi = min(hi, chunk_lo + TICK_READ_CHUNK)
+            for t, p, v in zip(ts[chunk_lo:chunk_hi].tolist(), price[chunk_lo:chunk_hi].tolist(), volume[chunk_lo:chunk_hi].tolist()):
+                if start_ns is not None and t < start_ns:
+                    continue
+                if end_ns is not None and t > end_ns:
+                    continue
+                if stats is not None:
+                    stats['ticks'] += 1
+                yield from_ns(t), p, v
+
+    def acquire(self):
+        """Take a reader reference; False once the sidecar has been closed."""
+        with self._ref_lock:
+            if self._closed:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        """Drop a reader reference; the last reader of a retired sidecar closes it."""
+        with self._ref_lock:
+            self._readers -= 1
+            close = self._retired and self._readers == 0 and not self._closed
+            if close:
+                self._closed = True
+        if close:
+            self._close()
+
+    def retire(self):
+        """No new readers (the cache dropped it); close now or when the last reader releases."""
+        with self._ref_lock:
+            self._retired = True
+            close = self._readers == 0 and not self._closed
+            if close:
+                self._closed = True
+        if close:
+            self._close()
+
+    def _close(self):
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        try:
+            self._mm.close()
+        except BufferError:
+            # numpy arrays from arrays() still reference the map; it is freed when they go away
+            pass
+        self._fh.close()
+
+
+class _SidecarTicks:
+    """Tick iterator that holds a reader reference on its sidecar until exhausted or closed."""
+
+    def __init__(self, sidecar, ticks):
+        self._sidecar = sidecar
+        self._ticks = ticks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._ticks is None:
+            raise StopIteration
+        try:
+            return next(self._ticks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._ticks is not None:
+            self._ticks.close()
+            self._ticks = None
+            self._sidecar.release()
+
+    def __del__(self):
+        self.close()
+
+
+class TickCache:
+    """Process-wide registry of open sidecars, keyed by source path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.invalidations = 0
+
+    def sidecar_paths(self, source_path):
+        local = os.path.abspath(source_path) + SIDECAR_SUFFIX
+        digest = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:16]
+        fallback = os.path.join(TICK_CACHE_DIR, f"{os.path.basename(source_path)}.{digest}{SIDECAR_SUFFIX}")
+        return local, fallback
+
+    def _load(self, path, st):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header_len = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        if (header.get('version') != SIDECAR_VERSION or header.get('source_size') != st.st_size
+                or header.get('source_mtime_ns') != st.st_mtime_ns or header.get('byteorder') != sys.byteorder):
+            return None
+        fh = open(path, 'rb')
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            fh.close()
+            raise
+        return TickSidecar(path, header, fh, mm)
+
+    def acquire(self, source_path):
+        """Open (or reuse) a fresh sidecar for source_path with a reader reference taken; None if
+        missing or stale. The caller must sidecar.release() it when done reading."""
+        key = os.path.abspath(source_path)
+        st = os.stat(source_path)
+        with self._lock:
+            entry = self._open.get(key)
+            if entry is not None:
+                sidecar, size, mtime_ns = entry
+                if size == st.st_size and mtime_ns == st.st_mtime_ns and sidecar.acquire():
+                    self.hits += 1
+                    return sidecar
+                # Source changed: readers still streaming from the old sidecar keep it until they release
+                del self._open[key]
+                sidecar.retire()
+                self.invalidations += 1
+            for path in self.sidecar_paths(source_path):
+                if not os.path.exists(path):
+                    continue
+                try:
+                    sidecar = self._load(path, st)
+                except (OSError, ValueError) as e:
+                    print(f"[TICK_CACHE] Unreadable sidecar {path}: {e}")
+                    sidecar = None
+                if sidecar is None:
+                    self.invalidations += 1
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                self._open[key] = (sidecar, st.st_size, st.st_mtime_ns)
+                sidecar.acquire()
+                self.hits += 1
+                return sidecar
+            self.misses += 1
+            return None
+
+    def writer(self, source_path):
+        """A TickSidecarWriter targeting a writable sidecar location, or None."""
+        st = os.stat(source_path)
+        for path in self.sidecar_paths(source_path):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                return TickSidecarWriter(source_path, path, st)
+            except OSError:
+                continue
+        return None
+
+    def release(self, source_path):
+        """Drop an open sidecar so its file can be replaced (required on Windows); it is closed now,
+        or by its last active reader."""
+        with self._lock:
+            entry = self._open.pop(os.path.abspath(source_path), None)
+        if entry is not None:
+            entry[0].retire()
+
+    def iter_ticks(self, source_path, start_dt=None, end_dt=None, stats=None):
+        """Date-filtered ticks from the sidecar when fresh, else parse (and build it)."""
+        sidecar = self.acquire(source_path)
+        if sidecar is not None:
+            return _SidecarTicks(sidecar, sidecar.iter_ticks(start_dt, end_dt, stats))
+        return self._parse_and_build(source_path, start_dt, end_dt, stats)
+
+    def _parse_and_build(self, source_path, start_dt, end_dt, stats):
+        # The writer is created on first next(), so an unstarted generator leaves no temp files
+        yield from iter_tick_file(source_path, start_dt, end_dt, stats, writer=self.writer(source_path))
+
+    def load_arrays(self, source_path, start_dt=None, end_dt=None):
+        """numpy column arrays for the date range, building the sidecar first if needed."""
+        if np is None:
+            raise RuntimeError('numpy is required for tick arrays (pip install numpy)')
+        sidecar = self.acquire(source_path)
+        if sidecar is None:
+            for _ in self._parse_and_build(source_path, None, None, {}):
+                pass
+            sidecar = self.acquire(source_path)
+        if sidecar is not None:
+            try:
+                return sidecar.arrays(start_dt, end_dt)
+            finally:
+                sidecar.release()
+        # Sidecar could not be written anywhere: parse straight into arrays
+        ts, price, volume = array.array('q'), array.array('d'), array.array('q')
+        for tick_time, p, v in iter_tick_file(source_path, start_dt, end_dt):
+            ts.append(to_ns(tick_time))
+            price.append(p)
+            volume.append(v)
+        return {'ts': np.frombuffer(ts, dtype=np.int64), 'price': np.frombuffer(price, dtype=np.float64),
+                'volume': np.frombuffer(volume, dtype=np.int64)}
+
+    def iter_merged(self, source_paths, start_dt=None, end_dt=None, stats=None):
+        """Ticks from several files merged into one time-ordered stream."""
+        per_file = []
+        streams = []
+        for path in source_paths:
+            file_stats = {'file': path}
+            per_file.append(file_stats)
+            streams.append(self.iter_ticks(path, start_dt, end_dt, file_stats))
+        if stats is not None:
+            stats['files'] = per_file
+        try:
+            yield from heapq.merge(*streams, key=lambda t: t[0])
+        finally:
+            for stream in streams:
+                stream.close()
+            if stats is not None:
+                for key in ('lines', 'skipped', 'parse_errors', 'ticks'):
+                    stats[key] = sum(f.get(key, 0) for f in per_file)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._open),
+                'hits': self.hits,
+                'misses': self.misses,
+                'builds': self.builds,
+                'invalidations': self.invalidations,
+                'index_stride': TICK_INDEX_STRIDE,
+            }
+
+    def close(self):
+        with self._lock:
+            entries = list(self._open.values())
+            self._open.clear()
+        for sidecar, _, _ in entries:
+            sidecar.retire()
+
+
+tick_cache = TickCache()
+
+
+def build_sidecar(source_path):
+    """Make sure source_path has a fresh sidecar and summarize it.
+
+    Module-level so it can run in a ProcessPoolExecutor worker. Returns
+    {'path', 'sidecar', 'ticks', 'first', 'last', 'built', 'elapsed_ms'},
+    or {'path', 'error'} when no sidecar could be written.
+    """
+    t0 = time.perf_counter()
+    sidecar = tick_cache.acquire(source_path)
+    built = sidecar is None
+    if built:
+        for _ in tick_cache._parse_and_build(source_path, None, None, {}):
+            pass
+        sidecar = tick_cache.acquire(source_path)
+    if sidecar is None:
+        return {'path': source_path, 'error': 'sidecar could not be written'}
+    try:
+        ts = sidecar.column('ts')
+        first = last = None
+        if sidecar.count:
+            lo, hi = (ts[0], ts[-1]) if sidecar.sorted else (min(ts), max(ts))
+            first, last = from_ns(lo).isoformat(), from_ns(hi).isoformat()
+    finally:
+        sidecar.release()
+    summary = {
+        'path': source_path,
+        'sidecar': sidecar.path,
+        'ticks': sidecar.count,
+        'first': first,
+        'last': last,
+        'built': built,
+        'elapsed_ms': round((time.perf_counter() - t0) * 1000, 1),
+    }
+    # Pool workers are long-lived; don't keep the map (or the file) open in them
+    tick_cache.release(source_path)
+    return summary
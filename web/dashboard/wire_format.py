@@ -0,0 +1,106 @@
+"""
+Compact request encodings for strategy -> dashboard posts.
+
+Ingest endpoints (/diag, /state, /api/volatility/record-bar, batch-record-bars)
+accept, in addition to plain JSON:
+
+- Content-Encoding: gzip or deflate (any body type)
+- Content-Type: application/msgpack (or application/x-msgpack), if the
+  optional `msgpack` package is installed
+- Positional rows instead of one object per record, in either form:
+      {"fields": ["timestamp", "open", ...], "rows": [[...], [...]]}
+      {"schema": "bar", "v": 1, "rows": [[...], [...]]}    (registered in WIRE_SCHEMAS)
+  "row": [...] instead of "rows" decodes to a single object.
+
+Delta-encoded /state payloads are merged by the server (see merge_state_delta).
+"""
+
+import gzip
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Registered positional layouts: (schema, version) -> field names. Never change a published
+# version; add a new one instead so older strategy builds keep decoding.
+WIRE_SCHEMAS = {
+    ('bar', 1): (
+        'timestamp', 'bar_index', 'symbol', 'open', 'high', 'low', 'close', 'volume',
+        'direction', 'in_trade', 'trade_result_ticks',
+        'ema_fast_period', 'ema_slow_period', 'ema_fast_value', 'ema_slow_value',
+        'fast_ema_grad_deg', 'stop_loss_points', 'candle_type', 'trend_up', 'trend_down',
+        'allow_long_this_bar', 'allow_short_this_bar', 'pending_long_from_bad', 'pending_short_from_good',
+        'avoid_longs_on_bad_candle', 'avoid_shorts_on_good_candle', 'entry_reason',
+    ),
+}
+
+
+class UnsupportedWireFormat(ValueError):
+    """Body uses an encoding this server cannot decode (mapped to HTTP 415)."""
+
+
+def _media_type(content_type):
+    return (content_type or '').split(';', 1)[0].strip().lower()
+
+
+def decompress(body, content_encoding):
+    """Undo a gzip/deflate Content-Encoding (identity passes through)."""
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)  # raw deflate without zlib header
+    raise UnsupportedWireFormat(f'Unsupported Content-Encoding: {content_encoding}')
+
+
+def _expand_rows(payload):
+    """{"fields"|"schema", "rows"|"row"} envelope -> list of dicts / dict; anything else unchanged."""
+    if not isinstance(payload, dict) or ('rows' not in payload and 'row' not in payload):
+        return payload
+    fields = payload.get('fields')
+    if fields is None:
+        if 'schema' not in payload:
+            return payload
+        key = (payload['schema'], int(payload.get('v', 1)))
+        fields = WIRE_SCHEMAS.get(key)
+        if fields is None:
+            raise UnsupportedWireFormat(f'Unknown wire schema {key[0]} v{key[1]}')
+    if 'row' in payload:
+        return dict(zip(fields, payload['row']))
+    return [dict(zip(fields, row)) for row in payload['rows']]
+
+
+def decode_body(body, content_type=None, content_encoding=None):
+    """Raw request body -> payload (dict or list). Raises ValueError on undecodable input."""
+    body = decompress(body, content_encoding)
+    if _media_type(content_type) in MSGPACK_CONTENT_TYPES:
+        if msgpack is None:
+            raise UnsupportedWireFormat('application/msgpack needs the msgpack package (pip install msgpack)')
+        payload = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    else:
+        payload = json.loads(body)
+    return _expand_rows(payload)
+
+
+def merge_state_delta(base, delta):
+    """Full state = cached `base` with the fields present in `delta` applied.
+
+    Keys listed in delta["removed"] are dropped; the transport keys ("delta", "removed") are not kept.
+    """
+    merged = dict(base)
+    for key, value in delta.items():
+        if key not in ('delta', 'removed'):
+            merged[key] = value
+    for key in delta.get('removed') or ():
+        merged.pop(key, None)
+    return merged